@@ -0,0 +1,193 @@
+import base64
+import json
+
+
+def encode_manifest_claim(manifest_digest, docker_reference):
+    """
+    Construct a manifest claim (image signature) and encode it to be sent to RADAS.
+
+    Constructed signature adheres to the following standard:
+    https://github.com/containers/image/blob/master/docs/containers-signature.5.md
+
+    Args:
+        manifest_digest (str):
+            Digest referencing the signed image. Mandatory part of the image signature.
+        docker_reference (str):
+            Image reference which will be used by customers to pull the image. Mandatory part of
+            the image signature.
+    Returns (str):
+        Base64-encoded manifest claim.
+    """
+    # container image signature
+    manifest_claim = {
+        "critical": {
+            "type": "atomic container signature",
+            "image": {"docker-manifest-digest": manifest_digest},
+            "identity": {"docker-reference": docker_reference},
+        },
+        # NOTE: pub version is no longer written here. I hope that's OK
+        "optional": {"creator": "Red Hat RCM Pub"},
+    }
+    # Python 2.6/3 compatibility workaround
+    return base64.b64encode(json.dumps(manifest_claim).encode("latin1")).decode("latin1")
+
+
+class ClaimMessage(object):
+    """
+    Compact representation of a claim message sent to RADAS.
+
+    Only the inputs of the claim are stored. The encoded manifest claim ('claim_file') is derived
+    from the manifest digest and docker reference whenever it's needed, which is usually only
+    when the message is sent. Messages support read-only dict-style access to their fields, so
+    they may be used in place of claim messages constructed as dicts.
+    """
+
+    FIELDS = (
+        "sig_key_id",
+        "claim_file",
+        "pub_task_id",
+        "request_id",
+        "manifest_digest",
+        "repo",
+        "image_name",
+        "docker_reference",
+        "created",
+    )
+
+    __slots__ = (
+        "sig_key_id",
+        "pub_task_id",
+        "request_id",
+        "manifest_digest",
+        "repo",
+        "image_name",
+        "docker_reference",
+        "created",
+    )
+
+    def __init__(
+        self,
+        sig_key_id,
+        pub_task_id,
+        request_id,
+        manifest_digest,
+        repo,
+        image_name,
+        docker_reference,
+        created,
+    ):
+        """
+        Initialize.
+
+        Args:
+            sig_key_id (str):
+                Signature key that will be sent to RADAS.
+            pub_task_id (str):
+                ID of the pub task.
+            request_id (str):
+                Unique ID of the signing request.
+            manifest_digest (str):
+                Digest referencing the signed image.
+            repo (str):
+                Internal destination repository to send to RADAS.
+            image_name (str):
+                Name of the image to send to RADAS.
+            docker_reference (str):
+                Image reference which will be used by customers to pull the image.
+            created (str):
+                Creation time of the message in ISO 8601 format.
+        """
+        self.sig_key_id = sig_key_id
+        self.pub_task_id = pub_task_id
+        self.request_id = request_id
+        self.manifest_digest = manifest_digest
+        self.repo = repo
+        self.image_name = image_name
+        self.docker_reference = docker_reference
+        self.created = created
+
+    @property
+    def claim_file(self):
+        """Encoded manifest claim."""
+        return encode_manifest_claim(self.manifest_digest, self.docker_reference)
+
+    def __getitem__(self, key):
+        """Get value of a field like from a dict."""
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        """Check if the message has a field."""
+        return key in self.FIELDS
+
+    def __eq__(self, other):
+        """Compare the message with another message or a dict."""
+        if isinstance(other, (ClaimMessage, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        """Compare the message with another message or a dict."""
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    # messages are compared by value, like the dicts they replace
+    __hash__ = None
+
+    def __repr__(self):
+        """Represent the message like a dict."""
+        return repr(self.to_dict())
+
+    def get(self, key, default=None):
+        """Get value of a field, or the default if the field doesn't exist."""
+        return self[key] if key in self.FIELDS else default
+
+    def keys(self):
+        """Get names of the message fields."""
+        return list(self.FIELDS)
+
+    def items(self):
+        """Get (name, value) pairs of the message fields."""
+        return [(key, self[key]) for key in self.FIELDS]
+
+    def to_dict(self, claim_file=None):
+        """
+        Serialize the message to a dict sent to RADAS.
+
+        Args:
+            claim_file (str):
+                Encoded manifest claim of the message, if it's already known.
+        Returns (dict):
+            Claim message.
+        """
+        message = dict((key, getattr(self, key)) for key in self.__slots__)
+        message["claim_file"] = claim_file or self.claim_file
+        return message
+
+
+def serialize_claim_messages(messages):
+    """
+    Serialize claim messages to be sent to RADAS.
+
+    Manifest claims are encoded once per manifest digest and docker reference. Messages which are
+    already dicts are returned as they are.
+
+    Args:
+        messages ([ClaimMessage|dict]):
+            Claim messages.
+    Returns ([dict]):
+        Serialized claim messages.
+    """
+    encoded_claims = {}
+    serialized = []
+    for message in messages:
+        if not isinstance(message, ClaimMessage):
+            serialized.append(message)
+            continue
+
+        key = (message.manifest_digest, message.docker_reference)
+        if key not in encoded_claims:
+            encoded_claims[key] = message.claim_file
+        serialized.append(message.to_dict(encoded_claims[key]))
+    return serialized
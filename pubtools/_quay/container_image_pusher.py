@@ -1,4 +1,5 @@
 import logging
+import threading
 
 import requests
 
@@ -9,10 +10,13 @@ from .exceptions import (
 from .utils.misc import (
     get_internal_container_repo_name,
     log_step,
+    run_in_parallel,
+    DEFAULT_MAX_THREADS,
 )
 from .quay_client import QuayClient
 from .tag_images import tag_images
 from .manifest_list_merger import ManifestListMerger
+from .push_journal import PushJournal
 
 LOG = logging.getLogger("PubLogger")
 logging.basicConfig()
@@ -41,6 +45,8 @@ class ContainerImagePusher:
 
         self.quay_host = self.target_settings.get("quay_host", "quay.io").rstrip("/")
         self._quay_client = None
+        self._repo_state = None
+        self._journal = None
 
     @property
     def quay_client(self):
@@ -53,6 +59,51 @@ class ContainerImagePusher:
             )
         return self._quay_client
 
+    def set_repo_state(self, repo_state):
+        """
+        Set a RepositoryStateSnapshot instance which will serve the repository data.
+
+        Args:
+            repo_state (RepositoryStateSnapshot):
+                RepositoryStateSnapshot instance shared with other stages of the push.
+        """
+        self._repo_state = repo_state
+
+    def set_journal(self, journal):
+        """
+        Set a PushJournal instance which will record finished copy and merge operations.
+
+        Args:
+            journal (PushJournal):
+                Journal of the push task.
+        """
+        self._journal = journal
+
+    def _get_manifest_list(self, image):
+        """
+        Get manifest list of an image. Read through the repository state snapshot if it's set.
+
+        Args:
+            image (str):
+                Image for which to get the manifest list.
+        Returns (dict):
+            Manifest list of the image.
+        """
+        if self._repo_state is not None:
+            return self._repo_state.get_manifest(image, manifest_list=True)
+        return self.quay_client.get_manifest(image, manifest_list=True)
+
+    def _invalidate_repo_state(self, dest_refs):
+        """
+        Invalidate cached data of repositories which were written to.
+
+        Args:
+            dest_refs ([str]):
+                Destination references of the write operation.
+        """
+        if self._repo_state is not None:
+            self._repo_state.invalidate_images(dest_refs)
+
     @classmethod
     def run_tag_images(cls, source_ref, dest_refs, all_arch, target_settings):
         """
@@ -95,16 +146,16 @@ class ContainerImagePusher:
             ),
         )
 
-    def copy_source_push_item(self, push_item):
+    def get_item_dest_refs(self, push_item):
         """
-        Perform the tagging operation for a push item containing a source image.
+        Get references of all destination images of a push item.
 
         Args:
             push_item (ContainerPushItem):
-                Source container push item.
+                Container push item.
+        Returns ([str]):
+            Destination references in the internal format of Quay repositories.
         """
-        LOG.info("Copying push item '{0}' as a source image".format(push_item))
-        source_ref = push_item.metadata["pull_url"]
         dest_refs = []
         image_schema = "{host}/{namespace}/{repo}:{tag}"
         namespace = self.target_settings["quay_namespace"]
@@ -120,7 +171,22 @@ class ContainerImagePusher:
                 )
                 dest_refs.append(dest_ref)
 
+        return dest_refs
+
+    def copy_source_push_item(self, push_item):
+        """
+        Perform the tagging operation for a push item containing a source image.
+
+        Args:
+            push_item (ContainerPushItem):
+                Source container push item.
+        """
+        LOG.info("Copying push item '{0}' as a source image".format(push_item))
+        source_ref = push_item.metadata["pull_url"]
+        dest_refs = self.get_item_dest_refs(push_item)
+
         self.run_tag_images(source_ref, dest_refs, True, self.target_settings)
+        self._invalidate_repo_state(dest_refs)
 
     def run_merge_workflow(self, source_ref, dest_refs):
         """
@@ -152,6 +218,10 @@ class ContainerImagePusher:
             self.run_tag_images(source_image, dest_images, False, self.target_settings)
 
         for dest_ref in dest_refs:
+            merge_key = "{0} {1}".format(source_ref, dest_ref)
+            if self._journal and self._journal.is_done("merge", merge_key):
+                LOG.info("Manifest list of '{0}' was already merged, skipping".format(dest_ref))
+                continue
             LOG.info(
                 "Merging manifest lists of source '{0}' and destination '{1}'".format(
                     source_ref, dest_ref
@@ -160,6 +230,9 @@ class ContainerImagePusher:
             merger = ManifestListMerger(source_ref, dest_ref, host=self.quay_host)
             merger.set_quay_client(self.quay_client)
             merger.merge_manifest_lists()
+            if self._journal:
+                self._journal.record("merge", merge_key, data={"dest_ref": dest_ref})
+        self._invalidate_repo_state(dest_refs)
 
     def copy_multiarch_push_item(self, push_item, source_ml):
         """
@@ -179,38 +252,27 @@ class ContainerImagePusher:
         simple_dest_refs = []
         merge_mls_dest_refs = []
 
-        image_schema = "{host}/{namespace}/{repo}:{tag}"
-        namespace = self.target_settings["quay_namespace"]
-
-        for repo, tags in sorted(push_item.metadata["tags"].items()):
-            internal_repo = get_internal_container_repo_name(repo)
-            for tag in tags:
-                dest_ref = image_schema.format(
-                    host=self.quay_host,
-                    namespace=namespace,
-                    repo=internal_repo,
-                    tag=tag,
-                )
-                try:
-                    dest_ml = self.quay_client.get_manifest(dest_ref, manifest_list=True)
-                    LOG.info(
-                        "Getting missing archs between images '{0}' and '{1}'".format(
-                            source_ref, dest_ref
-                        )
+        for dest_ref in self.get_item_dest_refs(push_item):
+            try:
+                dest_ml = self._get_manifest_list(dest_ref)
+                LOG.info(
+                    "Getting missing archs between images '{0}' and '{1}'".format(
+                        source_ref, dest_ref
                     )
-                    missing_archs = ManifestListMerger.get_missing_architectures(source_ml, dest_ml)
-                    # Option 1: Destination doesn't contain extra archs, ML merging is unnecessary
-                    if not missing_archs:
-                        simple_dest_refs.append(dest_ref)
-                    # Option 2: Destination has extra archs, MLs will be merged
-                    else:
-                        merge_mls_dest_refs.append(dest_ref)
-                except requests.exceptions.HTTPError as e:
-                    # Option 3: Destination tag doesn't exist, no ML merging
-                    if e.response.status_code == 404:
-                        simple_dest_refs.append(dest_ref)
-                    else:
-                        raise
+                )
+                missing_archs = ManifestListMerger.get_missing_architectures(source_ml, dest_ml)
+                # Option 1: Destination doesn't contain extra archs, ML merging is unnecessary
+                if not missing_archs:
+                    simple_dest_refs.append(dest_ref)
+                # Option 2: Destination has extra archs, MLs will be merged
+                else:
+                    merge_mls_dest_refs.append(dest_ref)
+            except requests.exceptions.HTTPError as e:
+                # Option 3: Destination tag doesn't exist, no ML merging
+                if e.response.status_code == 404:
+                    simple_dest_refs.append(dest_ref)
+                else:
+                    raise
 
         if simple_dest_refs:
             LOG.info(
@@ -219,6 +281,7 @@ class ContainerImagePusher:
                 )
             )
             self.run_tag_images(source_ref, simple_dest_refs, True, self.target_settings)
+            self._invalidate_repo_state(simple_dest_refs)
         if merge_mls_dest_refs:
             LOG.info(
                 "Copying image {0} to {1} destinations and merging manifest lists".format(
@@ -227,6 +290,80 @@ class ContainerImagePusher:
             )
             self.run_merge_workflow(source_ref, merge_mls_dest_refs)
 
+    def group_push_items(self):
+        """
+        Split push items into groups which can be pushed independently of each other.
+
+        Push items which share a destination tag are placed into the same group, as their
+        copying and manifest list merging would race with each other. The original order of the
+        items is preserved within a group.
+
+        Returns ([[ContainerPushItem]]):
+            Groups of push items.
+        """
+        # [(set of destination references, [indices of push items])]
+        groups = []
+        for index, item in enumerate(self.push_items):
+            dest_refs = set(self.get_item_dest_refs(item))
+            indices = [index]
+            remaining_groups = []
+            for group_refs, group_indices in groups:
+                if group_refs & dest_refs:
+                    dest_refs |= group_refs
+                    indices += group_indices
+                else:
+                    remaining_groups.append((group_refs, group_indices))
+            groups = remaining_groups + [(dest_refs, sorted(indices))]
+
+        groups = sorted(groups, key=lambda group: group[1][0])
+        return [[self.push_items[i] for i in indices] for _, indices in groups]
+
+    def push_container_item(self, item):
+        """
+        Push a single container push item to Quay.
+
+        Args:
+            item (ContainerPushItem):
+                Container push item.
+        """
+        journal_key = PushJournal.get_push_item_key(item)
+        if self._journal and self._journal.is_done("copy", journal_key):
+            LOG.info("Push item '{0}' was already copied, skipping".format(item))
+            return
+        try:
+            source_ml = self._get_manifest_list(item.metadata["pull_url"])
+        except ManifestTypeError:
+            source_ml = None
+
+        # this metadata field indicates a source image
+        sources_for_nvr = (
+            item.metadata["build"].get("extra", {}).get("image", {}).get("sources_for_nvr", None)
+        )
+        if not sources_for_nvr and not source_ml:
+            raise BadPushItem(
+                "Push item '{0}' contains a single-arch image that's not a "
+                "source image. This use-case is not supported".format(item)
+            )
+        if self._journal:
+            self._journal.record(
+                "copy",
+                journal_key,
+                status=self._journal.STARTED,
+                data={"dest_refs": self.get_item_dest_refs(item)},
+            )
+        # Source image
+        if sources_for_nvr:
+            self.copy_source_push_item(item)
+        # Multiarch images
+        else:
+            self.copy_multiarch_push_item(item, source_ml)
+        if self._journal:
+            self._journal.record(
+                "copy",
+                journal_key,
+                data={"dest_refs": self.get_item_dest_refs(item)},
+            )
+
     @log_step("Push images to Quay")
     def push_container_images(self):
         """
@@ -234,31 +371,31 @@ class ContainerImagePusher:
 
         Two image types are supported: source images and multiarch images. Non-source, single arch
         images are not supported. In case of multiarch images, manifest list merging is performed if
-        destination image contains more architectures than source.
+        destination image contains more architectures than source. If a journal is set, items
+        which were already copied by a previous run of the task are skipped.
+
+        Independent groups of push items are pushed in parallel, their number being limited by
+        the 'quay_max_concurrent_pushes' target setting. If pushing of any item fails, no new items
+        are started, and the error is raised once the running ones finish.
         """
-        for item in self.push_items:
-            try:
-                source_ml = self.quay_client.get_manifest(
-                    item.metadata["pull_url"], manifest_list=True
-                )
-            except ManifestTypeError:
-                source_ml = None
-
-            # this metadata field indicates a source image
-            sources_for_nvr = (
-                item.metadata["build"]
-                .get("extra", {})
-                .get("image", {})
-                .get("sources_for_nvr", None)
+        groups = self.group_push_items()
+        threads = self.target_settings.get("quay_max_concurrent_pushes", DEFAULT_MAX_THREADS)
+        LOG.info(
+            "Pushing {0} push items in {1} independent groups".format(
+                len(self.push_items), len(groups)
             )
-            if not sources_for_nvr and not source_ml:
-                raise BadPushItem(
-                    "Push item '{0}' contains a single-arch image that's not a "
-                    "source image. This use-case is not supported".format(item)
-                )
-            # Source image
-            if sources_for_nvr:
-                self.copy_source_push_item(item)
-            # Multiarch images
-            else:
-                self.copy_multiarch_push_item(item, source_ml)
+        )
+        failed = threading.Event()
+
+        def push_group(items):
+            for item in items:
+                if failed.is_set():
+                    LOG.warning("Push of item '{0}' cancelled due to a failure".format(item))
+                    return
+                try:
+                    self.push_container_item(item)
+                except Exception:
+                    failed.set()
+                    raise
+
+        run_in_parallel(push_group, groups, threads)
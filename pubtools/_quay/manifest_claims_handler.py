@@ -1,13 +1,18 @@
 # this code has been copied from rcm-pub (pubd/lib/docker_signature.py)
+from collections import deque
+import heapq
 import logging
 import os
 import json
+import threading
 import proton.handlers
 import proton.reactor
 import proton
 
 import monotonic
 
+from .claim_message import serialize_claim_messages
+
 LOG = logging.getLogger("PubLogger")
 
 # There are some linting errors since this was copied from rcm-pub
@@ -19,6 +24,50 @@ class MessageHandlerTimeoutException(Exception):
     pass
 
 
+class ResponseRouter(object):
+    """
+    Route responses from RADAS between claims handlers sharing one consumer queue.
+
+    The broker delivers every response to only one of the consumers of a queue, which isn't
+    necessarily the handler which sent the request. Handlers register the requests they send,
+    and a response received by another handler is passed to the event loop of its owner.
+    """
+
+    def __init__(self):
+        self._owners = {}  # {request_id: ManifestClaimsHandler}
+        self._lock = threading.Lock()
+
+    def register(self, request_ids, handler):
+        """Record that responses to the requests are awaited by the handler."""
+        with self._lock:
+            for request_id in request_ids:
+                self._owners[request_id] = handler
+
+    def unregister(self, request_id):
+        """Forget the owner of an answered request."""
+        with self._lock:
+            self._owners.pop(request_id, None)
+
+    def route(self, radas_message):
+        """
+        Pass a response to the handler which awaits it.
+
+        Args:
+            radas_message (dict):
+                Response message from RADAS.
+        Returns (bool):
+            Whether the response was routed, i.e. it's awaited by one of the handlers.
+        """
+        with self._lock:
+            owner = self._owners.get(radas_message["request_id"])
+        if owner is None:
+            return False
+        owner.injector.trigger(
+            proton.reactor.ApplicationEvent("radas_response", subject=radas_message)
+        )
+        return True
+
+
 class ManifestClaimsHandler(proton.handlers.MessagingHandler):
     """
     Class for handling communication with RADAS via UMB.
@@ -32,7 +81,8 @@ class ManifestClaimsHandler(proton.handlers.MessagingHandler):
         e.g "topic://VirtualTopic.eng.robosignatory.container.sign"
     - claim_messages - the messages sent which will be used
         to match up responses (as you can get responses from other workers).
-        This will use the request_id field
+        This will use the request_id field. May be a lazy iterable, claims are
+        pulled from it only when there are free spots in the window.
     - pub_cert - the certificate + private key combination from issued
         to connect to the Universal Message bus.
     - ca_cert - the certificate authority for the the pub_cert that
@@ -44,10 +94,35 @@ class ManifestClaimsHandler(proton.handlers.MessagingHandler):
         that will be called with no parameters to send the messages
         to RADAS for signing. This is called after the receiver is connected
         to avoid any potential race conditions due to slow network
+
+    - min_throttle, max_throttle - bounds of the adaptive throttle. If max_throttle is
+        greater than min_throttle, the throttle (window of requests awaiting response)
+        is adapted using AIMD: it grows by one per window of responses received faster
+        than target_latency, and it's halved on timeouts. Otherwise it's fixed.
+    - target_latency - response time in seconds under which the throttle may grow.
+        Defaults to a tenth of the timeout.
+    - keep_open - whether to keep the connection open once all claims are satisfied, so that
+        more claims may be added later (see SigningSession). The connection is then closed by
+        a 'close_signing_session' event.
+    - response_callback - function called with every expected response from RADAS.
+    - signature_spool - SignatureSpool which successful responses are appended to as
+        soon as they arrive, so that they survive a crash of the task.
+    - keep_responses - whether to collect responses in received_messages. If responses
+        are handled only by response_callback or signature_spool, the memory used by the
+        handler doesn't depend on the number of claims.
+    - response_router - ResponseRouter shared by handlers which consume the same queue
+        (see SignatureHandler shards). Responses to requests sent by another handler are
+        passed to it by the router, which injects a 'radas_response' event to its event loop.
+
+    At most 'throttle' requests are awaiting response at any time. The window is refilled
+    as soon as responses free enough spots for a batch of messages, while the timer task
+    only handles timed out requests.
     """
 
     TIMER_TASK_DELAY = int(os.getenv("PUB_UMB_TIMER_TASK_DELAY", "10"))
     # delay between polls
+    SEND_BATCH_FRACTION = 10
+    # messages are sent in batches of at least 1/SEND_BATCH_FRACTION of the throttle
 
     def __init__(
         self,
@@ -60,26 +135,51 @@ class ManifestClaimsHandler(proton.handlers.MessagingHandler):
         throttle,
         retry,
         message_sender_callback,
+        min_throttle=None,
+        max_throttle=None,
+        target_latency=None,
+        keep_open=False,
+        response_callback=None,
+        signature_spool=None,
+        keep_responses=True,
+        response_router=None,
     ):
         super(ManifestClaimsHandler, self).__init__()
         self.umb_urls = umb_urls
         self.radas_address = radas_address
-        self.claim_messages = list(claim_messages)
+        # iterators of claims which weren't pulled to the sending queue yet
+        self._claim_sources = deque([iter(claim_messages)])
         self.received_messages = []
+        self.keep_responses = keep_responses
         self.timeout = timeout
-        self.throttle = throttle
+        self.min_throttle = min(min_throttle or throttle, throttle)
+        self.max_throttle = max(max_throttle or throttle, throttle)
+        self.target_latency = target_latency or timeout / 10.0
+        self._set_throttle(throttle)
+        self._logged_throttle = throttle
+        # number of consecutive fast responses since the throttle was last changed
+        self._fast_responses = 0
         self.retry = retry
         self.timer_task = None
         self.receiver = None
         self.message_sender_callback = message_sender_callback
+        self.keep_open = keep_open
+        self.response_callback = response_callback
+        self.signature_spool = signature_spool
+        self.response_router = response_router
+        # responses received by other handlers are injected to this handler's event loop
+        self.injector = proton.reactor.EventInjector() if response_router else None
         self.awaiting_response = {}  # {request_id: monotonic.monotonic()}
+        # min-heap of (sent time, request_id) of sent requests, entries of requests which were
+        # answered or resent are dropped by _discard_stale_deadlines or skipped when popped
+        self.deadlines = []
         self.retry_count = {}  # {request_id: 1/2}
-        # a mutable list caches messages to send
-        self.to_send = list(claim_messages)
-        # {request_id: message} a map used to find wanted message by request_id
+        # a mutable list caches pulled and retried messages to send, they're serialized only
+        # when sent
+        self.to_send = []
+        # {request_id: message} a map used to find wanted message by request_id, it contains
+        # only the pulled messages which weren't answered yet
         self.id_msg_map = {}
-        for msg in self.claim_messages:
-            self.id_msg_map[msg["request_id"]] = msg
         self.connected = False
 
         self.ssl_domain = proton.SSLDomain(proton.SSLDomain.MODE_CLIENT)
@@ -93,6 +193,8 @@ class ManifestClaimsHandler(proton.handlers.MessagingHandler):
             urls=self.umb_urls, ssl_domain=self.ssl_domain, sasl_enabled=False
         )
         self.receiver = event.container.create_receiver(conn, self.radas_address)
+        if self.injector:
+            event.container.selectable(self.injector)
         self.timer_task = event.container.schedule(self.timeout, self)
         # schedule a timer task, if the connection to UMB could be established, raise exception.
         LOG.debug("Message event loop started")
@@ -101,42 +203,53 @@ class ManifestClaimsHandler(proton.handlers.MessagingHandler):
         """timer task has three functionalities:
         1. if it couldn't be connected to brokers, then after self.timeout, exception
            will be raised.
-        2. Check if any request is timed out, if it is, then continue checking the retry history
+        2. Check if any request is timed out, if it is, then continue checking the retry history.
+           Only the expired entries of the deadline heap are examined.
             - if the retry history shows it's been tried more than 3 times, then stop loop.
             - if not, then remove it from awaiting_response dict and send it back to to_send
               queue, bump the retry count.
-        3. Check if the number of requests in processing has reached throttle or not, if not
-           then send corresponding number of messages.
+        3. Send the requests which are to be retried, if the number of requests in processing
+           hasn't reached throttle. Otherwise the window is refilled when responses arrive.
         """
         if not self.connected:
             LOG.error("Couldn't connect to brokers after %s seconds", self.timeout)
             event.container.stop()
             raise MessageHandlerTimeoutException()
-        for request_id, started in sorted(list(self.awaiting_response.items())):
-            if monotonic.monotonic() - started > self.timeout:
-                if request_id not in self.retry_count or self.retry_count[request_id] < self.retry:
-                    self.retry_count.setdefault(request_id, 0)
-                    self.retry_count[request_id] += 1
-                    LOG.warn(
-                        "Didn't receive response in %s for request %s, will retry [%s/%s]",
-                        self.timeout,
-                        request_id,
-                        self.retry_count[request_id],
-                        self.retry,
-                    )
-                    # append to resend queue and remove from awaiting_response queue
-                    self.to_send.append(self.id_msg_map[request_id])
-                    self.awaiting_response.pop(request_id)
-                else:
-                    LOG.warn("Stopping message event loop due to timeout %s", request_id)
-                    event.container.stop()
-                    raise MessageHandlerTimeoutException()
+        now = monotonic.monotonic()
+        timed_out = False
+        while self.deadlines and now - self.deadlines[0][0] > self.timeout:
+            started, request_id = heapq.heappop(self.deadlines)
+            if self._is_stale_deadline((started, request_id)):
+                # already answered, or awaited since it was resent
+                continue
+            timed_out = True
+            if request_id not in self.retry_count or self.retry_count[request_id] < self.retry:
+                self.retry_count.setdefault(request_id, 0)
+                self.retry_count[request_id] += 1
+                LOG.warn(
+                    "Didn't receive response in %s for request %s, will retry [%s/%s]",
+                    self.timeout,
+                    request_id,
+                    self.retry_count[request_id],
+                    self.retry,
+                )
+                # append to resend queue and remove from awaiting_response queue
+                self.to_send.append(self.id_msg_map[request_id])
+                self.awaiting_response.pop(request_id)
+            else:
+                LOG.warn("Stopping message event loop due to timeout %s", request_id)
+                event.container.stop()
+                raise MessageHandlerTimeoutException()
+
+        if timed_out and self.adaptive_throttle:
+            self._set_throttle(max(self.min_throttle, self.throttle // 2))
+            self._fast_responses = 0
+        if self.throttle != self._logged_throttle:
+            LOG.info("Signing throttle changed to %s", self.throttle)
+            self._logged_throttle = self.throttle
 
         # send more requests if number of waiting < throttle
-        spots = self.throttle - len(self.awaiting_response)
-        if self.to_send and spots > 0:
-            # if there's free spots, send messages in queue
-            self._send_message(min(len(self.to_send), spots))
+        self._fill_window()
 
         # schdule the next timer task
         self.timer_task = event.container.schedule(self.TIMER_TASK_DELAY, self)
@@ -149,7 +262,11 @@ class ManifestClaimsHandler(proton.handlers.MessagingHandler):
             # timing out.
             self.timer_task.cancel()
             self.connected = True
-            self._send_message()
+            self._fill_window()
+            if self.finished and not self.keep_open:
+                # lazy claim messages may turn out to be empty
+                self._close(event.connection)
+                return
             self.timer_task = event.container.schedule(self.TIMER_TASK_DELAY, self)
         else:
             LOG.warn("Unexpected on_link_opened event")
@@ -163,18 +280,69 @@ class ManifestClaimsHandler(proton.handlers.MessagingHandler):
         request_id = radas_message["request_id"]
 
         if request_id in self.awaiting_response:
-            LOG.info("Received signing response: %s", request_id)
-            self.awaiting_response.pop(request_id)
-            self.received_messages.append(radas_message)
-            if not self.to_send and not self.awaiting_response:
-                LOG.info("All requests satisfied, closing connection...")
-                self.receiver.close()
-                event.connection.close()
-                self.timer_task.cancel()
-                LOG.info("Connection closed.")
+            self._on_response(radas_message, event.connection)
+        elif self.response_router and self.response_router.route(radas_message):
+            LOG.debug("Routed signing response to another shard: %s", request_id)
+        else:
+            LOG.debug("Ignored signing response: %s", radas_message["request_id"])
+
+    def on_radas_response(self, event):
+        """Handle a response received by another handler sharing the queue (event subject)."""
+        radas_message = event.subject
+        if radas_message["request_id"] in self.awaiting_response:
+            self._on_response(radas_message, self.receiver.connection)
         else:
             LOG.debug("Ignored signing response: %s", radas_message["request_id"])
 
+    def _on_response(self, radas_message, connection):
+        request_id = radas_message["request_id"]
+        LOG.info("Received signing response: %s", request_id)
+        started = self.awaiting_response.pop(request_id)
+        self._discard_stale_deadlines()
+        if self.response_router:
+            self.response_router.unregister(request_id)
+        if self.adaptive_throttle:
+            self._on_response_time(monotonic.monotonic() - started)
+        if self.keep_responses:
+            self.received_messages.append(radas_message)
+        if self.signature_spool:
+            self.signature_spool.add(self.id_msg_map[request_id], radas_message)
+        self.id_msg_map.pop(request_id, None)
+        self.retry_count.pop(request_id, None)
+        if self.response_callback:
+            self.response_callback(radas_message)
+        # refill the window without waiting for the timer task
+        self._fill_window(self.send_batch_size)
+        if self.finished and not self.keep_open:
+            self._close(connection)
+
+    def _close(self, connection):
+        LOG.info("All requests satisfied, closing connection...")
+        self.receiver.close()
+        connection.close()
+        self.timer_task.cancel()
+        if self.injector:
+            self.injector.close()
+        LOG.info("Connection closed.")
+
+    def on_claims(self, event):
+        """Add claim messages injected by another thread (event subject) to the sending queue."""
+        self.add_claim_messages(event.subject)
+
+    def on_close_signing_session(self, event):
+        LOG.info("Closing signing session...")
+        if self.receiver:
+            self.receiver.close()
+            self.receiver.connection.close()
+        if self.timer_task:
+            self.timer_task.cancel()
+
+    def add_claim_messages(self, claim_messages):
+        """Queue more claim messages, sending them right away if there are free spots."""
+        self._claim_sources.append(iter(claim_messages))
+        if self.connected:
+            self._fill_window()
+
     def on_connection_closed(self, event):
         LOG.debug("Messaging event: connection_closed")
 
@@ -196,15 +364,87 @@ class ManifestClaimsHandler(proton.handlers.MessagingHandler):
     def on_disconnected(self, event):
         LOG.debug("Messaging event: disconnected")
 
+    @property
+    def finished(self):
+        return not self._claim_sources and not self.to_send and not self.awaiting_response
+
+    @property
+    def adaptive_throttle(self):
+        return self.max_throttle > self.min_throttle
+
+    def _set_throttle(self, throttle):
+        self.throttle = throttle
+        self.send_batch_size = max(1, throttle // self.SEND_BATCH_FRACTION)
+
+    def _on_response_time(self, latency):
+        """Grow the throttle additively after a window of fast responses."""
+        if latency > self.target_latency:
+            self._fast_responses = 0
+            return
+        self._fast_responses += 1
+        if self._fast_responses >= self.throttle and self.throttle < self.max_throttle:
+            self._set_throttle(self.throttle + 1)
+            self._fast_responses = 0
+
+    def _fill_window(self, min_batch=1):
+        """Send queued messages if there are enough free spots among awaited requests.
+
+        A smaller batch is sent only if it contains all of the remaining messages.
+        """
+        spots = self.throttle - len(self.awaiting_response)
+        self._pull_claims(spots)
+        count = min(len(self.to_send), spots)
+        if count > 0 and count >= min(len(self.to_send), min_batch):
+            self._send_message(count)
+
+    def _pull_claims(self, count):
+        """Pull claims to the sending queue until it contains at least count messages."""
+        while len(self.to_send) < count and self._claim_sources:
+            try:
+                msg = next(self._claim_sources[0])
+            except StopIteration:
+                self._claim_sources.popleft()
+                continue
+            self.to_send.append(msg)
+            self.id_msg_map[msg["request_id"]] = msg
+
     def _send_message(self, count=None):
         if count is None:
+            self._pull_claims(self.throttle)
             count = min(len(self.to_send), self.throttle)
         messages = self.to_send[:count]
+        if self.response_router:
+            # responses may be received by another handler as soon as the messages are sent
+            self.response_router.register([msg["request_id"] for msg in messages], self)
         LOG.info("Sending %s messages...", count)
-        self.message_sender_callback(messages)
+        self.message_sender_callback(serialize_claim_messages(messages))
         # remove sent message from sending queue
         del self.to_send[:count]
 
         # add sent message's request id to waiting queue
+        started = monotonic.monotonic()
         for msg in messages:
-            self.awaiting_response[msg["request_id"]] = monotonic.monotonic()
+            self._await_response(msg["request_id"], started)
+
+    def _await_response(self, request_id, started):
+        self.awaiting_response[request_id] = started
+        heapq.heappush(self.deadlines, (started, request_id))
+
+    def _is_stale_deadline(self, deadline):
+        started, request_id = deadline
+        return self.awaiting_response.get(request_id) != started
+
+    def _discard_stale_deadlines(self):
+        """Drop deadline entries of requests which aren't awaited anymore.
+
+        Stale entries at the head of the heap are popped right away, and the heap is rebuilt from
+        the awaited requests once it's more than twice as large, so its size is bounded by the
+        number of requests in flight rather than by the number of answered ones.
+        """
+        while self.deadlines and self._is_stale_deadline(self.deadlines[0]):
+            heapq.heappop(self.deadlines)
+        if len(self.deadlines) > 2 * len(self.awaiting_response):
+            self.deadlines = [
+                (started, request_id) for request_id, started in self.awaiting_response.items()
+            ]
+            heapq.heapify(self.deadlines)
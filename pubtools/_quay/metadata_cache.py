@@ -0,0 +1,263 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+DEFAULT_CACHE_TTL = 3600
+
+
+class MetadataCache:
+    """
+    Interface of caches of rarely changing metadata.
+
+    This base class is the no-op default used when caching is disabled: nothing is stored and
+    every lookup is fetched again. SQLiteMetadataCache overrides it with a persistent cache.
+    Entries are identified by a namespace (type of the metadata) and a key, and values must be
+    JSON-serializable.
+    """
+
+    # Whether cached entries are ignored and replaced by freshly fetched values
+    refresh = False
+
+    def get(self, namespace, key):
+        """
+        Get a cached value.
+
+        Args:
+            namespace (str):
+                Type of the metadata, e.g. 'repo_metadata'.
+            key (str):
+                Identifier of the entry within the namespace.
+        Returns ((bool, object)):
+            Whether a valid entry was found, and its value.
+        """
+        return (False, None)
+
+    def set(self, namespace, key, value, ttl=DEFAULT_CACHE_TTL):
+        """
+        Store a value in the cache.
+
+        Args:
+            namespace (str):
+                Type of the metadata.
+            key (str):
+                Identifier of the entry within the namespace.
+            value (object):
+                JSON-serializable value to store.
+            ttl (int):
+                Number of seconds after which the entry expires.
+        """
+
+    def invalidate(self, namespace=None, key=None):
+        """
+        Remove entries from the cache.
+
+        Args:
+            namespace (str):
+                Namespace whose entries will be removed. If not specified, all entries are removed.
+            key (str):
+                Key of the entry to remove. If not specified, the whole namespace is removed.
+        """
+
+    def get_or_fetch(self, namespace, key, fetch, ttl=DEFAULT_CACHE_TTL):
+        """
+        Get a cached value, or fetch it and store it in the cache if it's missing or expired.
+
+        If the cache is refreshed, the cached entry is removed before the value is fetched, so
+        that a stale value isn't used again even if the fetch fails. Errors of the cache itself
+        are logged and don't prevent the value from being fetched.
+
+        Args:
+            namespace (str):
+                Type of the metadata.
+            key (str):
+                Identifier of the entry within the namespace.
+            fetch (callable):
+                Function without arguments which returns the current value.
+            ttl (int):
+                Number of seconds after which the stored entry expires.
+        Returns (object):
+            Cached or fetched value.
+        """
+        try:
+            if self.refresh:
+                self.invalidate(namespace, key)
+                found, value = (False, None)
+            else:
+                found, value = self.get(namespace, key)
+        except sqlite3.Error as e:
+            LOG.warning("Unable to read metadata cache: {0}".format(e))
+            found, value = (False, None)
+        if found:
+            LOG.info("Using cached {0} of '{1}'".format(namespace, key))
+            return value
+
+        value = fetch()
+        try:
+            self.set(namespace, key, value, ttl)
+        except sqlite3.Error as e:
+            LOG.warning("Unable to write to metadata cache: {0}".format(e))
+        return value
+
+
+class SQLiteMetadataCache(MetadataCache):
+    """
+    Metadata cache persisted in a local SQLite database.
+
+    The database is shared by all tasks running on the same worker. A new connection is opened
+    for every operation, so the cache may be used from multiple threads and processes.
+    """
+
+    def __init__(self, path, refresh=False):
+        """
+        Initialize.
+
+        Args:
+            path (str):
+                Path to the SQLite database file. It's created if it doesn't exist.
+            refresh (bool):
+                Whether to ignore cached entries and replace them by freshly fetched values.
+        """
+        self.path = path
+        self.refresh = refresh
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """
+        Open a connection to the database, creating the schema if needed.
+
+        Returns (sqlite3.Connection):
+            Database connection.
+        """
+        with self._lock:
+            if not self._initialized:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+            conn = sqlite3.connect(self.path, timeout=30)
+            if not self._initialized:
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS metadata ("
+                        "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                        "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+                    )
+                self._initialized = True
+        return conn
+
+    def get(self, namespace, key):
+        """
+        Get a cached value.
+
+        Args:
+            namespace (str):
+                Type of the metadata, e.g. 'repo_metadata'.
+            key (str):
+                Identifier of the entry within the namespace.
+        Returns ((bool, object)):
+            Whether a valid entry was found, and its value.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT value FROM metadata WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time()),
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            return (False, None)
+        return (True, json.loads(row[0]))
+
+    def set(self, namespace, key, value, ttl=DEFAULT_CACHE_TTL):
+        """
+        Store a value in the cache.
+
+        Args:
+            namespace (str):
+                Type of the metadata.
+            key (str):
+                Identifier of the entry within the namespace.
+            value (object):
+                JSON-serializable value to store.
+            ttl (int):
+                Number of seconds after which the entry expires.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO metadata (namespace, key, value, expires_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value), time.time() + ttl),
+                )
+                # opportunistically drop expired entries
+                conn.execute("DELETE FROM metadata WHERE expires_at <= ?", (time.time(),))
+        finally:
+            conn.close()
+
+    def invalidate(self, namespace=None, key=None):
+        """
+        Remove entries from the cache.
+
+        Args:
+            namespace (str):
+                Namespace whose entries will be removed. If not specified, all entries are removed.
+            key (str):
+                Key of the entry to remove. If not specified, the whole namespace is removed.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                if namespace is None:
+                    conn.execute("DELETE FROM metadata")
+                elif key is None:
+                    conn.execute("DELETE FROM metadata WHERE namespace = ?", (namespace,))
+                else:
+                    conn.execute(
+                        "DELETE FROM metadata WHERE namespace = ? AND key = ?", (namespace, key)
+                    )
+        finally:
+            conn.close()
+
+
+def get_metadata_cache(target_settings):
+    """
+    Get a metadata cache configured by target settings.
+
+    The SQLite cache is used if 'quay_metadata_cache_path' is specified, otherwise caching is
+    disabled. If 'quay_metadata_cache_refresh' is true, the cached entries are re-fetched.
+
+    Args:
+        target_settings (dict):
+            Target settings.
+    Returns (MetadataCache):
+        Metadata cache.
+    """
+    if target_settings.get("quay_metadata_cache_path"):
+        return SQLiteMetadataCache(
+            target_settings["quay_metadata_cache_path"],
+            refresh=target_settings.get("quay_metadata_cache_refresh", False),
+        )
+    return MetadataCache()
+
+
+def get_metadata_cache_ttl(target_settings):
+    """
+    Get the number of seconds for which cached metadata are valid.
+
+    Args:
+        target_settings (dict):
+            Target settings.
+    Returns (int):
+        Value of 'quay_metadata_cache_ttl' target setting, or the default TTL.
+    """
+    return target_settings.get("quay_metadata_cache_ttl", DEFAULT_CACHE_TTL)
@@ -7,6 +7,8 @@ from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
 from .container_image_pusher import ContainerImagePusher
+from .metadata_cache import get_metadata_cache, get_metadata_cache_ttl
+from .pyxis_client import get_target_pyxis_client
 from .utils.misc import (
     run_entrypoint,
     get_internal_container_repo_name,
@@ -39,6 +41,19 @@ class OperatorPusher:
         self.target_settings = target_settings
 
         self.quay_host = self.target_settings.get("quay_host", "quay.io").rstrip("/")
+        self._journal = None
+        self.metadata_cache = get_metadata_cache(self.target_settings)
+        self.metadata_cache_ttl = get_metadata_cache_ttl(self.target_settings)
+
+    def set_journal(self, journal):
+        """
+        Set a PushJournal instance which will record index images pushed to Quay.
+
+        Args:
+            journal (PushJournal):
+                Journal of the push task.
+        """
+        self._journal = journal
 
     @staticmethod
     def _get_immutable_tag(push_item):
@@ -89,6 +104,8 @@ class OperatorPusher:
         """
         Get a list of supported ocp versions from Pyxis.
 
+        Responses of Pyxis are read through the metadata cache.
+
         Args:
             push_item: (ContainerPushItem)
                 Push item for which the OCP version range will be found out.
@@ -99,19 +116,18 @@ class OperatorPusher:
         ocp_versions = push_item.metadata["com.redhat.openshift.versions"]
         LOG.info("Getting OCP versions of '{0}' from Pyxis.".format(ocp_versions))
 
-        args = ["--pyxis-server", self.target_settings["pyxis_server"]]
-        args += ["--pyxis-krb-principal", self.target_settings["iib_krb_principal"]]
-        args += ["--organization", self.target_settings["iib_organization"]]
-        args += ["--ocp-versions-range", ocp_versions]
-        if "iib_krb_ktfile" in self.target_settings:
-            args += ["--pyxis-krb-ktfile", self.target_settings["iib_krb_ktfile"]]
-        env_vars = {}
+        def fetch():
+            return get_target_pyxis_client(self.target_settings).get_operator_indices(
+                ocp_versions, self.target_settings["iib_organization"]
+            )
 
-        data = run_entrypoint(
-            ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-operator-indices"),
-            "pubtools-pyxis-get-operator-indices",
-            args,
-            env_vars,
+        cache_key = "{0} {1} {2}".format(
+            self.target_settings["pyxis_server"],
+            self.target_settings["iib_organization"],
+            ocp_versions,
+        )
+        data = self.metadata_cache.get_or_fetch(
+            "ocp_versions", cache_key, fetch, self.metadata_cache_ttl
         )
 
         if not data:
@@ -150,6 +166,8 @@ class OperatorPusher:
         """
         Get bundles to be deprecated in the index image.
 
+        Deprecation lists are read through the metadata cache.
+
         Args:
             version: (str)
                 version for which deprecation list will be fetched.
@@ -173,36 +191,44 @@ class OperatorPusher:
 
             return session
 
-        deprecation_list = []
         deprecation_list_url = "{0}/{1}.yml/raw?ref=master".format(
             self.target_settings["iib_deprecation_list_url"].rstrip("/"), version.replace(".", "_")
         )
         registry_url = self.target_settings["docker_settings"]["docker_reference_registry"][0]
 
-        LOG.info("Getting the deprecation list for OCP version {0}".format(version))
-        session = _get_requests_session()
-        response = session.get(url=deprecation_list_url)
-        if not response.ok:
-            LOG.error(
-                "Could not retrieve deprecation list after multiple attempts."
-                " Status Code {0}".format(response.status_code)
-            )
-            response.raise_for_status()
-
-        try:
-            yaml_response = yaml.safe_load(response.text)
-            if yaml_response:
-                deprecation_list = [
-                    "{0}/{1}".format(registry_url, bundle_path)
-                    for pkg_deprecation_list in yaml_response.values()
-                    for bundle_path in pkg_deprecation_list
-                ]
-        except Exception:
-            LOG.error("Data in {0} is invalid".format(deprecation_list_url))
-            raise
-
-        LOG.info("Deprecation list retrieved successfully")
-        return sorted(deprecation_list)
+        def fetch():
+            deprecation_list = []
+            LOG.info("Getting the deprecation list for OCP version {0}".format(version))
+            session = _get_requests_session()
+            response = session.get(url=deprecation_list_url)
+            if not response.ok:
+                LOG.error(
+                    "Could not retrieve deprecation list after multiple attempts."
+                    " Status Code {0}".format(response.status_code)
+                )
+                response.raise_for_status()
+
+            try:
+                yaml_response = yaml.safe_load(response.text)
+                if yaml_response:
+                    deprecation_list = [
+                        "{0}/{1}".format(registry_url, bundle_path)
+                        for pkg_deprecation_list in yaml_response.values()
+                        for bundle_path in pkg_deprecation_list
+                    ]
+            except Exception:
+                LOG.error("Data in {0} is invalid".format(deprecation_list_url))
+                raise
+
+            LOG.info("Deprecation list retrieved successfully")
+            return sorted(deprecation_list)
+
+        return self.metadata_cache.get_or_fetch(
+            "deprecation_list",
+            "{0} {1}".format(deprecation_list_url, registry_url),
+            fetch,
+            self.metadata_cache_ttl,
+        )
 
     @classmethod
     def pubtools_iib_get_common_args(cls, target_settings):
@@ -324,8 +350,51 @@ class OperatorPusher:
             env_vars,
         )
 
+    def prepare_index_image_builds(self):
+        """
+        Gather all data needed for building the index images.
+
+        This part of the build workflow doesn't depend on the container images being pushed. It
+        can thus be performed in parallel with the rest of the push.
+
+        Returns ({str:dict}):
+            Dictionary containing arguments of the IIB build and signing keys for all OPM
+            versions. Dictionary structure:
+            {
+                "version": {
+                    "bundles": [...] (bundles to add to the index image)
+                    "archs": [...] (architectures to build the index image for)
+                    "index_image": (...) (index image to add the bundles to)
+                    "deprecation_list": [...] (list of bundles to be deprecated)
+                    "signing_keys": [...] (list of signing keys to be used for signing)
+                }
+            }
+        """
+        version_items_mapping = self.generate_version_items_mapping()
+        builds = {}
+
+        for version, items in sorted(version_items_mapping.items()):
+            if self._journal and self._journal.is_done("index_push", version):
+                LOG.info("Index image of version {0} was already pushed, skipping".format(version))
+                continue
+            all_archs = [
+                i.metadata["arch"] if i.metadata["arch"] != "x86_64" else "amd64" for i in items
+            ]
+            builds[version] = {
+                "bundles": [self.public_bundle_ref(i) for i in items],
+                "archs": sorted(list(set(all_archs))),
+                "index_image": "{image_repo}:{tag}".format(
+                    image_repo=self.target_settings["iib_index_image"], tag=version
+                ),
+                # Get deprecation list
+                "deprecation_list": self.get_deprecation_list(version),
+                "signing_keys": sorted(list(set([item.claims_signing_key for item in items]))),
+            }
+
+        return builds
+
     @log_step("Build index images")
-    def build_index_images(self):
+    def build_index_images(self, builds=None):
         """
         Perform the 'build' part of the operator workflow.
 
@@ -336,6 +405,13 @@ class OperatorPusher:
         - Create mapping of which bundles should be pushed to which index image versions
         - Contact IIB to add the bundles to the index images
 
+        If a journal is set, versions whose index images were already pushed by a previous run of
+        the task are skipped.
+
+        Args:
+            builds ({str:dict}|None):
+                Build data as returned by 'prepare_index_image_builds'. Gathered if not specified.
+
         Returns ({str:dict}):
             Dictionary containing IIB results and signing keys for all OPM versions. Data will be
             used in operator signing. Dictionary structure:
@@ -347,33 +423,24 @@ class OperatorPusher:
             }
 
         """
-        version_items_mapping = self.generate_version_items_mapping()
+        if builds is None:
+            builds = self.prepare_index_image_builds()
         iib_results = {}
 
-        for version, items in sorted(version_items_mapping.items()):
-            bundles = [self.public_bundle_ref(i) for i in items]
-            all_archs = [
-                i.metadata["arch"] if i.metadata["arch"] != "x86_64" else "amd64" for i in items
-            ]
-            archs = sorted(list(set(all_archs)))
-            signing_keys = sorted(list(set([item.claims_signing_key for item in items])))
-
-            # Get deprecation list
-            deprecation_list = self.get_deprecation_list(version)
-
+        for version, build in sorted(builds.items()):
             # build index image in IIB
-            index_image = "{image_repo}:{tag}".format(
-                image_repo=self.target_settings["iib_index_image"], tag=version
-            )
             build_details = self.iib_add_bundles(
-                bundles=bundles,
-                archs=archs,
-                index_image=index_image,
-                deprecation_list=deprecation_list,
+                bundles=build["bundles"],
+                archs=build["archs"],
+                index_image=build["index_image"],
+                deprecation_list=build["deprecation_list"],
                 target_settings=self.target_settings,
             )
 
-            iib_results[version] = {"iib_result": build_details, "signing_keys": signing_keys}
+            iib_results[version] = {
+                "iib_result": build_details,
+                "signing_keys": build["signing_keys"],
+            }
 
         return iib_results
 
@@ -401,3 +468,9 @@ class OperatorPusher:
             ContainerImagePusher.run_tag_images(
                 build_details.index_image, [dest_image], True, self.target_settings
             )
+            if self._journal:
+                self._journal.record(
+                    "index_push",
+                    version,
+                    data={"index_image": build_details.index_image, "dest_image": dest_image},
+                )
@@ -1,12 +1,24 @@
 from collections import namedtuple
 import logging
+import time
 
 import requests
 
 from .exceptions import BadPushItem, InvalidTargetSettings, InvalidRepository
-from .utils.misc import run_entrypoint, get_internal_container_repo_name, log_step
+from .utils.misc import (
+    get_internal_container_repo_name,
+    get_target_info,
+    log_step,
+    run_in_parallel,
+    DEFAULT_MAX_THREADS,
+)
 from .quay_api_client import QuayApiClient
 from .quay_client import QuayClient
+from .repository_state_snapshot import RepositoryStateSnapshot
+from .metadata_cache import get_metadata_cache, get_metadata_cache_ttl
+from .pyxis_client import get_target_pyxis_client
+from .push_journal import PushJournal
+from .utils.pipeline import Pipeline
 from .container_image_pusher import ContainerImagePusher
 from .signature_handler import ContainerSignatureHandler, OperatorSignatureHandler
 from .operator_pusher import OperatorPusher
@@ -25,6 +37,9 @@ class PushDocker:
     """Handle full Docker push workflow."""
 
     ImageData = namedtuple("ImageData", ["repo", "tag"])
+    RollbackReport = namedtuple("RollbackReport", ["restored", "deleted", "failed"])
+
+    ROLLBACK_RETRY_DELAY = 5
 
     def __init__(self, push_items, hub, task_id, target_name, target_settings):
         """
@@ -55,6 +70,8 @@ class PushDocker:
         # TODO: will our robot credentials be able to read from brew's build repos?
         self._quay_client = None
         self._quay_api_client = None
+        self._repo_state = None
+        self._journal = None
 
     @property
     def quay_client(self):
@@ -76,6 +93,25 @@ class PushDocker:
             )
         return self._quay_api_client
 
+    @property
+    def repo_state(self):
+        """Create and access RepositoryStateSnapshot."""
+        if self._repo_state is None:
+            self._repo_state = RepositoryStateSnapshot(
+                self.quay_client,
+                self.quay_api_client,
+                self.quay_host,
+                self.target_settings.get("quay_max_concurrent_requests", DEFAULT_MAX_THREADS),
+            )
+        return self._repo_state
+
+    @property
+    def journal(self):
+        """Create and access PushJournal. None if journaling isn't enabled in target settings."""
+        if self._journal is None and self.target_settings.get("quay_push_journal_dir"):
+            self._journal = PushJournal(self.target_settings["quay_push_journal_dir"], self.task_id)
+        return self._journal
+
     def verify_target_settings(self):
         """Verify that target settings contains all the necessary data."""
         LOG.info("Verifying the necessary target settings")
@@ -199,7 +235,9 @@ class PushDocker:
     @classmethod
     def get_repo_metadata(cls, repo, target_settings):
         """
-        Invoke the 'get-repo-metadata' entrypoint from pubtools-pyxis.
+        Get metadata of a Comet repository from Pyxis.
+
+        The metadata are read through the metadata cache configured in target settings.
 
         Args:
             repo (str):
@@ -210,20 +248,16 @@ class PushDocker:
         Returns (dict):
             Parsed response from Pyxis.
         """
-        args = ["--pyxis-server", target_settings["pyxis_server"]]
-        args += ["--pyxis-krb-principal", target_settings["iib_krb_principal"]]
-        if "iib_krb_ktfile" in target_settings:
-            args += ["--pyxis-krb-ktfile", target_settings["iib_krb_ktfile"]]
-        args += ["--repo-name", repo]
-
-        env_vars = {}
-        metadata = run_entrypoint(
-            ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-repo-metadata"),
-            "pubtools-pyxis-get-repo-metadata",
-            args,
-            env_vars,
+
+        def fetch():
+            return get_target_pyxis_client(target_settings).get_repository_metadata(repo)
+
+        return get_metadata_cache(target_settings).get_or_fetch(
+            "repo_metadata",
+            "{0} {1}".format(target_settings["pyxis_server"], repo),
+            fetch,
+            get_metadata_cache_ttl(target_settings),
         )
-        return metadata
 
     @classmethod
     def check_repos_validity(cls, push_items, hub, target_settings, quay_api_client):
@@ -231,7 +265,8 @@ class PushDocker:
         Check if specified repos are valid and pushing to them is allowed.
 
         Specifically, this method checks if the repo exists in Comet and if it's not deprecated
-        If pushing to prod, also check if the repo already exists in stage.
+        If pushing to prod, also check if the repo already exists in stage. Repositories are
+        checked in parallel, and all invalid repositories are reported in a single exception.
 
         Args:
             push_items ([ContainerPushItem]):
@@ -242,6 +277,8 @@ class PushDocker:
                 Target settings.
             quay_api_client (QuayApiClient):
                 Instance of QuayApiClient.
+        Raises:
+            InvalidRepository: If any of the repositories hasn't passed the checks.
         """
         repos = []
         for item in push_items:
@@ -254,48 +291,87 @@ class PushDocker:
         repo_schema = "{namespace}/{repo}"
 
         # we'll need to get stage namespace from stage target settings
+        stage_namespace = None
         if "propagated_from" in target_settings:
-            stage_target_info = hub.worker.get_target_info(target_settings["propagated_from"])
+            stage_target_info = get_target_info(hub, target_settings["propagated_from"])
             stage_namespace = stage_target_info["settings"]["quay_namespace"]
 
-        for repo in repos:
+        def check_repo(repo):
             LOG.info("Checking validity of Comet repository '{0}'".format(repo))
             # Check if repo exists in Comet
             try:
                 metadata = cls.get_repo_metadata(repo, target_settings)
             except requests.exceptions.HTTPError as e:
                 if e.response.status_code == 404:
-                    raise InvalidRepository("Repository {0} doesn't exist in Comet".format(repo))
+                    return "Repository {0} doesn't exist in Comet".format(repo)
                 else:
                     raise
 
             # Check if repo is not deprecated
             # TODO: check with Comet team if this is a reliable way of checking
             if "Deprecated" in metadata["release_categories"]:
-                raise InvalidRepository("Repository {0} is deprecated".format(repo))
+                return "Repository {0} is deprecated".format(repo)
 
             # if we're pushing to prod target, check if repo exists on stage as well
-            if "propagated_from" in target_settings:
+            if stage_namespace is not None:
                 internal_repo = get_internal_container_repo_name(repo)
                 full_repo = repo_schema.format(namespace=stage_namespace, repo=internal_repo)
                 try:
                     quay_api_client.get_repository_data(full_repo)
                 except requests.exceptions.HTTPError as e:
                     if e.response.status_code == 404:
-                        raise InvalidRepository(
-                            "Repository {0} doesn't exist on stage".format(repo)
-                        )
+                        return "Repository {0} doesn't exist on stage".format(repo)
                     else:
                         raise
 
+            return None
+
+        errors = run_in_parallel(
+            check_repo,
+            repos,
+            target_settings.get("pyxis_max_concurrent_requests", DEFAULT_MAX_THREADS),
+        )
+        errors = [error for error in errors if error]
+        if errors:
+            for error in errors:
+                LOG.error(error)
+            raise InvalidRepository(
+                "{0} invalid repositories: {1}".format(len(errors), "; ".join(errors))
+            )
+
+    @log_step("Prefetch repository state")
+    def prefetch_repo_state(self, push_items):
+        """
+        Fetch data of all destination repositories and tags before the push starts.
+
+        The data are fetched in parallel and are served to the later stages by the
+        RepositoryStateSnapshot.
+
+        Args:
+            push_items ([ContainerPushItem]):
+                Container push items.
+        """
+        repo_tags = {}
+        repo_schema = "{namespace}/{repo}"
+        namespace = self.target_settings["quay_namespace"]
+
+        for item in push_items:
+            for repo, tags in sorted(item.metadata["tags"].items()):
+                internal_repo = get_internal_container_repo_name(repo)
+                full_repo = repo_schema.format(namespace=namespace, repo=internal_repo)
+                repo_tags.setdefault(full_repo, set()).update(tags)
+
+        self.repo_state.prefetch(repo_tags)
+
     @log_step("Generate backup mapping")
     def generate_backup_mapping(self, push_items):
         """
         Create resources which will be used for rollback if something goes wrong during the push.
 
         Specifically, create two resources: 'backup_tags' and 'rollback_tags'.
-        - 'backup_tags' is a mapping of ImageData->manifest, and consists of images which will
-          be overwritten. During rollback, tag is made to re-reference the old manifest.
+        - 'backup_tags' is a mapping of ImageData->manifest digest, and consists of images which
+          will be overwritten. During rollback, tag is made to re-reference the old manifest. Only
+          the digest is stored, as the manifest itself remains in the repository.
         - 'rollback_tags' is a list of ImageData which don't yet exist. During rollback, they
           will be removed to preserve pre-push state.
 
@@ -311,7 +387,6 @@ class PushDocker:
         backup_tags = {}
         rollback_tags = []
         repo_schema = "{namespace}/{repo}"
-        image_schema = "{host}/{repo}@{digest}"
         namespace = self.target_settings["quay_namespace"]
 
         for item in push_items:
@@ -321,7 +396,7 @@ class PushDocker:
                 LOG.info("Generating backup mapping for repository '{0}'".format(repo))
                 # try to get repo data
                 try:
-                    repo_data = self.quay_api_client.get_repository_data(full_repo)
+                    repo_data = self.repo_state.get_repository_data(full_repo)
                 except requests.exceptions.HTTPError as e:
                     if e.response.status_code == 404:
                         repo_data = None
@@ -336,13 +411,7 @@ class PushDocker:
                     # tag exists in the repo, add to backup tags
                     if tag in repo_data.get("tags", {}):
                         image_data = PushDocker.ImageData(full_repo, tag)
-                        image = image_schema.format(
-                            host=self.quay_host,
-                            repo=full_repo,
-                            digest=repo_data["tags"][tag]["manifest_digest"],
-                        )
-                        manifest = self.quay_client.get_manifest(image)
-                        backup_tags[image_data] = manifest
+                        backup_tags[image_data] = repo_data["tags"][tag]["manifest_digest"]
                     # tag doesn't exist in the repo, add to rollback tags
                     else:
                         rollback_tags.append(PushDocker.ImageData(full_repo, tag))
@@ -351,31 +420,391 @@ class PushDocker:
         rollback_tags = sorted(list(set(rollback_tags)))
         return (backup_tags, rollback_tags)
 
+    def get_backup_mapping(self, push_items):
+        """
+        Get the backup mapping of the push, reusing the one journaled by a previous run of the task.
+
+        Destination tags may already be modified by the previous run, so the backup mapping has
+        to be generated only once, before the first run modifies anything.
+
+        Args:
+            push_items ([ContainerPushItem]):
+                Container push items.
+
+        Returns (({ImageData: str}, [ImageData])):
+            Tuple of backup_tags and rollback_tags
+        """
+        if self.journal and self.journal.is_done("backup_mapping", self.task_id):
+            LOG.info("Using backup mapping of the previous run of the task")
+            data = self.journal.get_data("backup_mapping", self.task_id)
+            backup_tags = dict(
+                (PushDocker.ImageData(repo, tag), digest)
+                for repo, tag, digest in data["backup_tags"]
+            )
+            rollback_tags = [PushDocker.ImageData(repo, tag) for repo, tag in data["rollback_tags"]]
+            return (backup_tags, rollback_tags)
+
+        backup_tags, rollback_tags = self.generate_backup_mapping(push_items)
+        if self.journal:
+            data = {
+                "backup_tags": [
+                    [image_data.repo, image_data.tag, digest]
+                    for image_data, digest in sorted(backup_tags.items())
+                ],
+                "rollback_tags": [
+                    [image_data.repo, image_data.tag] for image_data in rollback_tags
+                ],
+            }
+            self.journal.record("backup_mapping", self.task_id, data=data)
+        return (backup_tags, rollback_tags)
+
+    @staticmethod
+    def get_dest_ref_image_data(dest_ref):
+        """
+        Get ImageData of a destination reference.
+
+        Args:
+            dest_ref (str):
+                Destination reference including the Quay host, e.g. 'quay.io/namespace/repo:tag'.
+        Returns (ImageData):
+            Repository (without the host) and tag of the reference.
+        """
+        repo, tag = dest_ref.rsplit(":", 1)
+        return PushDocker.ImageData("/".join(repo.split("/")[1:]), tag)
+
+    def get_journaled_rollback_mapping(self, backup_tags, rollback_tags):
+        """
+        Limit the rollback to the tags which were modified according to the journal.
+
+        Tags of all copy operations which were started by this or a previous run of the task are
+        considered to be modified. If journaling isn't enabled, all tags are returned.
+
+        Args:
+            backup_tags ({ImageData: str}):
+                Dictionary mapping of ImageData and a manifest digest before it was overwritten.
+            rollback_tags ([ImageData]):
+                List of newly added ImageData.
+
+        Returns (({ImageData: str}, [ImageData])):
+            Tuple of backup_tags and rollback_tags which should be rolled back.
+        """
+        if not self.journal:
+            return (backup_tags, rollback_tags)
+
+        modified = set()
+        for entry in self.journal.get_entries("copy"):
+            for dest_ref in entry["data"].get("dest_refs", []):
+                modified.add(self.get_dest_ref_image_data(dest_ref))
+
+        backup_tags = dict((k, v) for k, v in backup_tags.items() if k in modified)
+        rollback_tags = [image_data for image_data in rollback_tags if image_data in modified]
+        return (backup_tags, rollback_tags)
+
+    def invalidate_rolled_back_units(self, rolled_back_tags):
+        """
+        Mark journaled units which modified rolled back tags as rolled back.
+
+        Copies of push items with any of the tags, their signatures, and manifest list merges of
+        the tags are performed again by a re-run of the task. Units whose tags weren't rolled
+        back (e.g. because their rollback has failed) remain finished.
+
+        Args:
+            rolled_back_tags ([ImageData]):
+                Tags which were restored or deleted by the rollback.
+        """
+        rolled_back_tags = set(rolled_back_tags)
+        item_keys = set()
+        for entry in self.journal.get_entries("copy"):
+            dest_refs = entry["data"].get("dest_refs", [])
+            if any(self.get_dest_ref_image_data(ref) in rolled_back_tags for ref in dest_refs):
+                item_keys.add(entry["key"])
+
+        units = [("copy", key) for key in sorted(item_keys)]
+        units += [
+            ("container_signatures", entry["key"])
+            for entry in self.journal.get_entries("container_signatures")
+            if entry["key"] in item_keys
+        ]
+        units += [
+            ("merge", entry["key"])
+            for entry in self.journal.get_entries("merge")
+            if entry["data"].get("dest_ref")
+            and self.get_dest_ref_image_data(entry["data"]["dest_ref"]) in rolled_back_tags
+        ]
+        LOG.info("{0} journaled units will be performed again by a re-run".format(len(units)))
+        for unit, key in units:
+            # data are kept, so that a rollback of a re-run includes the tags of the unit
+            self.journal.record(
+                unit,
+                key,
+                status=self.journal.ROLLED_BACK,
+                data=self.journal.get_data(unit, key),
+            )
+
+    @staticmethod
+    def is_transient_error(error):
+        """
+        Determine whether a failed Quay request may succeed if it's retried.
+
+        Args:
+            error (Exception):
+                Exception raised by the request.
+        Returns (bool):
+            True if the request should be retried.
+        """
+        if isinstance(error, requests.exceptions.HTTPError):
+            status_code = getattr(error.response, "status_code", None)
+            return status_code is not None and (status_code == 429 or status_code >= 500)
+        return isinstance(
+            error,
+            (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                requests.exceptions.RetryError,
+            ),
+        )
+
+    def _rollback_tag(self, operation):
+        """
+        Restore or delete a single tag as a part of the rollback. Transient errors are retried.
+
+        Deleting a tag which doesn't exist (404) is considered successful.
+
+        Args:
+            operation ((str, ImageData, str|None)):
+                Type of the operation ('restore' or 'delete'), the tag, and a digest to restore.
+        Returns (Exception|None):
+            Error which caused the operation to fail, or None if it was successful.
+        """
+        action, image_data, digest = operation
+        image_ref = "{host}/{repo}:{tag}".format(
+            host=self.quay_host, repo=image_data.repo, tag=image_data.tag
+        )
+        retries = self.target_settings.get("quay_rollback_retries", 3)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                if action == "restore":
+                    LOG.info("Restoring tag '{0}' to '{1}'".format(image_ref, digest))
+                    self.quay_api_client.restore_tag(image_data.repo, image_data.tag, digest)
+                else:
+                    LOG.info("Removing tag '{0}'".format(image_ref))
+                    self.quay_api_client.delete_tag(image_data.repo, image_data.tag)
+                return None
+            except Exception as e:
+                if (
+                    action == "delete"
+                    and isinstance(e, requests.exceptions.HTTPError)
+                    and getattr(e.response, "status_code", None) == 404
+                ):
+                    # the tag is already gone, which is the desired end state
+                    LOG.info("Tag '{0}' doesn't exist anymore".format(image_ref))
+                    return None
+                if attempt > retries or not self.is_transient_error(e):
+                    LOG.error("Rollback of tag '{0}' has failed: {1}".format(image_ref, e))
+                    return e
+                LOG.warning(
+                    "Rollback of tag '{0}' has failed, will retry [{1}/{2}]: {3}".format(
+                        image_ref, attempt, retries, e
+                    )
+                )
+                time.sleep(self.ROLLBACK_RETRY_DELAY * attempt)
+            finally:
+                self.repo_state.invalidate(image_data.repo)
+
     @log_step("Perform rollback")
     def rollback(self, backup_tags, rollback_tags):
         """
         Perform a rollback.
 
+        Overwritten tags are restored to their original values and newly introduced tags are
+        deleted. The operations are run in parallel, and a failure of one of them doesn't stop
+        the others.
+
         Args:
             backup_tags ({ImageData: str}):
-                Dictionary mapping of ImageData and a manifest before it was overwritten.
+                Dictionary mapping of ImageData and a manifest digest before it was overwritten.
             rollback_tags ([ImageData]):
                 List of newly added ImageData.
+        Returns (RollbackReport):
+            Namedtuple containing lists of restored and deleted ImageData, and a list of
+            (ImageData, error) tuples of tags whose rollback has failed.
+        """
+        operations = [
+            ("restore", image_data, digest) for image_data, digest in sorted(backup_tags.items())
+        ]
+        operations += [("delete", image_data, None) for image_data in rollback_tags]
+        LOG.info(
+            "Restoring {0} tags to their original values and removing {1} newly introduced "
+            "tags".format(len(backup_tags), len(rollback_tags))
+        )
+
+        errors = run_in_parallel(
+            self._rollback_tag,
+            operations,
+            self.target_settings.get("quay_max_concurrent_requests", DEFAULT_MAX_THREADS),
+        )
+
+        report = PushDocker.RollbackReport([], [], [])
+        for (action, image_data, _), error in zip(operations, errors):
+            if error is not None:
+                report.failed.append((image_data, error))
+            elif action == "restore":
+                report.restored.append(image_data)
+            else:
+                report.deleted.append(image_data)
+
+        LOG.info(
+            "Rollback finished: {0} tags restored, {1} tags deleted, {2} failures".format(
+                len(report.restored), len(report.deleted), len(report.failed)
+            )
+        )
+        for image_data, error in report.failed:
+            LOG.error(
+                "Tag '{0}:{1}' couldn't be rolled back: {2}".format(
+                    image_data.repo, image_data.tag, error
+                )
+            )
+
+        return report
+
+    def get_bundle_push_items(self, docker_push_items, operator_push_items):
+        """
+        Get container push items which push the bundles referenced by operator push items.
+
+        Args:
+            docker_push_items ([ContainerPushItem]):
+                Container push items.
+            operator_push_items ([ContainerPushItem]):
+                Operator push items.
+        Returns ([ContainerPushItem]):
+            Container push items of the bundle images.
+        """
+        bundle_tags = set()
+        for item in operator_push_items:
+            for repo, tags in item.metadata["tags"].items():
+                bundle_tags.update([(repo, tag) for tag in tags])
+
+        return [
+            item
+            for item in docker_push_items
+            if any(
+                (repo, tag) in bundle_tags
+                for repo, tags in item.metadata["tags"].items()
+                for tag in tags
+            )
+        ]
+
+    def push_images(self, docker_push_items, operator_push_items):
+        """
+        Sign and push container images, and build, sign, and push index images.
+
+        The steps form a pipeline in which every step is started as soon as its dependencies
+        have finished:
+        - Sign container images
+        - Push container images containing operator bundles (after container signing)
+        - Push the rest of container images (after container signing)
+        - Get OCP versions and deprecation lists of index images (no dependencies)
+        - Build index images (after bundles are pushed and build data are gathered)
+        - Sign index images (after index image builds and container signing, as both use the
+          same signing session)
+        - Push index images (after index image signing and all container pushes)
+
+        Index images are thus pushed only if all container images were pushed successfully. If
+        any step fails, no new steps are started and the error is raised.
+
+        If 'quay_signature_index_reconcile' target setting is true, the local signature index is
+        reconciled with Pyxis before the images are signed.
+
+        Args:
+            docker_push_items ([ContainerPushItem]):
+                Container push items.
+            operator_push_items ([ContainerPushItem]):
+                Operator push items.
         """
-        # restore overwritten tags to their original values
-        schema = "{host}/{repo}:{tag}"
-        LOG.info("Restoring tags to their original values")
-        for image_data, manifest in sorted(backup_tags.items()):
-            image_ref = schema.format(host=self.quay_host, repo=image_data.repo, tag=image_data.tag)
-            LOG.info("Restoring tag '{0}'".format(image_ref))
-            self.quay_client.upload_manifest(manifest, image_ref)
-
-        # delete tags that didn't previously exist
-        LOG.info("Removing newly introduced tags")
-        for image_data in rollback_tags:
-            image_ref = schema.format(host=self.quay_host, repo=image_data.repo, tag=image_data.tag)
-            LOG.info("Removing tag '{0}'".format(image_ref))
-            self.quay_api_client.delete_tag(image_data.repo, image_data.tag)
+        pipeline = Pipeline()
+
+        container_signature_handler = ContainerSignatureHandler(
+            self.hub, self.task_id, self.target_settings, self.target_name
+        )
+        container_signature_handler.set_repo_state(self.repo_state)
+        container_signature_handler.set_journal(self.journal)
+        if self.target_settings.get("quay_signature_index_reconcile", False):
+            container_signature_handler.reconcile_signature_index()
+        pipeline.add_task(
+            "sign_container_images",
+            lambda: container_signature_handler.sign_container_images(docker_push_items),
+        )
+
+        push_tasks = []
+
+        def add_push_task(name, items):
+            container_pusher = ContainerImagePusher(items, self.target_settings)
+            container_pusher.set_repo_state(self.repo_state)
+            container_pusher.set_journal(self.journal)
+            pipeline.add_task(
+                name,
+                lambda _: container_pusher.push_container_images(),
+                depends_on=["sign_container_images"],
+            )
+            push_tasks.append(name)
+
+        bundle_push_items = self.get_bundle_push_items(docker_push_items, operator_push_items)
+        if bundle_push_items:
+            # Items sharing a destination tag with a bundle item mustn't be pushed concurrently
+            groups = ContainerImagePusher(
+                docker_push_items, self.target_settings
+            ).group_push_items()
+            bundle_push_items = [
+                item for group in groups if set(group) & set(bundle_push_items) for item in group
+            ]
+            add_push_task("push_bundle_images", bundle_push_items)
+        add_push_task(
+            "push_container_images", [i for i in docker_push_items if i not in bundle_push_items]
+        )
+
+        if operator_push_items:
+            operator_pusher = OperatorPusher(operator_push_items, self.target_settings)
+            operator_pusher.set_journal(self.journal)
+            operator_signature_handler = OperatorSignatureHandler(
+                self.hub, self.task_id, self.target_settings, self.target_name
+            )
+            operator_signature_handler.set_journal(self.journal)
+            # container and index images are signed over the same connection to RADAS
+            operator_signature_handler.set_signing_session(
+                container_signature_handler.signing_session
+            )
+
+            def sign_index_images(iib_results, *_):
+                operator_signature_handler.sign_operator_images(iib_results)
+                return iib_results
+
+            pipeline.add_task(
+                "prepare_index_image_builds", operator_pusher.prepare_index_image_builds
+            )
+            pipeline.add_task(
+                "build_index_images",
+                lambda builds, *_: operator_pusher.build_index_images(builds),
+                depends_on=["prepare_index_image_builds"]
+                + [t for t in push_tasks if t != "push_container_images"],
+            )
+            pipeline.add_task(
+                "sign_index_images",
+                sign_index_images,
+                depends_on=["build_index_images", "sign_container_images"],
+            )
+            pipeline.add_task(
+                "push_index_images",
+                lambda iib_results, *_: operator_pusher.push_index_images(iib_results),
+                depends_on=["sign_index_images"] + push_tasks,
+            )
+
+        try:
+            pipeline.run()
+        finally:
+            container_signature_handler.close_signing_session()
 
     def run(self):
         """
@@ -384,6 +813,7 @@ class PushDocker:
         The workflow can be summarized as:
         - Filter out push items to only include container image items
         - Check if the destination repos may be pushed to (using Pyxis)
+        - Prefetch data of destination repos, which will be shared by the following steps
         - Generate backup mapping that will be used for rollback if something goes wrong.
         - Sign container images using RADAS and upload signatures to Pyxis
         - Push container images to their destinations
@@ -393,6 +823,14 @@ class PushDocker:
         - Push the index images to Quay
         - (in case of failure) Rollback destination repos to the pre-push state
 
+        Signing and pushing steps run concurrently where their dependencies allow it (see
+        'push_images').
+
+        If journaling is enabled, finished units of work are recorded, and a re-run of the same
+        task skips them. Rollback may be disabled in target settings to allow resuming the push.
+        The journal is removed once the push succeeds or is fully rolled back. If the rollback
+        fails partially, units of the rolled back tags are marked to be performed again.
+
         Returns ([str]):
             List of container image repos (for UD cache flush done by pub)
         """
@@ -407,35 +845,38 @@ class PushDocker:
         self.check_repos_validity(
             docker_push_items, self.hub, self.target_settings, self.quay_api_client
         )
+        # Fetch destination repo data which will be shared by the following steps
+        self.prefetch_repo_state(docker_push_items)
         # Generate resources for rollback in case there are errors during the push
-        backup_tags, rollback_tags = self.generate_backup_mapping(docker_push_items)
+        backup_tags, rollback_tags = self.get_backup_mapping(docker_push_items)
 
         try:
-            # Sign container images
-            container_signature_handler = ContainerSignatureHandler(
-                self.hub, self.task_id, self.target_settings, self.target_name
-            )
-            container_signature_handler.sign_container_images(docker_push_items)
-            # Push container images
-            container_pusher = ContainerImagePusher(docker_push_items, self.target_settings)
-            container_pusher.push_container_images()
-
-            if operator_push_items:
-                # Build index images
-                operator_pusher = OperatorPusher(operator_push_items, self.target_settings)
-                iib_results = operator_pusher.build_index_images()
-                # Sign operator images
-                operator_signature_handler = OperatorSignatureHandler(
-                    self.hub, self.task_id, self.target_settings, self.target_name
-                )
-                operator_signature_handler.sign_operator_images(iib_results)
-                # Push index images to Quay
-                operator_pusher.push_index_images(iib_results)
+            self.push_images(docker_push_items, operator_push_items)
         except Exception:
+            if not self.target_settings.get("quay_rollback_enabled", True):
+                LOG.error(
+                    "An exception has occurred during the push, rollback is disabled. "
+                    "The push may be resumed by re-running the task."
+                )
+                raise
             LOG.error("An exception has occurred during the push, starting rollback")
-            self.rollback(backup_tags, rollback_tags)
+            backup_tags, rollback_tags = self.get_journaled_rollback_mapping(
+                backup_tags, rollback_tags
+            )
+            report = self.rollback(backup_tags, rollback_tags)
+            if self.journal and report.failed:
+                # Only the work which wasn't undone may be skipped by a re-run of the task
+                self.invalidate_rolled_back_units(report.restored + report.deleted)
+            elif self.journal:
+                # The previous state was restored, a re-run of the task must start from the
+                # beginning
+                self.journal.clear()
             raise
 
+        # The push has finished, a re-run of the task must start from the beginning
+        if self.journal:
+            self.journal.clear()
+
         # Return repos for UD cache flush
         repos = []
         for item in docker_push_items:
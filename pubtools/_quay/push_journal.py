@@ -0,0 +1,173 @@
+from datetime import datetime
+import json
+import logging
+import os
+import threading
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+
+class PushJournal:
+    """
+    Append-only record of the units of work performed by a push task.
+
+    The journal is stored as a JSONL file named after the task ID. Every line describes a state
+    change of a single unit (e.g. a copy of a push item) identified by its type and key. A unit is
+    marked as 'started' before it modifies Quay and as 'done' after it finished, which allows a
+    re-run of the same task to skip finished units, and a rollback to target only units which
+    have started. A unit whose changes were undone by a rollback is marked as 'rolled_back', so
+    that a re-run performs it again.
+    """
+
+    STARTED = "started"
+    DONE = "done"
+    ROLLED_BACK = "rolled_back"
+
+    def __init__(self, journal_dir, task_id):
+        """
+        Initialize.
+
+        Args:
+            journal_dir (str):
+                Directory where journal files are stored.
+            task_id (str):
+                ID of the pub task. Re-runs of the same task share a journal.
+        """
+        self.task_id = task_id
+        self.path = os.path.join(journal_dir, "push-{0}.jsonl".format(task_id))
+        # {(unit, key): entry}, containing the latest entry of each unit
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        if not os.path.isdir(journal_dir):
+            os.makedirs(journal_dir)
+        self._load()
+
+    def _load(self):
+        """Load entries of a previous run of the task."""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Last line may be incomplete if the previous run was killed during a write
+                    LOG.warning("Ignoring corrupted journal entry: {0}".format(line.strip()))
+                    continue
+                self._entries[(entry["unit"], entry["key"])] = entry
+
+        LOG.info(
+            "Loaded {0} journal entries of task {1} from {2}".format(
+                len(self._entries), self.task_id, self.path
+            )
+        )
+
+    @staticmethod
+    def get_push_item_key(push_item):
+        """
+        Get the key of units of work performed for a push item.
+
+        Push items may share their source image, so the key consists of the pull URL and all
+        destination tags of the item.
+
+        Args:
+            push_item (ContainerPushItem):
+                Container push item.
+        Returns (str):
+            Key of the push item.
+        """
+        dest_tags = sorted(
+            [
+                "{0}:{1}".format(repo, tag)
+                for repo, tags in push_item.metadata["tags"].items()
+                for tag in tags
+            ]
+        )
+        return " ".join([push_item.metadata["pull_url"]] + dest_tags)
+
+    def record(self, unit, key, status=DONE, data=None):
+        """
+        Append a state change of a unit to the journal.
+
+        Args:
+            unit (str):
+                Type of the unit, e.g. 'copy'.
+            key (str):
+                Identifier of the unit, unique within the unit type.
+            status (str):
+                New status of the unit ('started', 'done' or 'rolled_back').
+            data (dict):
+                Additional JSON-serializable data describing the unit.
+        """
+        entry = {
+            "task_id": self.task_id,
+            "unit": unit,
+            "key": key,
+            "status": status,
+            "data": data or {},
+            "time": datetime.utcnow().isoformat() + "Z",
+        }
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, sort_keys=True) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries[(unit, key)] = entry
+
+    def is_done(self, unit, key):
+        """
+        Check whether a unit was finished.
+
+        Args:
+            unit (str):
+                Type of the unit.
+            key (str):
+                Identifier of the unit.
+        Returns (bool):
+            True if the unit was finished by this or a previous run of the task.
+        """
+        with self._lock:
+            entry = self._entries.get((unit, key))
+        return entry is not None and entry["status"] == self.DONE
+
+    def get_data(self, unit, key):
+        """
+        Get data of the latest entry of a unit.
+
+        Args:
+            unit (str):
+                Type of the unit.
+            key (str):
+                Identifier of the unit.
+        Returns (dict|None):
+            Data of the unit, or None if the unit isn't journaled.
+        """
+        with self._lock:
+            entry = self._entries.get((unit, key))
+        return entry["data"] if entry is not None else None
+
+    def get_entries(self, unit):
+        """
+        Get the latest entries of all units of a given type.
+
+        Args:
+            unit (str):
+                Type of the units.
+        Returns ([dict]):
+            Journal entries sorted by their keys.
+        """
+        with self._lock:
+            entries = [e for (u, _), e in self._entries.items() if u == unit]
+        return sorted(entries, key=lambda e: e["key"])
+
+    def clear(self):
+        """Remove the journal, so that a re-run of the task starts from the beginning."""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._entries = {}
+        LOG.info("Journal {0} was removed".format(self.path))
@@ -0,0 +1,316 @@
+from collections import deque
+from multiprocessing.pool import ThreadPool
+import atexit
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from .utils.misc import DEFAULT_MAX_THREADS
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+
+class PyxisClient:
+    """
+    In-process client of Pyxis.
+
+    Calls the client library of pubtools-pyxis directly instead of running its entrypoints. The
+    underlying HTTP session is authenticated once and reused (including its connection pool) by
+    all calls, which may be made from multiple threads.
+    """
+
+    # Digests of a signature search are sent in the URL, which must not exceed this length
+    MAX_SEARCH_URL_LENGTH = 7000
+    # Chunks of signature searches are resized so that a request takes around this many seconds
+    TARGET_SEARCH_TIME = 2.0
+
+    def __init__(self, server, krb_principal, krb_ktfile=None):
+        """
+        Initialize.
+
+        Args:
+            server (str):
+                URL of the Pyxis service.
+            krb_principal (str):
+                Kerberos principal to use for Pyxis authentication.
+            krb_ktfile (str|None):
+                Path to Kerberos keytab file. Optional.
+        """
+        self.server = server
+        self.krb_principal = krb_principal
+        self.krb_ktfile = krb_ktfile
+
+        self._client = None
+        self._ccache_file = None
+        self._lock = threading.Lock()
+
+    def _create_client(self):
+        """
+        Create an authenticated client of pubtools-pyxis.
+
+        Returns (pubtools._pyxis.pyxis_client.PyxisClient):
+            pubtools-pyxis client.
+        """
+        from pubtools._pyxis.pyxis_authentication import PyxisKrbAuth
+        from pubtools._pyxis.pyxis_client import PyxisClient as _PyxisClient
+
+        # Kerberos ticket is obtained once and kept in a credential cache private to this client
+        fd, self._ccache_file = tempfile.mkstemp(prefix="pubtools_quay_pyxis_ccache_")
+        os.close(fd)
+        auth = PyxisKrbAuth(
+            self.krb_principal, self.server, self._ccache_file, ktfile=self.krb_ktfile
+        )
+        LOG.info("Creating Pyxis client for {0}".format(self.server))
+        return _PyxisClient(hostname=self.server, auth=auth)
+
+    @property
+    def client(self):
+        """Create and get pubtools-pyxis client instance."""
+        with self._lock:
+            if self._client is None:
+                self._client = self._create_client()
+            return self._client
+
+    def close(self):
+        """Drop the underlying session and remove the Kerberos credential cache."""
+        with self._lock:
+            self._client = None
+            if self._ccache_file and os.path.exists(self._ccache_file):
+                os.remove(self._ccache_file)
+            self._ccache_file = None
+
+    def get_repository_metadata(self, repository):
+        """
+        Get metadata of a Comet repository.
+
+        Args:
+            repository (str):
+                Name of the repository.
+        Returns (dict):
+            Repository metadata.
+        """
+        LOG.info("Getting metadata of repository '{0}' from Pyxis".format(repository))
+        return self.client.get_repository_metadata(repository)
+
+    def get_operator_indices(self, ocp_versions_range, organization):
+        """
+        Get index images supported by an OCP versions range.
+
+        Args:
+            ocp_versions_range (str):
+                Supported OCP versions range, e.g. 'v4.5-v4.7'.
+            organization (str):
+                Organization of the index images.
+        Returns ([dict]):
+            Index images as returned by Pyxis.
+        """
+        return self.client.get_operator_indices(ocp_versions_range, organization)
+
+    def get_container_signatures(self, manifest_digests):
+        """
+        Get existing signatures of the specified manifests.
+
+        Args:
+            manifest_digests ([str]):
+                Digests of the manifests.
+        Returns ([dict]):
+            Signatures as returned by Pyxis.
+        """
+        return self.client.get_container_signatures(",".join(manifest_digests), None)
+
+    def _next_search_chunk(self, manifest_digests, start, chunk_size):
+        """
+        Get the next chunk of digests to search for, respecting the URL length limit.
+
+        Args:
+            manifest_digests ([str]):
+                All digests to search for.
+            start (int):
+                Index of the first digest of the chunk.
+            chunk_size (int):
+                Maximum number of digests in the chunk.
+        Returns ([str]):
+            Digests of the chunk. At least one digest is returned if any are left.
+        """
+        end = start
+        url_length = 0
+        while end < len(manifest_digests) and end - start < chunk_size:
+            url_length += len(manifest_digests[end]) + 1
+            if end > start and url_length > self.MAX_SEARCH_URL_LENGTH:
+                break
+            end += 1
+        return manifest_digests[start:end]
+
+    def _timed_get_container_signatures(self, manifest_digests):
+        """
+        Get signatures of the specified manifests and measure the duration of the request.
+
+        Args:
+            manifest_digests ([str]):
+                Digests of the manifests.
+        Returns (([dict], float)):
+            Signatures as returned by Pyxis, and duration of the request in seconds.
+        """
+        start = time.time()
+        signatures = list(self.get_container_signatures(manifest_digests))
+        return (signatures, time.time() - start)
+
+    def iter_container_signatures(self, manifest_digests, chunk_size=50, threads=None):
+        """
+        Search for signatures of many manifests, sending requests for chunks of digests in parallel.
+
+        The chunk size is adapted to the response times of Pyxis: it's doubled after requests
+        taking less than half of TARGET_SEARCH_TIME and halved after requests taking longer than
+        TARGET_SEARCH_TIME. Chunks are also limited by MAX_SEARCH_URL_LENGTH.
+
+        Args:
+            manifest_digests ([str]):
+                Digests of the manifests.
+            chunk_size (int):
+                Initial number of digests per request.
+            threads (int):
+                Maximum number of requests sent at the same time.
+        Yields (dict):
+            Signatures as returned by Pyxis, in the order of the requested chunks.
+        """
+        manifest_digests = list(manifest_digests)
+        threads = max(1, threads or DEFAULT_MAX_THREADS)
+        position = 0
+        # (number of digests, AsyncResult) of the sent requests, in the order of chunks
+        pending = deque()
+        pool = ThreadPool(threads)
+        try:
+            while True:
+                while len(pending) < threads and position < len(manifest_digests):
+                    chunk = self._next_search_chunk(manifest_digests, position, chunk_size)
+                    position += len(chunk)
+                    pending.append(
+                        (
+                            len(chunk),
+                            pool.apply_async(self._timed_get_container_signatures, (chunk,)),
+                        )
+                    )
+                if not pending:
+                    break
+
+                sent_size, async_result = pending.popleft()
+                signatures, duration = async_result.get()
+                if duration < self.TARGET_SEARCH_TIME / 2 and sent_size >= chunk_size:
+                    chunk_size *= 2
+                elif duration > self.TARGET_SEARCH_TIME:
+                    chunk_size = max(1, sent_size // 2)
+
+                for signature in signatures:
+                    yield signature
+        finally:
+            pool.close()
+            pool.join()
+
+    def upload_signatures(self, signatures, ignore_conflicts=False):
+        """
+        Upload signatures to Pyxis.
+
+        Args:
+            signatures ([dict]):
+                Signatures to upload.
+            ignore_conflicts (bool):
+                Whether to treat a conflict response (signature already exists) as a success. If
+                a batch of signatures is rejected because of a conflict, its signatures are
+                uploaded one by one so that all the new ones are stored.
+        Returns ([dict]):
+            Uploaded signatures as returned by Pyxis.
+        """
+        try:
+            return self.client.upload_signatures(signatures)
+        except requests.exceptions.HTTPError as e:
+            if not ignore_conflicts or e.response is None or e.response.status_code != 409:
+                raise
+
+        if len(signatures) == 1:
+            LOG.info(
+                "Signature of {0} by key {1} already exists in Pyxis".format(
+                    signatures[0]["reference"], signatures[0]["sig_key_id"]
+                )
+            )
+            return []
+
+        LOG.info("Some of the uploaded signatures already exist, uploading them one by one")
+        results = []
+        for signature in signatures:
+            results += self.upload_signatures([signature], ignore_conflicts=True) or []
+        return results
+
+    def delete_container_signatures(self, signature_ids):
+        """
+        Delete signatures from Pyxis.
+
+        Args:
+            signature_ids ([str]):
+                IDs of the signatures to delete.
+        """
+        return self.client.delete_container_signatures(signature_ids)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_pyxis_client(server, krb_principal, krb_ktfile=None):
+    """
+    Get a Pyxis client shared by all callers using the same server and credentials.
+
+    Args:
+        server (str):
+            URL of the Pyxis service.
+        krb_principal (str):
+            Kerberos principal to use for Pyxis authentication.
+        krb_ktfile (str|None):
+            Path to Kerberos keytab file. Optional.
+    Returns (PyxisClient):
+        Pyxis client.
+    """
+    key = (server, krb_principal, krb_ktfile)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = PyxisClient(server, krb_principal, krb_ktfile)
+        return _clients[key]
+
+
+def close_pyxis_clients():
+    """
+    Close all shared Pyxis clients, removing their Kerberos credential caches.
+
+    Called when the process exits. Clients requested afterwards are created again.
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+atexit.register(close_pyxis_clients)
+
+
+def get_target_pyxis_client(target_settings):
+    """
+    Get a shared Pyxis client configured by target settings.
+
+    Args:
+        target_settings (dict):
+            Target settings containing 'pyxis_server', 'iib_krb_principal' and optionally
+            'iib_krb_ktfile'.
+    Returns (PyxisClient):
+        Pyxis client.
+    """
+    return get_pyxis_client(
+        target_settings["pyxis_server"],
+        target_settings["iib_krb_principal"],
+        target_settings.get("iib_krb_ktfile"),
+    )
@@ -70,6 +70,28 @@ class QuayApiClient:
 
         return response
 
+    def restore_tag(self, repository, tag, manifest_digest):
+        """
+        Make a tag reference a manifest which is already present in the repository.
+
+        Args:
+            repository (str):
+                Repository in which the tag resides.
+            tag (str):
+                Tag which will be created or moved.
+            manifest_digest (str):
+                Digest of the manifest the tag should reference.
+
+        Returns (Response):
+            Request library's Response object.
+        """
+        endpoint = "repository/{0}/tag/{1}".format(repository, tag)
+        kwargs = {"json": {"manifest_digest": manifest_digest}}
+        response = self.session.put(endpoint, **kwargs)
+        response.raise_for_status()
+
+        return response
+
     def delete_repository(self, repository):
         """
         Delete a Quay repository.
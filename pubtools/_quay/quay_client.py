@@ -135,10 +135,15 @@ class QuayClient:
             r.raise_for_status()
         if r.status_code == 401:
             LOG.debug("Unauthorized request, attempting to authenticate.")
-            self._authenticate_quay(r.headers)
+            token = self._authenticate_quay(r.headers)
         else:
             return r
 
+        # Session may be shared by threads working with different repositories, so the token
+        # is specified explicitly in case another thread has replaced it in the meantime
+        kwargs = dict(kwargs)
+        kwargs["headers"] = dict(kwargs.get("headers") or {})
+        kwargs["headers"]["Authorization"] = "Bearer {0}".format(token)
         r = self.session.request(method, endpoint, **kwargs)
         r.raise_for_status()
 
@@ -154,6 +159,8 @@ class QuayClient:
         Args:
             headers (dict):
                 Headers of the 401 response received from the registry.
+        Returns (str):
+            Bearer token which was obtained.
         Raises:
             RegistryAuthError:
                 When there's an issue with the authentication procedure.
@@ -193,6 +200,7 @@ class QuayClient:
         if "token" not in r.json():
             raise RegistryAuthError("Authentication server response doesn't contain a token.")
         self.session.set_auth_token(r.json()["token"])
+        return r.json()["token"]
 
     def _parse_and_validate_image_url(self, image):
         """
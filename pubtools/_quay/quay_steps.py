@@ -1,10 +1,10 @@
 from __future__ import print_function
 import re
 import six
-import pkg_resources
 
 from .utils.stepper import Step, StepFailedError
 from .utils.logger import log_jsonl
+from .utils.misc import load_entry_point
 
 
 LOG_INDENT = "  - "
@@ -497,7 +497,7 @@ class StepPushOperators(Step):
             "console_scripts",
             "pubtools-pyxis-get-operator-indices",
         )
-        entry_point_fn = pkg_resources.load_entry_point(*entry_point)
+        entry_point_fn = load_entry_point(*entry_point)
         args = [
             "cmd",
             "--pyxis-server",
@@ -1,5 +1,6 @@
 import logging
 
+from .signature_index import SignatureIndex
 from .signature_remover import SignatureRemover
 from .quay_api_client import QuayApiClient
 from .utils.misc import (
@@ -56,6 +57,12 @@ REMOVE_REPO_ARGS = {
         "required": False,
         "type": str,
     },
+    ("--signature-index-path",): {
+        "help": "Path to the local signature index, whose entries of removed signatures are "
+        "removed as well. Optional.",
+        "required": False,
+        "type": str,
+    },
     ("--send-umb-msg",): {
         "help": "Flag of whether to send a UMB message",
         "required": False,
@@ -159,6 +166,7 @@ def remove_repository(
     umb_client_key=None,
     umb_ca_cert=None,
     umb_topic="VirtualTopic.eng.pub.quay_remove_repository",
+    signature_index_path=None,
 ):
     """
     Remove Quay repository.
@@ -192,6 +200,9 @@ def remove_repository(
             Path to a CA certificate (for mutual authentication).
         umb_topic (str):
             Topic to send the UMB messages to.
+        signature_index_path (str):
+            Path to the local signature index of pushes to the same Pyxis. Entries of removed
+            signatures are removed from it. Optional.
     """
     verify_remove_repo_args(repository, send_umb_msg, umb_urls, umb_cert)
 
@@ -200,8 +211,16 @@ def remove_repository(
 
     sig_remover = SignatureRemover(quay_user=quay_user, quay_password=quay_password)
     sig_remover.set_quay_api_client(quay_api_client)
+    signature_index = None
+    if signature_index_path:
+        signature_index = SignatureIndex(signature_index_path, pyxis_server)
     sig_remover.remove_repository_signatures(
-        repository, namespace, pyxis_server, pyxis_krb_principal, pyxis_krb_ktfile
+        repository,
+        namespace,
+        pyxis_server,
+        pyxis_krb_principal,
+        pyxis_krb_ktfile,
+        signature_index=signature_index,
     )
 
     internal_repo = "{0}/{1}".format(namespace, get_internal_container_repo_name(repository))
@@ -0,0 +1,261 @@
+from copy import deepcopy
+import logging
+import threading
+
+import requests
+
+from .utils.misc import run_in_parallel, DEFAULT_MAX_THREADS
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+
+class RepositoryStateSnapshot:
+    """
+    Read-through cache of Quay repository data shared by the stages of a push.
+
+    Repository data (including the tag mapping) and manifests are fetched once and served to
+    every later request. Data of a repository must be invalidated after it was written to.
+    """
+
+    def __init__(self, quay_client, quay_api_client, host=None, threads=DEFAULT_MAX_THREADS):
+        """
+        Initialize.
+
+        Args:
+            quay_client (QuayClient):
+                Client used for fetching manifests.
+            quay_api_client (QuayApiClient):
+                Client used for fetching repository data.
+            host (str):
+                Quay registry URL. Defaults to 'quay.io'.
+            threads (int):
+                Maximum number of parallel requests during the prefetch.
+        """
+        self.quay_client = quay_client
+        self.quay_api_client = quay_api_client
+        self.host = host.rstrip("/") if host else "quay.io"
+        self.threads = threads
+
+        # {repository: repo data} or {repository: HTTPError} if the request has failed
+        self._repo_data = {}
+        # {(host, repository, reference, manifest_list): manifest}
+        self._manifests = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse_image(image):
+        """
+        Split an image reference into a host, a repository and a reference.
+
+        Args:
+            image (str):
+                Image reference, specified either by a tag or a digest.
+        Returns ((str, str, str, bool)):
+            Host, repository, reference, and whether the reference is a digest.
+        """
+        url_parts = image.split("/")
+        if "@" in url_parts[-1]:
+            remainder, ref = url_parts[-1].split("@")
+            is_digest = True
+        elif ":" in url_parts[-1]:
+            remainder, ref = url_parts[-1].split(":")
+            is_digest = False
+        else:
+            raise ValueError("Neither tag nor digest were found in the image")
+
+        repo = "/".join(url_parts[1:-1] + [remainder])
+        return (url_parts[0], repo, ref, is_digest)
+
+    def _fetch_repository_data(self, repository):
+        """
+        Fetch data of a repository. HTTP errors are returned instead of being raised.
+
+        Args:
+            repository (str):
+                Full repository path including the namespace.
+        Returns (dict|HTTPError):
+            Repository data or the error which occurred while fetching them.
+        """
+        try:
+            return self.quay_api_client.get_repository_data(repository)
+        except requests.exceptions.HTTPError as e:
+            return e
+
+    def get_repository_data(self, repository):
+        """
+        Get repository data including its tags. Data are fetched only if they're not cached.
+
+        Args:
+            repository (str):
+                Full repository path including the namespace.
+        Returns (dict):
+            Repository data.
+        Raises:
+            HTTPError: When the repository data couldn't be fetched (e.g. repo doesn't exist).
+        """
+        with self._lock:
+            cached = repository in self._repo_data
+            repo_data = self._repo_data.get(repository)
+        if not cached:
+            repo_data = self._fetch_repository_data(repository)
+            with self._lock:
+                self._repo_data[repository] = repo_data
+
+        if isinstance(repo_data, requests.exceptions.HTTPError):
+            raise repo_data
+        return repo_data
+
+    def _missing_tag_error(self, image):
+        """
+        Create an error identical to the one returned by Quay when a tag doesn't exist.
+
+        Args:
+            image (str):
+                Reference to the missing image.
+        Returns (HTTPError):
+            404 error of the given image.
+        """
+        response = requests.Response()
+        response.status_code = 404
+        response.reason = "Not Found"
+        response.url = image
+        return requests.exceptions.HTTPError(
+            "404 Client Error: Not Found for image: {0}".format(image), response=response
+        )
+
+    def get_manifest(self, image, manifest_list=False):
+        """
+        Get manifest of a given image. Manifest is fetched only if it's not cached.
+
+        The behavior is identical to QuayClient.get_manifest. If the repository data are cached,
+        tag references are resolved to digests, and a missing tag results in a 404 error
+        without contacting the registry. Repository data are only used for images on the Quay
+        host, and manifests are cached separately for every registry.
+
+        Args:
+            image (str):
+                Image for which to get the manifest.
+            manifest_list (bool):
+                Whether to only return a manifest list and raise an exception otherwise.
+        Returns (dict):
+            Image manifest.
+        """
+        host, repo, ref, is_digest = self._parse_image(image)
+
+        with self._lock:
+            # repository data are fetched from the Quay host only
+            repo_data = self._repo_data.get(repo) if host == self.host else None
+            manifest = self._manifests.get((host, repo, ref, manifest_list))
+            digest = ref if is_digest else None
+            if manifest is None and not is_digest and isinstance(repo_data, dict):
+                tag_data = repo_data.get("tags", {}).get(ref)
+                if tag_data is None:
+                    raise self._missing_tag_error(image)
+                digest = tag_data["manifest_digest"]
+            if manifest is None and digest:
+                # manifest list is preferred by the registry, so the non-ML query returns it too
+                manifest = self._manifests.get((host, repo, digest, True))
+                if manifest is None and not manifest_list:
+                    manifest = self._manifests.get((host, repo, digest, False))
+
+        if manifest is None:
+            if manifest_list:
+                manifest = self.quay_client.get_manifest(image, manifest_list=True)
+            else:
+                manifest = self.quay_client.get_manifest(image)
+            with self._lock:
+                self._manifests[(host, repo, ref, manifest_list)] = manifest
+
+        return deepcopy(manifest)
+
+    def prefetch(self, repo_tags):
+        """
+        Fetch in parallel the data of repositories and manifest lists referenced by given tags.
+
+        Args:
+            repo_tags ({str: [str]}):
+                Mapping of full repository paths (including namespace) and tags whose manifest
+                lists should be fetched.
+        """
+        repositories = sorted([r for r in repo_tags.keys() if r not in self._repo_data])
+        LOG.info("Prefetching data of {0} repositories".format(len(repositories)))
+        results = run_in_parallel(self._fetch_repository_data, repositories, self.threads)
+        with self._lock:
+            for repository, repo_data in zip(repositories, results):
+                self._repo_data[repository] = repo_data
+
+        ml_images = set()
+        for repository, tags in sorted(repo_tags.items()):
+            repo_data = self._repo_data.get(repository)
+            if not isinstance(repo_data, dict):
+                continue
+            for tag in tags:
+                tag_data = repo_data.get("tags", {}).get(tag)
+                # image_id isn't set for manifest lists
+                if tag_data and not tag_data.get("image_id"):
+                    ml_images.add((repository, tag_data["manifest_digest"]))
+
+        ml_images = sorted(
+            [i for i in ml_images if (self.host, i[0], i[1], True) not in self._manifests]
+        )
+        LOG.info("Prefetching {0} manifest lists".format(len(ml_images)))
+
+        def fetch_manifest_list(image):
+            try:
+                return self.quay_client.get_manifest(
+                    "{0}/{1}@{2}".format(self.host, image[0], image[1]),
+                    manifest_list=True,
+                )
+            except Exception as e:
+                # Manifest will be fetched later (and the error raised) if it's needed
+                LOG.warning("Couldn't prefetch manifest list {0}: {1}".format(image, e))
+                return None
+
+        manifests = run_in_parallel(fetch_manifest_list, ml_images, self.threads)
+        with self._lock:
+            for (repository, digest), manifest in zip(ml_images, manifests):
+                if manifest is not None:
+                    self._manifests[(self.host, repository, digest, True)] = manifest
+
+    def invalidate(self, repository):
+        """
+        Remove cached data of a repository. Should be called after the repository was modified.
+
+        Manifests referenced by digest are immutable, so they remain cached.
+
+        Args:
+            repository (str):
+                Full repository path including the namespace.
+        """
+        self._invalidate(self.host, repository)
+
+    def _invalidate(self, host, repository):
+        """
+        Remove cached data of a repository on a given registry.
+
+        Args:
+            host (str):
+                Registry of the repository.
+            repository (str):
+                Full repository path including the namespace.
+        """
+        with self._lock:
+            if host == self.host:
+                self._repo_data.pop(repository, None)
+            for key in list(self._manifests.keys()):
+                # tags can't contain ':', digests always do
+                if key[:2] == (host, repository) and ":" not in key[2]:
+                    self._manifests.pop(key)
+
+    def invalidate_images(self, images):
+        """
+        Remove cached data of repositories which contain the given images.
+
+        Args:
+            images ([str]):
+                References of images which were modified.
+        """
+        for host, repository in sorted(set([self._parse_image(image)[:2] for image in images])):
+            self._invalidate(host, repository)
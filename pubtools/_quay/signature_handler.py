@@ -1,20 +1,29 @@
-import base64
 from datetime import datetime
-import json
 import logging
+import threading
 import uuid
 
 import proton
 
+from .claim_message import ClaimMessage
 from .exceptions import SigningError
 from .utils.misc import (
-    run_entrypoint,
     get_internal_container_repo_name,
     log_step,
+    run_in_parallel,
+    DEFAULT_MAX_THREADS,
 )
 from .quay_api_client import QuayApiClient
 from .quay_client import QuayClient
-from .manifest_claims_handler import ManifestClaimsHandler
+from .manifest_claims_handler import ManifestClaimsHandler, ResponseRouter
+from .repository_state_snapshot import RepositoryStateSnapshot
+from .push_journal import PushJournal
+from .pyxis_client import get_target_pyxis_client
+from .signature_index import get_signature_index
+from .signature_spool import get_signature_spool
+from .signing_session import SigningSession
+from .signature_uploader import SignatureUploader
+from .signing_reconciliation import SigningReconciliation, StreamingReconciliation
 
 LOG = logging.getLogger("PubLogger")
 logging.basicConfig()
@@ -26,6 +35,8 @@ class SignatureHandler:
 
     MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST = 50
     DEFAULT_MAX_ITEMS_PER_UPLOAD_BATCH = 100
+    # Handlers of a task which may sign concurrently must use different spools
+    SPOOL_NAME = "signatures"
 
     def __init__(self, hub, task_id, target_settings, target_name):
         """
@@ -57,6 +68,13 @@ class SignatureHandler:
         self.quay_host = self.target_settings.get("quay_host", "quay.io").rstrip("/")
         self._quay_client = None
         self._quay_api_client = None
+        self._repo_state = None
+        self._journal = None
+        self._signing_session = None
+        self.signature_index = get_signature_index(self.target_settings)
+        self.signature_spool = get_signature_spool(
+            self.target_settings, self.task_id, self.SPOOL_NAME
+        )
 
     @property
     def quay_client(self):
@@ -78,6 +96,105 @@ class SignatureHandler:
             )
         return self._quay_api_client
 
+    @property
+    def repo_state(self):
+        """Create and access RepositoryStateSnapshot."""
+        if self._repo_state is None:
+            self._repo_state = RepositoryStateSnapshot(
+                self.quay_client, self.quay_api_client, self.quay_host
+            )
+        return self._repo_state
+
+    @property
+    def pyxis_client(self):
+        """Access the Pyxis client shared by all users of the same Pyxis server."""
+        return get_target_pyxis_client(self.target_settings)
+
+    def set_repo_state(self, repo_state):
+        """
+        Set a RepositoryStateSnapshot instance which will serve the repository data.
+
+        Args:
+            repo_state (RepositoryStateSnapshot):
+                RepositoryStateSnapshot instance shared with other stages of the push.
+        """
+        self._repo_state = repo_state
+
+    def set_journal(self, journal):
+        """
+        Set a PushJournal instance which will record finished signature uploads.
+
+        Args:
+            journal (PushJournal):
+                Journal of the push task.
+        """
+        self._journal = journal
+
+    @property
+    def signing_session(self):
+        """
+        Get the session used for signing, if it's enabled by 'umb_signing_session' docker setting.
+
+        The session keeps the connection to RADAS open across signing rounds. It should be closed
+        by the caller once signing is finished.
+        """
+        if self._signing_session is None and self.target_settings["docker_settings"].get(
+            "umb_signing_session", False
+        ):
+            self._signing_session = SigningSession(
+                lambda: self._create_claims_handler([], self._send_claim_messages, keep_open=True)
+            )
+        return self._signing_session
+
+    def set_signing_session(self, signing_session):
+        """
+        Set a signing session shared with other signature handlers.
+
+        Args:
+            signing_session (SigningSession):
+                Signing session.
+        """
+        self._signing_session = signing_session
+
+    def close_signing_session(self):
+        """Close the signing session, if it was opened."""
+        if self._signing_session:
+            self._signing_session.close()
+
+    @classmethod
+    def create_manifest_claim_messages(cls, claims, task_id):
+        """
+        Construct messages to send to RADAS for many manifest claims at once.
+
+        All messages share the same creation time. Manifest claims themselves are only encoded
+        when the messages are sent.
+
+        Args:
+            claims ([(str, str, str, str, str)]):
+                Claims as tuples (destination repo, signature key, manifest digest, docker
+                reference, image name). See create_manifest_claim_message for their meaning.
+            task_id (str):
+                ID of the pub task.
+        Returns ([ClaimMessage]):
+            Messages to send to RADAS, in the order of the claims.
+        """
+        created = datetime.utcnow().isoformat() + "Z"
+        return [
+            ClaimMessage(
+                sig_key_id=signature_key,
+                pub_task_id=task_id,
+                request_id=str(uuid.uuid4()),
+                manifest_digest=manifest_digest,
+                repo=destination_repo,
+                image_name=image_name,
+                docker_reference=docker_reference,
+                created=created,
+            )
+            for destination_repo, signature_key, manifest_digest, docker_reference, image_name in (
+                claims
+            )
+        ]
+
     @classmethod
     def create_manifest_claim_message(
         cls,
@@ -108,33 +225,13 @@ class SignatureHandler:
                 Name of the image to send to RADAS.
             task_id (str):
                 ID of the pub task.
+        Returns (ClaimMessage):
+            Message to send to RADAS.
         """
-        # container image signature
-        manifest_claim = {
-            "critical": {
-                "type": "atomic container signature",
-                "image": {"docker-manifest-digest": manifest_digest},
-                "identity": {"docker-reference": docker_reference},
-            },
-            # NOTE: pub version is no longer written here. I hope that's OK
-            "optional": {"creator": "Red Hat RCM Pub"},
-        }
-
-        message = {
-            "sig_key_id": signature_key,
-            # Python 2.6/3 compatibility workaround
-            "claim_file": base64.b64encode(json.dumps(manifest_claim).encode("latin1")).decode(
-                "latin1"
-            ),
-            "pub_task_id": task_id,
-            "request_id": str(uuid.uuid4()),
-            "manifest_digest": manifest_digest,
-            "repo": destination_repo,
-            "image_name": image_name,
-            "docker_reference": docker_reference,
-            "created": datetime.utcnow().isoformat() + "Z",
-        }
-        return message
+        return cls.create_manifest_claim_messages(
+            [(destination_repo, signature_key, manifest_digest, docker_reference, image_name)],
+            task_id,
+        )[0]
 
     def get_tagged_image_digests(self, image_ref):
         """
@@ -154,14 +251,14 @@ class SignatureHandler:
         repo_path, tag = image_ref.split(":")
         repo = "/".join(repo_path.split("/")[-2:])
 
-        repo_data = self.quay_api_client.get_repository_data(repo)
+        repo_data = self.repo_state.get_repository_data(repo)
 
         # if 'image_id' is specified, the tag doesn't reference a ML and digest should be included
         if repo_data["tags"][tag]["image_id"]:
             digests.append(repo_data["tags"][tag]["manifest_digest"])
         # if manifest list, we want to sign only arch digests, not ML digest
         else:
-            manifest_list = self.quay_client.get_manifest(image_ref, manifest_list=True)
+            manifest_list = self.repo_state.get_manifest(image_ref, manifest_list=True)
             for manifest in manifest_list["manifests"]:
                 digests.append(manifest["digest"])
 
@@ -172,8 +269,9 @@ class SignatureHandler:
         Get existing signatures from Pyxis based on the specified criteria (currently only digests).
 
         NOTE: In the current implementation, only manifest digests are being used to search for
-        existing signatures. Also, the search is performed in chunks, their size being limited by
-        MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST.
+        existing signatures. Also, the search is performed in chunks, which are fetched in parallel
+        (limited by 'pyxis_max_concurrent_requests' target setting). The initial chunk size
+        is MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST, and it's adapted to Pyxis response times.
 
         Args:
             manifest_digests ([str]|None):
@@ -183,31 +281,13 @@ class SignatureHandler:
                 Existing signatures as returned by Pyxis based on specified criteria. The returned
                 sturcture is an iterator to reduce memory requirements.
         """
-        chunk_size = self.MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST
-
-        for chunk_start in range(0, len(manifest_digests), chunk_size):
-            chunk = manifest_digests[chunk_start : chunk_start + chunk_size]  # noqa: E203
-
-            args = [
-                "--pyxis-server",
-                self.target_settings["pyxis_server"],
-                "--pyxis-krb-principal",
-                self.target_settings["iib_krb_principal"],
-            ]
-            if "iib_krb_ktfile" in self.target_settings:
-                args += ["--pyxis-krb-ktfile", self.target_settings["iib_krb_ktfile"]]
-            if manifest_digests:
-                args += ["--manifest-digest", ",".join(chunk)]
-
-            env_vars = {}
-            chunk_results = run_entrypoint(
-                ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-signatures"),
-                "pubtools-pyxis-get-signatures",
-                args,
-                env_vars,
-            )
-            for result in chunk_results:
-                yield result
+        signatures = self.pyxis_client.iter_container_signatures(
+            manifest_digests or [],
+            chunk_size=self.MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST,
+            threads=self.target_settings.get("pyxis_max_concurrent_requests", DEFAULT_MAX_THREADS),
+        )
+        for signature in signatures:
+            yield signature
 
     def remove_duplicate_claim_messages(self, claim_messages):
         """
@@ -223,9 +303,11 @@ class SignatureHandler:
         # dictionary key is a tuple of all parameters whose combination makes the message unique
         unique_message_mapping = {}
         for message in claim_messages:
+            # claims of constructed messages are given by their digest and reference
+            claim_file = None if isinstance(message, ClaimMessage) else message["claim_file"]
             key = (
                 message["sig_key_id"],
-                message["claim_file"],
+                claim_file,
                 message["pub_task_id"],
                 message["manifest_digest"],
                 message["repo"],
@@ -241,6 +323,10 @@ class SignatureHandler:
         """
         Filter out the manifest claim messages which are already in the sigstore.
 
+        If 'sigstore_optimistic_upload' target setting is enabled, Pyxis isn't queried and only
+        the messages found in the local signature index are filtered out. Signatures which
+        already exist in Pyxis are then skipped during the upload.
+
         Args:
             claim_messages ([dict]):
                 Messages to be sent to RADAS.
@@ -248,22 +334,49 @@ class SignatureHandler:
         Returns ([dict]):
             Messages which don't yet exist in Pyxis.
         """
-        LOG.info("Removing claim messages which already exist in Pyxis")
-        digests = [message["manifest_digest"] for message in claim_messages]
-        digests = sorted(list(set(digests)))
+        optimistic = self.target_settings.get("sigstore_optimistic_upload", False)
+        if optimistic:
+            LOG.info("Removing claim messages which are known to exist (Pyxis is not checked)")
+        else:
+            LOG.info("Removing claim messages which already exist in Pyxis")
 
-        existing_signatures = self.get_signatures_from_pyxis(manifest_digests=digests)
+        def get_key(message):
+            # combination of image reference, digest, and signature key makes a signature unique
+            return (message["docker_reference"], message["manifest_digest"], message["sig_key_id"])
+
+        # signatures recently uploaded or found in Pyxis don't have to be searched for again
+        indexed_signatures = set()
+        if self.signature_index:
+            indexed_signatures = self.signature_index.get_verified(
+                [message["manifest_digest"] for message in claim_messages]
+            )
+            LOG.info("{0} signatures were found in the local index".format(len(indexed_signatures)))
+
+        # in optimistic mode, existing signatures are detected during the upload instead
+        digests = [
+            message["manifest_digest"]
+            for message in claim_messages
+            if get_key(message) not in indexed_signatures and not optimistic
+        ]
+        digests = sorted(list(set(digests)))
 
         signatures_by_key = {}
-        for signature in existing_signatures:
-            # combination of image reference, digest, and signature key makes a signature unique
-            key = (signature["reference"], signature["manifest_digest"], signature["sig_key_id"])
-            signatures_by_key[key] = signature
+        if digests:
+            existing_signatures = self.get_signatures_from_pyxis(manifest_digests=digests)
+            for signature in existing_signatures:
+                key = (
+                    signature["reference"],
+                    signature["manifest_digest"],
+                    signature["sig_key_id"],
+                )
+                signatures_by_key[key] = signature
+            if self.signature_index:
+                self.signature_index.reconcile(digests, signatures_by_key.keys())
 
         filtered_claim_messages = []
         for message in claim_messages:
-            key = (message["docker_reference"], message["manifest_digest"], message["sig_key_id"])
-            if key not in signatures_by_key:
+            key = get_key(message)
+            if key not in signatures_by_key and key not in indexed_signatures:
                 filtered_claim_messages.append(message)
 
         LOG.info(
@@ -273,54 +386,220 @@ class SignatureHandler:
         )
         return filtered_claim_messages
 
-    def get_signatures_from_radas(self, claim_messages):
+    def reconcile_signature_index(self):
+        """
+        Verify all signatures in the local signature index against Pyxis.
+
+        Signatures which were deleted from Pyxis are removed from the index, and the verification
+        time of the remaining ones is refreshed.
+
+        Returns (int):
+            Number of signatures removed from the index.
+        """
+        if not self.signature_index:
+            LOG.info("Signature index is not enabled, skipping reconciliation")
+            return 0
+
+        digests = self.signature_index.get_manifest_digests()
+        LOG.info("Reconciling signature index of {0} manifests with Pyxis".format(len(digests)))
+        existing_signatures = set(
+            (signature["reference"], signature["manifest_digest"], signature["sig_key_id"])
+            for signature in self.get_signatures_from_pyxis(manifest_digests=digests)
+        )
+        return self.signature_index.reconcile(digests, existing_signatures)
+
+    def get_signatures_from_radas(self, claim_messages, response_callback=None):
         """
         Send signature claims to RADAS via UMB and receive signed claims.
 
-        The messaging logic is handled by the ManifestClaimsHandler class.
+        If the signature spool is enabled by 'quay_signature_spool_dir' target setting, claims
+        which were already signed by a previous run of the task aren't sent to RADAS. Their
+        spooled responses are returned instead.
 
         Args:
-            claim_messages ([dict]):
+            claim_messages (iterable):
+                Signature claims to be sent to RADAS. If a response callback is specified, they
+                may be a generator, which is consumed as the claims are sent.
+            response_callback (callable):
+                Function called with every response from RADAS as soon as it arrives. Optional.
+        Returns ([dict]):
+            Response messages from RADAS. If a response callback is specified, responses are
+            only passed to it, and an empty list is returned.
+        raises MessageHandlerTimeoutException:
+            If a message from RADAS hasn't arrived in time.
+        """
+        spooled_messages = []
+        if self.signature_spool:
+            spooled_count = [0]
+
+            def get_unsigned_messages(claim_messages):
+                for claim_message in claim_messages:
+                    spooled_message = self.signature_spool.get(claim_message)
+                    if spooled_message is None:
+                        yield claim_message
+                        continue
+                    spooled_count[0] += 1
+                    if response_callback:
+                        response_callback(spooled_message)
+                    else:
+                        spooled_messages.append(spooled_message)
+
+            claim_messages = get_unsigned_messages(claim_messages)
+            if not response_callback:
+                claim_messages = list(claim_messages)
+                if not claim_messages:
+                    LOG.info("Reused {0} spooled signatures".format(spooled_count[0]))
+                    return spooled_messages
+            signature_messages = self._get_signatures_from_umb(claim_messages, response_callback)
+            if spooled_count[0]:
+                LOG.info("Reused {0} spooled signatures".format(spooled_count[0]))
+            return spooled_messages + signature_messages
+
+        return self._get_signatures_from_umb(claim_messages, response_callback)
+
+    def _get_signatures_from_umb(self, claim_messages, response_callback=None):
+        """
+        Send signature claims to RADAS via UMB and receive signed claims.
+
+        The messaging logic is handled by the ManifestClaimsHandler class. If docker setting
+        'umb_signing_shards' is greater than 1, the claims are split to that many shards, each
+        handled by its own UMB connection and receiver running in a separate thread. All the
+        receivers consume the same queue, so the broker delivers every response only once, to
+        any of the shards, and a ResponseRouter passes it to the shard which sent the request.
+        The throttle is split between the shards. Claims are still sent one batch at a time via
+        pub-hub, so sharding only spreads the receiving and processing of responses. If the
+        signing session is enabled, the claims are signed in the session instead, without
+        sharding.
+
+        Args:
+            claim_messages (iterable):
                 Signature claims to be sent to RADAS.
+            response_callback (callable):
+                Function called with every response from RADAS as soon as it arrives. Optional.
         Returns ([dict]):
-            Response messages from RADAS.
+            Response messages from RADAS, or an empty list if the response callback is specified.
         raises MessageHandlerTimeoutException:
             If a message from RADAS hasn't arrived in time.
         """
         LOG.info("Sending claim messages to RADAS and waiting for results")
+        if self.signing_session:
+            return self.signing_session.sign(claim_messages, response_callback)
+
         # messages will be sent by pub-hub via XMLRPC
         # callback will be utilized by ManifestClaimsHandler, which will decide when to send msgs
-        message_sender_callback = (
-            lambda messages: self.hub.worker.umb_send_manifest_claim_messages(  # noqa: E731
-                self.target_name, self.task_id, messages
+        message_sender_callback = self._send_claim_messages
+
+        shards = self.target_settings["docker_settings"].get("umb_signing_shards", 1)
+        if shards > 1:
+            claim_messages = list(claim_messages)
+            shards = min(shards, len(claim_messages))
+        if shards <= 1:
+            claims_handler = self._create_claims_handler(
+                claim_messages, message_sender_callback, response_callback=response_callback
             )
-        )
+            container = proton.reactor.Container(claims_handler)
+            container.run()
+
+            return claims_handler.received_messages
+
+        LOG.info("Splitting claim messages to {0} shards".format(shards))
+        response_router = ResponseRouter()
+        # hub proxy may not be used from multiple threads at once
+        sender_lock = threading.Lock()
+
+        def locked_message_sender_callback(messages):
+            with sender_lock:
+                message_sender_callback(messages)
+
+        claims_handlers = [
+            self._create_claims_handler(
+                claim_messages[shard::shards],
+                locked_message_sender_callback,
+                shards,
+                response_callback=response_callback,
+                response_router=response_router,
+            )
+            for shard in range(shards)
+        ]
+
+        def run_shard(claims_handler):
+            proton.reactor.Container(claims_handler).run()
+
+        # errors are re-raised once all the shards finish
+        run_in_parallel(run_shard, claims_handlers, threads=shards)
+
+        received_messages = []
+        for claims_handler in claims_handlers:
+            received_messages += claims_handler.received_messages
+        return received_messages
+
+    def _send_claim_messages(self, messages):
+        """Send claim messages to RADAS via pub-hub."""
+        self.hub.worker.umb_send_manifest_claim_messages(self.target_name, self.task_id, messages)
+
+    def _create_claims_handler(
+        self,
+        claim_messages,
+        message_sender_callback,
+        shards=1,
+        keep_open=False,
+        response_callback=None,
+        response_router=None,
+    ):
+        """
+        Create a handler of communication with RADAS configured by docker settings.
 
+        Args:
+            claim_messages ([dict]):
+                Signature claims to be sent to RADAS.
+            message_sender_callback (callable):
+                Function sending claim messages to RADAS.
+            shards (int):
+                Number of shards. The throttle is split evenly between them.
+            keep_open (bool):
+                Whether the handler keeps the connection open for more claims. Responses aren't
+                collected by such a handler, they're only passed to the response callback.
+            response_callback (callable):
+                Function called with every response from RADAS. Responses aren't collected by
+                the handler if it's specified.
+            response_router (ResponseRouter):
+                Router of responses shared by the handlers of all shards.
+        Returns (ManifestClaimsHandler):
+            Claims handler.
+        """
         address = (
             "queue://Consumer.msg-producer-pub"
             ".{task_id}.VirtualTopic.eng.robosignatory.container.sign".format(task_id=self.task_id)
         )
-
         docker_settings = self.target_settings["docker_settings"]
-        claims_handler = ManifestClaimsHandler(
+        address = docker_settings.get("umb_radas_address", address)
+
+        def split(value):
+            return None if value is None else max(1, -(-value // shards))
+
+        return ManifestClaimsHandler(
             umb_urls=docker_settings["umb_urls"],
-            radas_address=docker_settings.get("umb_radas_address", address),
+            radas_address=address,
             claim_messages=claim_messages,
             pub_cert=docker_settings.get("umb_pub_cert", "/etc/pub/umb-pub-cert-key.pem"),
             ca_cert=docker_settings.get("umb_ca_cert", "/etc/pki/tls/certs/ca-bundle.crt"),
             timeout=docker_settings.get("umb_signing_timeout", 600),
-            throttle=docker_settings.get("umb_signing_throttle", 100),
+            throttle=split(docker_settings.get("umb_signing_throttle", 100)),
             retry=docker_settings.get("umb_signing_retry", 3),
             message_sender_callback=message_sender_callback,
+            min_throttle=split(docker_settings.get("umb_signing_throttle_min")),
+            max_throttle=split(docker_settings.get("umb_signing_throttle_max")),
+            target_latency=docker_settings.get("umb_signing_target_latency"),
+            keep_open=keep_open,
+            response_callback=response_callback,
+            signature_spool=self.signature_spool,
+            keep_responses=not keep_open and response_callback is None,
+            response_router=response_router,
         )
-        container = proton.reactor.Container(claims_handler)
-        container.run()
-
-        return claims_handler.received_messages
 
     def upload_signatures_to_pyxis(self, claim_mesages, signature_messages, max_items_per_batch):
         """
-        Upload signatures to Pyxis by using a pubtools-pyxis entrypoint.
+        Upload signatures to Pyxis.
 
         Data required for a Pyxis POST request:
         - manifest_digest
@@ -329,7 +608,9 @@ class SignatureHandler:
         - sig_key_id
         - signature_data
 
-        Signatures are uploaded in batches.
+        Signatures are uploaded in batches. Uploaded signatures are recorded in the local
+        signature index, if it's enabled. If 'sigstore_optimistic_upload' target setting is
+        enabled, signatures which already exist in Pyxis are not considered an error.
 
         Args:
             claim_messages ([dict]):
@@ -342,48 +623,167 @@ class SignatureHandler:
         LOG.info("Sending new signatures to Pyxis")
         signature_batches = [[]]
         claim_messages_by_id = dict((m["request_id"], m) for m in claim_mesages)
-        sorted_signature_messages = sorted(signature_messages, key=lambda msg: msg["request_id"])
 
-        for signature_message in sorted_signature_messages:
+        for signature_message in signature_messages:
             claim_message = claim_messages_by_id[signature_message["request_id"]]
 
             if len(signature_batches[-1]) >= max_items_per_batch:
                 signature_batches.append([])
             batch = signature_batches[-1]
 
-            batch.append(
-                {
-                    "manifest_digest": signature_message["manifest_digest"],
-                    "reference": claim_message["docker_reference"],
-                    "repository": claim_message["image_name"],
-                    "sig_key_id": claim_message["sig_key_id"],
-                    "signature_data": signature_message["signed_claim"],
-                }
-            )
+            batch.append(self._get_pyxis_signature(claim_message, signature_message))
         for i, batch in enumerate(signature_batches):
-            args = [
-                "--pyxis-server",
-                self.target_settings["pyxis_server"],
-                "--pyxis-krb-principal",
-                self.target_settings["iib_krb_principal"],
-            ]
-            if "iib_krb_ktfile" in self.target_settings:
-                args += ["--pyxis-krb-ktfile", self.target_settings["iib_krb_ktfile"]]
-            args += ["--signatures", json.dumps(batch)]
-
             LOG.info("Uploading signature batch #{0}/{1}".format(i + 1, len(signature_batches)))
+            self._upload_signature_batch(batch)
+
+    def _get_pyxis_signature(self, claim_message, signature_message):
+        """
+        Construct a signature to be uploaded to Pyxis.
+
+        Args:
+            claim_message (dict):
+                Signature claim message sent to RADAS.
+            signature_message (dict):
+                Message from RADAS containing the image signature.
+        Returns (dict):
+            Signature data for Pyxis.
+        """
+        return {
+            "manifest_digest": signature_message["manifest_digest"],
+            "reference": claim_message["docker_reference"],
+            "repository": claim_message["image_name"],
+            "sig_key_id": claim_message["sig_key_id"],
+            "signature_data": signature_message["signed_claim"],
+        }
+
+    def _upload_signature_batch(self, batch):
+        """
+        Upload a batch of signatures to Pyxis and record them in the signature index.
+
+        Args:
+            batch ([dict]):
+                Signatures to upload.
+        """
+        self.pyxis_client.upload_signatures(
+            batch,
+            ignore_conflicts=self.target_settings.get("sigstore_optimistic_upload", False),
+        )
+        if self.signature_index:
+            self.signature_index.add(
+                [(s["reference"], s["manifest_digest"], s["sig_key_id"]) for s in batch]
+            )
 
-            env_vars = {}
-            run_entrypoint(
-                ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-upload-signatures"),
-                "pubtools-pyxis-upload-signature",
-                args,
-                env_vars,
+    def sign_and_upload_claim_messages(self, claim_messages):
+        """
+        Get signatures of claim messages from RADAS, validate them and upload them to Pyxis.
+
+        If 'sigstore_streaming_upload' target setting is enabled, signatures are uploaded in the
+        background as soon as a full batch of them arrives from RADAS, while signing continues.
+        Signatures received before a signing failure may then already be uploaded. Claim
+        messages are pulled from the iterable only when they're sent, and neither the responses
+        nor the signed claims are kept, so the memory used doesn't depend on the number of
+        claims. Otherwise all the responses are collected before they're uploaded. Claims which
+        failed to be signed are sent to RADAS again if 'umb_signing_error_retries' docker setting
+        allows it. The signature spool is removed once all the signatures are uploaded.
+
+        Args:
+            claim_messages (iterable):
+                Signature claims to be sent to RADAS. May be a generator.
+        """
+        max_items_per_batch = self.target_settings.get(
+            "sigstore_max_upload_items", self.DEFAULT_MAX_ITEMS_PER_UPLOAD_BATCH
+        )
+        if not self.target_settings.get("sigstore_streaming_upload", False):
+            claim_messages = list(claim_messages)
+            signature_messages = self.get_signatures_from_radas(claim_messages)
+            signature_messages = self.retry_failed_claim_messages(
+                claim_messages, signature_messages
+            )
+            self.validate_radas_messages(claim_messages, signature_messages)
+            self.upload_signatures_to_pyxis(claim_messages, signature_messages, max_items_per_batch)
+            self._remove_signature_spool()
+            return
+
+        LOG.info("Signatures will be uploaded to Pyxis as they arrive")
+        uploader = SignatureUploader(self._upload_signature_batch, max_items_per_batch)
+        reconciliation = StreamingReconciliation()
+
+        def on_response(signature_message):
+            claim_message = reconciliation.add_response(signature_message)
+            # failed signatures are reported by the validation
+            if claim_message is not None:
+                uploader.add(self._get_pyxis_signature(claim_message, signature_message))
+
+        try:
+            self.get_signatures_from_radas(reconciliation.track(claim_messages), on_response)
+            retries = self.target_settings["docker_settings"].get("umb_signing_error_retries", 0)
+            for attempt in range(1, retries + 1):
+                failed_messages = reconciliation.get_failed_claim_messages()
+                if not failed_messages:
+                    break
+                LOG.warning(
+                    "Signing of {0}/{1} claim messages has failed, retrying them [{2}/{3}]".format(
+                        len(failed_messages), reconciliation.count, attempt, retries
+                    )
+                )
+                self.get_signatures_from_radas(failed_messages, on_response)
+
+            failed_count = reconciliation.log_failures()
+            if failed_count:
+                raise SigningError(
+                    "Signing of {0}/{1} messages has failed".format(
+                        failed_count, reconciliation.count
+                    )
+                )
+        except Exception:
+            uploader.finish(flush=False)
+            raise
+        uploader.finish()
+        self._remove_signature_spool()
+
+    def _remove_signature_spool(self):
+        """Remove spooled signatures, which aren't needed by a re-run once they're uploaded."""
+        if self.signature_spool:
+            self.signature_spool.remove()
+
+    def retry_failed_claim_messages(self, claim_messages, signature_messages):
+        """
+        Send claim messages which failed to be signed to RADAS again.
+
+        Only the failed or unanswered claims are re-sent, at most 'umb_signing_error_retries'
+        times (docker setting, 0 by default). Responses of the retried claims replace their
+        previous responses.
+
+        Args:
+            claim_messages ([dict]):
+                Signature claims which were sent to RADAS.
+            signature_messages ([dict]):
+                Response messages from RADAS.
+        Returns ([dict]):
+            Latest response messages from RADAS of all the claims.
+        """
+        retries = self.target_settings["docker_settings"].get("umb_signing_error_retries", 0)
+        if not retries:
+            return signature_messages
+
+        reconciliation = SigningReconciliation(claim_messages)
+        reconciliation.add_responses(signature_messages)
+        for attempt in range(1, retries + 1):
+            failed_messages = reconciliation.get_failed_claim_messages()
+            if not failed_messages:
+                break
+            LOG.warning(
+                "Signing of {0}/{1} claim messages has failed, retrying them [{2}/{3}]".format(
+                    len(failed_messages), len(reconciliation.claim_messages), attempt, retries
+                )
             )
+            reconciliation.add_responses(self.get_signatures_from_radas(failed_messages))
+
+        return reconciliation.get_signature_messages()
 
     def validate_radas_messages(self, claim_messages, signature_messages):
         """
-        Check if messages received from RADAS contain any errors.
+        Check if messages received from RADAS contain any errors, or if any are missing.
 
         Args:
             claim_messages ([dict]):
@@ -393,18 +793,11 @@ class SignatureHandler:
 
         Raises:
             SigningError:
-                If RADAS messages contain errors.
-        """
-        failed_messages = 0
-        for message in signature_messages:
-            if message["errors"]:
-                failed = [m for m in claim_messages if m["request_id"] == message["request_id"]][0]
-                LOG.error(
-                    "Signing of claim message {0} failed with following errors: {1}".format(
-                        failed, message["errors"]
-                    )
-                )
-                failed_messages += 1
+                If RADAS messages contain errors, or a claim message wasn't answered.
+        """
+        reconciliation = SigningReconciliation(claim_messages)
+        reconciliation.add_responses(signature_messages)
+        failed_messages = reconciliation.log_failures()
 
         if failed_messages:
             raise SigningError(
@@ -417,6 +810,8 @@ class SignatureHandler:
 class ContainerSignatureHandler(SignatureHandler):
     """Class for handling the signing of container images."""
 
+    SPOOL_NAME = "container-signatures"
+
     def construct_item_claim_messages(self, push_item):
         """
         Construct all the signature claim messages for RADAS for one push item.
@@ -427,7 +822,7 @@ class ContainerSignatureHandler(SignatureHandler):
             Claim messages for a given push item.
         """
         LOG.info("Constructing claim messages for push item '{0}'".format(push_item))
-        claim_messages = []
+        claims = []
 
         if push_item.claims_signing_key:
             digests = self.get_tagged_image_digests(push_item.metadata["pull_url"])
@@ -436,17 +831,15 @@ class ContainerSignatureHandler(SignatureHandler):
                 # each destination image reference needs its own signature
                 for repo, tags in sorted(push_item.metadata["tags"].items()):
                     for tag in tags:
-                        claim_messages += self.construct_variant_claim_messages(
+                        claims += self._get_variant_claims(
                             repo, tag, digest, [push_item.claims_signing_key]
                         )
 
-        return claim_messages
+        return self.create_manifest_claim_messages(claims, self.task_id)
 
-    def construct_variant_claim_messages(self, repo, tag, digest, signing_keys):
+    def _get_variant_claims(self, repo, tag, digest, signing_keys):
         """
-        Construct claim messages for all specified variations of a given image.
-
-        The variations are customer visible destination registry and signing key.
+        Get claims for all specified variations of a given image.
 
         Args:
             repo (str):
@@ -458,10 +851,10 @@ class ContainerSignatureHandler(SignatureHandler):
             signing_keys ([str]):
                 Signing keys to construct the signatures with.
 
-        Returns ([dict]):
-            Signature claim messages to send to RADAS.
+        Returns ([(str, str, str, str, str)]):
+            Claims as accepted by create_manifest_claim_messages.
         """
-        claim_messages = []
+        claims = []
         image_schema = "{host}/{repository}:{tag}"
         internal_repo_schema = self.target_settings["quay_namespace"] + "/{internal_repo}"
         internal_repo = get_internal_container_repo_name(repo)
@@ -471,17 +864,32 @@ class ContainerSignatureHandler(SignatureHandler):
             reference = image_schema.format(host=registry, repository=repo, tag=tag)
 
             for signing_key in signing_keys:
-                claim_message = self.create_manifest_claim_message(
-                    destination_repo=dest_repo,
-                    signature_key=signing_key,
-                    manifest_digest=digest,
-                    docker_reference=reference,
-                    image_name=repo,
-                    task_id=self.task_id,
-                )
-                claim_messages.append(claim_message)
+                claims.append((dest_repo, signing_key, digest, reference, repo))
+
+        return claims
+
+    def construct_variant_claim_messages(self, repo, tag, digest, signing_keys):
+        """
+        Construct claim messages for all specified variations of a given image.
 
-        return claim_messages
+        The variations are customer visible destination registry and signing key.
+
+        Args:
+            repo (str):
+                Destination external repository  of a pushed image.
+            tag: (str):
+                Destination tag of a pushed image
+            digest (str):
+                Digest of the pushed image.
+            signing_keys ([str]):
+                Signing keys to construct the signatures with.
+
+        Returns ([dict]):
+            Signature claim messages to send to RADAS.
+        """
+        return self.create_manifest_claim_messages(
+            self._get_variant_claims(repo, tag, digest, signing_keys), self.task_id
+        )
 
     @log_step("Sign container images")
     def sign_container_images(self, push_items):
@@ -504,6 +912,20 @@ class ContainerSignatureHandler(SignatureHandler):
             LOG.info("Container signing not allowed in target settings, skipping.")
             return
 
+        if self._journal:
+            signed_items = [
+                i
+                for i in push_items
+                if self._journal.is_done("container_signatures", PushJournal.get_push_item_key(i))
+            ]
+            if signed_items:
+                LOG.info(
+                    "Signatures of {0} push items were already uploaded, skipping".format(
+                        len(signed_items)
+                    )
+                )
+                push_items = [i for i in push_items if i not in signed_items]
+
         claim_messages = []
         for item in push_items:
             claim_messages += self.construct_item_claim_messages(item)
@@ -511,23 +933,20 @@ class ContainerSignatureHandler(SignatureHandler):
         claim_messages = self.filter_claim_messages(claim_messages)
         if len(claim_messages) == 0:
             LOG.info("No new claim messages will be uploaded")
-            return
+        else:
+            LOG.info("{0} claim messages will be uploaded".format(len(claim_messages)))
+            self.sign_and_upload_claim_messages(claim_messages)
 
-        LOG.info("{0} claim messages will be uploaded".format(len(claim_messages)))
-        signature_messages = self.get_signatures_from_radas(claim_messages)
-        self.validate_radas_messages(claim_messages, signature_messages)
-        self.upload_signatures_to_pyxis(
-            claim_messages,
-            signature_messages,
-            self.target_settings.get(
-                "sigstore_max_upload_items", self.DEFAULT_MAX_ITEMS_PER_UPLOAD_BATCH
-            ),
-        )
+        if self._journal:
+            for item in push_items:
+                self._journal.record("container_signatures", PushJournal.get_push_item_key(item))
 
 
 class OperatorSignatureHandler(SignatureHandler):
     """Class for handling the signing of index images."""
 
+    SPOOL_NAME = "operator-signatures"
+
     def construct_index_image_claim_messages(self, index_image, tag, signing_keys):
         """
         Construct signature claim messages for RADAS for the specified index image.
@@ -543,33 +962,25 @@ class OperatorSignatureHandler(SignatureHandler):
             Structured messages to be sent to UMB.
         """
         LOG.info("Constructing claim messages for index image '{0}'".format(index_image))
-        claim_messages = []
+        claims = []
         image_schema = "{host}/{repository}:{tag}"
         internal_repo_schema = self.target_settings["quay_namespace"] + "/{internal_repo}"
+        repo = self.target_settings["quay_operator_repository"]
+        internal_repo = get_internal_container_repo_name(repo)
+        dest_repo = internal_repo_schema.format(internal_repo=internal_repo)
 
         # Get digests of all archs this index image was build for
         manifest_list = self.quay_client.get_manifest(index_image, manifest_list=True)
         digests = [m["digest"] for m in manifest_list["manifests"]]
         for registry in self.dest_registries:
+            reference = image_schema.format(host=registry, repository=repo, tag=tag)
             for signing_key in signing_keys:
                 if not signing_key:
                     continue
                 for digest in digests:
-                    repo = self.target_settings["quay_operator_repository"]
-                    internal_repo = get_internal_container_repo_name(repo)
-                    dest_repo = internal_repo_schema.format(internal_repo=internal_repo)
-                    reference = image_schema.format(host=registry, repository=repo, tag=tag)
-                    claim_message = self.create_manifest_claim_message(
-                        destination_repo=dest_repo,
-                        signature_key=signing_key,
-                        manifest_digest=digest,
-                        docker_reference=reference,
-                        image_name=self.target_settings["quay_operator_repository"],
-                        task_id=self.task_id,
-                    )
-                    claim_messages.append(claim_message)
+                    claims.append((dest_repo, signing_key, digest, reference, repo))
 
-        return claim_messages
+        return self.create_manifest_claim_messages(claims, self.task_id)
 
     @log_step("Sign operator images")
     def sign_operator_images(self, iib_results):
@@ -577,20 +988,32 @@ class OperatorSignatureHandler(SignatureHandler):
         Perform all the steps needed to sign the newly constructed index images.
 
         Sigstore is not checked for existing signatures, as there's no way any could exist for a
-        newly constructed image.
+        newly constructed image. Claim messages of the versions are constructed only as they're
+        sent to RADAS.
 
         Args:
             iib_results ({str:dict}):
                 IIB results for each version the push was performed for.
         """
-        image_schema = "{host}/{namespace}/{repo}@{digest}"
         if not self.target_settings["docker_settings"].get(
             "docker_container_signing_enabled", False
         ):
             LOG.info("Container signing not allowed in target settings, skipping.")
             return
 
-        claim_messages = []
+        self.sign_and_upload_claim_messages(self._get_operator_claim_messages(iib_results))
+
+    def _get_operator_claim_messages(self, iib_results):
+        """
+        Construct claim messages of index images, one version at a time.
+
+        Args:
+            iib_results ({str:dict}):
+                IIB results for each version the push was performed for.
+        Yields (dict):
+            Structured messages to be sent to UMB.
+        """
+        image_schema = "{host}/{namespace}/{repo}@{digest}"
         for version, iib_details in sorted(iib_results.items()):
             iib_result = iib_details["iib_result"]
             signing_keys = iib_details["signing_keys"]
@@ -604,20 +1027,10 @@ class OperatorSignatureHandler(SignatureHandler):
                 digest=image_digest,
             )
             # Version acts as a tag of the index image
-            claim_messages += self.construct_index_image_claim_messages(
+            for message in self.construct_index_image_claim_messages(
                 intermediate_index_image, version, signing_keys
-            )
-
-        signature_messages = self.get_signatures_from_radas(claim_messages)
-        self.validate_radas_messages(claim_messages, signature_messages)
-
-        self.upload_signatures_to_pyxis(
-            claim_messages,
-            signature_messages,
-            self.target_settings.get(
-                "sigstore_max_upload_items", self.DEFAULT_MAX_ITEMS_PER_UPLOAD_BATCH
-            ),
-        )
+            ):
+                yield message
 
     def sign_task_index_image(self, signing_keys, index_image, tag):
         """
@@ -635,27 +1048,18 @@ class OperatorSignatureHandler(SignatureHandler):
                 Tag of the result index image.
         """
         claim_messages = self.construct_index_image_claim_messages(index_image, tag, signing_keys)
-        signature_messages = self.get_signatures_from_radas(claim_messages)
-        self.validate_radas_messages(claim_messages, signature_messages)
-
-        self.upload_signatures_to_pyxis(
-            claim_messages,
-            signature_messages,
-            self.target_settings.get(
-                "sigstore_max_upload_items", self.DEFAULT_MAX_ITEMS_PER_UPLOAD_BATCH
-            ),
-        )
+        self.sign_and_upload_claim_messages(claim_messages)
 
 
 class BasicSignatureHandler(SignatureHandler):
     """Class that handles signing claims which were constructed by user."""
 
-    def __init__(self, hub, target_settings, target_name):
+    SPOOL_NAME = "basic-signatures"
+
+    def __init__(self, hub, target_settings, target_name, task_id):
         """
         Initialize.
 
-        NOTE: "task_id" is not needed for this workflow
-
         Args:
             hub (HubProxy):
                 Instance of XMLRPC pub-hub proxy.
@@ -663,16 +1067,20 @@ class BasicSignatureHandler(SignatureHandler):
                 Target settings.
             target_name (str):
                 Name of the target.
+            task_id (str):
+                ID of the pub task. Claims are constructed by the user, so it only names the
+                signature spool of the task and identifies the task to pub-hub.
         """
-        SignatureHandler.__init__(self, hub, "1", target_settings, target_name)
+        SignatureHandler.__init__(self, hub, task_id, target_settings, target_name)
 
     def sign_claim_messages(self, claim_messages, remove_duplicates=True, filter_existing=True):
         """
         Sign claim messages that were provided by the user and upload them to Pyxis.
 
         Args:
-            claim_messages ([dict]):
-                Claim messages to be signed and uploaded.
+            claim_messages (iterable):
+                Claim messages to be signed and uploaded. A generator is passed on lazily if
+                neither duplicates nor existing signatures are removed.
             remove_duplicates (bool):
                 Whether to check if there are any duplicates among the messages and remove them.
             filter_existing (bool):
@@ -689,17 +1097,9 @@ class BasicSignatureHandler(SignatureHandler):
             claim_messages = self.remove_duplicate_claim_messages(claim_messages)
         if filter_existing:
             claim_messages = self.filter_claim_messages(claim_messages)
-        if len(claim_messages) == 0:
-            LOG.info("No new claim messages will be uploaded")
-            return
-
-        LOG.info("{0} claim messages will be uploaded".format(len(claim_messages)))
-        signature_messages = self.get_signatures_from_radas(claim_messages)
-        self.validate_radas_messages(claim_messages, signature_messages)
-        self.upload_signatures_to_pyxis(
-            claim_messages,
-            signature_messages,
-            self.target_settings.get(
-                "sigstore_max_upload_items", self.DEFAULT_MAX_ITEMS_PER_UPLOAD_BATCH
-            ),
-        )
+        if isinstance(claim_messages, list):
+            if len(claim_messages) == 0:
+                LOG.info("No new claim messages will be uploaded")
+                return
+            LOG.info("{0} claim messages will be uploaded".format(len(claim_messages)))
+        self.sign_and_upload_claim_messages(claim_messages)
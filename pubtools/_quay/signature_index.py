@@ -0,0 +1,225 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+DEFAULT_RECONCILE_INTERVAL = 24 * 3600
+
+
+class SignatureIndex:
+    """
+    Local persistent index of signatures which are known to exist in Pyxis.
+
+    Signatures are identified by (reference, manifest digest, signing key) and are recorded
+    together with the time they were last verified, either by uploading them or by finding them
+    in Pyxis. Entries which weren't verified within the reconciliation interval are not trusted,
+    which makes them checked in Pyxis again and removed if they were deleted on the server.
+    """
+
+    # SQLite limits the number of parameters of a single query
+    MAX_QUERY_PARAMS = 500
+
+    def __init__(self, path, pyxis_server, reconcile_interval=DEFAULT_RECONCILE_INTERVAL):
+        """
+        Initialize.
+
+        Args:
+            path (str):
+                Path to the SQLite database file. It's created if it doesn't exist.
+            pyxis_server (str):
+                URL of the Pyxis service whose signatures are indexed.
+            reconcile_interval (int):
+                Number of seconds after which an entry has to be verified in Pyxis again.
+        """
+        self.path = path
+        self.pyxis_server = pyxis_server
+        self.reconcile_interval = reconcile_interval
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """
+        Open a connection to the database, creating the schema if needed.
+
+        Returns (sqlite3.Connection):
+            Database connection.
+        """
+        with self._lock:
+            if not self._initialized:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+            conn = sqlite3.connect(self.path, timeout=30)
+            if not self._initialized:
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS signatures ("
+                        "pyxis_server TEXT NOT NULL, reference TEXT NOT NULL, "
+                        "manifest_digest TEXT NOT NULL, sig_key_id TEXT NOT NULL, "
+                        "verified_at REAL NOT NULL, "
+                        "PRIMARY KEY (pyxis_server, manifest_digest, reference, sig_key_id))"
+                    )
+                self._initialized = True
+        return conn
+
+    def _chunks(self, values):
+        """Split values to chunks usable as query parameters."""
+        values = list(values)
+        for start in range(0, len(values), self.MAX_QUERY_PARAMS):
+            yield values[start : start + self.MAX_QUERY_PARAMS]  # noqa: E203
+
+    def get_verified(self, manifest_digests):
+        """
+        Get signatures of the specified manifests which were recently verified to exist.
+
+        Args:
+            manifest_digests ([str]):
+                Digests of the manifests.
+        Returns (set((str, str, str))):
+            Signatures as tuples (reference, manifest digest, signing key).
+        """
+        verified_after = time.time() - self.reconcile_interval
+        found = set()
+        conn = self._connect()
+        try:
+            for chunk in self._chunks(set(manifest_digests)):
+                rows = conn.execute(
+                    "SELECT reference, manifest_digest, sig_key_id FROM signatures "
+                    "WHERE pyxis_server = ? AND verified_at > ? "
+                    "AND manifest_digest IN ({0})".format(", ".join(["?"] * len(chunk))),
+                    [self.pyxis_server, verified_after] + chunk,
+                )
+                found.update(tuple(row) for row in rows)
+        finally:
+            conn.close()
+        return found
+
+    def add(self, signatures):
+        """
+        Record signatures which were verified to exist in Pyxis.
+
+        Args:
+            signatures ([(str, str, str)]):
+                Signatures as tuples (reference, manifest digest, signing key).
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO signatures "
+                    "(pyxis_server, reference, manifest_digest, sig_key_id, verified_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(self.pyxis_server,) + tuple(signature) + (now,) for signature in signatures],
+                )
+        finally:
+            conn.close()
+
+    def remove(self, signatures):
+        """
+        Remove entries of signatures which were deleted from Pyxis.
+
+        Args:
+            signatures ([(str, str, str)]):
+                Signatures as tuples (reference, manifest digest, signing key).
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "DELETE FROM signatures WHERE pyxis_server = ? AND reference = ? "
+                    "AND manifest_digest = ? AND sig_key_id = ?",
+                    [(self.pyxis_server,) + tuple(signature) for signature in signatures],
+                )
+        finally:
+            conn.close()
+
+    def reconcile(self, manifest_digests, existing_signatures):
+        """
+        Replace index entries of the specified manifests with signatures found in Pyxis.
+
+        Entries of signatures which no longer exist in Pyxis are removed.
+
+        Args:
+            manifest_digests ([str]):
+                Digests of the manifests which were searched for in Pyxis.
+            existing_signatures ([(str, str, str)]):
+                Signatures of the manifests which exist in Pyxis, as tuples (reference,
+                manifest digest, signing key).
+        Returns (int):
+            Number of removed entries.
+        """
+        existing_signatures = set(tuple(signature) for signature in existing_signatures)
+        removed = 0
+        conn = self._connect()
+        try:
+            with conn:
+                for chunk in self._chunks(set(manifest_digests)):
+                    rows = conn.execute(
+                        "SELECT reference, manifest_digest, sig_key_id FROM signatures "
+                        "WHERE pyxis_server = ? AND manifest_digest IN ({0})".format(
+                            ", ".join(["?"] * len(chunk))
+                        ),
+                        [self.pyxis_server] + chunk,
+                    ).fetchall()
+                    stale = [tuple(row) for row in rows if tuple(row) not in existing_signatures]
+                    conn.executemany(
+                        "DELETE FROM signatures WHERE pyxis_server = ? AND reference = ? "
+                        "AND manifest_digest = ? AND sig_key_id = ?",
+                        [(self.pyxis_server,) + signature for signature in stale],
+                    )
+                    removed += len(stale)
+        finally:
+            conn.close()
+
+        self.add(existing_signatures)
+        if removed:
+            LOG.info("Removed {0} signatures deleted from Pyxis from the index".format(removed))
+        return removed
+
+    def get_manifest_digests(self):
+        """
+        Get digests of all indexed manifests.
+
+        Returns ([str]):
+            Sorted manifest digests.
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT DISTINCT manifest_digest FROM signatures WHERE pyxis_server = ? "
+                "ORDER BY manifest_digest",
+                (self.pyxis_server,),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+
+def get_signature_index(target_settings):
+    """
+    Get a signature index configured by target settings.
+
+    Args:
+        target_settings (dict):
+            Target settings. The index is enabled by 'quay_signature_index_path', and
+            'quay_signature_index_reconcile_interval' optionally sets the reconciliation interval.
+            Entries are trusted for the whole interval, so signatures deleted from Pyxis by
+            other tools than remove-repo (which is given the index path) require the index to be
+            reconciled ('quay_signature_index_reconcile') before the same images are pushed
+            again.
+    Returns (SignatureIndex|None):
+        Signature index, or None if it's not enabled.
+    """
+    if not target_settings.get("quay_signature_index_path"):
+        return None
+    return SignatureIndex(
+        target_settings["quay_signature_index_path"],
+        target_settings["pyxis_server"],
+        target_settings.get("quay_signature_index_reconcile_interval", DEFAULT_RECONCILE_INTERVAL),
+    )
@@ -1,8 +1,7 @@
 import logging
-import json
-import tempfile
 
-from .utils.misc import get_internal_container_repo_name, run_entrypoint
+from .utils.misc import get_internal_container_repo_name, DEFAULT_MAX_THREADS
+from .pyxis_client import get_pyxis_client
 from .quay_api_client import QuayApiClient
 from .quay_client import QuayClient
 
@@ -15,6 +14,7 @@ class SignatureRemover:
     """Class used for finding the signatures that should be removed and removing them."""
 
     MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST = 50
+    MAX_CONCURRENT_SEARCH_REQUESTS = DEFAULT_MAX_THREADS
 
     def __init__(self, quay_api_token=None, quay_user=None, quay_password=None, quay_host=None):
         """
@@ -95,8 +95,9 @@ class SignatureRemover:
         Get existing signatures from Pyxis based on the specified criteria (currently only digests).
 
         NOTE: In the current implementation, only manifest digests are being used to search for
-        existing signatures. Also, the search is performed in chunks, their size being limited by
-        MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST.
+        existing signatures. Also, the search is performed in chunks, which are fetched in parallel
+        (limited by MAX_CONCURRENT_SEARCH_REQUESTS). The initial chunk size is
+        MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST, and it's adapted to Pyxis response times.
 
         NOTE: This method is copied from SignatureHandler, although it doesn't utilize
         'target_settings' in order to be more versatile.
@@ -115,37 +116,20 @@ class SignatureRemover:
                 Existing signatures as returned by Pyxis based on specified criteria. The returned
                 sturcture is an iterator to reduce memory requirements.
         """
-        chunk_size = self.MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST
-
-        for chunk_start in range(0, len(manifest_digests), chunk_size):
-            chunk = manifest_digests[chunk_start : chunk_start + chunk_size]  # noqa: E203
-
-            args = [
-                "--pyxis-server",
-                pyxis_server,
-                "--pyxis-krb-principal",
-                pyxis_krb_principal,
-            ]
-            if pyxis_krb_ktfile:
-                args += ["--pyxis-krb-ktfile", pyxis_krb_ktfile]
-            if manifest_digests:
-                args += ["--manifest-digest", ",".join(chunk)]
-
-            env_vars = {}
-            chunk_results = run_entrypoint(
-                ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-signatures"),
-                "pubtools-pyxis-get-signatures",
-                args,
-                env_vars,
-            )
-            for result in chunk_results:
-                yield result
+        pyxis_client = get_pyxis_client(pyxis_server, pyxis_krb_principal, pyxis_krb_ktfile)
+        signatures = pyxis_client.iter_container_signatures(
+            manifest_digests,
+            chunk_size=self.MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST,
+            threads=self.MAX_CONCURRENT_SEARCH_REQUESTS,
+        )
+        for signature in signatures:
+            yield signature
 
     def remove_signatures_from_pyxis(
         self, signatures_to_remove, pyxis_server, pyxis_krb_principal, pyxis_krb_ktfile=None
     ):
         """
-        Remove signatures from Pyxis by using a pubtools-pyxis entrypoint.
+        Remove signatures from Pyxis.
 
         Args:
             signatures_to_remove ([str]):
@@ -159,27 +143,8 @@ class SignatureRemover:
         """
         LOG.info("Removing outdated signatures from pyxis")
 
-        args = [
-            "--pyxis-server",
-            pyxis_server,
-            "--pyxis-krb-principal",
-            pyxis_krb_principal,
-        ]
-        if pyxis_krb_ktfile:
-            args += ["--pyxis-krb-ktfile", pyxis_krb_ktfile]
-        with tempfile.NamedTemporaryFile(mode="w") as temp:
-            json.dump(signatures_to_remove, temp)
-            temp.flush()
-
-            args += ["--ids", "@%s" % temp.name]
-
-            env_vars = {}
-            run_entrypoint(
-                ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-delete-signatures"),
-                "pubtools-pyxis-delete-signatures",
-                args,
-                env_vars,
-            )
+        pyxis_client = get_pyxis_client(pyxis_server, pyxis_krb_principal, pyxis_krb_ktfile)
+        pyxis_client.delete_container_signatures(signatures_to_remove)
 
     def get_repository_digests(self, repository):
         """
@@ -212,11 +177,20 @@ class SignatureRemover:
         return sorted(list(set(digests)))
 
     def remove_repository_signatures(
-        self, repository, namespace, pyxis_server, pyxis_krb_principal, pyxis_krb_ktfile=None
+        self,
+        repository,
+        namespace,
+        pyxis_server,
+        pyxis_krb_principal,
+        pyxis_krb_ktfile=None,
+        signature_index=None,
     ):
         """
         Remove all signatures of all images in a given Quay repository.
 
+        Removed signatures are also removed from the local signature index, if it's specified, so
+        that they're not considered to exist when the same images are pushed again.
+
         Args:
             repository (str):
                 External name for a repository whose signatures should be removed.
@@ -228,11 +202,14 @@ class SignatureRemover:
                 Kerberos principal to use for Pyxis authentication.
             pyxis_krb_ktfile (str|None):
                 Path to Kerberos keytab file. Optional
+            signature_index (SignatureIndex|None):
+                Local index of signatures existing in Pyxis. Optional.
         """
         LOG.info("Removing signatures of all images of repository '{0}'".format(repository))
 
         internal_repo = "{0}/{1}".format(namespace, get_internal_container_repo_name(repository))
         remove_signature_ids = []
+        removed_signatures = []
         digests = self.get_repository_digests(internal_repo)
 
         for signature in self.get_signatures_from_pyxis(
@@ -240,6 +217,9 @@ class SignatureRemover:
         ):
             if signature["repository"] == repository:
                 remove_signature_ids.append(signature["_id"])
+                removed_signatures.append(
+                    (signature["reference"], signature["manifest_digest"], signature["sig_key_id"])
+                )
 
         if len(remove_signature_ids) > 0:
             LOG.info("{0} signatures will be removed".format(len(remove_signature_ids)))
@@ -247,5 +227,7 @@ class SignatureRemover:
             self.remove_signatures_from_pyxis(
                 remove_signature_ids, pyxis_server, pyxis_krb_principal, pyxis_krb_ktfile
             )
+            if signature_index:
+                signature_index.remove(removed_signatures)
         else:
             LOG.info("No signatures need to be removed")
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+
+class SignatureSpool:
+    """
+    Spool of claims signed by RADAS, persisted in a SQLite database.
+
+    The spool is stored in a database file named after the task ID and the signature handler
+    using it, so that handlers signing concurrently in one task don't remove each other's spool.
+    Every successful response
+    from RADAS is committed as soon as it arrives, together with the identity of its claim
+    (signing key, manifest digest and docker reference). If the task dies before the signatures
+    are uploaded to Pyxis, a re-run of the task reuses the spooled signatures of identical claims
+    instead of sending them to RADAS again. The spool is removed once the signatures are
+    uploaded.
+
+    Responses are looked up in the database, so the memory used by the spool doesn't depend on
+    the number of spooled signatures.
+    """
+
+    def __init__(self, spool_dir, task_id, name="signatures"):
+        """
+        Initialize.
+
+        Args:
+            spool_dir (str):
+                Directory where spool files are stored.
+            task_id (str):
+                ID of the pub task. Re-runs of the same task share a spool.
+            name (str):
+                Name of the spool, unique among the spools of a task.
+        """
+        self.task_id = task_id
+        self.path = os.path.join(spool_dir, "{0}-{1}.db".format(name, task_id))
+        self._conn = None
+        self._lock = threading.Lock()
+
+        if not os.path.isdir(spool_dir):
+            os.makedirs(spool_dir)
+        if os.path.exists(self.path):
+            LOG.info("Found signatures of task {0} spooled in {1}".format(task_id, self.path))
+
+    @staticmethod
+    def _get_key(claim_message):
+        """Get identity of a claim, which determines its signature."""
+        return (
+            claim_message["sig_key_id"],
+            claim_message["manifest_digest"],
+            claim_message["docker_reference"],
+        )
+
+    def _connect(self, create):
+        """
+        Get the connection to the database. Must be called with the lock held.
+
+        The connection is shared by all threads using the spool, since responses are spooled
+        and looked up one by one.
+
+        Args:
+            create (bool):
+                Whether to create the database if it doesn't exist.
+        Returns (sqlite3.Connection|None):
+            Database connection, or None if the database doesn't exist and shouldn't be created.
+        """
+        if self._conn is None:
+            if not create and not os.path.exists(self.path):
+                return None
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            # every commit is synced to disk, so that spooled responses survive a crash
+            conn.execute("PRAGMA synchronous = FULL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS signatures ("
+                    "sig_key_id TEXT NOT NULL, manifest_digest TEXT NOT NULL, "
+                    "docker_reference TEXT NOT NULL, response TEXT NOT NULL, "
+                    "PRIMARY KEY (sig_key_id, manifest_digest, docker_reference))"
+                )
+            self._conn = conn
+        return self._conn
+
+    def add(self, claim_message, signature_message):
+        """
+        Store a response from RADAS in the spool. Failed responses are ignored.
+
+        Args:
+            claim_message (dict):
+                Claim message sent to RADAS.
+            signature_message (dict):
+                Response message from RADAS.
+        """
+        if signature_message["errors"]:
+            return
+
+        with self._lock:
+            conn = self._connect(create=True)
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO signatures "
+                    "(sig_key_id, manifest_digest, docker_reference, response) "
+                    "VALUES (?, ?, ?, ?)",
+                    self._get_key(claim_message) + (json.dumps(signature_message),),
+                )
+
+    def get(self, claim_message):
+        """
+        Get the spooled response to an identical claim.
+
+        Args:
+            claim_message (dict):
+                Claim message to be sent to RADAS.
+        Returns (dict|None):
+            Response message from RADAS with the request ID of the claim message, or None if no
+            identical claim was spooled.
+        """
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return None
+            row = conn.execute(
+                "SELECT response FROM signatures "
+                "WHERE sig_key_id = ? AND manifest_digest = ? AND docker_reference = ?",
+                self._get_key(claim_message),
+            ).fetchone()
+        if row is None:
+            return None
+        response = json.loads(row[0])
+        response["request_id"] = claim_message["request_id"]
+        return response
+
+    def remove(self):
+        """Remove the spool, once all spooled signatures were uploaded to Pyxis."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+                LOG.info("Removed signature spool {0}".format(self.path))
+
+
+def get_signature_spool(target_settings, task_id, name="signatures"):
+    """
+    Get a signature spool configured by target settings.
+
+    Args:
+        target_settings (dict):
+            Target settings. The spool is enabled by 'quay_signature_spool_dir'.
+        task_id (str):
+            ID of the pub task.
+        name (str):
+            Name of the spool, unique among the spools of a task.
+    Returns (SignatureSpool|None):
+        Signature spool, or None if it's not enabled.
+    """
+    if not target_settings.get("quay_signature_spool_dir"):
+        return None
+    return SignatureSpool(target_settings["quay_signature_spool_dir"], task_id, name)
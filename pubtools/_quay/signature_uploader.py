@@ -0,0 +1,108 @@
+import logging
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+
+class SignatureUploader(object):
+    """
+    Upload signatures in batches in a background thread while more signatures are being added.
+
+    Signatures are accumulated until a full batch is available, which is then handed over to
+    the worker thread. Batches are uploaded one at a time, in the order in which they were
+    filled. At most 'max_queued_batches' full batches wait for the upload, adding more
+    signatures blocks until the worker catches up. If an upload fails, no more batches are
+    uploaded and the error is re-raised by the next call of 'add' and by 'finish'.
+    """
+
+    DEFAULT_MAX_QUEUED_BATCHES = 2
+
+    def __init__(self, upload_batch, max_items_per_batch, max_queued_batches=None):
+        """
+        Initialize.
+
+        Args:
+            upload_batch (callable):
+                Function uploading a list of signatures.
+            max_items_per_batch (int):
+                Maximum number of signatures uploaded at once.
+            max_queued_batches (int):
+                Maximum number of full batches waiting for the upload.
+        """
+        self.upload_batch = upload_batch
+        self.max_items_per_batch = max_items_per_batch
+        self.uploaded_batches = 0
+        self._batch = []
+        self._error = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queued_batches or self.DEFAULT_MAX_QUEUED_BATCHES)
+        self._worker = threading.Thread(target=self._upload_batches)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def _upload_batches(self):
+        """Upload batches from the queue until None is received."""
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error:
+                continue
+            try:
+                LOG.info(
+                    "Uploading signature batch #{0} ({1} signatures)".format(
+                        self.uploaded_batches + 1, len(batch)
+                    )
+                )
+                self.upload_batch(batch)
+                self.uploaded_batches += 1
+            except Exception:
+                LOG.error("Upload of signatures has failed, no more batches will be uploaded")
+                self._error = sys.exc_info()
+
+    def add(self, signature):
+        """
+        Add a signature to be uploaded. This method may be called from multiple threads.
+
+        Blocks while the queue of batches waiting for the upload is full.
+
+        Args:
+            signature (dict):
+                Signature to upload.
+        Raises:
+            Exception: Error raised by the upload of a previous batch.
+        """
+        if self._error:
+            six.reraise(*self._error)
+        with self._lock:
+            self._batch.append(signature)
+            if len(self._batch) >= self.max_items_per_batch:
+                self._queue.put(self._batch)
+                self._batch = []
+
+    def finish(self, flush=True):
+        """
+        Wait for all batches to be uploaded.
+
+        Args:
+            flush (bool):
+                Whether to upload the last, incomplete batch. If False, errors of the uploads are
+                only logged, as the caller is expected to be handling another error.
+        Raises:
+            Exception: Error raised by the upload of any batch.
+        """
+        with self._lock:
+            if flush and self._batch:
+                self._queue.put(self._batch)
+            self._batch = []
+        self._queue.put(None)
+        self._worker.join()
+
+        if self._error and flush:
+            six.reraise(*self._error)
@@ -0,0 +1,189 @@
+import logging
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+
+class SigningReconciliation(object):
+    """
+    Match responses from RADAS to the claim messages which were sent to it.
+
+    Claim messages are indexed by their request IDs once, and every claim is classified by its
+    latest response as either signed ('ok'), failed ('error') or without any response
+    ('missing'). Responses of claims which were sent again replace the previous ones, so only
+    failed claims need to be re-sent after a signing round.
+    """
+
+    def __init__(self, claim_messages):
+        """
+        Initialize.
+
+        Args:
+            claim_messages ([dict]):
+                Claim messages sent to RADAS.
+        """
+        self.claim_messages = list(claim_messages)
+        self.claim_messages_by_id = dict((m["request_id"], m) for m in self.claim_messages)
+        # {request_id: latest response}
+        self.responses = {}
+
+    def add_responses(self, signature_messages):
+        """
+        Record responses from RADAS.
+
+        A successful response is never replaced by a later failed one. Responses to requests
+        which weren't sent are ignored.
+
+        Args:
+            signature_messages ([dict]):
+                Messages received from RADAS.
+        """
+        for message in signature_messages:
+            request_id = message["request_id"]
+            if request_id not in self.claim_messages_by_id:
+                LOG.warning("Ignoring response to unknown signing request {0}".format(request_id))
+                continue
+            previous = self.responses.get(request_id)
+            if previous is None or previous["errors"] or not message["errors"]:
+                self.responses[request_id] = message
+
+    def get_status(self, claim_message):
+        """
+        Get status of a claim message.
+
+        Args:
+            claim_message (dict):
+                Claim message sent to RADAS.
+        Returns (str):
+            'ok', 'error' or 'missing'.
+        """
+        response = self.responses.get(claim_message["request_id"])
+        if response is None:
+            return "missing"
+        return "error" if response["errors"] else "ok"
+
+    def get_failed_claim_messages(self):
+        """
+        Get claim messages which failed to be signed or weren't answered at all.
+
+        Returns ([dict]):
+            Claim messages in the order in which they were sent.
+        """
+        return [m for m in self.claim_messages if self.get_status(m) != "ok"]
+
+    def get_signature_messages(self):
+        """
+        Get the latest responses of all answered claim messages.
+
+        Returns ([dict]):
+            Messages from RADAS in the order of their claim messages.
+        """
+        return [
+            self.responses[m["request_id"]]
+            for m in self.claim_messages
+            if m["request_id"] in self.responses
+        ]
+
+    def log_failures(self):
+        """
+        Log all claim messages which failed to be signed.
+
+        Returns (int):
+            Number of failed claim messages.
+        """
+        failed_messages = self.get_failed_claim_messages()
+        for message in failed_messages:
+            response = self.responses.get(message["request_id"])
+            if response is None:
+                LOG.error("No response was received for claim message {0}".format(message))
+            else:
+                LOG.error(
+                    "Signing of claim message {0} failed with following errors: {1}".format(
+                        message, response["errors"]
+                    )
+                )
+        return len(failed_messages)
+
+
+class StreamingReconciliation(object):
+    """
+    Match responses from RADAS to claim messages pulled lazily from an iterable.
+
+    Unlike SigningReconciliation, responses aren't kept. Only the claims which weren't signed
+    yet are remembered, together with the errors of their latest responses, so the memory used
+    doesn't depend on the number of signed claims.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        # {request_id: (order in which the claim was pulled, claim message)}
+        self.unsigned = {}
+        # {request_id: errors of the latest failed response}
+        self.errors = {}
+        self.count = 0
+
+    def track(self, claim_messages):
+        """
+        Remember claim messages as they're pulled from an iterable.
+
+        Args:
+            claim_messages (iterable):
+                Claim messages sent to RADAS.
+        Yields (dict):
+            The same claim messages.
+        """
+        for message in claim_messages:
+            self.unsigned[message["request_id"]] = (self.count, message)
+            self.count += 1
+            yield message
+
+    def add_response(self, signature_message):
+        """
+        Record a response from RADAS.
+
+        Args:
+            signature_message (dict):
+                Message received from RADAS.
+        Returns (dict|None):
+            Claim message which was signed by the response, or None if the response failed or
+            its request isn't awaited.
+        """
+        request_id = signature_message["request_id"]
+        if request_id not in self.unsigned:
+            LOG.warning("Ignoring response to unknown signing request {0}".format(request_id))
+            return None
+        if signature_message["errors"]:
+            self.errors[request_id] = signature_message["errors"]
+            return None
+        self.errors.pop(request_id, None)
+        return self.unsigned.pop(request_id)[1]
+
+    def get_failed_claim_messages(self):
+        """
+        Get claim messages which failed to be signed or weren't answered at all.
+
+        Returns ([dict]):
+            Claim messages in the order in which they were pulled.
+        """
+        return [message for _, message in sorted(self.unsigned.values(), key=lambda x: x[0])]
+
+    def log_failures(self):
+        """
+        Log all claim messages which failed to be signed.
+
+        Returns (int):
+            Number of failed claim messages.
+        """
+        failed_messages = self.get_failed_claim_messages()
+        for message in failed_messages:
+            errors = self.errors.get(message["request_id"])
+            if errors is None:
+                LOG.error("No response was received for claim message {0}".format(message))
+            else:
+                LOG.error(
+                    "Signing of claim message {0} failed with following errors: {1}".format(
+                        message, errors
+                    )
+                )
+        return len(failed_messages)
@@ -0,0 +1,173 @@
+import logging
+import sys
+import threading
+
+import proton.reactor
+import six
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+
+class _Batch(object):
+    """Claim messages submitted by one call of SigningSession.sign."""
+
+    def __init__(self, request_ids, response_callback=None):
+        """
+        Initialize.
+
+        Args:
+            request_ids ([str]):
+                Request IDs of the claim messages of the batch.
+            response_callback (callable):
+                Function called with every response to the batch. Optional. If it's specified,
+                responses aren't collected.
+        """
+        self.pending = set(request_ids)
+        self.response_callback = response_callback
+        self.received = []
+        self.done = threading.Event()
+        self.error = None
+
+
+class SigningSession(object):
+    """
+    Long-lived connection to RADAS which signs successive batches of claim messages.
+
+    The UMB connection and receiver are opened on the first call of 'sign' and are kept open
+    until the session is closed. The proton event loop runs in a background thread, and batches
+    of claims are handed over to it via an event injector. Batches may be submitted from
+    multiple threads at the same time.
+    """
+
+    def __init__(self, create_claims_handler):
+        """
+        Initialize.
+
+        Args:
+            create_claims_handler (callable):
+                Function without arguments which creates a ManifestClaimsHandler without any
+                claim messages, which keeps its connection open.
+        """
+        self.create_claims_handler = create_claims_handler
+        self._claims_handler = None
+        self._injector = None
+        self._thread = None
+        self._error = None
+        # {request_id: _Batch}
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """Create the claims handler and start the event loop in a background thread."""
+        LOG.info("Opening signing session")
+        self._claims_handler = self.create_claims_handler()
+        self._claims_handler.response_callback = self._on_response
+        self._injector = proton.reactor.EventInjector()
+        container = proton.reactor.Container(self._claims_handler)
+        container.selectable(self._injector)
+
+        self._thread = threading.Thread(target=self._run, args=(container,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, container):
+        """Run the event loop, failing all unfinished batches if it fails."""
+        try:
+            container.run()
+        except Exception:
+            LOG.exception("Signing session has failed")
+            with self._lock:
+                self._error = sys.exc_info()
+                self._fail_batches()
+        else:
+            with self._lock:
+                self._fail_batches()
+
+    def _fail_batches(self):
+        """Finish all unfinished batches, so that their callers don't wait forever."""
+        for batch in set(self._batches.values()):
+            batch.error = self._error or (
+                RuntimeError,
+                RuntimeError("Signing session was closed"),
+                None,
+            )
+            batch.done.set()
+        self._batches = {}
+
+    def _on_response(self, radas_message):
+        """
+        Record a response from RADAS, finishing its batch if it was the last one.
+
+        If the response callback of the batch fails, the batch is finished with its error and
+        its remaining responses are ignored. Other batches of the session aren't affected.
+        """
+        with self._lock:
+            batch = self._batches.pop(radas_message["request_id"], None)
+            if batch is None:
+                return
+            if not batch.response_callback:
+                batch.received.append(radas_message)
+            batch.pending.discard(radas_message["request_id"])
+            done = not batch.pending
+
+        if batch.response_callback:
+            try:
+                batch.response_callback(radas_message)
+            except Exception:
+                LOG.exception("Handling of a signing response has failed")
+                with self._lock:
+                    for request_id in batch.pending:
+                        self._batches.pop(request_id, None)
+                batch.error = sys.exc_info()
+                done = True
+        if done:
+            batch.done.set()
+
+    def sign(self, claim_messages, response_callback=None):
+        """
+        Send claim messages to RADAS and wait for their signatures.
+
+        Args:
+            claim_messages ([dict]):
+                Signature claims to be sent to RADAS.
+            response_callback (callable):
+                Function called with every response from RADAS as soon as it arrives. Optional.
+        Returns ([dict]):
+            Response messages from RADAS, or an empty list if responses are passed to the
+            callback.
+        Raises:
+            MessageHandlerTimeoutException: If a message from RADAS hasn't arrived in time.
+        """
+        claim_messages = list(claim_messages)
+        if not claim_messages:
+            return []
+
+        batch = _Batch([message["request_id"] for message in claim_messages], response_callback)
+        with self._lock:
+            if self._error:
+                six.reraise(*self._error)
+            if self._thread is None:
+                self._start()
+            for request_id in batch.pending:
+                self._batches[request_id] = batch
+
+        LOG.info("Sending {0} claim messages in the signing session".format(len(claim_messages)))
+        self._injector.trigger(proton.reactor.ApplicationEvent("claims", subject=claim_messages))
+        batch.done.wait()
+        if batch.error:
+            six.reraise(*batch.error)
+        return batch.received
+
+    def close(self):
+        """Close the connection and wait for the event loop to finish."""
+        with self._lock:
+            if self._thread is None:
+                return
+            thread = self._thread
+            self._thread = None
+        self._injector.trigger(proton.reactor.ApplicationEvent("close_signing_session"))
+        self._injector.close()
+        thread.join()
+        LOG.info("Signing session was closed")
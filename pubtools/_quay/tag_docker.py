@@ -10,7 +10,12 @@ from .exceptions import (
     BadPushItem,
     InvalidTargetSettings,
 )
-from .utils.misc import get_internal_container_repo_name
+from .utils.misc import (
+    get_internal_container_repo_name,
+    get_target_info,
+    log_step,
+    DEFAULT_MAX_THREADS,
+)
 from .quay_api_client import QuayApiClient
 from .quay_client import QuayClient
 from .container_image_pusher import ContainerImagePusher
@@ -18,6 +23,7 @@ from .signature_handler import SignatureHandler, BasicSignatureHandler
 from .manifest_list_merger import ManifestListMerger
 from .untag_images import untag_images
 from .push_docker import PushDocker
+from .repository_state_snapshot import RepositoryStateSnapshot
 
 # TODO: do we want this, or should I remove it?
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
@@ -33,6 +39,11 @@ class TagDocker:
     """Handle full tag-docker workflow."""
 
     ImageDetails = namedtuple("ImageDetails", ["reference", "manifest", "manifest_type", "digest"])
+    # Planned modification of a tag. 'function' is called with 'args' to perform it, after
+    # 'claim_messages' have been signed.
+    TagOperation = namedtuple(
+        "TagOperation", ["push_item", "tag", "claim_messages", "function", "args"]
+    )
     MANIFEST_LIST_TYPE = "application/vnd.docker.distribution.manifest.list.v2+json"
     MANIFEST_V2S2_TYPE = "application/vnd.docker.distribution.manifest.v2+json"
 
@@ -62,6 +73,7 @@ class TagDocker:
         self._quay_client = None
         self._quay_api_client = None
         self._executor = None
+        self._repo_state = None
 
         self.quay_host = self.target_settings.get("quay_host", "quay.io").rstrip("/")
 
@@ -105,6 +117,18 @@ class TagDocker:
             )
         return self._executor
 
+    @property
+    def repo_state(self):
+        """Create and access RepositoryStateSnapshot."""
+        if self._repo_state is None:
+            self._repo_state = RepositoryStateSnapshot(
+                self.quay_client,
+                self.quay_api_client,
+                self.quay_host,
+                self.target_settings.get("quay_max_concurrent_requests", DEFAULT_MAX_THREADS),
+            )
+        return self._repo_state
+
     def verify_target_settings(self):
         """Verify that target settings contains all the necessary data."""
         LOG.info("Verifying the necessary target settings")
@@ -159,9 +183,7 @@ class TagDocker:
         """
         if "propagated_from" in self.target_settings:
             full_repo_schema = "{host}/{namespace}/{repo}"
-            stage_target_info = self.hub.worker.get_target_info(
-                self.target_settings["propagated_from"]
-            )
+            stage_target_info = get_target_info(self.hub, self.target_settings["propagated_from"])
             stage_namespace = stage_target_info["settings"]["quay_namespace"]
 
             for item in self.push_items:
@@ -213,7 +235,7 @@ class TagDocker:
         """
         LOG.info("Getting image details of {0}".format(reference))
         try:
-            manifest = self.quay_client.get_manifest(reference)
+            manifest = self.repo_state.get_manifest(reference)
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 404:
                 LOG.info("Image '{0}' doesn't exist".format(reference))
@@ -237,7 +259,7 @@ class TagDocker:
                 )
 
         repo, tag = reference.split(":", 1)
-        repo_data = self.quay_api_client.get_repository_data("/".join(repo.split("/")[1:]))
+        repo_data = self.repo_state.get_repository_data("/".join(repo.split("/")[1:]))
         digest = repo_data["tags"][tag]["manifest_digest"]
 
         return TagDocker.ImageDetails(reference, manifest, manifest["mediaType"], digest)
@@ -466,23 +488,19 @@ class TagDocker:
             ]
             return add_archs
 
-    def copy_tag_sign_images(self, push_item, tag, signature_handler):
+    def _get_image_references(self, push_item, tag):
         """
-        Copy image from source to the destination tag and sign new manifest claims.
-
-        If destination tag already contains a manifest, it will be overwritten.
-        This workflow is expected to use on single-arch source images.
+        Get references of the source image and destination tag of a push item.
 
         Args:
             push_item (ContainerPushItem):
-                Push item to perform the workflow with.
+                Push item to get the references of.
             tag (str):
-                Tag, which acts as a destination to the copy operation.
-            signature_handler (BasicSignatureHandler):
-                Instance of signature handler which will perform the signing.
+                Destination tag.
+        Returns ((str, str)):
+            Source image and destination image references.
         """
         full_repo_schema = "{host}/{namespace}/{repo}"
-        external_image_schema = "{host}/{repo}:{tag}"
         namespace = self.target_settings["quay_namespace"]
 
         internal_repo = get_internal_container_repo_name(list(push_item.repos.keys())[0])
@@ -491,96 +509,125 @@ class TagDocker:
         )
         source_image = "{0}:{1}".format(full_repo, push_item.metadata["tag_source"])
         dest_image = "{0}:{1}".format(full_repo, tag)
+        return (source_image, dest_image)
 
-        LOG.info(
-            "Source image tag '{0}' will be copied to destination '{1}'".format(
-                push_item.metadata["tag_source"], tag
+    def _create_claim_messages(self, push_item, tag, manifest_digests):
+        """
+        Create claim messages of manifests which will be referenced by a destination tag.
+
+        Args:
+            push_item (ContainerPushItem):
+                Push item whose signing key will be used.
+            tag (str):
+                Destination tag.
+            manifest_digests ([str]):
+                Digests of the manifests to sign.
+        Returns ([dict]):
+            Claim messages, one per manifest and docker reference registry.
+        """
+        if not push_item.claims_signing_key:
+            return []
+
+        external_image_schema = "{host}/{repo}:{tag}"
+        repo = list(push_item.repos.keys())[0]
+        dest_repo = self.get_item_repository(push_item)
+        registries = self.target_settings["docker_settings"]["docker_reference_registry"]
+
+        claims = [
+            (
+                dest_repo,
+                push_item.claims_signing_key,
+                manifest_digest,
+                external_image_schema.format(host=registry, repo=repo, tag=tag),
+                repo,
             )
-        )
+            for manifest_digest in manifest_digests
+            for registry in registries
+        ]
+        return SignatureHandler.create_manifest_claim_messages(claims, self.task_id)
+
+    def copy_tag_claim_messages(self, push_item, tag):
+        """
+        Create claim messages of an image which will be copied to the destination tag.
 
-        claim_messages = []
+        Args:
+            push_item (ContainerPushItem):
+                Push item to perform the workflow with.
+            tag (str):
+                Tag, which acts as a destination to the copy operation.
+        Returns ([dict]):
+            Claim messages which need to be signed before the image is copied.
+        """
+        source_image, _ = self._get_image_references(push_item, tag)
         details = self.get_image_details(source_image)
-        dest_repo = "{0}/{1}".format(self.target_settings["quay_namespace"], internal_repo)
-        registries = self.target_settings["docker_settings"]["docker_reference_registry"]
 
-        if details.manifest_type == TagDocker.MANIFEST_V2S2_TYPE and push_item.claims_signing_key:
-            for registry in registries:
-                reference = external_image_schema.format(
-                    host=registry, repo=list(push_item.repos.keys())[0], tag=tag
-                )
-                message = SignatureHandler.create_manifest_claim_message(
-                    destination_repo=dest_repo,
-                    signature_key=push_item.claims_signing_key,
-                    manifest_digest=details.digest,
-                    docker_reference=reference,
-                    image_name=list(push_item.repos.keys())[0],
-                    task_id=self.task_id,
-                )
-                claim_messages.append(message)
-        elif details.manifest_type == TagDocker.MANIFEST_LIST_TYPE:
+        if details.manifest_type == TagDocker.MANIFEST_LIST_TYPE:
             raise ValueError("Tagging workflow is not supported for multiarch images")
+        if details.manifest_type != TagDocker.MANIFEST_V2S2_TYPE:
+            return []
+        return self._create_claim_messages(push_item, tag, [details.digest])
 
-        signature_handler.sign_claim_messages(claim_messages, True, True)
-        ContainerImagePusher.run_tag_images(source_image, [dest_image], True, self.target_settings)
-
-    def merge_manifest_lists_sign_images(self, push_item, tag, add_archs, signature_handler):
+    def copy_tag_images(self, push_item, tag):
         """
-        Merge manifest lists between source and destination tag and sign manifest claims.
+        Copy image from source to the destination tag.
+
+        If destination tag already contains a manifest, it will be overwritten.
 
         Args:
             push_item (ContainerPushItem):
                 Push item to perform the workflow with.
             tag (str):
-                Tag, which acts as a destination to the merge operation.
-            add_archs ([str]):
-                Architectures which should be copied to the existing manifest list.
-            signature_handler (BasicSignatureHandler):
-                Instance of signature handler which will perform the signing.
+                Tag, which acts as a destination to the copy operation.
         """
+        source_image, dest_image = self._get_image_references(push_item, tag)
         LOG.info(
-            "Architectures {0} of tag '{1}' will be copied to destination tag '{2}'".format(
-                add_archs, push_item.metadata["tag_source"], tag
+            "Source image tag '{0}' will be copied to destination '{1}'".format(
+                push_item.metadata["tag_source"], tag
             )
         )
+        ContainerImagePusher.run_tag_images(source_image, [dest_image], True, self.target_settings)
 
-        full_repo_schema = "{host}/{namespace}/{repo}"
-        external_image_schema = "{host}/{repo}:{tag}"
-        namespace = self.target_settings["quay_namespace"]
+    def merge_manifest_lists_claim_messages(self, push_item, tag, add_archs):
+        """
+        Merge manifest lists between source and destination tag and create their claim messages.
 
-        internal_repo = get_internal_container_repo_name(list(push_item.repos.keys())[0])
-        full_repo = full_repo_schema.format(
-            host=self.quay_host, namespace=namespace, repo=internal_repo
-        )
-        source_image = "{0}:{1}".format(full_repo, push_item.metadata["tag_source"])
-        dest_image = "{0}:{1}".format(full_repo, tag)
+        The merged manifest list is not uploaded.
 
-        claim_messages = []
-        dest_repo = "{0}/{1}".format(self.target_settings["quay_namespace"], internal_repo)
-        registries = self.target_settings["docker_settings"]["docker_reference_registry"]
+        Args:
+            push_item (ContainerPushItem):
+                Push item to perform the workflow with.
+            tag (str):
+                Tag, which acts as a destination to the merge operation.
+            add_archs ([str]):
+                Architectures which should be copied to the existing manifest list.
+        Returns ((dict, [dict])):
+            Merged manifest list, and claim messages which need to be signed before it's uploaded.
+        """
+        source_image, dest_image = self._get_image_references(push_item, tag)
 
         # NOTE: Arch images don't need to be copied, since they already exist in the same repo
         merger = ManifestListMerger(source_image, dest_image)
         merger.set_quay_client(self.quay_client)
         new_manifest_list = merger.merge_manifest_lists_selected_architectures(add_archs)
 
-        if push_item.claims_signing_key:
-            for manifest in new_manifest_list["manifests"]:
-                for registry in registries:
-                    reference = external_image_schema.format(
-                        host=registry, repo=list(push_item.repos.keys())[0], tag=tag
-                    )
-                    message = SignatureHandler.create_manifest_claim_message(
-                        destination_repo=dest_repo,
-                        signature_key=push_item.claims_signing_key,
-                        manifest_digest=manifest["digest"],
-                        docker_reference=reference,
-                        image_name=list(push_item.repos.keys())[0],
-                        task_id=self.task_id,
-                    )
-                    claim_messages.append(message)
-
-        signature_handler.sign_claim_messages(claim_messages, True, True)
+        claim_messages = self._create_claim_messages(
+            push_item, tag, [manifest["digest"] for manifest in new_manifest_list["manifests"]]
+        )
+        return (new_manifest_list, claim_messages)
+
+    def upload_merged_manifest_list(self, push_item, tag, new_manifest_list):
+        """
+        Upload a merged manifest list to the destination tag.
 
+        Args:
+            push_item (ContainerPushItem):
+                Push item to perform the workflow with.
+            tag (str):
+                Tag, which acts as a destination to the merge operation.
+            new_manifest_list (dict):
+                Merged manifest list.
+        """
+        source_image, dest_image = self._get_image_references(push_item, tag)
         raw_src_manifest = self.quay_client.get_manifest(source_image, manifest_list=True, raw=True)
 
         # Special case: if the source manifest and the merged manifest are the same, upload the
@@ -683,6 +730,144 @@ class TagDocker:
 
         self._quay_client.upload_manifest(new_manifest_list, dest_image)
 
+    def get_item_repository(self, push_item):
+        """
+        Get the internal repository (including the namespace) modified by a push item.
+
+        Args:
+            push_item (ContainerPushItem):
+                Push item to get the repository of.
+        Returns (str):
+            Full repository path without the host.
+        """
+        internal_repo = get_internal_container_repo_name(list(push_item.repos.keys())[0])
+        return "{0}/{1}".format(self.target_settings["quay_namespace"], internal_repo)
+
+    def plan_add_tag(self, push_item, tag):
+        """
+        Plan the operation adding an image to a tag, without modifying the tag.
+
+        Args:
+            push_item (ContainerPushItem):
+                Push item to perform the workflow with.
+            tag (str):
+                Tag, for which an 'add' operation will be performed.
+        Returns (TagOperation|None):
+            Planned operation, or None if no operation is needed.
+        """
+        LOG.info("Processing add tag '{0}'".format(tag))
+        add_archs = self.tag_add_calculate_archs(push_item, tag)
+        # If all archs were somehow excluded from being added, no-op
+        if add_archs == []:
+            LOG.warning("No archs can be added to tag '{0}', skipping".format(tag))
+            return None
+        # If None, we're dealing with a source image and we want to copy to destination
+        elif add_archs is None:
+            claim_messages = self.copy_tag_claim_messages(push_item, tag)
+            return TagDocker.TagOperation(
+                push_item, tag, claim_messages, self.copy_tag_images, (push_item, tag)
+            )
+        # Otherwise, merge relevant archs of source and dest
+        else:
+            LOG.info(
+                "Architectures {0} of tag '{1}' will be copied to destination tag '{2}'".format(
+                    add_archs, push_item.metadata["tag_source"], tag
+                )
+            )
+            new_manifest_list, claim_messages = self.merge_manifest_lists_claim_messages(
+                push_item, tag, add_archs
+            )
+            return TagDocker.TagOperation(
+                push_item,
+                tag,
+                claim_messages,
+                self.upload_merged_manifest_list,
+                (push_item, tag, new_manifest_list),
+            )
+
+    def plan_remove_tag(self, push_item, tag):
+        """
+        Plan the operation removing an image from a tag, without modifying the tag.
+
+        Args:
+            push_item (ContainerPushItem):
+                Push item to perform the workflow with.
+            tag (str):
+                Tag, for which a 'remove' operation will be performed.
+        Returns (TagOperation|None):
+            Planned operation, or None if no operation is needed.
+        """
+        LOG.info("Processing remove tag '{0}'".format(tag))
+        remove_archs, keep_archs = self.tag_remove_calculate_archs(push_item, tag)
+        # If all archs were somehow excluded from removal, no-op
+        if not remove_archs:
+            LOG.warning("No archs can be removed from tag '{0}', skipping".format(tag))
+            return None
+        # If no archs will remain after removal, just perform untagging
+        elif not keep_archs:
+            return TagDocker.TagOperation(push_item, tag, [], self.untag_image, (push_item, tag))
+        # if some archs will be removed and some will remain, create new manifest list
+        else:
+            return TagDocker.TagOperation(
+                push_item, tag, [], self.manifest_list_remove_archs, (push_item, tag, remove_archs)
+            )
+
+    def operations_modify_tags(self, operations, push_item, tags):
+        """
+        Check if any of the planned operations modifies the given tags of a push item's repository.
+
+        Operations reading such tags can't be planned until the planned operations are performed.
+
+        Args:
+            operations ([TagOperation]):
+                Planned operations.
+            push_item (ContainerPushItem):
+                Push item whose repository contains the tags.
+            tags ([str|None]):
+                Tags to check.
+        Returns (bool):
+            Whether any of the tags is modified.
+        """
+        repository = self.get_item_repository(push_item)
+        modified = set(
+            (self.get_item_repository(operation.push_item), operation.tag)
+            for operation in operations
+        )
+        return any((repository, tag) in modified for tag in tags)
+
+    def run_tag_operations(self, operations, signature_handler):
+        """
+        Sign claim messages of all planned operations at once, and then perform the operations.
+
+        Args:
+            operations ([TagOperation]):
+                Planned operations, in the order in which they'll be performed.
+            signature_handler (BasicSignatureHandler):
+                Instance of signature handler which will perform the signing.
+        """
+        claim_messages = [
+            message for operation in operations for message in operation.claim_messages
+        ]
+        if claim_messages:
+            signature_handler.sign_claim_messages(claim_messages, True, True)
+
+        for operation in operations:
+            operation.function(*operation.args)
+            self.repo_state.invalidate(self.get_item_repository(operation.push_item))
+
+    @log_step("Prefetch repository state")
+    def prefetch_repo_state(self):
+        """Fetch in parallel the data of all repositories and tags which will be processed."""
+        repo_tags = {}
+        for item in self.push_items:
+            tags = repo_tags.setdefault(self.get_item_repository(item), set())
+            tags.update(item.metadata["add_tags"])
+            tags.update(item.metadata["remove_tags"])
+            if item.metadata["tag_source"]:
+                tags.add(item.metadata["tag_source"])
+
+        self.repo_state.prefetch(repo_tags)
+
     def run(self):
         """
         Perform the full tag-docker workflow.
@@ -698,9 +883,12 @@ class TagDocker:
 
         The workflow may be summarized as:
         - Verify that all repos may be worked with (same conditions are in PushDocker)
-        - Evaluate which archs are to be added/removed from a given tag
-        - If new images were created, perform signing workflow on them
-        - Perform the appropriate add/remove/merge operation
+        - Evaluate which archs are to be added/removed from every tag, planning the operations
+        - Sign all new images at once
+        - Perform the planned add/remove/merge operations
+
+        If an operation reads a tag which is modified by an already planned operation, the
+        planned operations are signed and performed first.
         """
         # Validate repos, same as in PushDocker
         PushDocker.check_repos_validity(
@@ -708,36 +896,39 @@ class TagDocker:
         )
         # perform tag-docker-specific checks
         self.check_input_validity()
-        signature_handler = BasicSignatureHandler(self.hub, self.target_settings, self.target_name)
+        self.prefetch_repo_state()
+        signature_handler = BasicSignatureHandler(
+            self.hub, self.target_settings, self.target_name, self.task_id
+        )
+        signature_handler.set_repo_state(self.repo_state)
 
-        for item in self.push_items:
-            for tag in item.metadata["add_tags"]:
-                LOG.info("Processing add tag '{0}'".format(tag))
-                add_archs = self.tag_add_calculate_archs(item, tag)
-                # If all archs were somehow excluded from being added, no-op
-                if add_archs == []:
-                    LOG.warning("No archs can be added to tag '{0}', skipping".format(tag))
-                    continue
-                # If None, we're dealing with a source image and we want to copy to destination
-                elif add_archs is None:
-                    self.copy_tag_sign_images(item, tag, signature_handler)
-                # Otherwise, merge relevant archs of source and dest
-                else:
-                    self.merge_manifest_lists_sign_images(item, tag, add_archs, signature_handler)
-
-            for tag in item.metadata["remove_tags"]:
-                LOG.info("Processing remove tag '{0}'".format(tag))
-                remove_archs, keep_archs = self.tag_remove_calculate_archs(item, tag)
-                # If all archs were somehow excluded from removal, no-op
-                if not remove_archs:
-                    LOG.warning("No archs can be removed from tag '{0}', skipping".format(tag))
-                    continue
-                # If no archs will remain after removal, just perform untagging
-                elif not keep_archs:
-                    self.untag_image(item, tag)
-                # if some archs will be removed and some will remain, create new manifest list
-                else:
-                    self.manifest_list_remove_archs(item, tag, remove_archs)
+        operations = []
+        try:
+            for item in self.push_items:
+                for tag in item.metadata["add_tags"]:
+                    if self.operations_modify_tags(
+                        operations, item, [item.metadata["tag_source"], tag]
+                    ):
+                        self.run_tag_operations(operations, signature_handler)
+                        operations = []
+                    operation = self.plan_add_tag(item, tag)
+                    if operation:
+                        operations.append(operation)
+
+                for tag in item.metadata["remove_tags"]:
+                    if self.operations_modify_tags(
+                        operations, item, [item.metadata["tag_source"], tag]
+                    ):
+                        self.run_tag_operations(operations, signature_handler)
+                        operations = []
+                    operation = self.plan_remove_tag(item, tag)
+                    if operation:
+                        operations.append(operation)
+
+            self.run_tag_operations(operations, signature_handler)
+        finally:
+            # all added tags are signed over the same connection to RADAS, if it's enabled
+            signature_handler.close_signing_session()
 
 
 def mod_entry_point(push_items, hub, task_id, target_name, target_settings):
@@ -2,18 +2,29 @@ import argparse
 import contextlib
 import json
 import logging
+from multiprocessing.pool import ThreadPool
 import os
-import pkg_resources
 import sys
 import textwrap
+import threading
+import weakref
 
 from six import StringIO
 
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # pragma: no cover
+    try:
+        import importlib_metadata
+    except ImportError:
+        importlib_metadata = None
+
 LOG = logging.getLogger("PubLogger")
 logging.basicConfig()
 LOG.setLevel(logging.INFO)
 
 INTERNAL_DELIMITER = "----"
+DEFAULT_MAX_THREADS = 5
 
 
 def setup_arg_parser(args):
@@ -118,6 +129,63 @@ def capture_stdout():
         sys.stdout = old_stdout
 
 
+_entry_point_cache = {}
+_entry_point_lock = threading.Lock()
+
+
+def _resolve_entry_point(dist, group, name):
+    """
+    Find an entrypoint in the metadata of an installed distribution and load it.
+
+    importlib.metadata (or its backport) is preferred, pkg_resources is only imported as the last
+    resort, since importing it scans all installed distributions.
+
+    Args:
+        dist (str):
+            Name of the distribution.
+        group (str):
+            Entrypoint group, e.g. 'console_scripts'.
+        name (str):
+            Entrypoint name.
+    Returns (callable):
+        Object referenced by the entrypoint.
+    """
+    if importlib_metadata is None:
+        import pkg_resources
+
+        return pkg_resources.load_entry_point(dist, group, name)
+
+    try:
+        distribution = importlib_metadata.distribution(dist)
+    except importlib_metadata.PackageNotFoundError:
+        raise ImportError("Distribution '{0}' is not installed".format(dist))
+    for entry_point in distribution.entry_points:
+        if entry_point.group == group and entry_point.name == name:
+            return entry_point.load()
+    raise ImportError("Entry point {0} of group {1} not found in {2}".format(name, group, dist))
+
+
+def load_entry_point(dist, group, name):
+    """
+    Load an entrypoint, caching the result for the lifetime of the process.
+
+    Args:
+        dist (str):
+            Name of the distribution.
+        group (str):
+            Entrypoint group, e.g. 'console_scripts'.
+        name (str):
+            Entrypoint name.
+    Returns (callable):
+        Object referenced by the entrypoint.
+    """
+    key = (dist, group, name)
+    with _entry_point_lock:
+        if key not in _entry_point_cache:
+            _entry_point_cache[key] = _resolve_entry_point(dist, group, name)
+        return _entry_point_cache[key]
+
+
 @contextlib.contextmanager
 def setup_entry_point_cli(entry_tuple, name, args, environ_vars):
     """
@@ -145,7 +213,7 @@ def setup_entry_point_cli(entry_tuple, name, args, environ_vars):
         sys.argv.extend(args)
         for key in environ_vars:
             os.environ[key] = environ_vars[key]
-        entry_point_func = pkg_resources.load_entry_point(*entry_tuple)
+        entry_point_func = load_entry_point(*entry_tuple)
         yield entry_point_func
     finally:
         sys.argv = orig_argv[:]
@@ -264,3 +332,65 @@ def log_step(step_name):
         return fn_wrapper
 
     return decorate
+
+
+def run_in_parallel(func, data, threads=DEFAULT_MAX_THREADS):
+    """
+    Call a function on every element of the data, using a bounded pool of threads.
+
+    If only one thread is allowed (or there's at most one element), the calls are performed
+    sequentially in the calling thread. If any of the calls raises an exception, it's re-raised
+    in the calling thread.
+
+    Args:
+        func (callable):
+            Function accepting one argument, which will be called on each element.
+        data ([object]):
+            Elements to process.
+        threads (int):
+            Maximum number of threads to use.
+
+    Returns ([object]):
+        Return values of the function calls, in the same order as the input data.
+    """
+    data = list(data)
+    if threads <= 1 or len(data) <= 1:
+        return [func(element) for element in data]
+
+    pool = ThreadPool(min(threads, len(data)))
+    try:
+        return pool.map(func, data)
+    finally:
+        pool.close()
+        pool.join()
+
+
+_target_info_cache = weakref.WeakKeyDictionary()
+_target_info_lock = threading.Lock()
+
+
+def get_target_info(hub, target_name):
+    """
+    Get information about a target from pub-hub.
+
+    The results are cached per hub proxy. Since each task uses its own proxy, target info is
+    only requested once per task, regardless of how many steps need it.
+
+    Args:
+        hub (HubProxy):
+            Instance of XMLRPC pub-hub proxy.
+        target_name (str):
+            Name of the target.
+
+    Returns (dict):
+        Target info as returned by pub-hub.
+    """
+    # the global lock only guards the cache, requests of different targets run concurrently
+    with _target_info_lock:
+        entry = _target_info_cache.setdefault(hub, {}).setdefault(
+            target_name, {"lock": threading.Lock()}
+        )
+    with entry["lock"]:
+        if "info" not in entry:
+            entry["info"] = hub.worker.get_target_info(target_name)
+        return entry["info"]
@@ -0,0 +1,134 @@
+import logging
+from multiprocessing.pool import ThreadPool
+import sys
+import threading
+
+import six
+
+from .misc import DEFAULT_MAX_THREADS
+
+LOG = logging.getLogger("PubLogger")
+logging.basicConfig()
+LOG.setLevel(logging.INFO)
+
+
+class Pipeline(object):
+    """
+    Run tasks concurrently while respecting the dependencies between them.
+
+    Tasks form a directed acyclic graph. A task is started once all the tasks it depends on have
+    finished, and it receives their return values as arguments. If any task fails, no new tasks
+    are started, and the error is re-raised once the running tasks finish.
+    """
+
+    def __init__(self, threads=DEFAULT_MAX_THREADS):
+        """
+        Initialize.
+
+        Args:
+            threads (int):
+                Maximum number of tasks running at the same time.
+        """
+        self.threads = threads
+        # [(name, func, depends_on)]
+        self._tasks = []
+
+    def add_task(self, name, func, depends_on=None):
+        """
+        Add a task to the pipeline.
+
+        Tasks may only depend on previously added tasks, which ensures that there are no cycles.
+
+        Args:
+            name (str):
+                Unique name of the task.
+            func (callable):
+                Function to run. It's called with the return values of its dependencies, in the
+                order in which they were specified.
+            depends_on ([str]):
+                Names of the tasks which must finish before this task is started.
+        """
+        names = [task[0] for task in self._tasks]
+        if name in names:
+            raise ValueError("Task '{0}' is already in the pipeline".format(name))
+        for dependency in depends_on or []:
+            if dependency not in names:
+                raise ValueError(
+                    "Task '{0}' depends on an unknown task '{1}'".format(name, dependency)
+                )
+        self._tasks.append((name, func, list(depends_on or [])))
+
+    def _run_task(self, name, func, args):
+        """
+        Run a single task, capturing its exception.
+
+        Args:
+            name (str):
+                Name of the task.
+            func (callable):
+                Function of the task.
+            args ([object]):
+                Return values of the dependencies of the task.
+        Returns ((str, bool, object)):
+            Name of the task, whether it succeeded, and its return value or exception info.
+        """
+        LOG.info("Starting task '{0}'".format(name))
+        try:
+            result = func(*args)
+        except Exception:
+            LOG.error("Task '{0}' has failed".format(name))
+            return (name, False, sys.exc_info())
+        LOG.info("Task '{0}' has finished".format(name))
+        return (name, True, result)
+
+    def run(self):
+        """
+        Run all tasks of the pipeline.
+
+        Returns ({str: object}):
+            Return values of the tasks.
+        Raises:
+            Exception: The first exception raised by any of the tasks.
+        """
+        results = {}
+        errors = []
+        pending = list(self._tasks)
+        running = set()
+        condition = threading.Condition()
+
+        def on_finished(task_result):
+            name, success, value = task_result
+            with condition:
+                running.discard(name)
+                if success:
+                    results[name] = value
+                else:
+                    errors.append(value)
+                condition.notify()
+
+        pool = ThreadPool(max(1, self.threads))
+        try:
+            with condition:
+                while True:
+                    if not errors:
+                        for task in list(pending):
+                            name, func, depends_on = task
+                            if len(running) >= self.threads:
+                                break
+                            if all(dependency in results for dependency in depends_on):
+                                pending.remove(task)
+                                running.add(name)
+                                args = [results[dependency] for dependency in depends_on]
+                                pool.apply_async(
+                                    self._run_task, (name, func, args), callback=on_finished
+                                )
+                    if not running:
+                        break
+                    condition.wait()
+        finally:
+            pool.close()
+            pool.join()
+
+        if errors:
+            six.reraise(*errors[0])
+        return results
@@ -0,0 +1,97 @@
+import json
+import base64
+
+import mock
+import pytest
+
+from pubtools._quay import claim_message
+
+
+def get_message(**kwargs):
+    fields = {
+        "sig_key_id": "key1",
+        "pub_task_id": "1",
+        "request_id": "id1",
+        "manifest_digest": "sha256:f4f4f4f",
+        "repo": "some-dest-repo",
+        "image_name": "image",
+        "docker_reference": "registry.com/image:1",
+        "created": "2021-03-19T14:45:23.128632Z",
+    }
+    fields.update(kwargs)
+    return claim_message.ClaimMessage(**fields)
+
+
+def test_encode_manifest_claim():
+    claim = json.loads(
+        base64.b64decode(
+            claim_message.encode_manifest_claim("sha256:f4f4f4f", "registry.com/image:1")
+        )
+    )
+    assert claim == {
+        "critical": {
+            "type": "atomic container signature",
+            "image": {"docker-manifest-digest": "sha256:f4f4f4f"},
+            "identity": {"docker-reference": "registry.com/image:1"},
+        },
+        "optional": {"creator": "Red Hat RCM Pub"},
+    }
+
+
+def test_claim_message_dict_access():
+    message = get_message()
+    claim_file = claim_message.encode_manifest_claim("sha256:f4f4f4f", "registry.com/image:1")
+    expected = {
+        "sig_key_id": "key1",
+        "claim_file": claim_file,
+        "pub_task_id": "1",
+        "request_id": "id1",
+        "manifest_digest": "sha256:f4f4f4f",
+        "repo": "some-dest-repo",
+        "image_name": "image",
+        "docker_reference": "registry.com/image:1",
+        "created": "2021-03-19T14:45:23.128632Z",
+    }
+
+    assert message["request_id"] == "id1"
+    assert message["claim_file"] == claim_file
+    assert message.get("missing", "default") == "default"
+    assert "repo" in message
+    assert "missing" not in message
+    with pytest.raises(KeyError):
+        message["missing"]
+    with pytest.raises(AttributeError):
+        message.missing = "value"
+
+    assert message.to_dict() == expected
+    assert message == expected
+    assert expected == message
+    assert message == get_message()
+    assert message != get_message(sig_key_id="key2")
+    assert sorted(message.keys()) == sorted(expected.keys())
+
+
+@mock.patch("pubtools._quay.claim_message.encode_manifest_claim")
+def test_serialize_claim_messages(mock_encode):
+    mock_encode.side_effect = lambda digest, reference: "{0} {1}".format(digest, reference)
+    messages = [
+        get_message(),
+        get_message(sig_key_id="key2", request_id="id2"),
+        get_message(manifest_digest="sha256:a2a2a2a", request_id="id3"),
+        {"request_id": "id4", "claim_file": "some-encode"},
+    ]
+
+    serialized = claim_message.serialize_claim_messages(messages)
+
+    # claims are encoded once per digest and reference
+    assert mock_encode.call_args_list == [
+        mock.call("sha256:f4f4f4f", "registry.com/image:1"),
+        mock.call("sha256:a2a2a2a", "registry.com/image:1"),
+    ]
+    assert all(isinstance(message, dict) for message in serialized)
+    assert [(m["request_id"], m["claim_file"]) for m in serialized] == [
+        ("id1", "sha256:f4f4f4f registry.com/image:1"),
+        ("id2", "sha256:f4f4f4f registry.com/image:1"),
+        ("id3", "sha256:a2a2a2a registry.com/image:1"),
+        ("id4", "some-encode"),
+    ]
@@ -1,3 +1,4 @@
+from copy import deepcopy
 import logging
 import mock
 import pytest
@@ -7,6 +8,7 @@ import requests
 from pubtools._quay import exceptions
 from pubtools._quay import quay_client
 from pubtools._quay import container_image_pusher
+from pubtools._quay.push_journal import PushJournal
 from .utils.misc import sort_dictionary_sortable_values, compare_logs
 
 # flake8: noqa: E501
@@ -295,6 +297,85 @@ def test_push_container_items_src_item(
     mock_copy_src.assert_called_once()
 
 
+@mock.patch("pubtools._quay.container_image_pusher.ContainerImagePusher.copy_source_push_item")
+@mock.patch("pubtools._quay.container_image_pusher.ContainerImagePusher.copy_multiarch_push_item")
+@mock.patch("pubtools._quay.container_image_pusher.QuayClient")
+def test_push_container_items_journal(
+    mock_quay_client,
+    mock_copy_multiarch,
+    mock_copy_src,
+    target_settings,
+    container_source_push_item,
+    tmpdir,
+):
+    mock_get_manifest = mock.MagicMock()
+    mock_get_manifest.side_effect = exceptions.ManifestTypeError("no manifest list")
+    mock_quay_client.return_value.get_manifest = mock_get_manifest
+    journal = PushJournal(str(tmpdir), "1")
+
+    pusher = container_image_pusher.ContainerImagePusher(
+        [container_source_push_item], target_settings
+    )
+    pusher.set_journal(journal)
+    pusher.push_container_images()
+
+    mock_copy_src.assert_called_once()
+    key = "some-registry/src/repo:1 target/repo:1.0 target/repo:latest-test-tag"
+    assert journal.is_done("copy", key)
+    assert journal.get_data("copy", key) == {
+        "dest_refs": [
+            "quay.io/some-namespace/target----repo:latest-test-tag",
+            "quay.io/some-namespace/target----repo:1.0",
+        ]
+    }
+
+    # re-run of the same task skips the finished item
+    pusher = container_image_pusher.ContainerImagePusher(
+        [container_source_push_item], target_settings
+    )
+    pusher.set_journal(PushJournal(str(tmpdir), "1"))
+    pusher.push_container_images()
+
+    mock_copy_src.assert_called_once()
+    mock_get_manifest.assert_called_once()
+    mock_copy_multiarch.assert_not_called()
+
+
+@mock.patch("pubtools._quay.container_image_pusher.ContainerImagePusher.copy_source_push_item")
+@mock.patch("pubtools._quay.container_image_pusher.QuayClient")
+def test_push_container_items_journal_shared_source(
+    mock_quay_client,
+    mock_copy_src,
+    target_settings,
+    container_source_push_item,
+    tmpdir,
+):
+    mock_quay_client.return_value.get_manifest.side_effect = exceptions.ManifestTypeError(
+        "no manifest list"
+    )
+    other_item = deepcopy(container_source_push_item)
+    other_item.metadata["tags"] = {"target/repo2": ["1"]}
+    journal = PushJournal(str(tmpdir), "1")
+
+    pusher = container_image_pusher.ContainerImagePusher(
+        [container_source_push_item], target_settings
+    )
+    pusher.set_journal(journal)
+    pusher.push_container_images()
+
+    # item with the same source but different destination tags isn't considered copied
+    pusher = container_image_pusher.ContainerImagePusher(
+        [container_source_push_item, other_item], target_settings
+    )
+    pusher.set_journal(PushJournal(str(tmpdir), "1"))
+    pusher.push_container_images()
+
+    assert mock_copy_src.call_args_list == [
+        mock.call(container_source_push_item),
+        mock.call(other_item),
+    ]
+
+
 @mock.patch("pubtools._quay.container_image_pusher.ContainerImagePusher.copy_source_push_item")
 @mock.patch("pubtools._quay.container_image_pusher.ContainerImagePusher.copy_multiarch_push_item")
 @mock.patch("pubtools._quay.container_image_pusher.QuayClient")
@@ -339,3 +420,77 @@ def test_push_container_items_multiarch_item(
 
     mock_copy_src.assert_not_called()
     mock_copy_multiarch.assert_called_once()
+
+
+def test_group_push_items(target_settings, container_source_push_item):
+    items = []
+    for pull_url, tags in [
+        ("some-registry/src/repo:1", {"target/repo": ["1", "2"]}),
+        ("some-registry/src/repo:2", {"target/repo2": ["1"]}),
+        ("some-registry/src/repo:3", {"target/repo3": ["1"], "target/repo": ["3"]}),
+        ("some-registry/src/repo:4", {"target/repo2": ["1"], "target/repo3": ["1"]}),
+        ("some-registry/src/repo:5", {"target/repo": ["2"]}),
+    ]:
+        item = deepcopy(container_source_push_item)
+        item.metadata["pull_url"] = pull_url
+        item.metadata["tags"] = tags
+        items.append(item)
+
+    pusher = container_image_pusher.ContainerImagePusher(items, target_settings)
+    groups = pusher.group_push_items()
+
+    # item 4 connects items 2 and 3, item 5 shares a tag with item 1
+    assert groups == [[items[0], items[4]], [items[1], items[2], items[3]]]
+
+
+@mock.patch("pubtools._quay.container_image_pusher.ContainerImagePusher.push_container_item")
+def test_push_container_images_parallel_failure(
+    mock_push_container_item, target_settings, container_source_push_item
+):
+    items = []
+    for i in range(4):
+        item = deepcopy(container_source_push_item)
+        item.metadata["pull_url"] = "some-registry/src/repo:{0}".format(i)
+        # items 0 and 1 share a tag, items 2 and 3 as well
+        item.metadata["tags"] = {"target/repo{0}".format(i // 2): ["1"]}
+        items.append(item)
+    target_settings["quay_max_concurrent_pushes"] = 1
+
+    def push_container_item(item):
+        if item is items[0]:
+            raise ValueError("push failed")
+
+    mock_push_container_item.side_effect = push_container_item
+
+    pusher = container_image_pusher.ContainerImagePusher(items, target_settings)
+    with pytest.raises(ValueError, match="push failed"):
+        pusher.push_container_images()
+
+    # no new items are started after the failure
+    mock_push_container_item.assert_called_once_with(items[0])
+
+
+@mock.patch("pubtools._quay.container_image_pusher.ContainerImagePusher.push_container_item")
+def test_push_container_images_parallel(
+    mock_push_container_item, target_settings, container_source_push_item
+):
+    items = []
+    for i in range(6):
+        item = deepcopy(container_source_push_item)
+        item.metadata["pull_url"] = "some-registry/src/repo:{0}".format(i)
+        item.metadata["tags"] = {"target/repo{0}".format(i % 3): ["1"]}
+        items.append(item)
+    target_settings["quay_max_concurrent_pushes"] = 3
+
+    pusher = container_image_pusher.ContainerImagePusher(items, target_settings)
+    pusher.push_container_images()
+
+    pushed = [c[0][0] for c in mock_push_container_item.call_args_list]
+    assert sorted(i.metadata["pull_url"] for i in pushed) == sorted(
+        i.metadata["pull_url"] for i in items
+    )
+    # items sharing a tag are pushed in their original order
+    for group in range(3):
+        assert [pushed.index(i) for i in items[group::3]] == sorted(
+            [pushed.index(i) for i in items[group::3]]
+        )
@@ -61,16 +61,16 @@ def test_init(mock_ssl_domain):
 
     assert handler.umb_urls == ["umb-url1.com", "umb_url2.com"]
     assert handler.radas_address == "queue://Consumer.msg-producer-pub.some-address"
-    assert handler.claim_messages == claim_messages
     assert handler.timeout == 600
     assert handler.throttle == 100
     assert handler.retry == 3
     assert handler.message_sender_callback == message_sender_callback
-    assert handler.to_send == claim_messages
-    assert handler.id_msg_map == {
-        "asdasdasd-77bc-4222-ad6a-89f508f02d75": claim_messages[0],
-        "7ed1d8fb-77bc-4222-ad6a-89f508f02d75": claim_messages[1],
-    }
+    # claims are pulled only when they're about to be sent
+    assert handler.to_send == []
+    assert handler.id_msg_map == {}
+    handler._pull_claims(1)
+    assert handler.to_send == claim_messages[:1]
+    assert handler.id_msg_map == {"asdasdasd-77bc-4222-ad6a-89f508f02d75": claim_messages[0]}
     mock_ssl_domain.assert_called_once()
     mock_set_credentials.assert_called_once()
     mock_set_trusted_ca_db.assert_called_once()
@@ -137,7 +137,7 @@ def test_on_timer_task_no_failures(mock_ssl_domain, mock_monotonic, mock_send_me
     mock_container.schedule = mock_schedule
     mock_event = mock.MagicMock()
     mock_event.container = mock_container
-    mock_monotonic.side_effect = [700, 702]
+    mock_monotonic.return_value = 700
 
     handler = manifest_claims_handler.ManifestClaimsHandler(
         ["umb-url1.com", "umb_url2.com"],
@@ -151,12 +151,14 @@ def test_on_timer_task_no_failures(mock_ssl_domain, mock_monotonic, mock_send_me
         message_sender_callback,
     )
     handler.connected = "yes"
-    handler.awaiting_response = {"1": 500, "2": 10}
+    handler._pull_claims(2)
+    handler._await_response("1", 500)
+    handler._await_response("2", 10)
     handler.to_send = []
 
     handler.on_timer_task(mock_event)
 
-    assert mock_monotonic.call_count == 2
+    assert mock_monotonic.call_count == 1
     assert handler.retry_count == {"2": 1}
     assert handler.to_send == [{"request_id": "2"}]
     assert handler.awaiting_response == {"1": 500}
@@ -183,7 +185,7 @@ def test_on_timer_task_retry_limit_reached(
     mock_container.stop = mock_stop
     mock_event = mock.MagicMock()
     mock_event.container = mock_container
-    mock_monotonic.side_effect = [700, 702]
+    mock_monotonic.return_value = 700
 
     handler = manifest_claims_handler.ManifestClaimsHandler(
         ["umb-url1.com", "umb_url2.com"],
@@ -197,14 +199,16 @@ def test_on_timer_task_retry_limit_reached(
         message_sender_callback,
     )
     handler.connected = "yes"
-    handler.awaiting_response = {"1": 500, "2": 10}
+    handler._pull_claims(2)
+    handler._await_response("1", 500)
+    handler._await_response("2", 10)
     handler.to_send = []
     handler.retry_count["2"] = 3
 
     with pytest.raises(manifest_claims_handler.MessageHandlerTimeoutException):
         handler.on_timer_task(mock_event)
 
-    assert mock_monotonic.call_count == 2
+    assert mock_monotonic.call_count == 1
     mock_send_message.assert_not_called()
     mock_schedule.assert_not_called()
     mock_stop.assert_called_once_with()
@@ -213,6 +217,145 @@ def test_on_timer_task_retry_limit_reached(
     compare_logs(caplog, expected_logs)
 
 
+@mock.patch("pubtools._quay.manifest_claims_handler.ManifestClaimsHandler._send_message")
+@mock.patch("pubtools._quay.manifest_claims_handler.monotonic.monotonic")
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
+def test_on_timer_task_stale_deadlines(mock_ssl_domain, mock_monotonic, mock_send_message):
+    hub = mock.MagicMock()
+    message_sender_callback = lambda messages: hub.worker.umb_send_manifest_claim_messages(
+        "1", messages
+    )
+    mock_monotonic.return_value = 700
+
+    handler = manifest_claims_handler.ManifestClaimsHandler(
+        ["umb-url1.com", "umb_url2.com"],
+        "queue://Consumer.msg-producer-pub.some-address",
+        [{"request_id": "1"}, {"request_id": "2"}, {"request_id": "3"}],
+        "/etc/pub/umb-pub-cert-key.pem",
+        "/etc/pki/tls/certs/ca-bundle.crt",
+        600,
+        100,
+        3,
+        message_sender_callback,
+    )
+    handler.connected = True
+    handler._pull_claims(3)
+    handler.to_send = []
+    handler._await_response("1", 10)
+    handler._await_response("2", 20)
+    handler._await_response("3", 30)
+    # request 1 was answered, request 2 was resent later
+    handler.awaiting_response.pop("1")
+    handler._await_response("2", 650)
+
+    handler.on_timer_task(mock.MagicMock())
+
+    assert handler.retry_count == {"3": 1}
+    assert handler.to_send == [{"request_id": "3"}]
+    assert handler.awaiting_response == {"2": 650}
+    # only the entry which hasn't expired yet is left
+    assert handler.deadlines == [(650, "2")]
+    mock_send_message.assert_called_once_with(1)
+
+
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
+def test_on_message_discards_stale_deadlines(mock_ssl_domain):
+    handler = manifest_claims_handler.ManifestClaimsHandler(
+        ["umb-url1.com", "umb_url2.com"],
+        "queue://Consumer.msg-producer-pub.some-address",
+        [{"request_id": str(i)} for i in range(10)],
+        "/etc/pub/umb-pub-cert-key.pem",
+        "/etc/pki/tls/certs/ca-bundle.crt",
+        600,
+        10,
+        3,
+        mock.MagicMock(),
+        keep_open=True,
+    )
+    handler.connected = True
+    handler._pull_claims(10)
+    handler.to_send = []
+    for i in range(10):
+        handler._await_response(str(i), i)
+
+    event = mock.MagicMock()
+
+    def respond(request_id):
+        event.message.body = '{"msg": {"request_id": "%s"}}' % request_id
+        handler.on_message(event)
+
+    # answered entry at the head of the heap is popped right away
+    respond("0")
+    assert len(handler.deadlines) == 9
+    assert handler.deadlines[0] == (1, "1")
+    # answered entries elsewhere in the heap are kept until it's twice as large as needed
+    for i in range(9, 5, -1):
+        respond(str(i))
+    assert len(handler.deadlines) == 9
+    respond("5")
+    assert sorted(handler.deadlines) == [(i, str(i)) for i in range(1, 5)]
+    assert len(handler.deadlines) == len(handler.awaiting_response)
+
+
+@mock.patch("pubtools._quay.manifest_claims_handler.ManifestClaimsHandler._send_message")
+@mock.patch("pubtools._quay.manifest_claims_handler.monotonic.monotonic")
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
+def test_adaptive_throttle(mock_ssl_domain, mock_monotonic, mock_send_message, caplog):
+    caplog.set_level(logging.INFO)
+    hub = mock.MagicMock()
+    message_sender_callback = lambda messages: hub.worker.umb_send_manifest_claim_messages(
+        "1", messages
+    )
+
+    handler = manifest_claims_handler.ManifestClaimsHandler(
+        ["umb-url1.com", "umb_url2.com"],
+        "queue://Consumer.msg-producer-pub.some-address",
+        [],
+        "/etc/pub/umb-pub-cert-key.pem",
+        "/etc/pki/tls/certs/ca-bundle.crt",
+        600,
+        4,
+        3,
+        message_sender_callback,
+        min_throttle=3,
+        max_throttle=5,
+    )
+    assert handler.adaptive_throttle
+    assert handler.target_latency == 60
+    handler.connected = True
+    handler.receiver = mock.MagicMock()
+    handler.timer_task = mock.MagicMock()
+    mock_event = mock.MagicMock()
+
+    def respond(request_id, latency):
+        mock_monotonic.return_value = 100 + latency
+        handler._await_response(request_id, 100)
+        mock_event.message.body = '{"msg": {"request_id": "%s"}}' % request_id
+        handler.on_message(mock_event)
+
+    # slow response doesn't count towards growing the throttle
+    for i in range(3):
+        respond(str(i), 10)
+    respond("3", 70)
+    for i in range(4, 7):
+        respond(str(i), 10)
+    assert handler.throttle == 4
+    # a whole window of fast responses grows the throttle by one, up to the maximum
+    for i in range(7, 30):
+        respond(str(i), 10)
+    assert handler.throttle == 5
+
+    # throttle is halved on timeouts, down to the minimum
+    mock_monotonic.return_value = 1000
+    handler.id_msg_map["30"] = {"request_id": "30"}
+    handler._await_response("30", 100)
+    handler.on_timer_task(mock_event)
+    assert handler.throttle == 3
+    assert handler.send_batch_size == 1
+
+    assert caplog.records[-1].getMessage() == "Signing throttle changed to 3"
+
+
 @mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
 def test_on_timer_task_not_connected(mock_ssl_domain, caplog):
     hub = mock.MagicMock()
@@ -289,7 +432,7 @@ def test_on_link_opened(mock_ssl_domain, mock_send_message, caplog):
 
     mock_cancel.assert_called_once_with()
     assert handler.connected is True
-    mock_send_message.assert_called_once_with()
+    mock_send_message.assert_called_once_with(2)
     mock_schedule.assert_called_once()
     assert handler.timer_task == "new-timer-task"
     expected_logs = []
@@ -443,6 +586,181 @@ def test_on_message_not_last_one(mock_ssl_domain, mock_send_message, caplog):
     compare_logs(caplog, expected_logs)
 
 
+@mock.patch("pubtools._quay.manifest_claims_handler.ManifestClaimsHandler._send_message")
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
+def test_on_message_refill_window(mock_ssl_domain, mock_send_message):
+    hub = mock.MagicMock()
+    message_sender_callback = lambda messages: hub.worker.umb_send_manifest_claim_messages(
+        "1", messages
+    )
+
+    handler = manifest_claims_handler.ManifestClaimsHandler(
+        ["umb-url1.com", "umb_url2.com"],
+        "queue://Consumer.msg-producer-pub.some-address",
+        [],
+        "/etc/pub/umb-pub-cert-key.pem",
+        "/etc/pki/tls/certs/ca-bundle.crt",
+        600,
+        20,
+        3,
+        message_sender_callback,
+    )
+    handler.awaiting_response = dict((str(i), i) for i in range(20))
+    handler.to_send = [{"request_id": str(i)} for i in range(20, 25)]
+    handler.receiver = mock.MagicMock()
+    handler.timer_task = mock.MagicMock()
+    mock_event = mock.MagicMock()
+
+    # a single free spot isn't enough for a batch of messages
+    mock_event.message.body = '{"msg": {"request_id": "1"}}'
+    handler.on_message(mock_event)
+    assert handler.send_batch_size == 2
+    mock_send_message.assert_not_called()
+
+    mock_event.message.body = '{"msg": {"request_id": "2"}}'
+    handler.on_message(mock_event)
+    mock_send_message.assert_called_once_with(2)
+    handler.timer_task.cancel.assert_not_called()
+
+    # remaining messages are sent even if they don't fill a batch
+    mock_send_message.reset_mock()
+    handler.to_send = [{"request_id": "25"}]
+    mock_event.message.body = '{"msg": {"request_id": "3"}}'
+    handler.on_message(mock_event)
+    mock_send_message.assert_called_once_with(1)
+
+
+@mock.patch("pubtools._quay.manifest_claims_handler.ManifestClaimsHandler._send_message")
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
+def test_keep_open(mock_ssl_domain, mock_send_message):
+    hub = mock.MagicMock()
+    message_sender_callback = lambda messages: hub.worker.umb_send_manifest_claim_messages(
+        "1", messages
+    )
+    response_callback = mock.MagicMock()
+
+    handler = manifest_claims_handler.ManifestClaimsHandler(
+        ["umb-url1.com", "umb_url2.com"],
+        "queue://Consumer.msg-producer-pub.some-address",
+        [],
+        "/etc/pub/umb-pub-cert-key.pem",
+        "/etc/pki/tls/certs/ca-bundle.crt",
+        600,
+        100,
+        3,
+        message_sender_callback,
+        keep_open=True,
+        response_callback=response_callback,
+    )
+    handler.receiver = mock.MagicMock()
+    handler.timer_task = mock.MagicMock()
+
+    # claims added before the link is opened are only queued
+    mock_event = mock.MagicMock()
+    mock_event.subject = [{"request_id": "1"}]
+    handler.on_claims(mock_event)
+    mock_send_message.assert_not_called()
+
+    handler.connected = True
+    handler.add_claim_messages([{"request_id": "2"}])
+    mock_send_message.assert_called_once_with(2)
+    assert handler.to_send == [{"request_id": "1"}, {"request_id": "2"}]
+    assert handler.id_msg_map == {"1": {"request_id": "1"}, "2": {"request_id": "2"}}
+
+    # connection stays open once all claims are satisfied
+    handler.to_send = []
+    handler.awaiting_response = {"1": 1}
+    mock_event.message.body = '{"msg": {"request_id": "1"}}'
+    handler.on_message(mock_event)
+    response_callback.assert_called_once_with({"request_id": "1"})
+    handler.receiver.close.assert_not_called()
+    handler.timer_task.cancel.assert_not_called()
+
+    handler.on_close_signing_session(mock_event)
+    handler.receiver.close.assert_called_once_with()
+    handler.receiver.connection.close.assert_called_once_with()
+    handler.timer_task.cancel.assert_called_once_with()
+
+
+@mock.patch("pubtools._quay.manifest_claims_handler.ManifestClaimsHandler._send_message")
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
+def test_on_message_signature_spool(mock_ssl_domain, mock_send_message):
+    signature_spool = mock.MagicMock()
+    claim_messages = [{"request_id": "1"}, {"request_id": "2"}]
+
+    handler = manifest_claims_handler.ManifestClaimsHandler(
+        ["umb-url1.com", "umb_url2.com"],
+        "queue://Consumer.msg-producer-pub.some-address",
+        claim_messages,
+        "/etc/pub/umb-pub-cert-key.pem",
+        "/etc/pki/tls/certs/ca-bundle.crt",
+        600,
+        100,
+        3,
+        mock.MagicMock(),
+        signature_spool=signature_spool,
+    )
+    handler.receiver = mock.MagicMock()
+    handler.timer_task = mock.MagicMock()
+    handler._pull_claims(2)
+    handler.to_send = []
+    handler.awaiting_response = {"2": 1}
+
+    mock_event = mock.MagicMock()
+    mock_event.message.body = '{"msg": {"request_id": "2", "errors": []}}'
+    handler.on_message(mock_event)
+
+    signature_spool.add.assert_called_once_with(
+        {"request_id": "2"}, {"request_id": "2", "errors": []}
+    )
+
+
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
+def test_lazy_claim_messages(mock_ssl_domain):
+    pulled = []
+
+    def claim_messages():
+        for i in range(100):
+            pulled.append(i)
+            yield {"request_id": str(i)}
+
+    sent = []
+    handler = manifest_claims_handler.ManifestClaimsHandler(
+        ["umb-url1.com", "umb_url2.com"],
+        "queue://Consumer.msg-producer-pub.some-address",
+        claim_messages(),
+        "/etc/pub/umb-pub-cert-key.pem",
+        "/etc/pki/tls/certs/ca-bundle.crt",
+        600,
+        10,
+        3,
+        sent.extend,
+        keep_responses=False,
+    )
+    handler.receiver = mock.MagicMock()
+    handler.timer_task = mock.MagicMock()
+    assert pulled == []
+
+    mock_event = mock.MagicMock()
+    mock_event.receiver = handler.receiver
+    handler.on_link_opened(mock_event)
+    # only claims fitting into the window are pulled
+    assert len(pulled) == 10
+    assert len(sent) == 10
+
+    while handler.awaiting_response:
+        request_id = sorted(handler.awaiting_response)[0]
+        mock_event.message.body = '{"msg": {"request_id": "%s", "errors": []}}' % request_id
+        handler.on_message(mock_event)
+        # only in-flight claims are kept
+        assert len(handler.id_msg_map) <= 10
+
+    assert len(sent) == 100
+    assert handler.finished is True
+    assert handler.received_messages == []
+    handler.receiver.close.assert_called_once_with()
+
+
 @mock.patch("pubtools._quay.manifest_claims_handler.ManifestClaimsHandler._send_message")
 @mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
 def test_on_message_unknown_message(mock_ssl_domain, mock_send_message, caplog):
@@ -529,7 +847,9 @@ def test_send_message(mock_ssl_domain, mock_monotonic):
         "1", [{"request_id": "1"}, {"request_id": "2"}]
     )
     assert handler.to_send == []
-    assert handler.awaiting_response == {"1": 10, "2": 20}
+    # messages sent together share the sent time
+    assert handler.awaiting_response == {"1": 10, "2": 10}
+    assert handler.deadlines == [(10, "1"), (10, "2")]
 
 
 @mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
@@ -571,3 +891,50 @@ def test_events_logs(mock_ssl_domain, caplog):
         "Messaging event: disconnected",
     ]
     compare_logs(caplog, expected_logs)
+
+
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.reactor.EventInjector")
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
+def test_shards_share_queue_without_duplicate_deliveries(mock_ssl_domain, mock_injector):
+    router = manifest_claims_handler.ResponseRouter()
+    sent = []
+    handlers = [
+        manifest_claims_handler.ManifestClaimsHandler(
+            ["umb-url1.com", "umb_url2.com"],
+            "queue://Consumer.msg-producer-pub.some-address",
+            [{"request_id": "{0}-{1}".format(shard, i)} for i in range(4)],
+            "/etc/pub/umb-pub-cert-key.pem",
+            "/etc/pki/tls/certs/ca-bundle.crt",
+            600,
+            2,
+            3,
+            lambda messages: sent.extend(m["request_id"] for m in messages),
+            response_router=router,
+        )
+        for shard in range(3)
+    ]
+    for handler in handlers:
+        handler.receiver = mock.MagicMock()
+        handler.timer_task = mock.MagicMock()
+        # injected events are dispatched right away to the owner of the response
+        handler.injector = mock.MagicMock()
+        handler.injector.trigger.side_effect = lambda event, handler=handler: getattr(
+            handler, event.type.method
+        )(event)
+        handler.on_link_opened(mock.MagicMock(receiver=handler.receiver))
+
+    # the broker delivers every response once, to the shards in turn
+    delivered = 0
+    while sent:
+        event = mock.MagicMock()
+        event.message.body = '{"msg": {"request_id": "%s"}}' % sent.pop(0)
+        handlers[delivered % len(handlers)].on_message(event)
+        delivered += 1
+
+    assert delivered == 12
+    for shard, handler in enumerate(handlers):
+        assert handler.finished
+        assert sorted(m["request_id"] for m in handler.received_messages) == [
+            "{0}-{1}".format(shard, i) for i in range(4)
+        ]
+        handler.injector.close.assert_called_once_with()
@@ -0,0 +1,121 @@
+import os
+
+import mock
+import pytest
+
+from pubtools._quay import metadata_cache
+
+
+def test_sqlite_cache_get_set(tmpdir):
+    path = os.path.join(str(tmpdir), "cache", "metadata.db")
+    cache = metadata_cache.SQLiteMetadataCache(path)
+
+    assert cache.get("repo_metadata", "repo1") == (False, None)
+    cache.set("repo_metadata", "repo1", {"release_categories": ["Generally Available"]})
+    cache.set("ocp_versions", "repo1", ["v4.5"])
+
+    assert cache.get("repo_metadata", "repo1") == (
+        True,
+        {"release_categories": ["Generally Available"]},
+    )
+    # entries are persisted and shared by cache instances
+    other_cache = metadata_cache.SQLiteMetadataCache(path)
+    assert other_cache.get("ocp_versions", "repo1") == (True, ["v4.5"])
+
+
+@mock.patch("pubtools._quay.metadata_cache.time.time")
+def test_sqlite_cache_ttl(mock_time, tmpdir):
+    cache = metadata_cache.SQLiteMetadataCache(os.path.join(str(tmpdir), "metadata.db"))
+
+    mock_time.return_value = 1000
+    cache.set("repo_metadata", "repo1", "short", ttl=10)
+    cache.set("repo_metadata", "repo2", "long", ttl=100)
+
+    mock_time.return_value = 1050
+    assert cache.get("repo_metadata", "repo1") == (False, None)
+    assert cache.get("repo_metadata", "repo2") == (True, "long")
+
+
+def test_sqlite_cache_invalidate(tmpdir):
+    cache = metadata_cache.SQLiteMetadataCache(os.path.join(str(tmpdir), "metadata.db"))
+    for namespace in ["ns1", "ns2"]:
+        for key in ["key1", "key2"]:
+            cache.set(namespace, key, "value")
+
+    cache.invalidate("ns1", "key1")
+    assert cache.get("ns1", "key1") == (False, None)
+    assert cache.get("ns1", "key2") == (True, "value")
+
+    cache.invalidate("ns1")
+    assert cache.get("ns1", "key2") == (False, None)
+    assert cache.get("ns2", "key1") == (True, "value")
+
+    cache.invalidate()
+    assert cache.get("ns2", "key1") == (False, None)
+
+
+def test_get_or_fetch(tmpdir):
+    cache = metadata_cache.SQLiteMetadataCache(os.path.join(str(tmpdir), "metadata.db"))
+    fetch = mock.MagicMock(return_value={"data": 1})
+
+    assert cache.get_or_fetch("ns", "key", fetch) == {"data": 1}
+    assert cache.get_or_fetch("ns", "key", fetch) == {"data": 1}
+    fetch.assert_called_once_with()
+
+
+def test_get_or_fetch_refresh(tmpdir):
+    path = os.path.join(str(tmpdir), "metadata.db")
+    metadata_cache.SQLiteMetadataCache(path).set("ns", "key", "stale")
+    cache = metadata_cache.get_metadata_cache(
+        {"quay_metadata_cache_path": path, "quay_metadata_cache_refresh": True}
+    )
+    assert cache.refresh
+
+    assert cache.get_or_fetch("ns", "key", mock.MagicMock(return_value="fresh")) == "fresh"
+    assert metadata_cache.SQLiteMetadataCache(path).get("ns", "key") == (True, "fresh")
+
+    # a failed fetch doesn't leave the stale entry behind
+    with pytest.raises(ValueError):
+        cache.get_or_fetch("ns", "key", mock.MagicMock(side_effect=ValueError("no data")))
+    assert cache.get("ns", "key") == (False, None)
+
+
+def test_get_or_fetch_fetch_error(tmpdir):
+    cache = metadata_cache.SQLiteMetadataCache(os.path.join(str(tmpdir), "metadata.db"))
+    fetch = mock.MagicMock(side_effect=ValueError("no data"))
+
+    with pytest.raises(ValueError, match="no data"):
+        cache.get_or_fetch("ns", "key", fetch)
+    assert cache.get("ns", "key") == (False, None)
+
+
+def test_get_or_fetch_broken_cache(tmpdir):
+    path = os.path.join(str(tmpdir), "metadata.db")
+    with open(path, "w") as f:
+        f.write("not a database" * 100)
+    cache = metadata_cache.SQLiteMetadataCache(path)
+    fetch = mock.MagicMock(return_value="value")
+
+    assert cache.get_or_fetch("ns", "key", fetch) == "value"
+    assert cache.get_or_fetch("ns", "key", fetch) == "value"
+    assert fetch.call_count == 2
+
+
+def test_get_metadata_cache(tmpdir):
+    assert type(metadata_cache.get_metadata_cache({})) == metadata_cache.MetadataCache
+    assert metadata_cache.get_metadata_cache_ttl({}) == metadata_cache.DEFAULT_CACHE_TTL
+
+    target_settings = {
+        "quay_metadata_cache_path": os.path.join(str(tmpdir), "metadata.db"),
+        "quay_metadata_cache_ttl": 60,
+    }
+    cache = metadata_cache.get_metadata_cache(target_settings)
+    assert isinstance(cache, metadata_cache.SQLiteMetadataCache)
+    assert cache.path == target_settings["quay_metadata_cache_path"]
+    assert metadata_cache.get_metadata_cache_ttl(target_settings) == 60
+
+    # caching is disabled by default
+    fetch = mock.MagicMock(return_value="value")
+    metadata_cache.MetadataCache().get_or_fetch("ns", "key", fetch)
+    metadata_cache.MetadataCache().get_or_fetch("ns", "key", fetch)
+    assert fetch.call_count == 2
@@ -41,59 +41,67 @@ def test_public_bundle_ref(target_settings, operator_push_item_no_vr):
     assert ref == "some-registry1.com/repo1:1.0000000"
 
 
-@mock.patch("pubtools._quay.operator_pusher.run_entrypoint")
+@mock.patch("pubtools._quay.operator_pusher.get_target_pyxis_client")
 def test_pyxis_get_ocp_versions(
-    mock_run_entrypoint,
+    mock_get_pyxis_client,
     target_settings,
     operator_push_item_ok,
 ):
     pusher = operator_pusher.OperatorPusher([operator_push_item_ok], target_settings)
 
-    mock_run_entrypoint.return_value = [{"ocp_version": "4.5"}, {"ocp_version": "4.6"}]
+    mock_get_operator_indices = mock_get_pyxis_client.return_value.get_operator_indices
+    mock_get_operator_indices.return_value = [{"ocp_version": "4.5"}, {"ocp_version": "4.6"}]
     versions = pusher.pyxis_get_ocp_versions(operator_push_item_ok)
 
-    mock_run_entrypoint.assert_called_once_with(
-        ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-operator-indices"),
-        "pubtools-pyxis-get-operator-indices",
-        [
-            "--pyxis-server",
-            "pyxis-url.com",
-            "--pyxis-krb-principal",
-            "some-principal@REDHAT.COM",
-            "--organization",
-            "redhat-operators",
-            "--ocp-versions-range",
-            "v4.5",
-            "--pyxis-krb-ktfile",
-            "/etc/pub/some.keytab",
-        ],
-        {},
-    )
+    mock_get_pyxis_client.assert_called_once_with(target_settings)
+    mock_get_operator_indices.assert_called_once_with("v4.5", "redhat-operators")
     assert versions == ["v4.5", "v4.6"]
 
 
-@mock.patch("pubtools._quay.operator_pusher.run_entrypoint")
+@mock.patch("pubtools._quay.operator_pusher.get_target_pyxis_client")
+def test_pyxis_get_ocp_versions_cached(
+    mock_get_pyxis_client,
+    target_settings,
+    operator_push_item_ok,
+    tmpdir,
+):
+    target_settings["quay_metadata_cache_path"] = str(tmpdir.join("metadata.db"))
+    mock_get_operator_indices = mock_get_pyxis_client.return_value.get_operator_indices
+    mock_get_operator_indices.return_value = [{"ocp_version": "4.5"}, {"ocp_version": "4.6"}]
+
+    pusher = operator_pusher.OperatorPusher([operator_push_item_ok], target_settings)
+    assert pusher.pyxis_get_ocp_versions(operator_push_item_ok) == ["v4.5", "v4.6"]
+    # a pusher of another task reuses the cached response
+    pusher = operator_pusher.OperatorPusher([operator_push_item_ok], target_settings)
+    assert pusher.pyxis_get_ocp_versions(operator_push_item_ok) == ["v4.5", "v4.6"]
+
+    assert mock_get_operator_indices.call_count == 1
+
+
+@mock.patch("pubtools._quay.operator_pusher.get_target_pyxis_client")
 def test_pyxis_get_ocp_versions_no_data(
-    mock_run_entrypoint,
+    mock_get_pyxis_client,
     target_settings,
     operator_push_item_ok,
 ):
     pusher = operator_pusher.OperatorPusher([operator_push_item_ok], target_settings)
 
-    mock_run_entrypoint.return_value = []
+    mock_get_operator_indices = mock_get_pyxis_client.return_value.get_operator_indices
+    mock_get_operator_indices.return_value = []
     with pytest.raises(ValueError, match="Pyxis has returned no OCP.*"):
         versions = pusher.pyxis_get_ocp_versions(operator_push_item_ok)
 
 
-@mock.patch("pubtools._quay.operator_pusher.run_entrypoint")
+@mock.patch("pubtools._quay.operator_pusher.get_target_pyxis_client")
 def test_pyxis_generate_mapping(
-    mock_run_entrypoint,
+    mock_get_pyxis_client,
     target_settings,
     operator_push_item_ok,
     operator_push_item_different_version,
 ):
 
-    mock_run_entrypoint.side_effect = [
+    mock_get_operator_indices = mock_get_pyxis_client.return_value.get_operator_indices
+    mock_get_operator_indices.side_effect = [
         [{"ocp_version": "4.5"}, {"ocp_version": "4.6"}, {"ocp_version": "4.7"}],
         [{"ocp_version": "4.7"}],
     ]
@@ -102,7 +110,7 @@ def test_pyxis_generate_mapping(
     )
 
     mapping = pusher.generate_version_items_mapping()
-    assert mock_run_entrypoint.call_count == 2
+    assert mock_get_operator_indices.call_count == 2
     assert len(mapping["v4.5"]) == 1
     assert len(mapping["v4.6"]) == 1
     assert len(mapping["v4.7"]) == 2
@@ -278,11 +286,11 @@ def test_iib_remove_operators(
 
 @mock.patch("pubtools._quay.operator_pusher.ContainerImagePusher.run_tag_images")
 @mock.patch("pubtools._quay.operator_pusher.OperatorPusher.iib_add_bundles")
-@mock.patch("pubtools._quay.operator_pusher.run_entrypoint")
+@mock.patch("pubtools._quay.operator_pusher.get_target_pyxis_client")
 @mock.patch("pubtools._quay.operator_pusher.OperatorPusher.get_deprecation_list")
 def test_push_operators(
     mock_get_deprecation_list,
-    mock_run_entrypoint,
+    mock_get_pyxis_client,
     mock_add_bundles,
     mock_run_tag_images,
     target_settings,
@@ -295,7 +303,7 @@ def test_push_operators(
 
     mock_get_deprecation_list.side_effect = [["bundle1", "bundle2"], ["bundle3"], []]
 
-    mock_run_entrypoint.side_effect = [
+    mock_get_pyxis_client.return_value.get_operator_indices.side_effect = [
         [{"ocp_version": "4.5"}, {"ocp_version": "4.6"}, {"ocp_version": "4.7"}],
         [{"ocp_version": "4.7"}],
     ]
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from pubtools._quay.utils.pipeline import Pipeline
+
+
+def test_pipeline_dependencies():
+    order = []
+    lock = threading.Lock()
+
+    def task(name, value):
+        def func(*args):
+            with lock:
+                order.append(name)
+            return value + sum(args)
+
+        return func
+
+    pipeline = Pipeline(threads=3)
+    pipeline.add_task("a", task("a", 1))
+    pipeline.add_task("b", task("b", 10))
+    pipeline.add_task("c", task("c", 100), depends_on=["a"])
+    pipeline.add_task("d", task("d", 1000), depends_on=["b", "c"])
+
+    results = pipeline.run()
+
+    assert results == {"a": 1, "b": 10, "c": 101, "d": 1111}
+    assert order.index("a") < order.index("c") < order.index("d")
+    assert order.index("b") < order.index("d")
+
+
+def test_pipeline_concurrent_tasks():
+    # both tasks wait for each other, which only succeeds if they run concurrently
+    barrier = [threading.Event(), threading.Event()]
+
+    def task(index):
+        def func():
+            barrier[index].set()
+            assert barrier[1 - index].wait(5)
+            return index
+
+        return func
+
+    pipeline = Pipeline(threads=2)
+    pipeline.add_task("first", task(0))
+    pipeline.add_task("second", task(1))
+
+    assert pipeline.run() == {"first": 0, "second": 1}
+
+
+def test_pipeline_failure():
+    called = []
+
+    def fail():
+        raise ValueError("task failed")
+
+    pipeline = Pipeline(threads=1)
+    pipeline.add_task("a", fail)
+    pipeline.add_task("b", lambda: called.append("b"))
+    pipeline.add_task("c", lambda *_: called.append("c"), depends_on=["a", "b"])
+
+    with pytest.raises(ValueError, match="task failed"):
+        pipeline.run()
+
+    # no tasks are started after the failure
+    assert called == []
+
+
+def test_pipeline_add_task_errors():
+    pipeline = Pipeline()
+    pipeline.add_task("a", lambda: None)
+
+    with pytest.raises(ValueError, match="Task 'a' is already in the pipeline"):
+        pipeline.add_task("a", lambda: None)
+    with pytest.raises(ValueError, match="Task 'b' depends on an unknown task 'c'"):
+        pipeline.add_task("b", lambda _: None, depends_on=["c"])
@@ -4,6 +4,7 @@ import mock
 import pytest
 import requests_mock
 import requests
+import threading
 
 from pubtools._quay import exceptions
 from pubtools._quay import quay_client
@@ -200,6 +201,31 @@ def test_get_operator_push_items_ok(
     assert items == [operator_push_item_ok, operator_push_item_ok2]
 
 
+@mock.patch("pubtools._quay.push_docker.QuayClient")
+@mock.patch("pubtools._quay.push_docker.QuayApiClient")
+def test_get_bundle_push_items(
+    mock_quay_api_client,
+    mock_quay_client,
+    target_settings,
+    operator_push_item_ok,
+    container_push_item_ok,
+    container_multiarch_push_item,
+):
+    hub = mock.MagicMock()
+    container_multiarch_push_item.metadata["tags"] = {"repo": ["1.0"]}
+    push_docker_instance = push_docker.PushDocker(
+        [operator_push_item_ok, container_push_item_ok, container_multiarch_push_item],
+        hub,
+        "1",
+        "some-target",
+        target_settings,
+    )
+    items = push_docker_instance.get_bundle_push_items(
+        [container_push_item_ok, container_multiarch_push_item], [operator_push_item_ok]
+    )
+    assert items == [container_multiarch_push_item]
+
+
 @mock.patch("pubtools._quay.push_docker.QuayClient")
 @mock.patch("pubtools._quay.push_docker.QuayApiClient")
 def test_get_operator_push_item_errors(
@@ -273,19 +299,20 @@ def test_get_operator_push_item_no_ocp_versions(
         items = push_docker_instance.get_operator_push_items()
 
 
-@mock.patch("pubtools._quay.push_docker.run_entrypoint")
+@mock.patch("pubtools._quay.push_docker.get_target_pyxis_client")
 @mock.patch("pubtools._quay.push_docker.QuayClient")
 @mock.patch("pubtools._quay.push_docker.QuayApiClient")
 def test_get_repo_metadata(
     mock_quay_api_client,
     mock_quay_client,
-    mock_run_entrypoint,
+    mock_get_pyxis_client,
     target_settings,
     container_multiarch_push_item,
     operator_push_item_ok,
 ):
     hub = mock.MagicMock()
-    mock_run_entrypoint.return_value = {"key": "value"}
+    mock_get_metadata = mock_get_pyxis_client.return_value.get_repository_metadata
+    mock_get_metadata.return_value = {"key": "value"}
     push_docker_instance = push_docker.PushDocker(
         [container_multiarch_push_item, operator_push_item_ok],
         hub,
@@ -296,21 +323,20 @@ def test_get_repo_metadata(
     res = push_docker_instance.get_repo_metadata("some_repo", target_settings)
 
     assert res == {"key": "value"}
-    mock_run_entrypoint.assert_called_once_with(
-        ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-repo-metadata"),
-        "pubtools-pyxis-get-repo-metadata",
-        [
-            "--pyxis-server",
-            "pyxis-url.com",
-            "--pyxis-krb-principal",
-            "some-principal@REDHAT.COM",
-            "--pyxis-krb-ktfile",
-            "/etc/pub/some.keytab",
-            "--repo-name",
-            "some_repo",
-        ],
-        {},
-    )
+    mock_get_pyxis_client.assert_called_once_with(target_settings)
+    mock_get_metadata.assert_called_once_with("some_repo")
+
+
+@mock.patch("pubtools._quay.push_docker.get_target_pyxis_client")
+def test_get_repo_metadata_cached(mock_get_pyxis_client, target_settings, tmpdir):
+    target_settings["quay_metadata_cache_path"] = str(tmpdir.join("metadata.db"))
+    mock_get_metadata = mock_get_pyxis_client.return_value.get_repository_metadata
+    mock_get_metadata.side_effect = [{"key": "value1"}, {"key": "value2"}]
+
+    assert push_docker.PushDocker.get_repo_metadata("repo1", target_settings) == {"key": "value1"}
+    assert push_docker.PushDocker.get_repo_metadata("repo1", target_settings) == {"key": "value1"}
+    assert push_docker.PushDocker.get_repo_metadata("repo2", target_settings) == {"key": "value2"}
+    assert mock_get_metadata.call_count == 2
 
 
 @mock.patch("pubtools._quay.push_docker.PushDocker.get_repo_metadata")
@@ -390,10 +416,13 @@ def test_check_repos_validity_missing_repo(
 
     response = mock.MagicMock()
     response.status_code = 404
-    mock_get_repo_metadata.side_effect = [
-        {"release_categories": "value1"},
-        requests.exceptions.HTTPError("missing", response=response),
-    ]
+
+    def get_repo_metadata(repo, target_settings):
+        if repo == "namespace/repo1":
+            return {"release_categories": "value1"}
+        raise requests.exceptions.HTTPError("missing", response=response)
+
+    mock_get_repo_metadata.side_effect = get_repo_metadata
     target_settings["propagated_from"] = "target_stage_quay"
     push_docker_instance = push_docker.PushDocker(
         [container_push_item_ok, container_signing_push_item],
@@ -402,7 +431,7 @@ def test_check_repos_validity_missing_repo(
         "some-target",
         target_settings,
     )
-    with pytest.raises(exceptions.InvalidRepository, match=".*doesn't exist in Comet.*"):
+    with pytest.raises(exceptions.InvalidRepository) as exc_info:
         push_docker_instance.check_repos_validity(
             [container_push_item_ok, container_signing_push_item],
             hub,
@@ -410,8 +439,13 @@ def test_check_repos_validity_missing_repo(
             mock_quay_api_client,
         )
 
+    # all invalid repos are reported at once
+    assert str(exc_info.value) == (
+        "2 invalid repositories: Repository namespace/repo2 doesn't exist in Comet; "
+        "Repository test_repo doesn't exist in Comet"
+    )
     mock_get_target_info.assert_called_once_with("target_stage_quay")
-    assert mock_get_repo_metadata.call_count == 2
+    assert mock_get_repo_metadata.call_count == 3
     mock_get_repo_metadata.call_args_list[0] == mock.call("namespace/repo1")
     mock_get_repo_metadata.call_args_list[1] == mock.call("namespace/repo2")
 
@@ -436,10 +470,13 @@ def test_check_repos_validity_get_repo_server_error(
 
     response = mock.MagicMock()
     response.status_code = 500
-    mock_get_repo_metadata.side_effect = [
-        {"release_categories": "value1"},
-        requests.exceptions.HTTPError("server error", response=response),
-    ]
+
+    def get_repo_metadata(repo, target_settings):
+        if repo == "namespace/repo2":
+            raise requests.exceptions.HTTPError("server error", response=response)
+        return {"release_categories": "value1"}
+
+    mock_get_repo_metadata.side_effect = get_repo_metadata
     target_settings["propagated_from"] = "target_stage_quay"
     push_docker_instance = push_docker.PushDocker(
         [container_push_item_ok, container_signing_push_item],
@@ -457,7 +494,7 @@ def test_check_repos_validity_get_repo_server_error(
         )
 
     mock_get_target_info.assert_called_once_with("target_stage_quay")
-    assert mock_get_repo_metadata.call_count == 2
+    assert mock_get_repo_metadata.call_count == 3
     mock_get_repo_metadata.call_args_list[0] == mock.call("namespace/repo1")
     mock_get_repo_metadata.call_args_list[1] == mock.call("namespace/repo2")
 
@@ -480,10 +517,9 @@ def test_check_repos_validity_deprecated_repo(
     hub = mock.MagicMock()
     hub.worker = mock_worker
 
-    mock_get_repo_metadata.side_effect = [
-        {"release_categories": "value1"},
-        {"release_categories": "Deprecated"},
-    ]
+    mock_get_repo_metadata.side_effect = lambda repo, target_settings: {
+        "release_categories": "Deprecated" if repo == "namespace/repo2" else "value1"
+    }
     target_settings["propagated_from"] = "target_stage_quay"
     push_docker_instance = push_docker.PushDocker(
         [container_push_item_ok, container_signing_push_item],
@@ -494,7 +530,7 @@ def test_check_repos_validity_deprecated_repo(
     )
     with pytest.raises(exceptions.InvalidRepository, match=".*is deprecated.*"):
         push_docker_instance.check_repos_validity(
-            [container_push_item_ok, container_signing_push_item],
+            [container_signing_push_item],
             hub,
             target_settings,
             mock_quay_api_client,
@@ -526,17 +562,17 @@ def test_check_repos_validity_missing_stage_repo(
 
     response = mock.MagicMock()
     response.status_code = 404
+
+    def get_repository_data(repo):
+        if repo == "stage_namespace/namespace----repo2":
+            raise requests.exceptions.HTTPError("missing", response=response)
+        return "repo_data"
+
     mock_get_repository_data = mock.MagicMock()
-    mock_get_repository_data.side_effect = [
-        "repo_data1",
-        requests.exceptions.HTTPError("missing", response=response),
-    ]
+    mock_get_repository_data.side_effect = get_repository_data
     mock_quay_api_client.get_repository_data = mock_get_repository_data
 
-    mock_get_repo_metadata.side_effect = [
-        {"release_categories": "value1"},
-        {"release_categories": "value2"},
-    ]
+    mock_get_repo_metadata.return_value = {"release_categories": "value1"}
     target_settings["propagated_from"] = "target_stage_quay"
     push_docker_instance = push_docker.PushDocker(
         [container_push_item_ok, container_signing_push_item],
@@ -547,7 +583,7 @@ def test_check_repos_validity_missing_stage_repo(
     )
     with pytest.raises(exceptions.InvalidRepository, match=".*doesn't exist on stage.*"):
         push_docker_instance.check_repos_validity(
-            [container_push_item_ok, container_signing_push_item],
+            [container_signing_push_item],
             hub,
             target_settings,
             mock_quay_api_client,
@@ -582,17 +618,17 @@ def test_check_repos_validity_get_stage_repo_server_error(
 
     response = mock.MagicMock()
     response.status_code = 500
+
+    def get_repository_data(repo):
+        if repo == "stage_namespace/namespace----repo2":
+            raise requests.exceptions.HTTPError("server error", response=response)
+        return "repo_data"
+
     mock_get_repository_data = mock.MagicMock()
-    mock_get_repository_data.side_effect = [
-        "repo_data1",
-        requests.exceptions.HTTPError("server error", response=response),
-    ]
+    mock_get_repository_data.side_effect = get_repository_data
     mock_quay_api_client.get_repository_data = mock_get_repository_data
 
-    mock_get_repo_metadata.side_effect = [
-        {"release_categories": "value1"},
-        {"release_categories": "value2"},
-    ]
+    mock_get_repo_metadata.return_value = {"release_categories": "value1"}
     target_settings["propagated_from"] = "target_stage_quay"
     push_docker_instance = push_docker.PushDocker(
         [container_push_item_ok, container_signing_push_item],
@@ -603,7 +639,7 @@ def test_check_repos_validity_get_stage_repo_server_error(
     )
     with pytest.raises(requests.exceptions.HTTPError, match=".*server error*"):
         push_docker_instance.check_repos_validity(
-            [container_push_item_ok, container_signing_push_item],
+            [container_signing_push_item],
             hub,
             target_settings,
             mock_quay_api_client,
@@ -640,7 +676,6 @@ def test_generate_backup_mapping(
     mock_quay_api_client.return_value.get_repository_data = mock_get_repository_data
 
     mock_get_manifest = mock.MagicMock()
-    mock_get_manifest.return_value = "some-manifest-list"
     mock_quay_client.return_value.get_manifest = mock_get_manifest
 
     push_docker_instance = push_docker.PushDocker(
@@ -657,7 +692,7 @@ def test_generate_backup_mapping(
     assert backup_tags == {
         push_docker.PushDocker.ImageData(
             repo="some-namespace/target----repo", tag="latest-test-tag"
-        ): "some-manifest-list"
+        ): "sha256:a1a1a1a1a1a1"
     }
     assert rollback_tags == [
         push_docker.PushDocker.ImageData(repo="some-namespace/target----repo1", tag="tag1"),
@@ -669,9 +704,8 @@ def test_generate_backup_mapping(
     assert mock_get_repository_data.call_args_list[1] == mock.call("some-namespace/target----repo1")
     assert mock_get_repository_data.call_args_list[2] == mock.call("some-namespace/target----repo2")
 
-    mock_get_manifest.assert_called_once_with(
-        "quay.io/some-namespace/target----repo@sha256:a1a1a1a1a1a1"
-    )
+    # only digests are backed up, manifests aren't downloaded
+    mock_get_manifest.assert_not_called()
 
 
 @mock.patch("pubtools._quay.push_docker.QuayClient")
@@ -722,16 +756,18 @@ def test_rollback(
     hub = mock.MagicMock()
     mock_upload_manifest = mock.MagicMock()
     mock_quay_client.return_value.upload_manifest = mock_upload_manifest
+    mock_restore_tag = mock.MagicMock()
+    mock_quay_api_client.return_value.restore_tag = mock_restore_tag
     mock_delete_tag = mock.MagicMock()
     mock_quay_api_client.return_value.delete_tag = mock_delete_tag
 
     backup_tags = {
         push_docker.PushDocker.ImageData(
             repo="some-namespace/target----repo1", tag="1"
-        ): "some-manifest-list",
+        ): "sha256:a1a1a1a1a1a1",
         push_docker.PushDocker.ImageData(
             repo="some-namespace/target----repo2", tag="2"
-        ): "other-manifest-list",
+        ): "sha256:b2b2b2b2b2b2",
     }
     rollback_tags = [
         push_docker.PushDocker.ImageData(repo="some-namespace/target----repo3", tag="3"),
@@ -744,18 +780,111 @@ def test_rollback(
         "some-target",
         target_settings,
     )
-    push_docker_instance.rollback(backup_tags, rollback_tags)
+    report = push_docker_instance.rollback(backup_tags, rollback_tags)
 
-    assert mock_upload_manifest.call_count == 2
-    assert mock_upload_manifest.call_args_list[0] == mock.call(
-        "some-manifest-list", "quay.io/some-namespace/target----repo1:1"
-    )
-    assert mock_upload_manifest.call_args_list[1] == mock.call(
-        "other-manifest-list", "quay.io/some-namespace/target----repo2:2"
+    mock_upload_manifest.assert_not_called()
+    # operations run in parallel, so their order isn't guaranteed
+    assert mock_restore_tag.call_count == 2
+    mock_restore_tag.assert_has_calls(
+        [
+            mock.call("some-namespace/target----repo1", "1", "sha256:a1a1a1a1a1a1"),
+            mock.call("some-namespace/target----repo2", "2", "sha256:b2b2b2b2b2b2"),
+        ],
+        any_order=True,
     )
     assert mock_delete_tag.call_count == 2
-    assert mock_delete_tag.call_args_list[0] == mock.call("some-namespace/target----repo3", "3")
-    assert mock_delete_tag.call_args_list[1] == mock.call("some-namespace/target----repo4", "4")
+    mock_delete_tag.assert_has_calls(
+        [
+            mock.call("some-namespace/target----repo3", "3"),
+            mock.call("some-namespace/target----repo4", "4"),
+        ],
+        any_order=True,
+    )
+    assert report.restored == sorted(backup_tags.keys())
+    assert report.deleted == rollback_tags
+    assert report.failed == []
+
+
+@mock.patch("pubtools._quay.push_docker.time.sleep")
+@mock.patch("pubtools._quay.push_docker.QuayClient")
+@mock.patch("pubtools._quay.push_docker.QuayApiClient")
+def test_rollback_failures(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_sleep,
+    target_settings,
+    container_multiarch_push_item,
+):
+    hub = mock.MagicMock()
+    target_settings["quay_rollback_retries"] = 2
+    server_error = requests.exceptions.HTTPError(
+        "server error", response=mock.Mock(status_code=500)
+    )
+    client_error = requests.exceptions.HTTPError("forbidden", response=mock.Mock(status_code=403))
+
+    def restore_tag(repo, tag, digest):
+        # first tag recovers after a retry, second one fails permanently
+        if tag == "1" and mock_sleep.call_count == 0:
+            raise server_error
+        if tag == "2":
+            raise client_error
+
+    mock_quay_api_client.return_value.restore_tag.side_effect = restore_tag
+    mock_delete_tag = mock.MagicMock()
+    mock_delete_tag.side_effect = requests.exceptions.ConnectionError("connection lost")
+    mock_quay_api_client.return_value.delete_tag = mock_delete_tag
+
+    image_data1 = push_docker.PushDocker.ImageData(repo="some-namespace/target----repo1", tag="1")
+    image_data2 = push_docker.PushDocker.ImageData(repo="some-namespace/target----repo2", tag="2")
+    image_data3 = push_docker.PushDocker.ImageData(repo="some-namespace/target----repo3", tag="3")
+    target_settings["quay_max_concurrent_requests"] = 1
+
+    push_docker_instance = push_docker.PushDocker(
+        [container_multiarch_push_item], hub, "1", "some-target", target_settings
+    )
+    report = push_docker_instance.rollback(
+        {image_data1: "sha256:a1a1a1a1a1a1", image_data2: "sha256:b2b2b2b2b2b2"}, [image_data3]
+    )
+
+    assert report.restored == [image_data1]
+    assert report.deleted == []
+    assert report.failed == [
+        (image_data2, client_error),
+        (image_data3, mock_delete_tag.side_effect),
+    ]
+    # client error isn't retried, connection error is retried until retries are exhausted
+    assert mock_quay_api_client.return_value.restore_tag.call_count == 3
+    assert mock_delete_tag.call_count == 3
+    assert mock_sleep.call_count == 3
+
+
+@mock.patch("pubtools._quay.push_docker.QuayClient")
+@mock.patch("pubtools._quay.push_docker.QuayApiClient")
+def test_rollback_deleted_tag_not_found(
+    mock_quay_api_client,
+    mock_quay_client,
+    target_settings,
+    container_multiarch_push_item,
+):
+    hub = mock.MagicMock()
+    not_found = requests.exceptions.HTTPError("not found", response=mock.Mock(status_code=404))
+    mock_quay_api_client.return_value.delete_tag.side_effect = not_found
+    mock_quay_api_client.return_value.restore_tag.side_effect = not_found
+    image_data1 = push_docker.PushDocker.ImageData(repo="some-namespace/target----repo1", tag="1")
+    image_data2 = push_docker.PushDocker.ImageData(repo="some-namespace/target----repo2", tag="2")
+
+    push_docker_instance = push_docker.PushDocker(
+        [container_multiarch_push_item], hub, "1", "some-target", target_settings
+    )
+    report = push_docker_instance.rollback({image_data1: "sha256:a1a1a1a1a1a1"}, [image_data2])
+
+    # tag which is already gone is rolled back, but a tag which can't be restored isn't
+    assert report.deleted == [image_data2]
+    assert report.restored == []
+    assert report.failed == [(image_data1, not_found)]
+    mock_quay_api_client.return_value.delete_tag.assert_called_once_with(
+        "some-namespace/target----repo2", "2"
+    )
 
 
 @mock.patch("pubtools._quay.push_docker.PushDocker.rollback")
@@ -837,16 +966,127 @@ def test_push_docker_full_success(
         [container_multiarch_push_item, container_push_item_external_repos]
     )
     mock_operator_pusher.assert_called_once_with([operator_push_item_ok], target_settings)
-    mock_build_index_images.assert_called_once_with()
+    mock_operator_pusher.return_value.prepare_index_image_builds.assert_called_once_with()
+    mock_build_index_images.assert_called_once_with(
+        mock_operator_pusher.return_value.prepare_index_image_builds.return_value
+    )
     mock_push_index_images.assert_called_once_with({"v4.5": {"some": "data"}})
     mock_operator_signature_handler.assert_called_once_with(
         hub, "1", target_settings, "some-target"
     )
     mock_sign_operator_images.assert_called_once_with({"v4.5": {"some": "data"}})
+    # both handlers share the signing session, which is closed at the end
+    mock_operator_signature_handler.return_value.set_signing_session.assert_called_once_with(
+        mock_container_signature_handler.return_value.signing_session
+    )
+    mock_container_signature_handler.return_value.close_signing_session.assert_called_once_with()
     mock_rollback.assert_not_called()
     assert repos == ["external/repo", "test_repo"]
 
 
+@mock.patch("pubtools._quay.push_docker.OperatorSignatureHandler")
+@mock.patch("pubtools._quay.push_docker.OperatorPusher")
+@mock.patch("pubtools._quay.push_docker.ContainerSignatureHandler")
+@mock.patch("pubtools._quay.push_docker.ContainerImagePusher")
+@mock.patch("pubtools._quay.push_docker.QuayClient")
+@mock.patch("pubtools._quay.push_docker.QuayApiClient")
+def test_push_images_no_bundles_sign_index_after_containers(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_container_image_pusher,
+    mock_container_signature_handler,
+    mock_operator_pusher,
+    mock_operator_signature_handler,
+    target_settings,
+    container_multiarch_push_item,
+    operator_push_item_ok,
+):
+    events = []
+    index_built = threading.Event()
+    index_signed = threading.Event()
+
+    def sign_container_images(push_items):
+        # index images are built while container images are being signed
+        assert index_built.wait(10)
+        # index images mustn't be signed before container signing has finished
+        index_signed.wait(0.5)
+        events.append("sign_container_images")
+
+    def sign_operator_images(iib_results):
+        events.append("sign_index_images")
+        index_signed.set()
+
+    def build_index_images(builds):
+        events.append("build_index_images")
+        index_built.set()
+        return {"v4.5": {"some": "data"}}
+
+    mock_container_signature_handler.return_value.sign_container_images.side_effect = (
+        sign_container_images
+    )
+    mock_operator_pusher.return_value.build_index_images.side_effect = build_index_images
+    mock_operator_signature_handler.return_value.sign_operator_images.side_effect = (
+        sign_operator_images
+    )
+    push_docker_instance = push_docker.PushDocker(
+        [container_multiarch_push_item], mock.MagicMock(), "1", "some-target", target_settings
+    )
+
+    push_docker_instance.push_images([container_multiarch_push_item], [operator_push_item_ok])
+
+    # index images share the signing session, so they're signed after the container images
+    assert events == ["build_index_images", "sign_container_images", "sign_index_images"]
+    mock_operator_signature_handler.return_value.sign_operator_images.assert_called_once_with(
+        {"v4.5": {"some": "data"}}
+    )
+
+
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_pyxis")
+@mock.patch("pubtools._quay.push_docker.ContainerSignatureHandler.sign_container_images")
+@mock.patch("pubtools._quay.push_docker.ContainerImagePusher")
+@mock.patch("pubtools._quay.push_docker.QuayClient")
+@mock.patch("pubtools._quay.push_docker.QuayApiClient")
+def test_push_images_reconcile_signature_index(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_container_image_pusher,
+    mock_sign_container_images,
+    mock_get_signatures,
+    target_settings,
+    container_multiarch_push_item,
+    existing_signatures,
+    tmpdir,
+):
+    target_settings["quay_signature_index_path"] = str(tmpdir.join("index.db"))
+    index = push_docker.ContainerSignatureHandler(
+        mock.MagicMock(), "1", target_settings, "some-target"
+    ).signature_index
+    index.add(
+        [
+            ("registry.com/image:1", "sha256:f4f4f4f", "key1"),
+            ("registry.com/image:1", "sha256:b3b3b3b", "key1"),
+        ]
+    )
+    mock_get_signatures.return_value = existing_signatures[:1]
+    push_docker_instance = push_docker.PushDocker(
+        [container_multiarch_push_item], mock.MagicMock(), "1", "some-target", target_settings
+    )
+
+    # the index is reconciled only on request
+    push_docker_instance.push_images([container_multiarch_push_item], [])
+    mock_get_signatures.assert_not_called()
+    assert index.get_manifest_digests() == ["sha256:b3b3b3b", "sha256:f4f4f4f"]
+
+    target_settings["quay_signature_index_reconcile"] = True
+    push_docker_instance.push_images([container_multiarch_push_item], [])
+    mock_get_signatures.assert_called_once_with(
+        manifest_digests=["sha256:b3b3b3b", "sha256:f4f4f4f"]
+    )
+    # signature deleted from Pyxis was removed before the images were signed
+    assert index.get_manifest_digests() == ["sha256:f4f4f4f"]
+    assert mock_sign_container_images.call_count == 2
+
+
 @mock.patch("pubtools._quay.push_docker.PushDocker.rollback")
 @mock.patch("pubtools._quay.push_docker.OperatorSignatureHandler")
 @mock.patch("pubtools._quay.push_docker.OperatorPusher")
@@ -985,14 +1225,245 @@ def test_push_docker_failure_rollback(
         hub, "1", target_settings, "some-target"
     )
     mock_sign_container_images.assert_called_once_with([container_multiarch_push_item])
-    mock_operator_pusher.assert_not_called()
-    mock_build_index_images.assert_not_called()
+    # index images may be built concurrently with the container push, but aren't pushed
+    mock_operator_pusher.assert_called_once_with([operator_push_item_ok], target_settings)
     mock_push_index_images.assert_not_called()
-    mock_operator_signature_handler.assert_not_called()
-    mock_sign_operator_images.assert_not_called()
     mock_rollback.assert_called_once_with({"some-key": "some-val"}, ["item1", "item2"])
 
 
+@mock.patch("pubtools._quay.push_docker.PushDocker.rollback")
+@mock.patch("pubtools._quay.push_docker.ContainerSignatureHandler")
+@mock.patch("pubtools._quay.push_docker.ContainerImagePusher")
+@mock.patch("pubtools._quay.push_docker.PushDocker.generate_backup_mapping")
+@mock.patch("pubtools._quay.push_docker.PushDocker.check_repos_validity")
+@mock.patch("pubtools._quay.push_docker.PushDocker.get_operator_push_items")
+@mock.patch("pubtools._quay.push_docker.PushDocker.get_docker_push_items")
+@mock.patch("pubtools._quay.push_docker.QuayClient")
+@mock.patch("pubtools._quay.push_docker.QuayApiClient")
+def test_push_docker_failure_journaled_rollback(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_docker_push_items,
+    mock_get_operator_push_items,
+    mock_check_repos_validity,
+    mock_generate_backup_mapping,
+    mock_container_image_pusher,
+    mock_container_signature_handler,
+    mock_rollback,
+    target_settings,
+    container_multiarch_push_item,
+    tmpdir,
+):
+    hub = mock.MagicMock()
+    target_settings["quay_push_journal_dir"] = str(tmpdir)
+    image_data1 = push_docker.PushDocker.ImageData("some-namespace/target----repo", "1")
+    image_data2 = push_docker.PushDocker.ImageData("some-namespace/target----repo", "2")
+    image_data3 = push_docker.PushDocker.ImageData("some-namespace/target----repo", "3")
+
+    push_docker_instance = push_docker.PushDocker(
+        [container_multiarch_push_item], hub, "1", "some-target", target_settings
+    )
+
+    def push_container_images():
+        # only tag '1' and '3' were modified before the failure
+        push_docker_instance.journal.record(
+            "copy",
+            "some-registry/src/repo:1",
+            status="started",
+            data={
+                "dest_refs": [
+                    "quay.io/some-namespace/target----repo:1",
+                    "quay.io/some-namespace/target----repo:3",
+                ]
+            },
+        )
+        raise ValueError("Error pushing container images")
+
+    mock_container_image_pusher.return_value.push_container_images.side_effect = (
+        push_container_images
+    )
+    mock_get_docker_push_items.return_value = [container_multiarch_push_item]
+    mock_get_operator_push_items.return_value = []
+    mock_generate_backup_mapping.return_value = (
+        {image_data1: "sha256:a1a1a1a1a1a1", image_data2: "sha256:b2b2b2b2b2b2"},
+        [image_data3],
+    )
+    mock_rollback.return_value = push_docker.PushDocker.RollbackReport(
+        [image_data1], [image_data3], []
+    )
+
+    with pytest.raises(ValueError, match="Error pushing container images"):
+        push_docker_instance.run()
+
+    mock_container_image_pusher.return_value.set_journal.assert_called_once_with(
+        push_docker_instance.journal
+    )
+    mock_rollback.assert_called_once_with({image_data1: "sha256:a1a1a1a1a1a1"}, [image_data3])
+    # push was rolled back, re-run has to start from the beginning
+    assert not tmpdir.join("push-1.jsonl").exists()
+
+
+@mock.patch("pubtools._quay.push_docker.PushDocker.rollback")
+@mock.patch("pubtools._quay.push_docker.ContainerSignatureHandler")
+@mock.patch("pubtools._quay.push_docker.ContainerImagePusher")
+@mock.patch("pubtools._quay.push_docker.PushDocker.generate_backup_mapping")
+@mock.patch("pubtools._quay.push_docker.PushDocker.check_repos_validity")
+@mock.patch("pubtools._quay.push_docker.PushDocker.get_operator_push_items")
+@mock.patch("pubtools._quay.push_docker.PushDocker.get_docker_push_items")
+@mock.patch("pubtools._quay.push_docker.QuayClient")
+@mock.patch("pubtools._quay.push_docker.QuayApiClient")
+def test_push_docker_failure_rollback_disabled_resume(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_docker_push_items,
+    mock_get_operator_push_items,
+    mock_check_repos_validity,
+    mock_generate_backup_mapping,
+    mock_container_image_pusher,
+    mock_container_signature_handler,
+    mock_rollback,
+    target_settings,
+    container_multiarch_push_item,
+    tmpdir,
+):
+    hub = mock.MagicMock()
+    target_settings["quay_push_journal_dir"] = str(tmpdir)
+    target_settings["quay_rollback_enabled"] = False
+    image_data1 = push_docker.PushDocker.ImageData("some-namespace/target----repo", "1")
+    image_data2 = push_docker.PushDocker.ImageData("some-namespace/target----repo", "2")
+
+    mock_push_container_images = mock.MagicMock()
+    mock_push_container_images.side_effect = [ValueError("Error pushing container images"), None]
+    mock_container_image_pusher.return_value.push_container_images = mock_push_container_images
+    mock_get_docker_push_items.return_value = [container_multiarch_push_item]
+    mock_get_operator_push_items.return_value = []
+    mock_generate_backup_mapping.return_value = (
+        {image_data1: "sha256:a1a1a1a1a1a1"},
+        [image_data2],
+    )
+
+    push_docker_instance = push_docker.PushDocker(
+        [container_multiarch_push_item], hub, "1", "some-target", target_settings
+    )
+    with pytest.raises(ValueError, match="Error pushing container images"):
+        push_docker_instance.run()
+    mock_rollback.assert_not_called()
+
+    # re-run uses the journaled backup mapping, as the tags may have been modified already
+    push_docker_instance = push_docker.PushDocker(
+        [container_multiarch_push_item], hub, "1", "some-target", target_settings
+    )
+    assert push_docker_instance.get_backup_mapping([container_multiarch_push_item]) == (
+        {image_data1: "sha256:a1a1a1a1a1a1"},
+        [image_data2],
+    )
+    push_docker_instance.run()
+
+    mock_generate_backup_mapping.assert_called_once_with([container_multiarch_push_item])
+    assert mock_push_container_images.call_count == 2
+    mock_rollback.assert_not_called()
+    # journal of the finished push is removed
+    assert not tmpdir.join("push-1.jsonl").exists()
+
+
+@mock.patch("pubtools._quay.push_docker.PushDocker.rollback")
+@mock.patch("pubtools._quay.push_docker.ContainerSignatureHandler")
+@mock.patch("pubtools._quay.push_docker.ContainerImagePusher")
+@mock.patch("pubtools._quay.push_docker.PushDocker.generate_backup_mapping")
+@mock.patch("pubtools._quay.push_docker.PushDocker.check_repos_validity")
+@mock.patch("pubtools._quay.push_docker.PushDocker.get_operator_push_items")
+@mock.patch("pubtools._quay.push_docker.PushDocker.get_docker_push_items")
+@mock.patch("pubtools._quay.push_docker.QuayClient")
+@mock.patch("pubtools._quay.push_docker.QuayApiClient")
+def test_push_docker_failure_partial_rollback_resume(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_docker_push_items,
+    mock_get_operator_push_items,
+    mock_check_repos_validity,
+    mock_generate_backup_mapping,
+    mock_container_image_pusher,
+    mock_container_signature_handler,
+    mock_rollback,
+    target_settings,
+    container_multiarch_push_item,
+    tmpdir,
+):
+    hub = mock.MagicMock()
+    target_settings["quay_push_journal_dir"] = str(tmpdir)
+    image_data1 = push_docker.PushDocker.ImageData("some-namespace/target----repo", "1")
+    image_data2 = push_docker.PushDocker.ImageData("some-namespace/target----repo", "2")
+    item_key1 = "some-registry/src/repo:1 target/repo:1"
+    item_key2 = "some-registry/src/repo:2 target/repo:2"
+    merge_key1 = "some-registry/src/repo:1 quay.io/some-namespace/target----repo:1"
+    merge_key2 = "some-registry/src/repo:2 quay.io/some-namespace/target----repo:2"
+
+    push_docker_instance = push_docker.PushDocker(
+        [container_multiarch_push_item], hub, "1", "some-target", target_settings
+    )
+
+    def push_container_images():
+        journal = push_docker_instance.journal
+        for key, merge_key, tag in [(item_key1, merge_key1, "1"), (item_key2, merge_key2, "2")]:
+            dest_ref = "quay.io/some-namespace/target----repo:{0}".format(tag)
+            journal.record("copy", key, data={"dest_refs": [dest_ref]})
+            journal.record("container_signatures", key)
+            journal.record("merge", merge_key, data={"dest_ref": dest_ref})
+        raise ValueError("Error pushing container images")
+
+    mock_push_container_images = mock.MagicMock()
+    mock_push_container_images.side_effect = push_container_images
+    mock_container_image_pusher.return_value.push_container_images = mock_push_container_images
+    mock_get_docker_push_items.return_value = [container_multiarch_push_item]
+    mock_get_operator_push_items.return_value = []
+    mock_generate_backup_mapping.return_value = (
+        {image_data1: "sha256:a1a1a1a1a1a1", image_data2: "sha256:b2b2b2b2b2b2"},
+        [],
+    )
+    # rollback of tag '2' has failed
+    mock_rollback.return_value = push_docker.PushDocker.RollbackReport(
+        [image_data1], [], [(image_data2, "some error")]
+    )
+
+    with pytest.raises(ValueError, match="Error pushing container images"):
+        push_docker_instance.run()
+
+    assert tmpdir.join("push-1.jsonl").exists()
+
+    # re-run performs again only the units of the restored tag '1'
+    push_docker_instance = push_docker.PushDocker(
+        [container_multiarch_push_item], hub, "1", "some-target", target_settings
+    )
+    journal_states = {}
+
+    def resume_container_images():
+        journal = push_docker_instance.journal
+        for unit, key in [
+            ("copy", item_key1),
+            ("copy", item_key2),
+            ("container_signatures", item_key1),
+            ("container_signatures", item_key2),
+            ("merge", merge_key1),
+            ("merge", merge_key2),
+        ]:
+            journal_states[(unit, key)] = journal.is_done(unit, key)
+
+    mock_push_container_images.side_effect = resume_container_images
+    push_docker_instance.run()
+
+    assert journal_states == {
+        ("copy", item_key1): False,
+        ("copy", item_key2): True,
+        ("container_signatures", item_key1): False,
+        ("container_signatures", item_key2): True,
+        ("merge", merge_key1): False,
+        ("merge", merge_key2): True,
+    }
+    mock_generate_backup_mapping.assert_called_once_with([container_multiarch_push_item])
+    mock_rollback.assert_called_once()
+    assert not tmpdir.join("push-1.jsonl").exists()
+
+
 @mock.patch("pubtools._quay.push_docker.PushDocker")
 def test_mod_entrypoint(
     mock_push_docker, container_multiarch_push_item, operator_push_item_ok, target_settings
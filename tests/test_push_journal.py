@@ -0,0 +1,66 @@
+import json
+
+from pubtools._quay.push_journal import PushJournal
+
+
+def test_record_and_load(tmpdir):
+    journal_dir = str(tmpdir.join("journal"))
+    journal = PushJournal(journal_dir, "1")
+    journal.record("copy", "some-registry/src/repo:1", status=journal.STARTED, data={"a": 1})
+    journal.record("copy", "some-registry/src/repo:2", data={"b": 2})
+
+    assert not journal.is_done("copy", "some-registry/src/repo:1")
+    assert journal.is_done("copy", "some-registry/src/repo:2")
+    assert not journal.is_done("merge", "some-registry/src/repo:2")
+
+    journal.record("copy", "some-registry/src/repo:1", data={"a": 1})
+
+    # new instance of the same task loads the entries
+    journal2 = PushJournal(journal_dir, "1")
+    assert journal2.is_done("copy", "some-registry/src/repo:1")
+    assert journal2.get_data("copy", "some-registry/src/repo:1") == {"a": 1}
+    assert journal2.get_data("copy", "missing") is None
+    assert [e["key"] for e in journal2.get_entries("copy")] == [
+        "some-registry/src/repo:1",
+        "some-registry/src/repo:2",
+    ]
+
+    # other tasks have separate journals
+    assert PushJournal(journal_dir, "2").get_entries("copy") == []
+
+    with open(journal.path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [(line["key"], line["status"]) for line in lines] == [
+        ("some-registry/src/repo:1", "started"),
+        ("some-registry/src/repo:2", "done"),
+        ("some-registry/src/repo:1", "done"),
+    ]
+    assert lines[0]["task_id"] == "1"
+    assert lines[0]["unit"] == "copy"
+
+
+def test_load_corrupted_entry(tmpdir):
+    journal = PushJournal(str(tmpdir), "1")
+    journal.record("index_push", "v4.5")
+    with open(journal.path, "a") as f:
+        f.write('{"unit": "index_push", "key": "v4.6", "sta')
+
+    journal2 = PushJournal(str(tmpdir), "1")
+    assert journal2.is_done("index_push", "v4.5")
+    assert not journal2.is_done("index_push", "v4.6")
+
+
+def test_clear(tmpdir):
+    journal = PushJournal(str(tmpdir), "1")
+    journal.record("index_push", "v4.5")
+    journal.clear()
+
+    assert not tmpdir.join("push-1.jsonl").exists()
+    assert not journal.is_done("index_push", "v4.5")
+    assert not PushJournal(str(tmpdir), "1").is_done("index_push", "v4.5")
+
+
+def test_get_push_item_key(container_source_push_item):
+    assert PushJournal.get_push_item_key(container_source_push_item) == (
+        "some-registry/src/repo:1 target/repo:1.0 target/repo:latest-test-tag"
+    )
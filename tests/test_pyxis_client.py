@@ -0,0 +1,190 @@
+import os
+import sys
+
+import mock
+import pytest
+import requests
+
+from pubtools._quay import pyxis_client
+
+
+@mock.patch("pubtools._quay.pyxis_client.PyxisClient._create_client")
+def test_client_reused(mock_create_client):
+    client = pyxis_client.PyxisClient("pyxis-url.com", "some-principal", "some-keytab")
+    inner = mock_create_client.return_value
+    inner.get_container_signatures.return_value = [{"some": "data"}]
+
+    client.get_repository_metadata("namespace/repo")
+    client.get_operator_indices("v4.5-v4.7", "redhat-operators")
+    assert client.get_container_signatures(["digest1", "digest2"]) == [{"some": "data"}]
+    client.upload_signatures([{"signature_data": "data"}])
+    client.delete_container_signatures(["id1", "id2"])
+
+    mock_create_client.assert_called_once_with()
+    inner.get_repository_metadata.assert_called_once_with("namespace/repo")
+    inner.get_operator_indices.assert_called_once_with("v4.5-v4.7", "redhat-operators")
+    inner.get_container_signatures.assert_called_once_with("digest1,digest2", None)
+    inner.upload_signatures.assert_called_once_with([{"signature_data": "data"}])
+    inner.delete_container_signatures.assert_called_once_with(["id1", "id2"])
+
+
+def test_create_client():
+    mock_auth_module = mock.MagicMock()
+    mock_client_module = mock.MagicMock()
+    modules = {
+        "pubtools._pyxis": mock.MagicMock(),
+        "pubtools._pyxis.pyxis_authentication": mock_auth_module,
+        "pubtools._pyxis.pyxis_client": mock_client_module,
+    }
+    with mock.patch.dict(sys.modules, modules):
+        client = pyxis_client.PyxisClient("pyxis-url.com", "some-principal", "some-keytab")
+        assert client.client == mock_client_module.PyxisClient.return_value
+        assert client.client == mock_client_module.PyxisClient.return_value
+
+    ccache_file = client._ccache_file
+    assert os.path.exists(ccache_file)
+    mock_auth_module.PyxisKrbAuth.assert_called_once_with(
+        "some-principal", "pyxis-url.com", ccache_file, ktfile="some-keytab"
+    )
+    mock_client_module.PyxisClient.assert_called_once_with(
+        hostname="pyxis-url.com", auth=mock_auth_module.PyxisKrbAuth.return_value
+    )
+
+    client.close()
+    assert not os.path.exists(ccache_file)
+    assert client._client is None
+
+
+def test_get_pyxis_client(target_settings):
+    client1 = pyxis_client.get_pyxis_client("pyxis-url.com", "some-principal", "some-keytab")
+    client2 = pyxis_client.get_pyxis_client("pyxis-url.com", "some-principal", "some-keytab")
+    client3 = pyxis_client.get_pyxis_client("pyxis-url.com", "other-principal")
+    assert client1 is client2
+    assert client1 is not client3
+
+    client = pyxis_client.get_target_pyxis_client(target_settings)
+    assert client.server == "pyxis-url.com"
+    assert client.krb_principal == "some-principal@REDHAT.COM"
+    assert client.krb_ktfile == "/etc/pub/some.keytab"
+    assert client is pyxis_client.get_target_pyxis_client(target_settings)
+
+
+@mock.patch("pubtools._quay.pyxis_client.PyxisClient._create_client")
+def test_close_pyxis_clients(mock_create_client, tmpdir):
+    client = pyxis_client.get_pyxis_client("pyxis-url.com", "closed-principal")
+    ccache_file = str(tmpdir.join("ccache"))
+    open(ccache_file, "w").close()
+
+    def create_client():
+        client._ccache_file = ccache_file
+        return mock.MagicMock()
+
+    mock_create_client.side_effect = create_client
+    client.get_repository_metadata("namespace/repo")
+
+    pyxis_client.close_pyxis_clients()
+
+    assert not os.path.exists(ccache_file)
+    assert client._client is None
+    # closed clients aren't shared anymore
+    assert pyxis_client.get_pyxis_client("pyxis-url.com", "closed-principal") is not client
+
+
+@mock.patch("pubtools._quay.pyxis_client.time")
+@mock.patch("pubtools._quay.pyxis_client.PyxisClient.get_container_signatures")
+def test_iter_container_signatures_adaptive(mock_get_signatures, mock_time):
+    # every request is measured by two consecutive calls of time.time()
+    durations = [0.1, 0.1, 3.0, 1.5, 0.1]
+    timestamps = []
+    for duration in durations:
+        timestamps += [0, duration]
+    mock_time.time.side_effect = timestamps
+    mock_get_signatures.side_effect = lambda digests: iter([{"digests": digests}])
+
+    client = pyxis_client.PyxisClient("pyxis-url.com", "some-principal")
+    digests = ["digest{0}".format(i) for i in range(20)]
+    signatures = list(client.iter_container_signatures(digests, chunk_size=2, threads=1))
+
+    # fast requests double the chunk size, slow requests halve it
+    assert [s["digests"] for s in signatures] == [
+        digests[0:2],
+        digests[2:6],
+        digests[6:14],
+        digests[14:18],
+        digests[18:20],
+    ]
+
+
+@mock.patch("pubtools._quay.pyxis_client.PyxisClient.get_container_signatures")
+def test_iter_container_signatures_parallel(mock_get_signatures):
+    mock_get_signatures.side_effect = lambda digests: [{"digests": digests}]
+
+    client = pyxis_client.PyxisClient("pyxis-url.com", "some-principal")
+    client.MAX_SEARCH_URL_LENGTH = 10
+    digests = ["digest{0:02}".format(i) for i in range(20)]
+    signatures = list(client.iter_container_signatures(digests, chunk_size=5, threads=4))
+
+    # URL length limit allows only one digest per request, results keep the order of digests
+    assert [s["digests"] for s in signatures] == [[digest] for digest in digests]
+    assert mock_get_signatures.call_count == 20
+
+
+@mock.patch("pubtools._quay.pyxis_client.PyxisClient.get_container_signatures")
+def test_iter_container_signatures_error(mock_get_signatures):
+    def get_signatures(digests):
+        if "digest3" in digests:
+            raise ValueError("server error")
+        return [{"digests": digests}]
+
+    mock_get_signatures.side_effect = get_signatures
+
+    client = pyxis_client.PyxisClient("pyxis-url.com", "some-principal")
+    digests = ["digest{0}".format(i) for i in range(6)]
+    signatures = client.iter_container_signatures(digests, chunk_size=2, threads=2)
+
+    assert next(signatures) == {"digests": ["digest0", "digest1"]}
+    with pytest.raises(ValueError, match="server error"):
+        next(signatures)
+
+
+def _conflict(status_code=409):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError("{0} Error".format(status_code), response=response)
+
+
+@mock.patch("pubtools._quay.pyxis_client.PyxisClient._create_client")
+def test_upload_signatures_ignore_conflicts(mock_create_client):
+    client = pyxis_client.PyxisClient("pyxis-url.com", "some-principal")
+    signatures = [
+        {"reference": "registry.com/image:1", "sig_key_id": "key1", "signature_data": "data1"},
+        {"reference": "registry.com/image:2", "sig_key_id": "key1", "signature_data": "data2"},
+    ]
+
+    def upload(batch):
+        if len(batch) > 1 or batch[0]["signature_data"] == "data1":
+            raise _conflict()
+        return [{"_id": "id2"}]
+
+    mock_create_client.return_value.upload_signatures.side_effect = upload
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.upload_signatures(signatures)
+    assert client.upload_signatures(signatures, ignore_conflicts=True) == [{"_id": "id2"}]
+    # the batch was retried one signature at a time
+    assert mock_create_client.return_value.upload_signatures.call_args_list[-2:] == [
+        mock.call(signatures[:1]),
+        mock.call(signatures[1:]),
+    ]
+
+
+@mock.patch("pubtools._quay.pyxis_client.PyxisClient._create_client")
+def test_upload_signatures_other_error(mock_create_client):
+    client = pyxis_client.PyxisClient("pyxis-url.com", "some-principal")
+    mock_create_client.return_value.upload_signatures.side_effect = _conflict(500)
+
+    with pytest.raises(requests.exceptions.HTTPError, match="500"):
+        client.upload_signatures([{"signature_data": "data"}], ignore_conflicts=True)
+    mock_create_client.return_value.upload_signatures.assert_called_once_with(
+        [{"signature_data": "data"}]
+    )
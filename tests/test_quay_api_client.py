@@ -57,6 +57,27 @@ def test_delete_client():
         assert m.call_count == 3
 
 
+def test_restore_tag():
+    client = quay_api_client.QuayApiClient("some-token", "stage.quay.io")
+
+    with requests_mock.Mocker() as m:
+        m.put(
+            "https://stage.quay.io/api/v1/repository/some-namespace/some-repo/tag/10",
+            [
+                {"text": "Server error", "status_code": 500},
+                {"text": "Updated", "status_code": 201},
+            ],
+        )
+        with pytest.raises(requests.HTTPError, match="500 Server Error.*"):
+            client.restore_tag("some-namespace/some-repo", "10", "sha256:a1a1a1a1")
+
+        response = client.restore_tag("some-namespace/some-repo", "10", "sha256:a1a1a1a1")
+        assert response.status_code == 201
+
+        assert m.call_count == 2
+        assert m.last_request.json() == {"manifest_digest": "sha256:a1a1a1a1"}
+
+
 def test_delete_repository():
     client = quay_api_client.QuayApiClient("some-token", "stage.quay.io")
 
@@ -161,12 +161,16 @@ def test_request_quay_authenticate_success(mock_authenticate):
             ],
         )
 
+        mock_authenticate.return_value = "some-token"
+
         client = quay_client.QuayClient("user", "pass")
         r = client._request_quay("GET", "get/data/1")
 
         assert r.text == "data"
         assert r.status_code == 200
         mock_authenticate.assert_called_once_with({"some-header": "value"})
+        # obtained token is used even if the session was re-authenticated by another thread
+        assert m.last_request.headers["Authorization"] == "Bearer some-token"
 
 
 @mock.patch("pubtools._quay.quay_client.QuayClient._authenticate_quay")
@@ -291,12 +291,51 @@ def test_run(mock_quay_api_client, mock_send_umb_message, mock_signature_remover
     )
     mock_set_quay_api_client.assert_called_once_with(mock_quay_api_client.return_value)
     mock_remove_repository_signatures.assert_called_once_with(
-        "namespace/image", "internal-namespace", "pyxis-url.com", "some-principal", None
+        "namespace/image",
+        "internal-namespace",
+        "pyxis-url.com",
+        "some-principal",
+        None,
+        signature_index=None,
     )
     mock_delete_repo.assert_called_once_with("internal-namespace/namespace----image")
     mock_send_umb_message.assert_not_called()
 
 
+@mock.patch("pubtools._quay.remove_repo.SignatureRemover")
+@mock.patch("pubtools._quay.remove_repo.QuayApiClient")
+def test_run_signature_index(mock_quay_api_client, mock_signature_remover, tmpdir):
+    index_path = str(tmpdir.join("index.db"))
+    args = [
+        "dummy",
+        "--repository",
+        "namespace/image",
+        "--namespace",
+        "internal-namespace",
+        "--quay-user",
+        "some-user",
+        "--quay-password",
+        "some-password",
+        "--quay-api-token",
+        "some-token",
+        "--pyxis-server",
+        "pyxis-url.com",
+        "--pyxis-krb-principal",
+        "some-principal",
+        "--signature-index-path",
+        index_path,
+    ]
+
+    remove_repo.remove_repository_main(args)
+
+    mock_remove_repository_signatures = (
+        mock_signature_remover.return_value.remove_repository_signatures
+    )
+    index = mock_remove_repository_signatures.call_args[1]["signature_index"]
+    assert index.path == index_path
+    assert index.pyxis_server == "pyxis-url.com"
+
+
 @mock.patch("pubtools._quay.remove_repo.SignatureRemover")
 @mock.patch("pubtools._quay.remove_repo.send_umb_message")
 @mock.patch("pubtools._quay.remove_repo.QuayApiClient")
@@ -341,7 +380,12 @@ def test_send_umb_message(mock_quay_api_client, mock_send_umb_message, mock_sign
 
     mock_set_quay_api_client.assert_called_once_with(mock_quay_api_client.return_value)
     mock_remove_repository_signatures.assert_called_once_with(
-        "namespace/image", "internal-namespace", "pyxis-url.com", "some-principal", None
+        "namespace/image",
+        "internal-namespace",
+        "pyxis-url.com",
+        "some-principal",
+        None,
+        signature_index=None,
     )
     mock_delete_repo.assert_called_once_with("internal-namespace/namespace----image")
     mock_send_umb_message.assert_called_once_with(
@@ -0,0 +1,136 @@
+import mock
+import pytest
+import requests
+
+from pubtools._quay.repository_state_snapshot import RepositoryStateSnapshot
+
+# flake8: noqa: E501
+
+ML_DIGEST = "sha256:8a3a33cad0bd33650ba7287a7ec94327d8e47ddf7845c569c80b5c4b20d49d36"
+
+
+def http_error(status_code):
+    response = mock.Mock(status_code=status_code)
+    return requests.exceptions.HTTPError("error", response=response)
+
+
+def test_prefetch(repo_api_data, manifest_list_data):
+    mock_quay_client = mock.MagicMock()
+    mock_quay_client.get_manifest.return_value = manifest_list_data
+    mock_quay_api_client = mock.MagicMock()
+
+    def get_repository_data(repo):
+        if repo != "name/repo1":
+            raise http_error(404)
+        return repo_api_data
+
+    mock_quay_api_client.get_repository_data.side_effect = get_repository_data
+
+    snapshot = RepositoryStateSnapshot(mock_quay_client, mock_quay_api_client, "quay.io/")
+    snapshot.prefetch({"name/repo1": ["1", "2", "3", "5"], "name/missing": ["1"]})
+
+    assert mock_quay_api_client.get_repository_data.call_count == 2
+    # tags '1' and '2' reference the same manifest list, '3' is not a manifest list
+    mock_quay_client.get_manifest.assert_called_once_with(
+        "quay.io/name/repo1@{0}".format(ML_DIGEST), manifest_list=True
+    )
+
+    assert snapshot.get_repository_data("name/repo1") == repo_api_data
+    assert snapshot.get_manifest("quay.io/name/repo1:1", manifest_list=True) == manifest_list_data
+    assert snapshot.get_manifest("quay.io/name/repo1:2") == manifest_list_data
+    assert snapshot.get_manifest("quay.io/name/repo1@" + ML_DIGEST) == manifest_list_data
+    with pytest.raises(requests.exceptions.HTTPError, match=".*404.*"):
+        snapshot.get_manifest("quay.io/name/repo1:5")
+    with pytest.raises(requests.exceptions.HTTPError):
+        snapshot.get_repository_data("name/missing")
+
+    assert mock_quay_api_client.get_repository_data.call_count == 2
+    assert mock_quay_client.get_manifest.call_count == 1
+
+
+def test_prefetch_manifest_list_error(repo_api_data, manifest_list_data):
+    mock_quay_client = mock.MagicMock()
+    mock_quay_client.get_manifest.side_effect = [http_error(500), manifest_list_data]
+    mock_quay_api_client = mock.MagicMock()
+    mock_quay_api_client.get_repository_data.return_value = repo_api_data
+
+    snapshot = RepositoryStateSnapshot(mock_quay_client, mock_quay_api_client)
+    snapshot.prefetch({"name/repo1": ["1"]})
+
+    # manifest wasn't cached, so it's fetched again when requested
+    assert snapshot.get_manifest("quay.io/name/repo1:1", manifest_list=True) == manifest_list_data
+    assert mock_quay_client.get_manifest.call_args_list == [
+        mock.call("quay.io/name/repo1@{0}".format(ML_DIGEST), manifest_list=True),
+        mock.call("quay.io/name/repo1:1", manifest_list=True),
+    ]
+
+
+def test_read_through(repo_api_data, v2s2_manifest_data):
+    mock_quay_client = mock.MagicMock()
+    mock_quay_client.get_manifest.return_value = v2s2_manifest_data
+    mock_quay_api_client = mock.MagicMock()
+    mock_quay_api_client.get_repository_data.return_value = repo_api_data
+
+    snapshot = RepositoryStateSnapshot(mock_quay_client, mock_quay_api_client)
+
+    manifest = snapshot.get_manifest("quay.io/name/repo1:3")
+    assert manifest == v2s2_manifest_data
+    # returned data are copies, modifying them doesn't affect the cache
+    manifest["mediaType"] = "modified"
+    assert snapshot.get_manifest("quay.io/name/repo1:3") == v2s2_manifest_data
+    assert snapshot.get_repository_data("name/repo1") == repo_api_data
+    assert snapshot.get_repository_data("name/repo1") == repo_api_data
+
+    mock_quay_client.get_manifest.assert_called_once_with("quay.io/name/repo1:3")
+    mock_quay_api_client.get_repository_data.assert_called_once_with("name/repo1")
+
+
+def test_invalidate(repo_api_data, manifest_list_data):
+    mock_quay_client = mock.MagicMock()
+    mock_quay_client.get_manifest.return_value = manifest_list_data
+    mock_quay_api_client = mock.MagicMock()
+    mock_quay_api_client.get_repository_data.return_value = repo_api_data
+
+    snapshot = RepositoryStateSnapshot(mock_quay_client, mock_quay_api_client)
+    snapshot.get_manifest("quay.io/name/repo1:1", manifest_list=True)
+    snapshot.get_manifest("quay.io/name/repo1@" + ML_DIGEST, manifest_list=True)
+    snapshot.get_repository_data("name/repo1")
+
+    snapshot.invalidate_images(["quay.io/name/repo1:1"])
+
+    snapshot.get_repository_data("name/repo1")
+    snapshot.get_manifest("quay.io/name/repo1@" + ML_DIGEST, manifest_list=True)
+    assert mock_quay_api_client.get_repository_data.call_count == 2
+    # digest-referenced manifests are immutable and stay cached
+    assert mock_quay_client.get_manifest.call_count == 2
+
+
+def test_get_manifest_other_registry(repo_api_data, manifest_list_data, v2s2_manifest_data):
+    mock_quay_client = mock.MagicMock()
+    mock_quay_client.get_manifest.side_effect = [v2s2_manifest_data, manifest_list_data]
+    mock_quay_api_client = mock.MagicMock()
+    mock_quay_api_client.get_repository_data.return_value = repo_api_data
+
+    snapshot = RepositoryStateSnapshot(mock_quay_client, mock_quay_api_client)
+    snapshot.get_repository_data("name/repo1")
+
+    # image of the same repository and tag on another registry isn't resolved by Quay data
+    assert snapshot.get_manifest("registry.com/name/repo1:5") == v2s2_manifest_data
+    assert snapshot.get_manifest("quay.io/name/repo1:1") == manifest_list_data
+    assert snapshot.get_manifest("registry.com/name/repo1:5") == v2s2_manifest_data
+    assert mock_quay_client.get_manifest.call_args_list == [
+        mock.call("registry.com/name/repo1:5"),
+        mock.call("quay.io/name/repo1:1"),
+    ]
+
+    snapshot.invalidate_images(["registry.com/name/repo1:5"])
+    # repository data of Quay aren't affected by an image on another registry
+    snapshot.get_repository_data("name/repo1")
+    mock_quay_api_client.get_repository_data.assert_called_once_with("name/repo1")
+
+
+def test_get_manifest_no_reference():
+    snapshot = RepositoryStateSnapshot(mock.MagicMock(), mock.MagicMock())
+
+    with pytest.raises(ValueError, match="Neither tag nor digest.*"):
+        snapshot.get_manifest("quay.io/name/repo1")
@@ -1,3 +1,4 @@
+from copy import deepcopy
 import json
 import logging
 import mock
@@ -5,10 +6,12 @@ import pytest
 import requests_mock
 import requests
 import six
+import time
 
 from pubtools._quay import exceptions
 from pubtools._quay import quay_client
 from pubtools._quay import signature_handler
+from pubtools._quay.push_journal import PushJournal
 from .utils.misc import sort_dictionary_sortable_values, compare_logs
 
 # flake8: noqa: E501
@@ -36,7 +39,7 @@ def test_init(mock_quay_api_client, mock_quay_client, target_settings):
 
 @mock.patch("pubtools._quay.signature_handler.uuid.uuid4")
 @mock.patch("pubtools._quay.signature_handler.datetime")
-@mock.patch("pubtools._quay.signature_handler.base64.b64encode")
+@mock.patch("pubtools._quay.claim_message.base64.b64encode")
 @mock.patch("pubtools._quay.signature_handler.QuayClient")
 @mock.patch("pubtools._quay.signature_handler.QuayApiClient")
 def test_create_claim_message(
@@ -51,6 +54,9 @@ def test_create_claim_message(
     claim_msg = sig_handler.create_manifest_claim_message(
         "some-dest-repo", "key1", "sha256:f4f4f4f", "registry.com/image:1", "image", "1"
     )
+    # claim is encoded only when it's needed
+    mock_encode.assert_not_called()
+    assert claim_msg["claim_file"] == "some-encode"
     mock_encode.assert_called_with(
         json.dumps(
             {
@@ -76,6 +82,27 @@ def test_create_claim_message(
     }
 
 
+@mock.patch("pubtools._quay.signature_handler.datetime")
+def test_create_claim_messages_bulk(mock_datetime):
+    mock_datetime.utcnow.return_value.isoformat.return_value = "2021-03-19T14:45:23.128632"
+
+    claim_msgs = signature_handler.SignatureHandler.create_manifest_claim_messages(
+        [
+            ("some-dest-repo", "key1", "sha256:f4f4f4f", "registry.com/image:1", "image"),
+            ("some-dest-repo", "key2", "sha256:f4f4f4f", "registry.com/image:1", "image"),
+        ],
+        "1",
+    )
+
+    assert [(m["sig_key_id"], m["manifest_digest"]) for m in claim_msgs] == [
+        ("key1", "sha256:f4f4f4f"),
+        ("key2", "sha256:f4f4f4f"),
+    ]
+    assert claim_msgs[0]["claim_file"] == claim_msgs[1]["claim_file"]
+    assert claim_msgs[0]["request_id"] != claim_msgs[1]["request_id"]
+    mock_datetime.utcnow.assert_called_once_with()
+
+
 @mock.patch("pubtools._quay.signature_handler.QuayClient")
 @mock.patch("pubtools._quay.signature_handler.QuayApiClient")
 def test_get_tagged_image_digests_no_manifest_list(
@@ -120,55 +147,29 @@ def test_get_tagged_image_digests_manifest_list(
     mock_get_manifest.assert_called_once_with("registry.com/namespace/image:1", manifest_list=True)
 
 
-@mock.patch("pubtools._quay.signature_handler.run_entrypoint")
+@mock.patch("pubtools._quay.signature_handler.get_target_pyxis_client")
 @mock.patch("pubtools._quay.signature_handler.QuayClient")
 @mock.patch("pubtools._quay.signature_handler.QuayApiClient")
 def test_get_pyxis_signature(
-    mock_quay_api_client, mock_quay_client, mock_run_entrypoint, target_settings
+    mock_quay_api_client, mock_quay_client, mock_get_pyxis_client, target_settings
 ):
     hub = mock.MagicMock()
     expected_data1 = [{"some": "data"}, {"other": "data"}]
     expected_data2 = [{"some-other": "data"}]
-    mock_run_entrypoint.side_effect = [iter(expected_data1), iter(expected_data2)]
+    mock_iter_signatures = mock_get_pyxis_client.return_value.iter_container_signatures
+    mock_iter_signatures.return_value = iter(expected_data1 + expected_data2)
+    target_settings["pyxis_max_concurrent_requests"] = 3
 
     sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
     sig_handler.MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST = 2
     sig_data = sig_handler.get_signatures_from_pyxis(
         ["sha256:a1a1a1a1a", "sha256:b2b2b2b2", "sha256:c3c3c3c3"],
     )
-    for i, data in enumerate(sig_data):
-        assert data == (expected_data1 + expected_data2)[i]
+    assert list(sig_data) == expected_data1 + expected_data2
 
-    assert mock_run_entrypoint.call_count == 2
-    assert mock_run_entrypoint.mock_calls[0] == mock.call(
-        ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-signatures"),
-        "pubtools-pyxis-get-signatures",
-        [
-            "--pyxis-server",
-            "pyxis-url.com",
-            "--pyxis-krb-principal",
-            "some-principal@REDHAT.COM",
-            "--pyxis-krb-ktfile",
-            "/etc/pub/some.keytab",
-            "--manifest-digest",
-            "sha256:a1a1a1a1a,sha256:b2b2b2b2",
-        ],
-        {},
-    )
-    assert mock_run_entrypoint.mock_calls[1] == mock.call(
-        ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-signatures"),
-        "pubtools-pyxis-get-signatures",
-        [
-            "--pyxis-server",
-            "pyxis-url.com",
-            "--pyxis-krb-principal",
-            "some-principal@REDHAT.COM",
-            "--pyxis-krb-ktfile",
-            "/etc/pub/some.keytab",
-            "--manifest-digest",
-            "sha256:c3c3c3c3",
-        ],
-        {},
+    mock_get_pyxis_client.assert_called_with(target_settings)
+    mock_iter_signatures.assert_called_once_with(
+        ["sha256:a1a1a1a1a", "sha256:b2b2b2b2", "sha256:c3c3c3c3"], chunk_size=2, threads=3
     )
 
 
@@ -207,6 +208,98 @@ def test_filter_claim_messages(
     ]
 
 
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_pyxis")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_filter_claim_messages_signature_index(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_signatures,
+    target_settings,
+    claim_messages,
+    existing_signatures,
+    tmpdir,
+):
+    hub = mock.MagicMock()
+    target_settings["quay_signature_index_path"] = str(tmpdir.join("index.db"))
+    mock_get_signatures.return_value = existing_signatures
+
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    sig_handler.signature_index.add([("registry.com/image:2", "sha256:b3b3b3b", "key2")])
+    filtered_msgs = sig_handler.filter_claim_messages(claim_messages)
+    assert [m["request_id"] for m in filtered_msgs] == ["id3"]
+
+    # second run only asks Pyxis about signatures which weren't found the first time
+    mock_get_signatures.reset_mock()
+    mock_get_signatures.return_value = []
+    filtered_msgs = sig_handler.filter_claim_messages(claim_messages)
+    assert [m["request_id"] for m in filtered_msgs] == ["id3"]
+    mock_get_signatures.assert_called_once_with(manifest_digests=["sha256:b3b3b3b"])
+
+    # signature with a different key was removed from the index, as it wasn't found in Pyxis
+    assert sig_handler.signature_index.get_verified(["sha256:b3b3b3b"]) == set()
+
+
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_pyxis")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_filter_claim_messages_optimistic(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_signatures,
+    target_settings,
+    claim_messages,
+    tmpdir,
+):
+    hub = mock.MagicMock()
+    target_settings["sigstore_optimistic_upload"] = True
+
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    filtered_msgs = sig_handler.filter_claim_messages(claim_messages)
+    assert filtered_msgs == claim_messages
+
+    # only the local index is used to filter out existing signatures
+    target_settings["quay_signature_index_path"] = str(tmpdir.join("index.db"))
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    sig_handler.signature_index.add([("registry.com/image:1", "sha256:f4f4f4f", "key1")])
+    filtered_msgs = sig_handler.filter_claim_messages(claim_messages)
+    assert [m["request_id"] for m in filtered_msgs] == ["id2", "id3"]
+
+    mock_get_signatures.assert_not_called()
+
+
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_pyxis")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_reconcile_signature_index(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_signatures,
+    target_settings,
+    existing_signatures,
+    tmpdir,
+):
+    hub = mock.MagicMock()
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    assert sig_handler.reconcile_signature_index() == 0
+
+    target_settings["quay_signature_index_path"] = str(tmpdir.join("index.db"))
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    sig_handler.signature_index.add(
+        [
+            ("registry.com/image:1", "sha256:f4f4f4f", "key1"),
+            ("registry.com/image:1", "sha256:b3b3b3b", "key1"),
+        ]
+    )
+    mock_get_signatures.return_value = existing_signatures[:1]
+
+    assert sig_handler.reconcile_signature_index() == 1
+    mock_get_signatures.assert_called_once_with(
+        manifest_digests=["sha256:b3b3b3b", "sha256:f4f4f4f"]
+    )
+    assert sig_handler.signature_index.get_manifest_digests() == ["sha256:f4f4f4f"]
+
+
 @mock.patch("pubtools._quay.signature_handler.proton")
 @mock.patch("pubtools._quay.signature_handler.ManifestClaimsHandler")
 @mock.patch("pubtools._quay.signature_handler.QuayClient")
@@ -267,17 +360,103 @@ def test_get_signatures_from_radas(
     assert mock_claim_handler.call_args[1]["timeout"] == 600
     assert mock_claim_handler.call_args[1]["throttle"] == 100
     assert mock_claim_handler.call_args[1]["retry"] == 3
+    assert mock_claim_handler.call_args[1]["min_throttle"] is None
+    assert mock_claim_handler.call_args[1]["max_throttle"] is None
 
     assert len(mock_proton.mock_calls) == 2
 
 
-@mock.patch("pubtools._quay.signature_handler.run_entrypoint")
+@mock.patch("pubtools._quay.signature_handler.proton")
+@mock.patch("pubtools._quay.signature_handler.ManifestClaimsHandler")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_get_signatures_from_radas_shards(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_claim_handler,
+    mock_proton,
+    target_settings,
+    claim_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["docker_settings"]["umb_signing_shards"] = 2
+    handlers = [mock.MagicMock(), mock.MagicMock()]
+    handlers[0].received_messages = [{"request_id": "id1"}, {"request_id": "id3"}]
+    handlers[1].received_messages = [{"request_id": "id2"}]
+    mock_claim_handler.side_effect = handlers
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+
+    received = sig_handler.get_signatures_from_radas(claim_messages)
+
+    assert [m["request_id"] for m in received] == ["id1", "id3", "id2"]
+    assert mock_claim_handler.call_count == 2
+    shard_kwargs = [call[1] for call in mock_claim_handler.call_args_list]
+    assert [[m["request_id"] for m in kwargs["claim_messages"]] for kwargs in shard_kwargs] == [
+        ["id1", "id3"],
+        ["id2"],
+    ]
+    # shards consume one queue, each response is delivered once and routed to its sender
+    assert [kwargs["radas_address"] for kwargs in shard_kwargs] == [
+        "queue://Consumer.msg-producer-pub.1.VirtualTopic.eng.robosignatory.container.sign",
+    ] * 2
+    assert isinstance(shard_kwargs[0]["response_router"], signature_handler.ResponseRouter)
+    assert shard_kwargs[1]["response_router"] is shard_kwargs[0]["response_router"]
+    assert [kwargs["throttle"] for kwargs in shard_kwargs] == [50, 50]
+    # shards run in parallel, in any order
+    assert mock_proton.reactor.Container.call_count == 2
+    mock_proton.reactor.Container.assert_any_call(handlers[0])
+    mock_proton.reactor.Container.assert_any_call(handlers[1])
+
+    # sending is serialized, as the hub proxy isn't thread-safe
+    shard_kwargs[0]["message_sender_callback"](["msg1"])
+    hub.worker.umb_send_manifest_claim_messages.assert_called_once_with(
+        "some-target", "1", ["msg1"]
+    )
+
+
+@mock.patch("pubtools._quay.signature_handler.ManifestClaimsHandler")
+@mock.patch("pubtools._quay.signature_handler.SigningSession")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_get_signatures_from_radas_session(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_signing_session,
+    mock_claim_handler,
+    target_settings,
+    claim_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["docker_settings"]["umb_signing_session"] = True
+    mock_signing_session.return_value.sign.return_value = ["sig1"]
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+
+    assert sig_handler.get_signatures_from_radas(claim_messages) == ["sig1"]
+    assert sig_handler.get_signatures_from_radas(claim_messages) == ["sig1"]
+    mock_signing_session.assert_called_once()
+    assert mock_signing_session.return_value.sign.call_args_list == [
+        mock.call(claim_messages, None),
+        mock.call(claim_messages, None),
+    ]
+
+    # session creates a handler which keeps the connection open
+    mock_signing_session.call_args[0][0]()
+    assert mock_claim_handler.call_args[1]["claim_messages"] == []
+    assert mock_claim_handler.call_args[1]["keep_open"] is True
+
+    other_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    other_handler.set_signing_session(sig_handler.signing_session)
+    other_handler.close_signing_session()
+    mock_signing_session.return_value.close.assert_called_once_with()
+
+
+@mock.patch("pubtools._quay.signature_handler.get_target_pyxis_client")
 @mock.patch("pubtools._quay.signature_handler.QuayClient")
 @mock.patch("pubtools._quay.signature_handler.QuayApiClient")
 def test_upload_signatures_pyxis(
     mock_quay_api_client,
     mock_quay_client,
-    mock_run_entrypoint,
+    mock_get_pyxis_client,
     target_settings,
     claim_messages,
     signed_messages,
@@ -311,37 +490,236 @@ def test_upload_signatures_pyxis(
         },
     ]
 
-    mock_run_entrypoint.call_count == 2
-    assert mock_run_entrypoint.mock_calls[0] == mock.call(
-        ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-upload-signatures"),
-        "pubtools-pyxis-upload-signature",
+    mock_upload_signatures = mock_get_pyxis_client.return_value.upload_signatures
+    assert mock_upload_signatures.call_args_list == [
+        mock.call(signatures[:2], ignore_conflicts=False),
+        mock.call(signatures[2:], ignore_conflicts=False),
+    ]
+
+
+@mock.patch("pubtools._quay.signature_handler.get_target_pyxis_client")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_upload_signatures_pyxis_optimistic(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_pyxis_client,
+    target_settings,
+    claim_messages,
+    signed_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["sigstore_optimistic_upload"] = True
+
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    sig_handler.upload_signatures_to_pyxis(claim_messages, signed_messages, 100)
+
+    mock_upload_signatures = mock_get_pyxis_client.return_value.upload_signatures
+    mock_upload_signatures.assert_called_once_with(mock.ANY, ignore_conflicts=True)
+    assert len(mock_upload_signatures.call_args[0][0]) == 3
+
+
+@mock.patch("pubtools._quay.signature_handler.get_target_pyxis_client")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_upload_signatures_pyxis_signature_index(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_pyxis_client,
+    target_settings,
+    claim_messages,
+    signed_messages,
+    tmpdir,
+):
+    hub = mock.MagicMock()
+    target_settings["quay_signature_index_path"] = str(tmpdir.join("index.db"))
+    mock_get_pyxis_client.return_value.upload_signatures.side_effect = [None, Exception("failed")]
+
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    with pytest.raises(Exception, match="failed"):
+        sig_handler.upload_signatures_to_pyxis(claim_messages, signed_messages, 2)
+
+    # only signatures of the successfully uploaded batch are indexed
+    assert sig_handler.signature_index.get_verified(
+        ["sha256:f4f4f4f", "sha256:a2a2a2a", "sha256:b3b3b3b"]
+    ) == set(
         [
-            "--pyxis-server",
-            "pyxis-url.com",
-            "--pyxis-krb-principal",
-            "some-principal@REDHAT.COM",
-            "--pyxis-krb-ktfile",
-            "/etc/pub/some.keytab",
-            "--signatures",
-            json.dumps(signatures[:2]),
-        ],
-        {},
+            ("registry.com/image:1", "sha256:f4f4f4f", "key1"),
+            ("registry.com/image:1", "sha256:a2a2a2a", "key1"),
+        ]
     )
-    assert mock_run_entrypoint.mock_calls[1] == mock.call(
-        ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-upload-signatures"),
-        "pubtools-pyxis-upload-signature",
-        [
-            "--pyxis-server",
-            "pyxis-url.com",
-            "--pyxis-krb-principal",
-            "some-principal@REDHAT.COM",
-            "--pyxis-krb-ktfile",
-            "/etc/pub/some.keytab",
-            "--signatures",
-            json.dumps(signatures[2:]),
-        ],
-        {},
+
+
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_radas")
+@mock.patch("pubtools._quay.signature_handler.get_target_pyxis_client")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_sign_and_upload_streaming(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_pyxis_client,
+    mock_get_signatures,
+    target_settings,
+    claim_messages,
+    signed_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["sigstore_streaming_upload"] = True
+    target_settings["sigstore_max_upload_items"] = 2
+    mock_upload_signatures = mock_get_pyxis_client.return_value.upload_signatures
+    uploads_during_signing = []
+
+    def get_signatures(claim_messages, response_callback):
+        # claim messages are pulled lazily
+        assert [m["request_id"] for m in claim_messages] == ["id1", "id2", "id3"]
+        for i, message in enumerate(signed_messages):
+            response_callback(message)
+            if i == 1:
+                # wait for the upload of the first batch, which happens while signing continues
+                for _ in range(1000):
+                    if mock_upload_signatures.call_count:
+                        break
+                    time.sleep(0.01)
+                uploads_during_signing.append(mock_upload_signatures.call_count)
+        return []
+
+    mock_get_signatures.side_effect = get_signatures
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    sig_handler.sign_and_upload_claim_messages(claim_messages)
+
+    assert uploads_during_signing == [1]
+    assert [
+        [s["manifest_digest"] for s in call[0][0]] for call in mock_upload_signatures.call_args_list
+    ] == [["sha256:f4f4f4f", "sha256:a2a2a2a"], ["sha256:b3b3b3b"]]
+
+
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_radas")
+@mock.patch("pubtools._quay.signature_handler.get_target_pyxis_client")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_sign_and_upload_streaming_signing_error(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_pyxis_client,
+    mock_get_signatures,
+    target_settings,
+    claim_messages,
+    error_signed_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["sigstore_streaming_upload"] = True
+
+    def get_signatures(claim_messages, response_callback):
+        list(claim_messages)
+        for message in error_signed_messages:
+            response_callback(message)
+        return []
+
+    mock_get_signatures.side_effect = get_signatures
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    with pytest.raises(exceptions.SigningError, match="Signing of 2/3 messages has failed"):
+        sig_handler.sign_and_upload_claim_messages(claim_messages)
+
+    # incomplete batch of valid signatures isn't uploaded
+    mock_get_pyxis_client.return_value.upload_signatures.assert_not_called()
+
+
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler._get_signatures_from_umb")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_get_signatures_from_radas_spooled(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_signatures_from_umb,
+    tmpdir,
+    target_settings,
+    claim_messages,
+    signed_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["quay_signature_spool_dir"] = str(tmpdir)
+    # previous run of the task received the signature of the first claim
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    sig_handler.signature_spool.add(claim_messages[0], signed_messages[0])
+
+    mock_get_signatures_from_umb.return_value = signed_messages[1:]
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    assert sig_handler.get_signatures_from_radas(claim_messages) == signed_messages
+    mock_get_signatures_from_umb.assert_called_once_with(claim_messages[1:], None)
+
+    # with a response callback, claims are filtered lazily and responses aren't returned
+    def get_signatures_from_umb(claim_messages, response_callback):
+        assert [m["request_id"] for m in claim_messages] == ["id2", "id3"]
+        return []
+
+    mock_get_signatures_from_umb.side_effect = get_signatures_from_umb
+    response_callback = mock.MagicMock()
+    assert sig_handler.get_signatures_from_radas(iter(claim_messages), response_callback) == []
+    response_callback.assert_called_once_with(signed_messages[0])
+    mock_get_signatures_from_umb.side_effect = None
+
+    # nothing is sent to RADAS if all claims were spooled
+    mock_get_signatures_from_umb.reset_mock()
+    assert sig_handler.get_signatures_from_radas(claim_messages[:1]) == signed_messages[:1]
+    mock_get_signatures_from_umb.assert_not_called()
+
+
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.upload_signatures_to_pyxis")
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler._get_signatures_from_umb")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_sign_and_upload_removes_spool(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_signatures_from_umb,
+    mock_upload_signatures_to_pyxis,
+    tmpdir,
+    target_settings,
+    claim_messages,
+    signed_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["quay_signature_spool_dir"] = str(tmpdir)
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    sig_handler.signature_spool.add(claim_messages[0], signed_messages[0])
+    mock_get_signatures_from_umb.return_value = signed_messages[1:]
+
+    # spool is kept for a re-run if the upload fails
+    mock_upload_signatures_to_pyxis.side_effect = ValueError("upload failed")
+    with pytest.raises(ValueError, match="upload failed"):
+        sig_handler.sign_and_upload_claim_messages(claim_messages)
+    assert tmpdir.join("signatures-1.db").exists()
+
+    mock_upload_signatures_to_pyxis.side_effect = None
+    sig_handler.sign_and_upload_claim_messages(claim_messages)
+    assert not tmpdir.join("signatures-1.db").exists()
+
+
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_signature_spool_per_handler(
+    mock_quay_api_client,
+    mock_quay_client,
+    tmpdir,
+    target_settings,
+    claim_messages,
+    signed_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["quay_signature_spool_dir"] = str(tmpdir)
+    container_handler = signature_handler.ContainerSignatureHandler(
+        hub, "1", target_settings, "some-target"
     )
+    operator_handler = signature_handler.OperatorSignatureHandler(
+        hub, "1", target_settings, "some-target"
+    )
+    container_handler.signature_spool.add(claim_messages[0], signed_messages[0])
+    operator_handler.signature_spool.add(claim_messages[1], signed_messages[1])
+
+    # handlers signing concurrently in one task don't remove each other's spool
+    container_handler._remove_signature_spool()
+    assert not tmpdir.join("container-signatures-1.db").exists()
+    assert operator_handler.signature_spool.get(claim_messages[1]) == signed_messages[1]
 
 
 @mock.patch("pubtools._quay.signature_handler.QuayClient")
@@ -356,7 +734,82 @@ def test_validate_radas_msgs(
         sig_handler.validate_radas_messages(claim_messages, error_signed_messages)
 
 
-@mock.patch("pubtools._quay.signature_handler.base64.b64encode")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_validate_radas_msgs_missing_response(
+    mock_quay_api_client, mock_quay_client, target_settings, claim_messages, signed_messages
+):
+    hub = mock.MagicMock()
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+
+    with pytest.raises(exceptions.SigningError, match="Signing of 1/3 messages has failed"):
+        sig_handler.validate_radas_messages(claim_messages, signed_messages[:2])
+
+
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.upload_signatures_to_pyxis")
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_radas")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_sign_and_upload_retry_failed(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_signatures,
+    mock_upload_signatures_to_pyxis,
+    target_settings,
+    claim_messages,
+    signed_messages,
+    error_signed_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["docker_settings"]["umb_signing_error_retries"] = 2
+    # id1 and id2 fail at first, id1 fails once more
+    mock_get_signatures.side_effect = [
+        [error_signed_messages[0], error_signed_messages[1], signed_messages[2]],
+        [error_signed_messages[0], signed_messages[1]],
+        [signed_messages[0]],
+    ]
+
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    sig_handler.sign_and_upload_claim_messages(claim_messages)
+
+    assert mock_get_signatures.call_args_list == [
+        mock.call(claim_messages),
+        mock.call(claim_messages[:2]),
+        mock.call(claim_messages[:1]),
+    ]
+    mock_upload_signatures_to_pyxis.assert_called_once_with(claim_messages, signed_messages, 100)
+
+
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.upload_signatures_to_pyxis")
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_radas")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_sign_and_upload_retry_budget_exceeded(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_signatures,
+    mock_upload_signatures_to_pyxis,
+    target_settings,
+    claim_messages,
+    signed_messages,
+    error_signed_messages,
+):
+    hub = mock.MagicMock()
+    target_settings["docker_settings"]["umb_signing_error_retries"] = 1
+    mock_get_signatures.side_effect = [
+        [error_signed_messages[0], signed_messages[1], signed_messages[2]],
+        [error_signed_messages[0]],
+    ]
+
+    sig_handler = signature_handler.SignatureHandler(hub, "1", target_settings, "some-target")
+    with pytest.raises(exceptions.SigningError, match="Signing of 1/3 messages has failed"):
+        sig_handler.sign_and_upload_claim_messages(claim_messages)
+
+    assert mock_get_signatures.call_count == 2
+    mock_upload_signatures_to_pyxis.assert_not_called()
+
+
+@mock.patch("pubtools._quay.claim_message.base64.b64encode")
 @mock.patch("pubtools._quay.signature_handler.datetime")
 @mock.patch("pubtools._quay.signature_handler.uuid.uuid4")
 @mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_tagged_image_digests")
@@ -474,6 +927,43 @@ def test_sign_container_images(
     mock_upload_signatures_to_pyxis.assert_called_once_with(["msg2", "msg3"], ["sig2", "sig3"], 100)
 
 
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.sign_and_upload_claim_messages")
+@mock.patch("pubtools._quay.signature_handler.SignatureHandler.filter_claim_messages")
+@mock.patch(
+    "pubtools._quay.signature_handler.ContainerSignatureHandler.construct_item_claim_messages"
+)
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_sign_container_images_journal_shared_source(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_construct_claim_msgs,
+    mock_filter_claim_msgs,
+    mock_sign_and_upload,
+    target_settings,
+    container_signing_push_item,
+    tmpdir,
+):
+    hub = mock.MagicMock()
+    mock_construct_claim_msgs.return_value = []
+    mock_filter_claim_msgs.return_value = []
+    other_item = deepcopy(container_signing_push_item)
+    other_item.metadata["tags"] = {"other/repo": ["1"]}
+    sig_handler = signature_handler.ContainerSignatureHandler(
+        hub, "1", target_settings, "some-target"
+    )
+    sig_handler.set_journal(PushJournal(str(tmpdir), "1"))
+    sig_handler.sign_container_images([container_signing_push_item])
+
+    # item with the same source but different destination tags isn't considered signed
+    sig_handler.sign_container_images([container_signing_push_item, other_item])
+
+    assert mock_construct_claim_msgs.call_args_list == [
+        mock.call(container_signing_push_item),
+        mock.call(other_item),
+    ]
+
+
 @mock.patch("pubtools._quay.signature_handler.SignatureHandler.upload_signatures_to_pyxis")
 @mock.patch("pubtools._quay.signature_handler.SignatureHandler.validate_radas_messages")
 @mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_radas")
@@ -547,7 +1037,7 @@ def test_sign_container_images_not_allowed(
     mock_upload_signatures_to_pyxis.assert_not_called()
 
 
-@mock.patch("pubtools._quay.signature_handler.base64.b64encode")
+@mock.patch("pubtools._quay.claim_message.base64.b64encode")
 @mock.patch("pubtools._quay.signature_handler.datetime")
 @mock.patch("pubtools._quay.signature_handler.uuid.uuid4")
 @mock.patch("pubtools._quay.signature_handler.QuayClient")
@@ -671,6 +1161,104 @@ def test_sign_operator_images_not_allowed(
     mock_upload_signatures_to_pyxis.assert_not_called()
 
 
+@mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain")
+@mock.patch("pubtools._quay.signature_handler.proton")
+@mock.patch("pubtools._quay.signature_handler.get_target_pyxis_client")
+@mock.patch("pubtools._quay.signature_handler.QuayClient")
+@mock.patch("pubtools._quay.signature_handler.QuayApiClient")
+def test_sign_operator_images_streaming(
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_get_pyxis_client,
+    mock_proton,
+    mock_ssl_domain,
+    target_settings,
+    signing_manifest_list_data,
+):
+    class IIBRes:
+        def __init__(self, index_image_resolved):
+            self.index_image_resolved = index_image_resolved
+
+    hub = mock.MagicMock()
+    target_settings["sigstore_streaming_upload"] = True
+    target_settings["docker_settings"]["umb_signing_throttle"] = 1
+    mock_get_manifest = mock_quay_client.return_value.get_manifest
+    mock_get_manifest.return_value = signing_manifest_list_data
+    sent = []
+    manifests_fetched = []
+    handlers = []
+
+    def send_claims(target, task_id, claim_messages):
+        sent.extend(claim_messages)
+        manifests_fetched.append(mock_get_manifest.call_count)
+
+    hub.worker.umb_send_manifest_claim_messages.side_effect = send_claims
+
+    def create_container(handler):
+        # RADAS answers every claim as soon as it's sent
+        def run():
+            event = mock.MagicMock()
+            handler.on_start(event)
+            event.receiver = handler.receiver
+            handler.on_link_opened(event)
+            while handler.signed_count < len(sent):
+                message = sent[handler.signed_count]
+                event.message.body = json.dumps(
+                    {
+                        "msg": {
+                            "request_id": message["request_id"],
+                            "manifest_digest": message["manifest_digest"],
+                            "signed_claim": "signed-" + message["request_id"],
+                            "errors": [],
+                        }
+                    }
+                )
+                handler.signed_count += 1
+                handler.on_message(event)
+
+        handler.signed_count = 0
+        handlers.append(handler)
+        container = mock.MagicMock()
+        container.run.side_effect = run
+        return container
+
+    mock_proton.reactor.Container.side_effect = create_container
+    iib_results = {
+        "v4.5": {
+            "iib_result": IIBRes("registry1/iib-namespace/image@sha256:a1a1a1"),
+            "signing_keys": ["key1"],
+        },
+        "v4.6": {
+            "iib_result": IIBRes("registry1/iib-namespace/image@sha256:b2b2b2"),
+            "signing_keys": ["key2"],
+        },
+    }
+
+    sig_handler = signature_handler.OperatorSignatureHandler(
+        hub, "1", target_settings, "some-target"
+    )
+    sig_handler.sign_operator_images(iib_results)
+
+    digests = [m["digest"] for m in signing_manifest_list_data["manifests"]]
+    assert len(sent) == 2 * 2 * len(digests)
+    # claims of the second version are constructed only once the first ones are signed
+    assert manifests_fetched[0] == 1
+    assert manifests_fetched[-1] == 2
+    # responses are neither kept by the claims handler nor returned
+    assert len(handlers) == 1
+    assert handlers[0].keep_responses is False
+    assert handlers[0].received_messages == []
+    assert handlers[0].signed_count == len(sent)
+    uploaded = [
+        signature
+        for call in mock_get_pyxis_client.return_value.upload_signatures.call_args_list
+        for signature in call[0][0]
+    ]
+    assert sorted(s["signature_data"] for s in uploaded) == sorted(
+        "signed-" + m["request_id"] for m in sent
+    )
+
+
 @mock.patch("pubtools._quay.signature_handler.SignatureHandler.upload_signatures_to_pyxis")
 @mock.patch("pubtools._quay.signature_handler.SignatureHandler.validate_radas_messages")
 @mock.patch("pubtools._quay.signature_handler.SignatureHandler.get_signatures_from_radas")
@@ -713,7 +1301,7 @@ def test_sign_task_index_image(
 @mock.patch("pubtools._quay.signature_handler.QuayApiClient")
 def test_basic_signature_handler_init(mock_quay_api_client, mock_quay_client, target_settings):
     hub = mock.MagicMock()
-    sig_handler = signature_handler.BasicSignatureHandler(hub, target_settings, "some-target")
+    sig_handler = signature_handler.BasicSignatureHandler(hub, target_settings, "some-target", "1")
 
     assert sig_handler.hub == hub
     assert sig_handler.task_id == "1"
@@ -753,7 +1341,7 @@ def test_sign_claim_messages(
     mock_filter_claim_msgs.return_value = ["msg2", "msg3"]
     mock_get_radas_signatures.return_value = ["sig2", "sig3"]
 
-    sig_handler = signature_handler.BasicSignatureHandler(hub, target_settings, "some-target")
+    sig_handler = signature_handler.BasicSignatureHandler(hub, target_settings, "some-target", "1")
     sig_handler.sign_claim_messages(["msg1", "msg2", "msg3", "msg4"])
     mock_remove_duplicate_claim_msgs.assert_called_once_with(["msg1", "msg2", "msg3", "msg4"])
     mock_filter_claim_msgs.assert_called_once_with(["msg1", "msg2", "msg3", "msg4"])
@@ -780,7 +1368,7 @@ def test_sign_claim_messages_not_allowed(
 ):
     hub = mock.MagicMock()
     target_settings["docker_settings"]["docker_container_signing_enabled"] = False
-    sig_handler = signature_handler.BasicSignatureHandler(hub, target_settings, "some-target")
+    sig_handler = signature_handler.BasicSignatureHandler(hub, target_settings, "some-target", "1")
     sig_handler.sign_claim_messages(["msg1", "msg2", "msg3", "msg4"])
     mock_filter_claim_msgs.assert_not_called()
     mock_get_radas_signatures.assert_not_called()
@@ -811,7 +1399,7 @@ def test_sign_claim_messages_no_signatures(
     mock_remove_duplicate_claim_msgs.return_value = ["msg1", "msg2", "msg3", "msg4"]
     mock_filter_claim_msgs.return_value = []
 
-    sig_handler = signature_handler.BasicSignatureHandler(hub, target_settings, "some-target")
+    sig_handler = signature_handler.BasicSignatureHandler(hub, target_settings, "some-target", "1")
     sig_handler.sign_claim_messages(["msg1", "msg2", "msg3", "msg4"])
     mock_remove_duplicate_claim_msgs.assert_called_once_with(["msg1", "msg2", "msg3", "msg4"])
     mock_filter_claim_msgs.assert_called_once_with(["msg1", "msg2", "msg3", "msg4"])
@@ -0,0 +1,80 @@
+import mock
+
+from pubtools._quay import signature_index
+
+SIG1 = ("registry.com/image:1", "sha256:a1a1a1", "key1")
+SIG2 = ("registry.com/image:2", "sha256:a1a1a1", "key1")
+SIG3 = ("registry.com/image:1", "sha256:b2b2b2", "key2")
+
+
+def test_add_get_verified(tmpdir):
+    index = signature_index.SignatureIndex(str(tmpdir.join("index.db")), "pyxis-url.com")
+    index.add([SIG1, SIG2, SIG3])
+
+    assert index.get_verified(["sha256:a1a1a1"]) == set([SIG1, SIG2])
+    assert index.get_verified(["sha256:a1a1a1", "sha256:b2b2b2", "sha256:c3c3c3"]) == set(
+        [SIG1, SIG2, SIG3]
+    )
+    assert index.get_manifest_digests() == ["sha256:a1a1a1", "sha256:b2b2b2"]
+
+    # signatures of other Pyxis servers are not visible
+    other_index = signature_index.SignatureIndex(str(tmpdir.join("index.db")), "other-pyxis.com")
+    assert other_index.get_verified(["sha256:a1a1a1"]) == set()
+
+
+def test_get_verified_many_digests(tmpdir):
+    index = signature_index.SignatureIndex(str(tmpdir.join("index.db")), "pyxis-url.com")
+    signatures = [("registry.com/image:1", "sha256:{0:04}".format(i), "key1") for i in range(1200)]
+    index.add(signatures)
+
+    assert index.get_verified([s[1] for s in signatures]) == set(signatures)
+
+
+@mock.patch("pubtools._quay.signature_index.time")
+def test_get_verified_reconcile_interval(mock_time, tmpdir):
+    index = signature_index.SignatureIndex(
+        str(tmpdir.join("index.db")), "pyxis-url.com", reconcile_interval=100
+    )
+    mock_time.time.return_value = 1000
+    index.add([SIG1])
+    mock_time.time.return_value = 1050
+    index.add([SIG2])
+
+    mock_time.time.return_value = 1120
+    # SIG1 wasn't verified recently enough to be trusted
+    assert index.get_verified(["sha256:a1a1a1"]) == set([SIG2])
+
+
+def test_reconcile(tmpdir):
+    index = signature_index.SignatureIndex(str(tmpdir.join("index.db")), "pyxis-url.com")
+    index.add([SIG1, SIG2, SIG3])
+
+    new_sig = ("registry.com/image:3", "sha256:a1a1a1", "key1")
+    removed = index.reconcile(["sha256:a1a1a1"], [SIG1, new_sig])
+
+    assert removed == 1
+    assert index.get_verified(["sha256:a1a1a1", "sha256:b2b2b2"]) == set([SIG1, new_sig, SIG3])
+
+
+def test_remove(tmpdir):
+    index = signature_index.SignatureIndex(str(tmpdir.join("index.db")), "pyxis-url.com")
+    index.add([SIG1, SIG2, SIG3])
+
+    index.remove([SIG1, SIG3])
+
+    assert index.get_verified(["sha256:a1a1a1", "sha256:b2b2b2"]) == set([SIG2])
+
+
+def test_get_signature_index(tmpdir):
+    assert signature_index.get_signature_index({"pyxis_server": "pyxis-url.com"}) is None
+
+    index = signature_index.get_signature_index(
+        {
+            "pyxis_server": "pyxis-url.com",
+            "quay_signature_index_path": str(tmpdir.join("index.db")),
+            "quay_signature_index_reconcile_interval": 60,
+        }
+    )
+    assert index.path == str(tmpdir.join("index.db"))
+    assert index.pyxis_server == "pyxis-url.com"
+    assert index.reconcile_interval == 60
@@ -1,6 +1,7 @@
 import mock
 import pytest
 
+from pubtools._quay import signature_index
 from pubtools._quay import signature_remover
 
 
@@ -74,78 +75,41 @@ def test_quay_client_error():
         sig_remover.quay_client
 
 
-@mock.patch("pubtools._quay.signature_remover.run_entrypoint")
-def test_get_signatures_from_pyxis(mock_run_entrypoint):
+@mock.patch("pubtools._quay.signature_remover.get_pyxis_client")
+def test_get_signatures_from_pyxis(mock_get_pyxis_client):
     expected_data1 = [{"some": "data"}, {"other": "data"}]
     expected_data2 = [{"some-other": "data"}]
-    mock_run_entrypoint.side_effect = [iter(expected_data1), iter(expected_data2)]
+    mock_iter_signatures = mock_get_pyxis_client.return_value.iter_container_signatures
+    mock_iter_signatures.return_value = iter(expected_data1 + expected_data2)
 
     sig_remover = signature_remover.SignatureRemover()
     sig_remover.MAX_MANIFEST_DIGESTS_PER_SEARCH_REQUEST = 2
     sig_data = sig_remover.get_signatures_from_pyxis(
         ["digest1", "digest2", "digest3"], "pyxis-server.com", "some-principal", "some-keytab"
     )
+    assert list(sig_data) == expected_data1 + expected_data2
 
-    for i, data in enumerate(sig_data):
-        assert data == (expected_data1 + expected_data2)[i]
+    mock_get_pyxis_client.assert_called_once_with(
+        "pyxis-server.com", "some-principal", "some-keytab"
+    )
+    mock_iter_signatures.assert_called_once_with(
+        ["digest1", "digest2", "digest3"], chunk_size=2, threads=5
+    )
 
-    assert mock_run_entrypoint.call_count == 2
-    assert mock_run_entrypoint.mock_calls[0] == mock.call(
-        ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-signatures"),
-        "pubtools-pyxis-get-signatures",
-        [
-            "--pyxis-server",
-            "pyxis-server.com",
-            "--pyxis-krb-principal",
-            "some-principal",
-            "--pyxis-krb-ktfile",
-            "some-keytab",
-            "--manifest-digest",
-            "digest1,digest2",
-        ],
-        {},
-    )
-    assert mock_run_entrypoint.mock_calls[1] == mock.call(
-        ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-signatures"),
-        "pubtools-pyxis-get-signatures",
-        [
-            "--pyxis-server",
-            "pyxis-server.com",
-            "--pyxis-krb-principal",
-            "some-principal",
-            "--pyxis-krb-ktfile",
-            "some-keytab",
-            "--manifest-digest",
-            "digest3",
-        ],
-        {},
-    )
-
-
-@mock.patch("pubtools._quay.signature_remover.tempfile.NamedTemporaryFile")
-@mock.patch("pubtools._quay.signature_remover.run_entrypoint")
-def test_remove_signatures_from_pyxis(mock_run_entrypoint, mock_temp_file):
-    mock_temp_file.return_value.__enter__.return_value.name = "some-tmp-file"
+
+@mock.patch("pubtools._quay.signature_remover.get_pyxis_client")
+def test_remove_signatures_from_pyxis(mock_get_pyxis_client):
     sig_remover = signature_remover.SignatureRemover()
 
     sig_remover.remove_signatures_from_pyxis(
         ["id1", "id2", "id3"], "pyxis-server.com", "some-principal", "some-keytab"
     )
 
-    mock_run_entrypoint.assert_called_once_with(
-        ("pubtools-pyxis", "console_scripts", "pubtools-pyxis-delete-signatures"),
-        "pubtools-pyxis-delete-signatures",
-        [
-            "--pyxis-server",
-            "pyxis-server.com",
-            "--pyxis-krb-principal",
-            "some-principal",
-            "--pyxis-krb-ktfile",
-            "some-keytab",
-            "--ids",
-            "@some-tmp-file",
-        ],
-        {},
+    mock_get_pyxis_client.assert_called_once_with(
+        "pyxis-server.com", "some-principal", "some-keytab"
+    )
+    mock_get_pyxis_client.return_value.delete_container_signatures.assert_called_once_with(
+        ["id1", "id2", "id3"]
     )
 
 
@@ -195,19 +159,51 @@ def test_remove_repository_signatures(
     mock_get_repo_digests,
     mock_get_signatures,
     mock_remove_signatures,
+    tmpdir,
 ):
     mock_get_repo_digests.return_value = ["digest1", "digest2"]
     mock_get_signatures.return_value = [
-        {"repository": "namespace/repo", "_id": "id1"},
-        {"repository": "namespace/repo", "_id": "id2"},
-        {"repository": "namespace/different-repo", "_id": "id3"},
+        {
+            "repository": "namespace/repo",
+            "_id": "id1",
+            "reference": "registry.com/namespace/repo:1",
+            "manifest_digest": "digest1",
+            "sig_key_id": "key1",
+        },
+        {
+            "repository": "namespace/repo",
+            "_id": "id2",
+            "reference": "registry.com/namespace/repo:2",
+            "manifest_digest": "digest2",
+            "sig_key_id": "key1",
+        },
+        {
+            "repository": "namespace/different-repo",
+            "_id": "id3",
+            "reference": "registry.com/namespace/different-repo:1",
+            "manifest_digest": "digest1",
+            "sig_key_id": "key1",
+        },
     ]
+    index = signature_index.SignatureIndex(str(tmpdir.join("index.db")), "pyxis-server.com")
+    index.add(
+        [
+            ("registry.com/namespace/repo:1", "digest1", "key1"),
+            ("registry.com/namespace/repo:2", "digest2", "key1"),
+            ("registry.com/namespace/different-repo:1", "digest1", "key1"),
+        ]
+    )
 
     sig_remover = signature_remover.SignatureRemover(
         quay_user="some-user", quay_password="some-password", quay_api_token="some-token"
     )
     sig_remover.remove_repository_signatures(
-        "namespace/repo", "internal-namespace", "pyxis-server.com", "some-principal", "some-keytab"
+        "namespace/repo",
+        "internal-namespace",
+        "pyxis-server.com",
+        "some-principal",
+        "some-keytab",
+        signature_index=index,
     )
 
     mock_get_repo_digests.assert_called_once_with("internal-namespace/namespace----repo")
@@ -217,6 +213,10 @@ def test_remove_repository_signatures(
     mock_remove_signatures.assert_called_once_with(
         ["id1", "id2"], "pyxis-server.com", "some-principal", "some-keytab"
     )
+    # removed signatures aren't considered to exist by later pushes
+    assert index.get_verified(["digest1", "digest2"]) == set(
+        [("registry.com/namespace/different-repo:1", "digest1", "key1")]
+    )
 
 
 @mock.patch("pubtools._quay.signature_remover.SignatureRemover.remove_signatures_from_pyxis")
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+
+from pubtools._quay.signature_spool import SignatureSpool, get_signature_spool
+
+
+def _response(claim_message, errors=None):
+    return {
+        "request_id": claim_message["request_id"],
+        "manifest_digest": claim_message["manifest_digest"],
+        "signed_claim": "signed-" + claim_message["request_id"],
+        "errors": errors or [],
+    }
+
+
+def test_spool_signatures(tmpdir, claim_messages):
+    spool = SignatureSpool(str(tmpdir.join("spool")), "1")
+    spool.add(claim_messages[0], _response(claim_messages[0]))
+    spool.add(claim_messages[1], _response(claim_messages[1], ["some-error"]))
+
+    assert spool.get(claim_messages[0]) == _response(claim_messages[0])
+    assert spool.get(claim_messages[1]) is None
+    assert spool.get(claim_messages[2]) is None
+    # only the successful response was stored
+    conn = sqlite3.connect(spool.path)
+    assert conn.execute("SELECT COUNT(*) FROM signatures").fetchone() == (1,)
+    conn.close()
+
+
+def test_reuse_spooled_signatures(tmpdir, claim_messages):
+    spool_dir = str(tmpdir.join("spool"))
+    spool = SignatureSpool(spool_dir, "1")
+    spool.add(claim_messages[0], _response(claim_messages[0]))
+    spool.add(claim_messages[0], _response(claim_messages[0]))
+
+    # identical claim of a re-run has a different request ID
+    claim_message = dict(claim_messages[0])
+    claim_message["request_id"] = "new-id"
+    rerun_spool = SignatureSpool(spool_dir, "1")
+    assert rerun_spool.get(claim_message) == dict(_response(claim_messages[0]), request_id="new-id")
+    # spools of other tasks are separate
+    assert SignatureSpool(spool_dir, "2").get(claim_message) is None
+
+
+def test_remove_spool(tmpdir, claim_messages):
+    spool = SignatureSpool(str(tmpdir.join("spool")), "1")
+    # database isn't created until a signature is spooled
+    assert spool.get(claim_messages[0]) is None
+    assert not os.path.exists(spool.path)
+    spool.remove()
+
+    spool.add(claim_messages[0], _response(claim_messages[0]))
+    assert os.path.exists(spool.path)
+    spool.remove()
+    assert not os.path.exists(spool.path)
+    assert spool.get(claim_messages[0]) is None
+
+
+def test_get_signature_spool(tmpdir, target_settings):
+    assert get_signature_spool(target_settings, "1") is None
+
+    target_settings["quay_signature_spool_dir"] = str(tmpdir.join("spool"))
+    spool = get_signature_spool(target_settings, "1")
+    assert spool.path == os.path.join(str(tmpdir), "spool", "signatures-1.db")
+    spool = get_signature_spool(target_settings, "1", "operator-signatures")
+    assert spool.path == os.path.join(str(tmpdir), "spool", "operator-signatures-1.db")
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import mock
+import pytest
+
+from pubtools._quay import signature_uploader
+
+
+def test_upload_batches():
+    upload_batch = mock.MagicMock()
+    uploader = signature_uploader.SignatureUploader(upload_batch, 2)
+
+    for i in range(5):
+        uploader.add({"signature_data": i})
+    uploader.finish()
+
+    assert upload_batch.call_args_list == [
+        mock.call([{"signature_data": 0}, {"signature_data": 1}]),
+        mock.call([{"signature_data": 2}, {"signature_data": 3}]),
+        mock.call([{"signature_data": 4}]),
+    ]
+    assert uploader.uploaded_batches == 3
+
+
+def test_upload_while_adding():
+    uploaded = threading.Event()
+    upload_batch = mock.MagicMock(side_effect=lambda batch: uploaded.set())
+    uploader = signature_uploader.SignatureUploader(upload_batch, 2)
+
+    uploader.add({"signature_data": 0})
+    uploader.add({"signature_data": 1})
+    # full batch is uploaded before the uploader is finished
+    assert uploaded.wait(10)
+    uploader.add({"signature_data": 2})
+    uploader.finish()
+
+    assert upload_batch.call_count == 2
+
+
+def test_upload_failure():
+    upload_batch = mock.MagicMock(side_effect=[None, ValueError("upload failed"), None])
+    uploader = signature_uploader.SignatureUploader(upload_batch, 1)
+
+    uploader.add({"signature_data": 0})
+    uploader.add({"signature_data": 1})
+    # error of the upload is raised by the next added signature, so signing stops early
+    with pytest.raises(ValueError, match="upload failed"):
+        for i in range(2, 1000):
+            uploader.add({"signature_data": i})
+            time.sleep(0.01)
+    with pytest.raises(ValueError, match="upload failed"):
+        uploader.finish()
+
+    # no batches are uploaded after a failure
+    assert upload_batch.call_count == 2
+    assert uploader.uploaded_batches == 1
+
+
+def test_finish_without_flush():
+    upload_batch = mock.MagicMock(side_effect=ValueError("upload failed"))
+    uploader = signature_uploader.SignatureUploader(upload_batch, 2)
+
+    for i in range(3):
+        uploader.add({"signature_data": i})
+    # error isn't raised, the incomplete batch isn't uploaded
+    uploader.finish(flush=False)
+
+    upload_batch.assert_called_once_with([{"signature_data": 0}, {"signature_data": 1}])
+
+
+def test_bounded_queue():
+    release = threading.Event()
+    upload_batch = mock.MagicMock(side_effect=lambda batch: release.wait(10))
+    uploader = signature_uploader.SignatureUploader(upload_batch, 1, max_queued_batches=1)
+    added = []
+
+    def add_signatures():
+        for i in range(4):
+            uploader.add({"signature_data": i})
+            added.append(i)
+
+    thread = threading.Thread(target=add_signatures)
+    thread.start()
+    # first batch is being uploaded, one is queued, adding the next one waits for the upload
+    time.sleep(0.2)
+    assert added == [0, 1]
+    release.set()
+    thread.join(10)
+    uploader.finish()
+
+    assert added == [0, 1, 2, 3]
+    assert upload_batch.call_count == 4
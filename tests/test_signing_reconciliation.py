@@ -0,0 +1,74 @@
+from pubtools._quay.signing_reconciliation import SigningReconciliation, StreamingReconciliation
+
+
+def _response(request_id, errors=None):
+    return {"request_id": request_id, "errors": errors or [], "signed_claim": request_id}
+
+
+def test_classify_responses(claim_messages):
+    reconciliation = SigningReconciliation(claim_messages)
+    reconciliation.add_responses([_response("id2", ["some-error"]), _response("id1")])
+
+    assert [reconciliation.get_status(m) for m in claim_messages] == ["ok", "error", "missing"]
+    assert [m["request_id"] for m in reconciliation.get_failed_claim_messages()] == ["id2", "id3"]
+    assert reconciliation.get_signature_messages() == [
+        _response("id1"),
+        _response("id2", ["some-error"]),
+    ]
+
+
+def test_retried_responses(claim_messages):
+    reconciliation = SigningReconciliation(claim_messages)
+    reconciliation.add_responses(
+        [_response("id1"), _response("id2", ["some-error"]), _response("id3", ["some-error"])]
+    )
+    # failed response replaces a failed one, but not a successful one
+    reconciliation.add_responses(
+        [_response("id1", ["other-error"]), _response("id2"), _response("id3", ["other-error"])]
+    )
+
+    assert [reconciliation.get_status(m) for m in claim_messages] == ["ok", "ok", "error"]
+    assert reconciliation.get_signature_messages() == [
+        _response("id1"),
+        _response("id2"),
+        _response("id3", ["other-error"]),
+    ]
+
+
+def test_unknown_response(claim_messages, caplog):
+    reconciliation = SigningReconciliation(claim_messages)
+    reconciliation.add_responses([_response("id4")])
+
+    assert reconciliation.get_signature_messages() == []
+    assert "Ignoring response to unknown signing request id4" in caplog.text
+
+
+def test_log_failures(claim_messages, caplog):
+    reconciliation = SigningReconciliation(claim_messages)
+    reconciliation.add_responses([_response("id1"), _response("id2", ["some-error"])])
+
+    assert reconciliation.log_failures() == 2
+    assert "failed with following errors: ['some-error']" in caplog.text
+    assert "No response was received for claim message" in caplog.text
+
+
+def test_streaming_reconciliation(claim_messages, caplog):
+    reconciliation = StreamingReconciliation()
+    tracked = reconciliation.track(iter(claim_messages))
+
+    # claims are remembered only once they're pulled
+    assert next(tracked) == claim_messages[0]
+    assert reconciliation.count == 1
+    assert list(tracked) == claim_messages[1:]
+
+    assert reconciliation.add_response(_response("id1")) == claim_messages[0]
+    assert reconciliation.add_response(_response("id2", ["some-error"])) is None
+    assert reconciliation.add_response(_response("id4")) is None
+    assert "Ignoring response to unknown signing request id4" in caplog.text
+    # signed claims aren't kept
+    assert reconciliation.get_failed_claim_messages() == claim_messages[1:]
+
+    assert reconciliation.log_failures() == 2
+    assert "failed with following errors: ['some-error']" in caplog.text
+    assert reconciliation.add_response(_response("id2")) == claim_messages[1]
+    assert reconciliation.get_failed_claim_messages() == claim_messages[2:]
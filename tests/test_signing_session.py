@@ -0,0 +1,85 @@
+import mock
+import proton.handlers
+import pytest
+
+from pubtools._quay import signing_session
+from pubtools._quay.manifest_claims_handler import MessageHandlerTimeoutException
+
+
+class FakeClaimsHandler(proton.handlers.MessagingHandler):
+    """Claims handler answering every claim right away, without any UMB connection."""
+
+    def __init__(self, fail=False):
+        """Initialize, optionally failing on every batch of claims."""
+        super(FakeClaimsHandler, self).__init__()
+        self.fail = fail
+        self.response_callback = None
+        self.batches = []
+        self.closed = False
+
+    def on_claims(self, event):
+        """Answer the injected claims."""
+        if self.fail:
+            raise MessageHandlerTimeoutException()
+        self.batches.append([m["request_id"] for m in event.subject])
+        for message in event.subject:
+            self.response_callback({"request_id": message["request_id"], "errors": []})
+
+    def on_close_signing_session(self, event):
+        """Record that the session was closed."""
+        self.closed = True
+
+
+def test_sign_batches():
+    handler = FakeClaimsHandler()
+    create_claims_handler = mock.MagicMock(return_value=handler)
+    session = signing_session.SigningSession(create_claims_handler)
+
+    assert session.sign([]) == []
+    create_claims_handler.assert_not_called()
+
+    received = session.sign([{"request_id": "1"}, {"request_id": "2"}])
+    assert sorted(m["request_id"] for m in received) == ["1", "2"]
+    response_callback = mock.MagicMock()
+    received = session.sign([{"request_id": "3"}], response_callback)
+    # responses passed to the callback aren't collected
+    assert received == []
+    response_callback.assert_called_once_with({"request_id": "3", "errors": []})
+
+    session.close()
+    # all batches were sent over the same connection
+    create_claims_handler.assert_called_once_with()
+    assert handler.batches == [["1", "2"], ["3"]]
+    assert handler.closed is True
+
+
+def test_sign_failure():
+    session = signing_session.SigningSession(lambda: FakeClaimsHandler(fail=True))
+
+    with pytest.raises(MessageHandlerTimeoutException):
+        session.sign([{"request_id": "1"}])
+    # session can't be used after a failure
+    with pytest.raises(MessageHandlerTimeoutException):
+        session.sign([{"request_id": "2"}])
+    session.close()
+
+
+def test_sign_callback_failure():
+    handler = FakeClaimsHandler()
+    session = signing_session.SigningSession(lambda: handler)
+    response_callback = mock.MagicMock(side_effect=ValueError("upload failed"))
+
+    with pytest.raises(ValueError, match="upload failed"):
+        session.sign([{"request_id": "1"}, {"request_id": "2"}], response_callback)
+    # batch stops at the first failure, and the session can still be used
+    response_callback.assert_called_once()
+    received = session.sign([{"request_id": "3"}])
+    assert [m["request_id"] for m in received] == ["3"]
+    session.close()
+
+
+def test_close_not_started():
+    create_claims_handler = mock.MagicMock()
+    session = signing_session.SigningSession(create_claims_handler)
+    session.close()
+    create_claims_handler.assert_not_called()
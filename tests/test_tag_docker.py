@@ -1567,11 +1567,11 @@ def test_tag_add_calculate_archs_different_manifest_types(
 @mock.patch("pubtools._quay.tag_docker.QuayClient")
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.get_image_details")
-@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_message")
+@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_messages")
 @mock.patch("pubtools._quay.tag_docker.ContainerImagePusher.run_tag_images")
-def test_copy_all_archs_sign_images_source(
+def test_run_tag_operations_copy_source(
     mock_run_tag_images,
-    mock_create_claim_message,
+    mock_create_claim_messages,
     mock_get_image_details,
     mock_quay_api_client,
     mock_quay_client,
@@ -1584,7 +1584,9 @@ def test_copy_all_archs_sign_images_source(
     sig_handler = mock.MagicMock()
     mock_sign_claim_messages = mock.MagicMock()
     sig_handler.sign_claim_messages = mock_sign_claim_messages
-    mock_create_claim_message.side_effect = ["msg{0}".format(i) for i in range(50)]
+    mock_create_claim_messages.side_effect = lambda claims, task_id: [
+        "msg{0}".format(i) for i in range(len(claims))
+    ]
     # shorten the ML to have less claim messages
     source_details = tag_docker.TagDocker.ImageDetails(
         "quay.io/some-namespace/namespace----test_repo:v1.5",
@@ -1600,28 +1602,32 @@ def test_copy_all_archs_sign_images_source(
         "some-target",
         target_settings,
     )
-    tag_docker_instance.copy_tag_sign_images(tag_docker_push_item_add, "v1.6", sig_handler)
+    with mock.patch.object(tag_docker_instance, "tag_add_calculate_archs", return_value=None):
+        operation = tag_docker_instance.plan_add_tag(tag_docker_push_item_add, "v1.6")
+    tag_docker_instance.run_tag_operations([operation], sig_handler)
 
     mock_get_image_details.assert_called_once_with(
         "quay.io/some-namespace/namespace----test_repo:v1.5"
     )
 
-    assert mock_create_claim_message.call_count == 2
-    assert mock_create_claim_message.call_args_list[0] == mock.call(
-        destination_repo="some-namespace/namespace----test_repo",
-        signature_key="some-key",
-        manifest_digest="sha256:8a3a33cad0bd33650ba7287a7ec94327d8e47ddf7845c569c80b5c4b20d49d36",
-        docker_reference="some-registry1.com/namespace/test_repo:v1.6",
-        image_name="namespace/test_repo",
-        task_id="1",
-    )
-    assert mock_create_claim_message.call_args_list[1] == mock.call(
-        destination_repo="some-namespace/namespace----test_repo",
-        signature_key="some-key",
-        manifest_digest="sha256:8a3a33cad0bd33650ba7287a7ec94327d8e47ddf7845c569c80b5c4b20d49d36",
-        docker_reference="some-registry2.com/namespace/test_repo:v1.6",
-        image_name="namespace/test_repo",
-        task_id="1",
+    mock_create_claim_messages.assert_called_once_with(
+        [
+            (
+                "some-namespace/namespace----test_repo",
+                "some-key",
+                "sha256:8a3a33cad0bd33650ba7287a7ec94327d8e47ddf7845c569c80b5c4b20d49d36",
+                "some-registry1.com/namespace/test_repo:v1.6",
+                "namespace/test_repo",
+            ),
+            (
+                "some-namespace/namespace----test_repo",
+                "some-key",
+                "sha256:8a3a33cad0bd33650ba7287a7ec94327d8e47ddf7845c569c80b5c4b20d49d36",
+                "some-registry2.com/namespace/test_repo:v1.6",
+                "namespace/test_repo",
+            ),
+        ],
+        "1",
     )
     mock_sign_claim_messages.assert_called_once_with(["msg0", "msg1"], True, True)
     mock_run_tag_images.assert_called_once_with(
@@ -1636,11 +1642,11 @@ def test_copy_all_archs_sign_images_source(
 @mock.patch("pubtools._quay.tag_docker.QuayClient")
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.get_image_details")
-@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_message")
+@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_messages")
 @mock.patch("pubtools._quay.tag_docker.ContainerImagePusher.run_tag_images")
-def test_tag_sign_images_multiarch_error(
+def test_plan_add_tag_copy_multiarch_error(
     mock_run_tag_images,
-    mock_create_claim_message,
+    mock_create_claim_messages,
     mock_get_image_details,
     mock_quay_api_client,
     mock_quay_client,
@@ -1650,7 +1656,6 @@ def test_tag_sign_images_multiarch_error(
     manifest_list_data,
 ):
     hub = mock.MagicMock()
-    sig_handler = mock.MagicMock()
     source_details = tag_docker.TagDocker.ImageDetails(
         "quay.io/some-namespace/namespace----test_repo:v1.5",
         manifest_list_data,
@@ -1665,8 +1670,9 @@ def test_tag_sign_images_multiarch_error(
         "some-target",
         target_settings,
     )
-    with pytest.raises(ValueError, match="Tagging workflow is not supported.*"):
-        tag_docker_instance.copy_tag_sign_images(tag_docker_push_item_add, "v1.6", sig_handler)
+    with mock.patch.object(tag_docker_instance, "tag_add_calculate_archs", return_value=None):
+        with pytest.raises(ValueError, match="Tagging workflow is not supported.*"):
+            tag_docker_instance.plan_add_tag(tag_docker_push_item_add, "v1.6")
 
     mock_get_image_details.assert_called_once_with(
         "quay.io/some-namespace/namespace----test_repo:v1.5"
@@ -1679,13 +1685,13 @@ def test_tag_sign_images_multiarch_error(
 @mock.patch("pubtools._quay.tag_docker.QuayClient")
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.get_image_details")
-@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_message")
+@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_messages")
 @mock.patch("pubtools._quay.tag_docker.ContainerImagePusher.run_tag_images")
 @mock.patch("pubtools._quay.tag_docker.ManifestListMerger")
-def test_merge_manifest_lists_sign_images(
+def test_run_tag_operations_merge_manifest_lists(
     mock_manifest_list_merger,
     mock_run_tag_images,
-    mock_create_claim_message,
+    mock_create_claim_messages,
     mock_get_image_details,
     mock_quay_api_client,
     mock_quay_client,
@@ -1698,7 +1704,9 @@ def test_merge_manifest_lists_sign_images(
     sig_handler = mock.MagicMock()
     mock_sign_claim_messages = mock.MagicMock()
     sig_handler.sign_claim_messages = mock_sign_claim_messages
-    mock_create_claim_message.side_effect = ["msg{0}".format(i) for i in range(50)]
+    mock_create_claim_messages.side_effect = lambda claims, task_id: [
+        "msg{0}".format(i) for i in range(len(claims))
+    ]
 
     # shorten the ML to have less claim messages
     new_manifest_list = deepcopy(manifest_list_data)
@@ -1721,9 +1729,11 @@ def test_merge_manifest_lists_sign_images(
         "some-target",
         target_settings,
     )
-    tag_docker_instance.merge_manifest_lists_sign_images(
-        tag_docker_push_item_add, "v1.6", ["arm64", "amd64"], sig_handler
-    )
+    with mock.patch.object(
+        tag_docker_instance, "tag_add_calculate_archs", return_value=["arm64", "amd64"]
+    ):
+        operation = tag_docker_instance.plan_add_tag(tag_docker_push_item_add, "v1.6")
+    tag_docker_instance.run_tag_operations([operation], sig_handler)
 
     mock_manifest_list_merger.assert_called_once_with(
         "quay.io/some-namespace/namespace----test_repo:v1.5",
@@ -1734,38 +1744,38 @@ def test_merge_manifest_lists_sign_images(
         "quay.io/some-namespace/namespace----test_repo:v1.5", manifest_list=True, raw=True
     )
 
-    assert mock_create_claim_message.call_count == 4
-    assert mock_create_claim_message.call_args_list[0] == mock.call(
-        destination_repo="some-namespace/namespace----test_repo",
-        signature_key="some-key",
-        manifest_digest="sha256:2e8f38a0a8d2a450598430fa70c7f0b53aeec991e76c3e29c63add599b4ef7ee",
-        docker_reference="some-registry1.com/namespace/test_repo:v1.6",
-        image_name="namespace/test_repo",
-        task_id="1",
-    )
-    assert mock_create_claim_message.call_args_list[1] == mock.call(
-        destination_repo="some-namespace/namespace----test_repo",
-        signature_key="some-key",
-        manifest_digest="sha256:2e8f38a0a8d2a450598430fa70c7f0b53aeec991e76c3e29c63add599b4ef7ee",
-        docker_reference="some-registry2.com/namespace/test_repo:v1.6",
-        image_name="namespace/test_repo",
-        task_id="1",
-    )
-    assert mock_create_claim_message.call_args_list[2] == mock.call(
-        destination_repo="some-namespace/namespace----test_repo",
-        signature_key="some-key",
-        manifest_digest="sha256:b3f9218fb5839763e62e52ee6567fe331aa1f3c644f9b6f232ff23959257acf9",
-        docker_reference="some-registry1.com/namespace/test_repo:v1.6",
-        image_name="namespace/test_repo",
-        task_id="1",
-    )
-    assert mock_create_claim_message.call_args_list[3] == mock.call(
-        destination_repo="some-namespace/namespace----test_repo",
-        signature_key="some-key",
-        manifest_digest="sha256:b3f9218fb5839763e62e52ee6567fe331aa1f3c644f9b6f232ff23959257acf9",
-        docker_reference="some-registry2.com/namespace/test_repo:v1.6",
-        image_name="namespace/test_repo",
-        task_id="1",
+    mock_create_claim_messages.assert_called_once_with(
+        [
+            (
+                "some-namespace/namespace----test_repo",
+                "some-key",
+                "sha256:2e8f38a0a8d2a450598430fa70c7f0b53aeec991e76c3e29c63add599b4ef7ee",
+                "some-registry1.com/namespace/test_repo:v1.6",
+                "namespace/test_repo",
+            ),
+            (
+                "some-namespace/namespace----test_repo",
+                "some-key",
+                "sha256:2e8f38a0a8d2a450598430fa70c7f0b53aeec991e76c3e29c63add599b4ef7ee",
+                "some-registry2.com/namespace/test_repo:v1.6",
+                "namespace/test_repo",
+            ),
+            (
+                "some-namespace/namespace----test_repo",
+                "some-key",
+                "sha256:b3f9218fb5839763e62e52ee6567fe331aa1f3c644f9b6f232ff23959257acf9",
+                "some-registry1.com/namespace/test_repo:v1.6",
+                "namespace/test_repo",
+            ),
+            (
+                "some-namespace/namespace----test_repo",
+                "some-key",
+                "sha256:b3f9218fb5839763e62e52ee6567fe331aa1f3c644f9b6f232ff23959257acf9",
+                "some-registry2.com/namespace/test_repo:v1.6",
+                "namespace/test_repo",
+            ),
+        ],
+        "1",
     )
     mock_sign_claim_messages.assert_called_once_with(["msg0", "msg1", "msg2", "msg3"], True, True)
 
@@ -1778,13 +1788,13 @@ def test_merge_manifest_lists_sign_images(
 @mock.patch("pubtools._quay.tag_docker.QuayClient")
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.get_image_details")
-@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_message")
+@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_messages")
 @mock.patch("pubtools._quay.tag_docker.ContainerImagePusher.run_tag_images")
 @mock.patch("pubtools._quay.tag_docker.ManifestListMerger")
-def test_merge_manifest_lists_sign_images_upload_original_manifest(
+def test_run_tag_operations_merge_upload_original_manifest(
     mock_manifest_list_merger,
     mock_run_tag_images,
-    mock_create_claim_message,
+    mock_create_claim_messages,
     mock_get_image_details,
     mock_quay_api_client,
     mock_quay_client,
@@ -1797,7 +1807,9 @@ def test_merge_manifest_lists_sign_images_upload_original_manifest(
     sig_handler = mock.MagicMock()
     mock_sign_claim_messages = mock.MagicMock()
     sig_handler.sign_claim_messages = mock_sign_claim_messages
-    mock_create_claim_message.side_effect = ["msg{0}".format(i) for i in range(50)]
+    mock_create_claim_messages.side_effect = lambda claims, task_id: [
+        "msg{0}".format(i) for i in range(len(claims))
+    ]
 
     # shorten the ML to have less claim messages
     new_manifest_list = deepcopy(manifest_list_data)
@@ -1825,9 +1837,11 @@ def test_merge_manifest_lists_sign_images_upload_original_manifest(
         "some-target",
         target_settings,
     )
-    tag_docker_instance.merge_manifest_lists_sign_images(
-        tag_docker_push_item_add, "v1.6", ["arm64", "amd64"], sig_handler
-    )
+    with mock.patch.object(
+        tag_docker_instance, "tag_add_calculate_archs", return_value=["arm64", "amd64"]
+    ):
+        operation = tag_docker_instance.plan_add_tag(tag_docker_push_item_add, "v1.6")
+    tag_docker_instance.run_tag_operations([operation], sig_handler)
 
     mock_manifest_list_merger.assert_called_once_with(
         "quay.io/some-namespace/namespace----test_repo:v1.5",
@@ -1957,8 +1971,6 @@ def test_manifest_list_remove_archs(
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.BasicSignatureHandler")
 @mock.patch("pubtools._quay.tag_docker.PushDocker.check_repos_validity")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_sign_images")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.merge_manifest_lists_sign_images")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.untag_image")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.manifest_list_remove_archs")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.tag_add_calculate_archs")
@@ -1970,8 +1982,6 @@ def test_run_add_noop(
     mock_tag_add_calculate_archs,
     mock_manifest_list_remove_archs,
     mock_untag_image,
-    mock_merge_manifest_lists_sign_images,
-    mock_copy_tag_sign_images,
     mock_check_repos_validity,
     mock_basic_signature_handler,
     mock_quay_api_client,
@@ -1997,7 +2007,8 @@ def test_run_add_noop(
         [tag_docker_push_item_add], hub, target_settings, mock_quay_api_client.return_value
     )
     mock_check_input_validity.assert_called_once_with()
-    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target")
+    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target", "1")
+    mock_basic_signature_handler.return_value.close_signing_session.assert_called_once_with()
     assert mock_tag_add_calculate_archs.call_count == 2
     assert mock_tag_add_calculate_archs.call_args_list[0] == mock.call(
         tag_docker_push_item_add, "v1.6"
@@ -2005,8 +2016,6 @@ def test_run_add_noop(
     assert mock_tag_add_calculate_archs.call_args_list[1] == mock.call(
         tag_docker_push_item_add, "v1.7"
     )
-    mock_copy_tag_sign_images.assert_not_called()
-    mock_merge_manifest_lists_sign_images.assert_not_called()
     mock_tag_remove_calculate_archs.assert_not_called()
     mock_untag_image.assert_not_called()
     mock_manifest_list_remove_archs.assert_not_called()
@@ -2017,10 +2026,10 @@ def test_run_add_noop(
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.BasicSignatureHandler")
 @mock.patch("pubtools._quay.tag_docker.PushDocker.check_repos_validity")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_sign_images")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.merge_manifest_lists_sign_images")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.untag_image")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.manifest_list_remove_archs")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_claim_messages")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_images")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.merge_manifest_lists_claim_messages")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.upload_merged_manifest_list")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.tag_add_calculate_archs")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.tag_remove_calculate_archs")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.check_input_validity")
@@ -2028,10 +2037,10 @@ def test_run_add_tag_images(
     mock_check_input_validity,
     mock_tag_remove_calculate_archs,
     mock_tag_add_calculate_archs,
-    mock_manifest_list_remove_archs,
-    mock_untag_image,
-    mock_merge_manifest_lists_sign_images,
-    mock_copy_tag_sign_images,
+    mock_upload_merged_manifest_list,
+    mock_merge_manifest_lists_claim_messages,
+    mock_copy_tag_images,
+    mock_copy_tag_claim_messages,
     mock_check_repos_validity,
     mock_basic_signature_handler,
     mock_quay_api_client,
@@ -2042,6 +2051,10 @@ def test_run_add_tag_images(
 ):
     hub = mock.MagicMock()
     mock_tag_add_calculate_archs.return_value = None
+    mock_copy_tag_claim_messages.side_effect = [["msg0", "msg1"], ["msg2", "msg3"]]
+    mock_sign_claim_messages = mock_basic_signature_handler.return_value.sign_claim_messages
+    # all images are signed before any of them is copied
+    mock_sign_claim_messages.side_effect = lambda *args: mock_copy_tag_images.assert_not_called()
 
     tag_docker_instance = tag_docker.TagDocker(
         [tag_docker_push_item_add],
@@ -2057,25 +2070,23 @@ def test_run_add_tag_images(
         [tag_docker_push_item_add], hub, target_settings, mock_quay_api_client.return_value
     )
     mock_check_input_validity.assert_called_once_with()
-    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target")
-    assert mock_tag_add_calculate_archs.call_count == 2
-    assert mock_tag_add_calculate_archs.call_args_list[0] == mock.call(
-        tag_docker_push_item_add, "v1.6"
-    )
-    assert mock_tag_add_calculate_archs.call_args_list[1] == mock.call(
-        tag_docker_push_item_add, "v1.7"
-    )
-    assert mock_copy_tag_sign_images.call_count == 2
-    assert mock_copy_tag_sign_images.call_args_list[0] == mock.call(
-        tag_docker_push_item_add, "v1.6", mock_basic_signature_handler.return_value
-    )
-    assert mock_copy_tag_sign_images.call_args_list[1] == mock.call(
-        tag_docker_push_item_add, "v1.7", mock_basic_signature_handler.return_value
-    )
-    mock_merge_manifest_lists_sign_images.assert_not_called()
+    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target", "1")
+    assert mock_tag_add_calculate_archs.call_args_list == [
+        mock.call(tag_docker_push_item_add, "v1.6"),
+        mock.call(tag_docker_push_item_add, "v1.7"),
+    ]
+    assert mock_copy_tag_claim_messages.call_args_list == [
+        mock.call(tag_docker_push_item_add, "v1.6"),
+        mock.call(tag_docker_push_item_add, "v1.7"),
+    ]
+    mock_sign_claim_messages.assert_called_once_with(["msg0", "msg1", "msg2", "msg3"], True, True)
+    assert mock_copy_tag_images.call_args_list == [
+        mock.call(tag_docker_push_item_add, "v1.6"),
+        mock.call(tag_docker_push_item_add, "v1.7"),
+    ]
+    mock_merge_manifest_lists_claim_messages.assert_not_called()
+    mock_upload_merged_manifest_list.assert_not_called()
     mock_tag_remove_calculate_archs.assert_not_called()
-    mock_untag_image.assert_not_called()
-    mock_manifest_list_remove_archs.assert_not_called()
 
 
 @mock.patch("pubtools._quay.tag_docker.RemoteExecutor")
@@ -2083,10 +2094,10 @@ def test_run_add_tag_images(
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.BasicSignatureHandler")
 @mock.patch("pubtools._quay.tag_docker.PushDocker.check_repos_validity")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_sign_images")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.merge_manifest_lists_sign_images")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.untag_image")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.manifest_list_remove_archs")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_claim_messages")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_images")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.merge_manifest_lists_claim_messages")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.upload_merged_manifest_list")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.tag_add_calculate_archs")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.tag_remove_calculate_archs")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.check_input_validity")
@@ -2094,10 +2105,10 @@ def test_run_add_merge_manifest_lists(
     mock_check_input_validity,
     mock_tag_remove_calculate_archs,
     mock_tag_add_calculate_archs,
-    mock_manifest_list_remove_archs,
-    mock_untag_image,
-    mock_merge_manifest_lists_sign_images,
-    mock_copy_tag_sign_images,
+    mock_upload_merged_manifest_list,
+    mock_merge_manifest_lists_claim_messages,
+    mock_copy_tag_images,
+    mock_copy_tag_claim_messages,
     mock_check_repos_validity,
     mock_basic_signature_handler,
     mock_quay_api_client,
@@ -2108,6 +2119,11 @@ def test_run_add_merge_manifest_lists(
 ):
     hub = mock.MagicMock()
     mock_tag_add_calculate_archs.side_effect = [["amd64", "arm"], ["amd64", "arm64", "arm"]]
+    mock_merge_manifest_lists_claim_messages.side_effect = [
+        ({"manifests": ["list1"]}, ["msg0"]),
+        ({"manifests": ["list2"]}, ["msg1"]),
+    ]
+    mock_sign_claim_messages = mock_basic_signature_handler.return_value.sign_claim_messages
 
     tag_docker_instance = tag_docker.TagDocker(
         [tag_docker_push_item_add],
@@ -2119,35 +2135,20 @@ def test_run_add_merge_manifest_lists(
 
     tag_docker_instance.run()
 
-    mock_check_repos_validity.assert_called_once_with(
-        [tag_docker_push_item_add], hub, target_settings, mock_quay_api_client.return_value
-    )
     mock_check_input_validity.assert_called_once_with()
-    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target")
-    assert mock_tag_add_calculate_archs.call_count == 2
-    assert mock_tag_add_calculate_archs.call_args_list[0] == mock.call(
-        tag_docker_push_item_add, "v1.6"
-    )
-    assert mock_tag_add_calculate_archs.call_args_list[1] == mock.call(
-        tag_docker_push_item_add, "v1.7"
-    )
-    mock_copy_tag_sign_images.assert_not_called()
-    assert mock_merge_manifest_lists_sign_images.call_count == 2
-    assert mock_merge_manifest_lists_sign_images.call_args_list[0] == mock.call(
-        tag_docker_push_item_add,
-        "v1.6",
-        ["amd64", "arm"],
-        mock_basic_signature_handler.return_value,
-    )
-    assert mock_merge_manifest_lists_sign_images.call_args_list[1] == mock.call(
-        tag_docker_push_item_add,
-        "v1.7",
-        ["amd64", "arm64", "arm"],
-        mock_basic_signature_handler.return_value,
-    )
+    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target", "1")
+    mock_copy_tag_claim_messages.assert_not_called()
+    mock_copy_tag_images.assert_not_called()
+    assert mock_merge_manifest_lists_claim_messages.call_args_list == [
+        mock.call(tag_docker_push_item_add, "v1.6", ["amd64", "arm"]),
+        mock.call(tag_docker_push_item_add, "v1.7", ["amd64", "arm64", "arm"]),
+    ]
+    mock_sign_claim_messages.assert_called_once_with(["msg0", "msg1"], True, True)
+    assert mock_upload_merged_manifest_list.call_args_list == [
+        mock.call(tag_docker_push_item_add, "v1.6", {"manifests": ["list1"]}),
+        mock.call(tag_docker_push_item_add, "v1.7", {"manifests": ["list2"]}),
+    ]
     mock_tag_remove_calculate_archs.assert_not_called()
-    mock_untag_image.assert_not_called()
-    mock_manifest_list_remove_archs.assert_not_called()
 
 
 @mock.patch("pubtools._quay.tag_docker.RemoteExecutor")
@@ -2155,8 +2156,63 @@ def test_run_add_merge_manifest_lists(
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.BasicSignatureHandler")
 @mock.patch("pubtools._quay.tag_docker.PushDocker.check_repos_validity")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_sign_images")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.merge_manifest_lists_sign_images")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_claim_messages")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_images")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.tag_add_calculate_archs")
+@mock.patch("pubtools._quay.tag_docker.TagDocker.check_input_validity")
+def test_run_add_dependent_tags(
+    mock_check_input_validity,
+    mock_tag_add_calculate_archs,
+    mock_copy_tag_images,
+    mock_copy_tag_claim_messages,
+    mock_check_repos_validity,
+    mock_basic_signature_handler,
+    mock_quay_api_client,
+    mock_quay_client,
+    mock_remote_executor,
+    target_settings,
+    tag_docker_push_item_add,
+):
+    hub = mock.MagicMock()
+    # second item copies the tag which is created by the first item
+    item2 = deepcopy(tag_docker_push_item_add)
+    item2.metadata["tag_source"] = "v1.7"
+    item2.metadata["add_tags"] = ["v1.8"]
+    mock_tag_add_calculate_archs.return_value = None
+    mock_copy_tag_claim_messages.side_effect = [["msg0"], ["msg1"], ["msg2"]]
+    mock_sign_claim_messages = mock_basic_signature_handler.return_value.sign_claim_messages
+    calls = mock.MagicMock()
+    calls.attach_mock(mock_sign_claim_messages, "sign_claim_messages")
+    calls.attach_mock(mock_copy_tag_claim_messages, "copy_tag_claim_messages")
+    calls.attach_mock(mock_copy_tag_images, "copy_tag_images")
+
+    tag_docker_instance = tag_docker.TagDocker(
+        [tag_docker_push_item_add, item2],
+        hub,
+        "1",
+        "some-target",
+        target_settings,
+    )
+
+    tag_docker_instance.run()
+
+    assert calls.mock_calls == [
+        mock.call.copy_tag_claim_messages(tag_docker_push_item_add, "v1.6"),
+        mock.call.copy_tag_claim_messages(tag_docker_push_item_add, "v1.7"),
+        mock.call.sign_claim_messages(["msg0", "msg1"], True, True),
+        mock.call.copy_tag_images(tag_docker_push_item_add, "v1.6"),
+        mock.call.copy_tag_images(tag_docker_push_item_add, "v1.7"),
+        mock.call.copy_tag_claim_messages(item2, "v1.8"),
+        mock.call.sign_claim_messages(["msg2"], True, True),
+        mock.call.copy_tag_images(item2, "v1.8"),
+    ]
+
+
+@mock.patch("pubtools._quay.tag_docker.RemoteExecutor")
+@mock.patch("pubtools._quay.tag_docker.QuayClient")
+@mock.patch("pubtools._quay.tag_docker.QuayApiClient")
+@mock.patch("pubtools._quay.tag_docker.BasicSignatureHandler")
+@mock.patch("pubtools._quay.tag_docker.PushDocker.check_repos_validity")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.untag_image")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.manifest_list_remove_archs")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.tag_add_calculate_archs")
@@ -2168,8 +2224,6 @@ def test_run_remove_noop(
     mock_tag_add_calculate_archs,
     mock_manifest_list_remove_archs,
     mock_untag_image,
-    mock_merge_manifest_lists_sign_images,
-    mock_copy_tag_sign_images,
     mock_check_repos_validity,
     mock_basic_signature_handler,
     mock_quay_api_client,
@@ -2195,10 +2249,8 @@ def test_run_remove_noop(
         [tag_docker_push_item_remove_src], hub, target_settings, mock_quay_api_client.return_value
     )
     mock_check_input_validity.assert_called_once_with()
-    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target")
+    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target", "1")
     mock_tag_add_calculate_archs.assert_not_called()
-    mock_copy_tag_sign_images.assert_not_called()
-    mock_merge_manifest_lists_sign_images.assert_not_called()
     assert mock_tag_remove_calculate_archs.call_count == 2
     assert mock_tag_remove_calculate_archs.call_args_list[0] == mock.call(
         tag_docker_push_item_remove_src, "v1.8"
@@ -2215,8 +2267,6 @@ def test_run_remove_noop(
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.BasicSignatureHandler")
 @mock.patch("pubtools._quay.tag_docker.PushDocker.check_repos_validity")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_sign_images")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.merge_manifest_lists_sign_images")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.untag_image")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.manifest_list_remove_archs")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.tag_add_calculate_archs")
@@ -2228,8 +2278,6 @@ def test_run_remove_untag_image(
     mock_tag_add_calculate_archs,
     mock_manifest_list_remove_archs,
     mock_untag_image,
-    mock_merge_manifest_lists_sign_images,
-    mock_copy_tag_sign_images,
     mock_check_repos_validity,
     mock_basic_signature_handler,
     mock_quay_api_client,
@@ -2255,10 +2303,8 @@ def test_run_remove_untag_image(
         [tag_docker_push_item_remove_src], hub, target_settings, mock_quay_api_client.return_value
     )
     mock_check_input_validity.assert_called_once_with()
-    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target")
+    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target", "1")
     mock_tag_add_calculate_archs.assert_not_called()
-    mock_copy_tag_sign_images.assert_not_called()
-    mock_merge_manifest_lists_sign_images.assert_not_called()
     assert mock_tag_remove_calculate_archs.call_count == 2
     assert mock_tag_remove_calculate_archs.call_args_list[0] == mock.call(
         tag_docker_push_item_remove_src, "v1.8"
@@ -2277,8 +2323,6 @@ def test_run_remove_untag_image(
 @mock.patch("pubtools._quay.tag_docker.QuayApiClient")
 @mock.patch("pubtools._quay.tag_docker.BasicSignatureHandler")
 @mock.patch("pubtools._quay.tag_docker.PushDocker.check_repos_validity")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.copy_tag_sign_images")
-@mock.patch("pubtools._quay.tag_docker.TagDocker.merge_manifest_lists_sign_images")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.untag_image")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.manifest_list_remove_archs")
 @mock.patch("pubtools._quay.tag_docker.TagDocker.tag_add_calculate_archs")
@@ -2290,8 +2334,6 @@ def test_run_remove_manifest_list_remove_archs(
     mock_tag_add_calculate_archs,
     mock_manifest_list_remove_archs,
     mock_untag_image,
-    mock_merge_manifest_lists_sign_images,
-    mock_copy_tag_sign_images,
     mock_check_repos_validity,
     mock_basic_signature_handler,
     mock_quay_api_client,
@@ -2320,10 +2362,8 @@ def test_run_remove_manifest_list_remove_archs(
         [tag_docker_push_item_remove_src], hub, target_settings, mock_quay_api_client.return_value
     )
     mock_check_input_validity.assert_called_once_with()
-    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target")
+    mock_basic_signature_handler.assert_called_once_with(hub, target_settings, "some-target", "1")
     mock_tag_add_calculate_archs.assert_not_called()
-    mock_copy_tag_sign_images.assert_not_called()
-    mock_merge_manifest_lists_sign_images.assert_not_called()
     assert mock_tag_remove_calculate_archs.call_count == 2
     assert mock_tag_remove_calculate_archs.call_args_list[0] == mock.call(
         tag_docker_push_item_remove_src, "v1.8"
@@ -2367,11 +2407,11 @@ def test_mod_entrypoint(
 
 
 @mock.patch("pubtools._quay.tag_docker.TagDocker.get_image_details")
-@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_message")
+@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_messages")
 @mock.patch("pubtools._quay.tag_docker.ContainerImagePusher.run_tag_images")
-def test_copy_all_archs_sign_images_source_none_signing_key(
+def test_run_tag_operations_copy_source_none_signing_key(
     mock_run_tag_images,
-    mock_create_claim_message,
+    mock_create_claim_messages,
     mock_get_image_details,
     target_settings,
     tag_docker_push_item_add,
@@ -2398,10 +2438,12 @@ def test_copy_all_archs_sign_images_source_none_signing_key(
         "some-target",
         target_settings,
     )
-    tag_docker_instance.copy_tag_sign_images(push_item_none_key, "v1.6", sig_handler)
+    with mock.patch.object(tag_docker_instance, "tag_add_calculate_archs", return_value=None):
+        operation = tag_docker_instance.plan_add_tag(push_item_none_key, "v1.6")
+    tag_docker_instance.run_tag_operations([operation], sig_handler)
 
-    assert mock_create_claim_message.call_count == 0
-    mock_sign_claim_messages.assert_called_once_with([], True, True)
+    mock_create_claim_messages.assert_not_called()
+    mock_sign_claim_messages.assert_not_called()
     mock_run_tag_images.assert_called_once_with(
         "quay.io/some-namespace/namespace----test_repo:v1.5",
         ["quay.io/some-namespace/namespace----test_repo:v1.6"],
@@ -2411,13 +2453,13 @@ def test_copy_all_archs_sign_images_source_none_signing_key(
 
 
 @mock.patch("pubtools._quay.tag_docker.QuayClient")
-@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_message")
+@mock.patch("pubtools._quay.tag_docker.SignatureHandler.create_manifest_claim_messages")
 @mock.patch("pubtools._quay.tag_docker.ContainerImagePusher.run_tag_images")
 @mock.patch("pubtools._quay.tag_docker.ManifestListMerger")
-def test_merge_manifest_lists_sign_images_none_signing_key(
+def test_run_tag_operations_merge_none_signing_key(
     mock_manifest_list_merger,
     mock_run_tag_images,
-    mock_create_claim_message,
+    mock_create_claim_messages,
     mock_quay_client,
     target_settings,
     tag_docker_push_item_add,
@@ -2450,12 +2492,14 @@ def test_merge_manifest_lists_sign_images_none_signing_key(
         "some-target",
         target_settings,
     )
-    tag_docker_instance.merge_manifest_lists_sign_images(
-        push_item_none_key, "v1.6", ["arm64", "amd64"], sig_handler
-    )
+    with mock.patch.object(
+        tag_docker_instance, "tag_add_calculate_archs", return_value=["arm64", "amd64"]
+    ):
+        operation = tag_docker_instance.plan_add_tag(push_item_none_key, "v1.6")
+    tag_docker_instance.run_tag_operations([operation], sig_handler)
 
-    assert mock_create_claim_message.call_count == 0
-    mock_sign_claim_messages.assert_called_once_with([], True, True)
+    mock_create_claim_messages.assert_not_called()
+    mock_sign_claim_messages.assert_not_called()
     mock_upload_manifest.assert_called_once_with(
         new_manifest_list, "quay.io/some-namespace/namespace----test_repo:v1.6"
     )
@@ -21,6 +21,7 @@ from pubtools._quay.utils.logger import Logger
 from pubtools._quay.utils.stepper import StepResults
 
 from .conftest import MockContainerPushItem
+from .utils.misc import mock_entry_point
 
 
 @pytest.fixture
@@ -227,9 +228,10 @@ def operator_push_item_unkwown_op_type():
 
 @pytest.fixture
 def fixture_pyxis_get_ocp_versions():
-    with mock.patch("pkg_resources.load_entry_point") as mocked:
-        print(mocked())
-        yield mocked()
+    with mock_entry_point(
+        "pubtools-pyxis", "console_scripts", "pubtools-pyxis-get-operator-indices"
+    ) as mocked:
+        yield mocked
 
 
 @pytest.fixture
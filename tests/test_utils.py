@@ -1,6 +1,7 @@
 import json
 import logging
 import mock
+import threading
 import pytest
 import requests_mock
 import requests
@@ -53,6 +54,36 @@ def test_run_entrypoint(caplog):
         compare_logs(caplog, expected_logs)
 
 
+@mock.patch.dict(misc._entry_point_cache, clear=True)
+def test_load_entry_point():
+    with mock.patch.object(
+        misc, "_resolve_entry_point", wraps=misc._resolve_entry_point
+    ) as mock_resolve:
+        entry_point = misc.load_entry_point("pytest", "console_scripts", "pytest")
+        assert callable(entry_point)
+        assert misc.load_entry_point("pytest", "console_scripts", "pytest") is entry_point
+    mock_resolve.assert_called_once_with("pytest", "console_scripts", "pytest")
+
+
+@mock.patch.dict(misc._entry_point_cache, clear=True)
+def test_load_entry_point_not_found():
+    with pytest.raises(ImportError, match="Distribution 'nonexistent-dist' is not installed"):
+        misc.load_entry_point("nonexistent-dist", "console_scripts", "some-script")
+    with pytest.raises(ImportError, match="Entry point some-script of group console_scripts.*"):
+        misc.load_entry_point("pytest", "console_scripts", "some-script")
+    assert misc._entry_point_cache == {}
+
+
+@mock.patch.dict(misc._entry_point_cache, clear=True)
+@mock.patch("pubtools._quay.utils.misc.importlib_metadata", None)
+@mock.patch("pkg_resources.load_entry_point")
+def test_load_entry_point_pkg_resources(mock_load_entry_point):
+    assert misc.load_entry_point("some-dist", "console_scripts", "some-script") == (
+        mock_load_entry_point.return_value
+    )
+    mock_load_entry_point.assert_called_once_with("some-dist", "console_scripts", "some-script")
+
+
 def test_get_internal_repo_name():
     internal_name = misc.get_internal_container_repo_name("namespace/repo")
     assert internal_name == "namespace----repo"
@@ -83,3 +114,57 @@ def test_get_external_repo_name_errors():
 
     with pytest.raises(ValueError, match="Input repository should have the format.*"):
         misc.get_external_container_repo_name("name----space----repo")
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_run_in_parallel(threads):
+    assert misc.run_in_parallel(lambda x: x * 2, [1, 2, 3, 4, 5], threads) == [2, 4, 6, 8, 10]
+    assert misc.run_in_parallel(lambda x: x * 2, [], threads) == []
+
+
+def test_run_in_parallel_error():
+    def func(x):
+        if x == 3:
+            raise ValueError("failed {0}".format(x))
+        return x
+
+    with pytest.raises(ValueError, match="failed 3"):
+        misc.run_in_parallel(func, [1, 2, 3, 4], 2)
+
+
+def test_get_target_info():
+    hub1 = mock.MagicMock()
+    hub1.worker.get_target_info.side_effect = lambda target: {"name": target}
+    hub2 = mock.MagicMock()
+    hub2.worker.get_target_info.return_value = {"name": "other"}
+
+    assert misc.get_target_info(hub1, "target1") == {"name": "target1"}
+    assert misc.get_target_info(hub1, "target1") == {"name": "target1"}
+    assert misc.get_target_info(hub1, "target2") == {"name": "target2"}
+    assert misc.get_target_info(hub2, "target1") == {"name": "other"}
+
+    assert hub1.worker.get_target_info.call_args_list == [
+        mock.call("target1"),
+        mock.call("target2"),
+    ]
+    hub2.worker.get_target_info.assert_called_once_with("target1")
+
+
+def test_get_target_info_concurrent_targets():
+    hub = mock.MagicMock()
+    target2_requested = threading.Event()
+
+    def get_target_info(target):
+        if target == "target1":
+            # request of another target isn't blocked by this one
+            assert target2_requested.wait(10)
+        else:
+            target2_requested.set()
+        return {"name": target}
+
+    hub.worker.get_target_info.side_effect = get_target_info
+    results = misc.run_in_parallel(
+        lambda target: misc.get_target_info(hub, target), ["target1", "target2"], threads=2
+    )
+
+    assert results == [{"name": "target1"}, {"name": "target2"}]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Measure the cost of timeout handling of ManifestClaimsHandler with many requests in flight.
+
+A handler is filled with simulated in-flight claims sent over the course of the signing timeout,
+and timer ticks are run at several points in time, so that none, some, or all of the requests
+have timed out. The time of a tick is compared with a full scan of sorted awaited requests, which
+is how timeouts were found before the deadline heap was introduced. The tick also re-queues the
+timed out requests, while the scan only finds them. No UMB connection is made.
+
+Usage: python utils/benchmark_claim_timeouts.py [--claims N]
+"""
+
+import argparse
+import logging
+import time
+
+import mock
+
+from pubtools._quay import manifest_claims_handler
+
+TIMEOUT = 600
+
+
+def create_handler(count):
+    """Create a handler awaiting responses to the given number of requests."""
+    messages = [{"request_id": "{0:08d}".format(i)} for i in range(count)]
+    with mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain"):
+        handler = manifest_claims_handler.ManifestClaimsHandler(
+            [],
+            "",
+            messages,
+            "",
+            "",
+            TIMEOUT,
+            count,
+            count,
+            lambda messages: None,
+        )
+    handler.connected = True
+    handler._pull_claims(count)
+    handler.to_send = []
+    # requests are sent evenly over one timeout period
+    for i, message in enumerate(messages):
+        handler._await_response(message["request_id"], float(i) * TIMEOUT / count)
+    return handler
+
+
+def scan_sorted(handler, now):
+    """Find timed out requests the way it was done before the deadline heap."""
+    expired = []
+    for request_id, started in sorted(list(handler.awaiting_response.items())):
+        if now - started > handler.timeout:
+            expired.append(request_id)
+    return expired
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure timeout handling of claims.")
+    parser.add_argument("--claims", type=int, default=50000, help="Number of in-flight claims")
+    args = parser.parse_args()
+    # don't log every timed out request
+    logging.getLogger("PubLogger").setLevel(logging.ERROR)
+
+    print("{0:<12} {1:>12} {2:>14} {3:>14}".format("expired", "requests", "heap [ms]", "scan [ms]"))
+    for expired_fraction in [0.0, 0.01, 0.1, 1.0]:
+        handler = create_handler(args.claims)
+        now = TIMEOUT * (1 + expired_fraction)
+        event = mock.MagicMock()
+
+        start = time.time()
+        scan_sorted(handler, now)
+        scan_time = time.time() - start
+
+        with mock.patch(
+            "pubtools._quay.manifest_claims_handler.monotonic.monotonic", return_value=now
+        ):
+            with mock.patch.object(handler, "_send_message"):
+                start = time.time()
+                handler.on_timer_task(event)
+                heap_time = time.time() - start
+
+        print(
+            "{0:<12} {1:>12} {2:>14.2f} {3:>14.2f}".format(
+                "{0:.0%}".format(expired_fraction),
+                len(handler.to_send),
+                heap_time * 1000,
+                scan_time * 1000,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
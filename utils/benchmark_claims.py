@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Measure throughput of constructing claim messages sent to RADAS.
+
+Claim messages are constructed for a synthetic push, once by constructing every message
+separately and once by constructing all of them in bulk, and then serialized as they would be
+when sent to RADAS. Messages per second of each step are reported, as well as memory held by the
+constructed messages (on Python 3).
+
+Usage: python utils/benchmark_claims.py [--claims N] [--keys N]
+"""
+
+import argparse
+import time
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None
+
+from pubtools._quay.claim_message import serialize_claim_messages
+from pubtools._quay.signature_handler import SignatureHandler
+
+
+def get_claims(count, keys):
+    """Generate claims as accepted by SignatureHandler.create_manifest_claim_messages."""
+    claims = []
+    i = 0
+    while len(claims) < count:
+        digest = "sha256:{0:064x}".format(i // 4)
+        reference = "registry.com/namespace/image-{0}:tag-{1}".format(i // 40, i % 4)
+        for key in range(keys):
+            claims.append(("namespace/image", "key{0}".format(key), digest, reference, "image"))
+        i += 1
+    return claims[:count]
+
+
+def measure(func):
+    """Call a function and return its duration in seconds and its result."""
+    start = time.time()
+    result = func()
+    return (time.time() - start, result)
+
+
+def measure_memory(func):
+    """Call a function and return the size of its retained result in megabytes."""
+    if tracemalloc is None:
+        return float("nan")
+    tracemalloc.start()
+    result = func()  # noqa: F841
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / 1024.0 / 1024.0
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure claim message construction.")
+    parser.add_argument("--claims", type=int, default=100000, help="Number of claims")
+    parser.add_argument("--keys", type=int, default=2, help="Number of signing keys per image")
+    args = parser.parse_args()
+
+    claims = get_claims(args.claims, args.keys)
+
+    def one_by_one():
+        return [
+            SignatureHandler.create_manifest_claim_message(*claim, task_id="1") for claim in claims
+        ]
+
+    def bulk():
+        return SignatureHandler.create_manifest_claim_messages(claims, "1")
+
+    print("{0:<20} {1:>10} {2:>15}".format("method", "time [s]", "claims/s"))
+    for name, func in [("one by one", one_by_one), ("bulk", bulk)]:
+        duration, messages = measure(func)
+        print("{0:<20} {1:>10.2f} {2:>15.0f}".format(name, duration, len(claims) / duration))
+
+    duration, _ = measure(lambda: serialize_claim_messages(messages))
+    print("{0:<20} {1:>10.2f} {2:>15.0f}".format("serialization", duration, len(claims) / duration))
+
+    print("")
+    print("{0:<20} {1:>10}".format("messages", "memory [MB]"))
+    print("{0:<20} {1:>10.1f}".format("compact", measure_memory(bulk)))
+    print(
+        "{0:<20} {1:>10.1f}".format(
+            "serialized", measure_memory(lambda: serialize_claim_messages(bulk()))
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Measure peak memory of signing many claims with ManifestClaimsHandler.
+
+RADAS is simulated by answering every sent claim right away, in the order in which the claims
+were sent. Claims are passed to the handler either as a list created upfront, with responses
+collected by the handler, or as a generator with responses handled only by a callback. No UMB
+connection is made.
+
+Usage: python utils/benchmark_claims_memory.py [--claims N] [--throttle N]
+"""
+
+import argparse
+from collections import deque
+import json
+import logging
+import time
+import tracemalloc
+
+import mock
+
+from pubtools._quay import manifest_claims_handler
+from pubtools._quay.signature_handler import SignatureHandler
+
+
+def generate_claims(count):
+    """Generate claim messages of distinct images."""
+    for i in range(count):
+        claim = (
+            "namespace/repo",
+            "key1",
+            "sha256:{0:064x}".format(i),
+            "registry.com/namespace/repo:{0}".format(i),
+            "namespace/repo",
+        )
+        for message in SignatureHandler.create_manifest_claim_messages([claim], "1"):
+            yield message
+
+
+def run(claim_messages, throttle, lazy):
+    """Sign the claims by a simulated RADAS and return the number of responses."""
+    sent = deque()
+    responses = [0]
+
+    def on_response(message):
+        responses[0] += 1
+
+    with mock.patch("pubtools._quay.manifest_claims_handler.proton.SSLDomain"):
+        handler = manifest_claims_handler.ManifestClaimsHandler(
+            [],
+            "",
+            claim_messages,
+            "",
+            "",
+            600,
+            throttle,
+            3,
+            sent.extend,
+            response_callback=on_response if lazy else None,
+            keep_responses=not lazy,
+        )
+    handler.receiver = mock.MagicMock()
+    handler.timer_task = mock.MagicMock()
+    event = mock.MagicMock()
+    event.receiver = handler.receiver
+    handler.on_link_opened(event)
+
+    while sent:
+        message = sent.popleft()
+        response = {
+            "request_id": message["request_id"],
+            "manifest_digest": message["manifest_digest"],
+            "signed_claim": message["claim_file"],
+            "errors": [],
+        }
+        event.message.body = json.dumps({"msg": response})
+        handler.on_message(event)
+
+    return responses[0] if lazy else len(handler.received_messages)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure peak memory of signing claims.")
+    parser.add_argument("--claims", type=int, default=50000, help="Number of claims")
+    parser.add_argument("--throttle", type=int, default=100, help="Window of in-flight claims")
+    args = parser.parse_args()
+    logging.getLogger("PubLogger").setLevel(logging.ERROR)
+
+    print("{0:<10} {1:>12} {2:>10} {3:>14}".format("input", "responses", "time [s]", "peak [MiB]"))
+    for lazy in [False, True]:
+        tracemalloc.start()
+        start = time.time()
+        claims = generate_claims(args.claims)
+        responses = run(claims if lazy else list(claims), args.throttle, lazy)
+        duration = time.time() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(
+            "{0:<10} {1:>12} {2:>10.2f} {3:>14.1f}".format(
+                "generator" if lazy else "list", responses, duration, peak / 1024.0 / 1024.0
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
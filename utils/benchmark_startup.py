@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Measure cold start time of pubtools-quay console scripts.
+
+Every console script module is imported in a fresh interpreter several times, and the fastest
+and median wall-clock times are reported. Interpreter startup itself is measured as a baseline.
+
+Usage: python utils/benchmark_startup.py [--runs N]
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+# Mirrors 'console_scripts' in setup.py
+CONSOLE_SCRIPTS = [
+    ("pubtools-quay-tag-image", "pubtools._quay.tag_images", "tag_images_main"),
+    (
+        "pubtools-quay-merge-manifest-list",
+        "pubtools._quay.merge_manifest_list",
+        "merge_manifest_list_main",
+    ),
+    ("pubtools-quay-untag", "pubtools._quay.untag_images", "untag_images_main"),
+    ("pubtools-quay-remove-repo", "pubtools._quay.remove_repo", "remove_repository_main"),
+]
+
+
+def measure(code, runs):
+    """Run Python code in fresh interpreters and return the measured times in milliseconds."""
+    times = []
+    for _ in range(runs):
+        start = time.time()
+        subprocess.check_call([sys.executable, "-c", code])
+        times.append((time.time() - start) * 1000)
+    return sorted(times)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure cold start of console scripts.")
+    parser.add_argument("--runs", type=int, default=10, help="Number of runs per script")
+    args = parser.parse_args()
+
+    baseline = measure("pass", args.runs)
+    print("{0:<40} {1:>10} {2:>10}".format("script", "min [ms]", "median [ms]"))
+    print(
+        "{0:<40} {1:>10.1f} {2:>10.1f}".format(
+            "(interpreter)", baseline[0], baseline[len(baseline) // 2]
+        )
+    )
+
+    for script, module, func in CONSOLE_SCRIPTS:
+        code = "from {0} import {1}; import sys; assert 'pkg_resources' not in sys.modules".format(
+            module, func
+        )
+        times = measure(code, args.runs)
+        print("{0:<40} {1:>10.1f} {2:>10.1f}".format(script, times[0], times[len(times) // 2]))
+
+
+if __name__ == "__main__":
+    main()